@@ -9,9 +9,20 @@ def get_script_name() -> str:
     return Path(sys.argv[0]).stem
 
 
-def init_mt5(login: int, password: str, server: str):
+def init_mt5(login: int, password: str, server: str, supervise: bool = False):
     logging.info(f"MetaTRADER5 package author: {mt5.__author__}")
     logging.info(f"MetaTRADER5 package version: {mt5.__version__}")
+    if supervise:
+        # reconnects by itself when the terminal drops, see MT5ConnectionSupervisor
+        from art_trader.mt5.connection import MT5ConnectionSupervisor
+
+        supervisor = MT5ConnectionSupervisor(login, password, server)
+        if not supervisor.reconnect(max_attempts=5):
+            print("initialize() failed | {}".format(supervisor.last_error))
+            quit()
+        supervisor.install()
+        supervisor.start()
+        return supervisor
     if not mt5.initialize(login=login, password=password, server=server):
         print("initialize() failed, error code ={}".format(mt5.last_error()))
         quit()
@@ -0,0 +1,140 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+from datetime import datetime
+from typing import Optional, Type
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from art_trader.abstract.cache import toEpoch
+from art_trader.abstract.common import Symbol
+from art_trader.abstract.resample import PERIOD_SPAN, SUNDAY, periodEnds
+from art_trader.abstract.utils import TIME, BrokerUtils
+
+log = logging.getLogger(__name__)
+
+NONE = -1
+
+
+def enclosing(lower_times: np.ndarray, higher_times: np.ndarray, higher_ends: np.ndarray) -> np.ndarray:
+    """
+    Returns the row of the higher timeframe bar whose period contains each lower timeframe bar,
+    or `NONE` if that bar is missing (before the data or in a gap).
+    """
+    idx = np.searchsorted(higher_times, lower_times, side="right") - 1
+    valid = idx >= 0
+    valid[valid] = lower_times[valid] < higher_ends[idx[valid]]
+    return np.where(valid, idx, NONE)
+
+
+def lastCompleted(lower_times: np.ndarray, higher_ends: np.ndarray) -> np.ndarray:
+    """
+    Returns the row of the latest higher timeframe bar that had closed when each lower timeframe
+    bar opened, or `NONE` if there is none. This is the bar a strategy may read without lookahead.
+    """
+    return np.searchsorted(higher_ends, lower_times, side="right") - 1
+
+
+class AlignmentIndex:
+    """
+    Maps the bars of one symbol across timeframes, built once from its rates.
+
+    For every pair of a lower and a higher timeframe, the index holds the enclosing higher bar and
+    the last completed higher bar of each lower bar, and the lower rows making up each higher bar.
+    Lookups in strategy loops are then plain integer indexing.
+
+    Rows refer to the arrays the index was built from, see `rates`.
+
+    Attributes:
+        rules (dict[int, str]): The resampling rule of each higher timeframe, as `BrokerUtils.resampleRules`.
+        tz (ZoneInfo, optional): The session timezone of the bar times, as `BrokerUtils.RATES_TZ`.
+    """
+
+    def __init__(self, rates: dict[int, np.ndarray], rules: dict[int, str], tz: Optional[ZoneInfo] = None,
+                 week_start: int = SUNDAY) -> None:
+        self.rules = rules
+        self.tz = tz
+        self._rates = {tf: np.asarray(x) for tf, x in rates.items()}
+        self._times = {tf: x[:, TIME].astype(np.int64) if len(x) else np.empty(0, dtype=np.int64)
+                       for tf, x in self._rates.items()}
+        self._ends = {tf: periodEnds(self._times[tf], rules[tf], tz, week_start) for tf in self._rates if tf in rules}
+
+        self._enclosing: dict[tuple, np.ndarray] = {}
+        self._completed: dict[tuple, np.ndarray] = {}
+        self._members: dict[tuple, tuple] = {}
+        for lower in self._rates:
+            for higher in self._ends:
+                if self._span(lower) >= self._span(higher):
+                    continue
+                key = (lower, higher)
+                self._enclosing[key] = enclosing(self._times[lower], self._times[higher], self._ends[higher])
+                self._completed[key] = lastCompleted(self._times[lower], self._ends[higher])
+                self._members[key] = (np.searchsorted(self._times[lower], self._times[higher]),
+                                      np.searchsorted(self._times[lower], self._ends[higher]))
+
+    def __repr__(self) -> str:
+        return str({"timeframes": list(self._rates), "pairs": list(self._enclosing)})
+
+    def _span(self, timeframe: int) -> float:
+        # timeframes without a rule (M10) are below every rule
+        return PERIOD_SPAN[self.rules[timeframe]].total_seconds() if timeframe in self.rules else 0
+
+    def rates(self, timeframe: int) -> np.ndarray:
+        return self._rates[timeframe]
+
+    def enclosing(self, lower: int, higher: int) -> np.ndarray:
+        """
+        Returns the enclosing `higher` row of every `lower` row (`NONE` if missing).
+
+        Raises:
+            KeyError: If `lower` is not below `higher` or either was not indexed.
+        """
+        return self._enclosing[(lower, higher)]
+
+    def lastCompleted(self, lower: int, higher: int) -> np.ndarray:
+        """
+        Returns the last completed `higher` row when every `lower` row opened (`NONE` if none).
+
+        Raises:
+            KeyError: If `lower` is not below `higher` or either was not indexed.
+        """
+        return self._completed[(lower, higher)]
+
+    def members(self, higher: int, row: int, lower: int) -> slice:
+        """
+        Returns the `lower` rows within the period of a `higher` row, e.g. the hourly bars of a day.
+
+        Raises:
+            KeyError: If `lower` is not below `higher` or either was not indexed.
+        """
+        starts, ends = self._members[(lower, higher)]
+        return slice(int(starts[row]), int(ends[row]))
+
+    def row(self, timeframe: int, time) -> int:
+        """
+        Returns the row of the bar of `timeframe` opening at `time` (epoch seconds, date or datetime), or `NONE`.
+        """
+        t = int(toEpoch(time))
+        times = self._times[timeframe]
+        i = int(np.searchsorted(times, t))
+        return i if i < len(times) and times[i] == t else NONE
+
+    @classmethod
+    def fromBroker(cls, broker_utils: Type[BrokerUtils], symbol: Symbol, timeframes: list[int],
+                   start: datetime, end: datetime) -> "AlignmentIndex":
+        """
+        Fetches the symbol's rates of every timeframe through `broker_utils.getData` and indexes them.
+
+        Raises:
+            Exception: If fetching any of them fails.
+        """
+        rates = {}
+        for timeframe in timeframes:
+            try:
+                data = broker_utils.getData(symbol, timeframe, start, end)
+            except Exception as e:
+                raise Exception(f"Failed to load {symbol.info.ticker} {timeframe} for alignment | {e}")
+            rates[timeframe] = data if len(data) else np.empty((0, 6))
+        return cls(rates, broker_utils.resampleRules(), broker_utils.RATES_TZ)
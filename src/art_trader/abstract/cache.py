@@ -0,0 +1,172 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from art_trader.abstract.common import Symbol
+from art_trader.abstract.utils import TIME, adjust_tz
+
+log = logging.getLogger(__name__)
+
+
+def toEpoch(dt) -> float:
+    """Converts a date, datetime or timestamp to epoch seconds the way `getRates` interprets it."""
+    if isinstance(dt, (int, float, np.integer, np.floating)):
+        return float(dt)
+    if isinstance(dt, datetime) and dt.tzinfo is not None:
+        return dt.timestamp()
+    return adjust_tz(dt).timestamp()
+
+
+class _Entry:
+
+    def __init__(self, start: float, end: float, rates: np.ndarray) -> None:
+        self.start = start
+        self.end = end
+        self.rates = rates
+        self.used = time.monotonic()
+
+    @property
+    def spilled(self) -> bool:
+        # in a read-only file mapping or shared memory block (see shm.serve): not this process's memory
+        return isinstance(self.rates, np.memmap) or not self.rates.flags.writeable
+
+
+class RateCache:
+    """
+    In-process cache of formatted rates per (ticker, timeframe).
+
+    Each key holds one contiguous covered time range. A request inside the range is a slice;
+    a request reaching outside it fetches only the missing part(s) and extends the range.
+
+    Attributes:
+        fetch (Callable): Fetches formatted rates for `(symbol, timeframe, start, end)`.
+    """
+
+    def __init__(self, fetch: Callable[[Symbol, int, datetime, datetime], np.ndarray]) -> None:
+        self.fetch = fetch
+        self._entries: dict[tuple, _Entry] = {}
+        self._lock = threading.RLock()
+
+    def __repr__(self) -> str:
+        return str({"keys": list(self._entries.keys())})
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        """The bytes held in memory, excluding spilled entries."""
+        return sum(x.rates.nbytes for x in list(self._entries.values()) if not x.spilled)
+
+    def spill(self, nbytes: int, directory: str) -> int:
+        """
+        Moves the least recently used entries to read-only memory-mapped files in `directory` until
+        at least `nbytes` are freed. Spilled entries are still served, from disk (or the page cache);
+        an entry extended later is back in memory.
+
+        Returns:
+            int: The bytes freed.
+        """
+        freed = 0
+        with self._lock:
+            for key, entry in sorted(self._entries.items(), key=lambda x: x[1].used):
+                if freed >= nbytes:
+                    break
+                if entry.spilled or entry.rates.nbytes == 0:
+                    continue
+                path = os.path.join(directory, f"rates-{uuid.uuid4().hex}.npy")
+                out = np.lib.format.open_memmap(path, mode="w+", dtype=entry.rates.dtype, shape=entry.rates.shape)
+                out[:] = entry.rates
+                out.flush()
+                del out
+                freed += entry.rates.nbytes
+                entry.rates = np.load(path, mmap_mode="r")
+        if freed:
+            log.info(f"spilled {freed / 2 ** 20:.1f} MiB of rates to {directory}")
+        return freed
+
+    def release(self, directory: str) -> int:
+        """
+        Drops the entries spilled to `directory`, before the directory is removed. They are fetched
+        again when next requested.
+
+        Returns:
+            int: The number of entries dropped.
+        """
+        directory = os.path.abspath(directory)
+        with self._lock:
+            keys = [k for k, x in self._entries.items() if isinstance(x.rates, np.memmap)
+                    and os.path.dirname(os.path.abspath(x.rates.filename)) == directory]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def evict(self, ticker: str, timeframe: int = None) -> None:
+        """Drops the cached rates of a ticker (for one timeframe or all)."""
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == ticker and timeframe in (None, k[1])]:
+                del self._entries[key]
+
+    def put(self, ticker: str, timeframe: int, start, end, rates: np.ndarray) -> None:
+        """Stores rates known to cover `[start, end]`, replacing what was cached for the key."""
+        with self._lock:
+            self._entries[(ticker, timeframe)] = _Entry(toEpoch(start), toEpoch(end), rates)
+
+    def _fetch(self, symbol: Symbol, timeframe: int, start: float, end: float) -> np.ndarray:
+        utc = ZoneInfo("UTC")
+        return self.fetch(symbol, timeframe, datetime.fromtimestamp(start, utc), datetime.fromtimestamp(end, utc))
+
+    def get(self, symbol: Symbol, timeframe: int, start, end) -> np.ndarray:
+        """
+        Returns the formatted rates with `start <= time <= end`, fetching only what is not cached.
+
+        Extending a cached range forward fetches again from the open of its last bar, which may
+        have been forming when it was cached.
+        """
+        key = (symbol.info.ticker, timeframe)
+        start, end = toEpoch(start), toEpoch(end)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Entry(start, end, self._fetch(symbol, timeframe, start, end))
+            else:
+                parts = []
+                if start < entry.start:
+                    parts.append(self._fetch(symbol, timeframe, start, entry.start))
+                if len(entry.rates):
+                    parts.append(entry.rates)
+                if end > entry.end:
+                    # the last cached bar may have been forming when it was fetched, so it is fetched again
+                    since = min(entry.end, entry.rates[-1, TIME]) if len(entry.rates) else entry.end
+                    parts.append(self._fetch(symbol, timeframe, since, end))
+                parts = [x for x in parts if len(x)]
+                if len(parts) > 1:
+                    rates = np.concatenate(parts)
+                    # bars fetched twice at a boundary keep their latest version
+                    _, last = np.unique(rates[::-1, TIME], return_index=True)
+                    entry.rates = rates[::-1][last]
+                elif parts:
+                    entry.rates = parts[0]
+                entry.start, entry.end = min(start, entry.start), max(end, entry.end)
+            entry.used = time.monotonic()
+            rates = entry.rates
+
+        if len(rates) == 0:
+            return rates
+        lo = np.searchsorted(rates[:, TIME], start, side="left")
+        hi = np.searchsorted(rates[:, TIME], end, side="right")
+        return rates[lo:hi]
@@ -3,6 +3,7 @@ __version__ = "0.0-SNAPSHOT"
 
 from abc import ABC, abstractmethod
 from datetime import datetime
+from typing import Optional
 
 
 class SymbolInfo(ABC):
@@ -37,6 +38,25 @@ class Symbol(ABC):
         return str(self.__dict__)
 
 
+class StaticSymbolInfo(SymbolInfo):
+    """
+    Symbol information given up front, for data sources that do not describe their symbols.
+    """
+
+    def __init__(self, ticker: str, currency_profit: str = "USD", trade_contract_size: float = 1.,
+                 volume_step: float = None) -> None:
+        self.ticker = ticker
+        self.currency_profit = currency_profit
+        self.trade_contract_size = trade_contract_size
+        self.volume_step = volume_step
+
+
+class StaticSymbol(Symbol):
+
+    def __init__(self, ticker: str, **info) -> None:
+        self.info = StaticSymbolInfo(ticker, **info)
+
+
 class Account(ABC):
     """
     Account is an abstract base class that represents a financial account.
@@ -75,19 +95,23 @@ class Trade(ABC):
         TP (float): The take profit price for the trade.
         SL (float): The stop loss price for the trade.
         volume (float): The volume or quantity of the asset being traded.
+        trail (float): Optional trailing stop distance; the SL then follows the best price by this amount.
+                       Only honoured by the backtester.
     """
 
-    def __init__(self, ticker: str, is_long: bool, entry_price: float, TP: float, SL: float, volume: float):
+    def __init__(self, ticker: str, is_long: bool, entry_price: float, TP: float, SL: float, volume: float,
+                 trail: float = None):
         self.ticker = ticker
         self.is_long = is_long
         self.entry_price = entry_price
         self.TP = TP
         self.SL = SL
         self.volume = volume
+        self.trail = trail
 
     
     def as_dict(self) -> dict:
-        return {
+        out = {
             'ticker': self.ticker,
             'is_long': self.is_long,
             'entry_price': self.entry_price,
@@ -95,6 +119,9 @@ class Trade(ABC):
             'SL': self.SL,
             'volume': self.volume
         }
+        if self.trail:
+            out['trail'] = self.trail
+        return out
     
     def __repr__(self) -> str:
         return str(self.as_dict())
@@ -102,18 +129,31 @@ class Trade(ABC):
 
 
 class Strategy(ABC):
+    """
+    Attributes:
+        lookback (dict[int, int]): Bars of history per timeframe the strategy reads. If not empty, the
+                                   trader passes a `DataContext` holding them as `strat(..., context=...)`.
+        screen (list[Filter]): Daily conditions a (symbol, day) must meet to be traded, see `screening.Screen`.
+                               The backtester skips the others without calling `strat`.
+    """
+
+    lookback: dict[int, int] = {}
+    screen: list = []
 
     @abstractmethod
-    def strat(self, symbol: Symbol, day: datetime) -> Trade:
+    def strat(self, symbol: Symbol, day: datetime) -> Optional[Trade]:
         """
         Abstract method for implementing a trading strategy. Must be overridden by subclasses.
 
+        Strategies declaring a `lookback` must also accept a `context` keyword argument.
+        Returning None means no trade: nothing is sent, and the backtester does not fetch the day's prices.
+
         Parameters:
         - symbol (Symbol): The financial symbol or instrument to trade.
         - day (datetime): The date for which the trading strategy is being applied.
 
         Returns:
-        Trade: An object containing trade data.
+        Trade: An object containing trade data, or None.
         """
         pass
 
@@ -132,6 +172,10 @@ class BaseTrader(ABC):
 
     strategy: Strategy
 
-    def trade(self, symbol: Symbol, day: datetime) -> dict:
-        return self.strategy.strat(symbol, day).as_dict()
+    def trade(self, symbol: Symbol, day: datetime, context=None) -> Optional[dict]:
+        if context is None:
+            trade = self.strategy.strat(symbol, day)
+        else:
+            trade = self.strategy.strat(symbol, day, context=context)
+        return None if trade is None else trade.as_dict()
 
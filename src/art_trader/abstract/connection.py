@@ -0,0 +1,261 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import wraps
+from typing import Callable, Optional
+
+from art_trader.abstract.metrics import METRICS
+
+log = logging.getLogger(__name__)
+
+# CONNECTION STATES
+CONNECTED = "connected"
+RECONNECTING = "reconnecting"
+DISCONNECTED = "disconnected"
+
+
+class ConnectionLost(Exception):
+    """
+    Raised by a supervised broker call made while the connection is down.
+    """
+    pass
+
+
+class ConnectionSupervisor(ABC):
+    """
+    Keeps a broker session alive and brings it back, with its state, when it drops.
+
+    A monitor thread (`start`) sends a cheap `heartbeat` every `interval` seconds. When one fails,
+    or a supervised call fails on a dead session, the supervisor reconnects with exponential backoff
+    and then runs the rehydration hooks (`on_reconnect`), which reload broker-side state with bulk
+    calls. Only then are calls let through again.
+
+    Supervised calls (`call`, or `wrap`) made while the session is down wait up to `wait` seconds
+    for it to come back and otherwise raise `ConnectionLost` at once, so callers are never stuck
+    behind a dead terminal. With the default `wait` of 0 they fail fast.
+
+    The supervisor's own broker calls (connecting, heartbeats, rehydration) bypass the check. They
+    hold `lock`, which should be the lock serializing all other calls into the broker: a heartbeat
+    from the monitor thread then never overlaps another thread's call, and nothing reaches the
+    broker between connecting and the end of the rehydration.
+
+    Attributes:
+        interval (float): Seconds between heartbeats.
+        backoff (float): The first delay between reconnect attempts, doubled after each failure.
+        max_backoff (float): The longest delay between reconnect attempts.
+        wait (float): How long a supervised call waits for a reconnect before failing.
+        state (str): `CONNECTED`, `RECONNECTING` or `DISCONNECTED`.
+        last_error (str): Why the session was last considered lost.
+        lock (RLock): Held around the supervisor's own broker calls.
+    """
+
+    def __init__(self, interval: float = 1., backoff: float = 0.5, max_backoff: float = 30., wait: float = 0.,
+                 lock: threading.RLock = None) -> None:
+        self.interval = interval
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.wait = wait
+        self.lock = lock or threading.RLock()
+        self.state = DISCONNECTED
+        self.last_error = None
+        self._hooks: list[tuple[str, Callable]] = []
+        self._ready = threading.Event()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._reconnect_lock = threading.Lock()
+        self._local = threading.local()
+        self._thread: Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        return str({"state": self.state, "last_error": self.last_error, "interval": self.interval})
+
+    @abstractmethod
+    def connect(self) -> None:
+        """
+        Opens the broker session.
+
+        Raises:
+            Exception: If it could not be opened.
+        """
+        pass
+
+    @abstractmethod
+    def heartbeat(self) -> bool:
+        """Returns whether the session is alive, with the cheapest call the broker offers."""
+        pass
+
+    def disconnect(self) -> None:
+        """Closes whatever is left of the session before reconnecting."""
+        pass
+
+    def on_reconnect(self, name: str, hook: Callable[[], None]) -> None:
+        """
+        Registers a rehydration hook, run in registration order after every (re)connect.
+        A failing hook fails the attempt, which is then retried.
+        """
+        self._hooks.append((name, hook))
+
+    @property
+    def connected(self) -> bool:
+        return self.state == CONNECTED
+
+    def _internal(self) -> "_Internal":
+        return _Internal(self._local)
+
+    def _alive(self) -> bool:
+        with self.lock, self._internal():
+            try:
+                return bool(self.heartbeat())
+            except Exception as e:
+                log.debug(f"heartbeat failed | {e}")
+                return False
+
+    def rehydrate(self) -> dict[str, float]:
+        """
+        Runs the rehydration hooks.
+
+        Returns:
+            dict[str, float]: The seconds taken by each hook.
+        """
+        out = {}
+        with self.lock, self._internal():
+            for name, hook in self._hooks:
+                start = time.perf_counter()
+                try:
+                    hook()
+                except Exception as e:
+                    raise Exception(f"rehydrating {name} failed | {e}")
+                out[name] = time.perf_counter() - start
+        return out
+
+    def reconnect(self, max_attempts: int = None) -> bool:
+        """
+        Reconnects and rehydrates, retrying with exponential backoff.
+
+        Args:
+            max_attempts (int, optional): Give up after this many attempts, by default retry until `stop`.
+
+        Returns:
+            bool: Whether the session is back.
+        """
+        with self._reconnect_lock:
+            self.state = RECONNECTING
+            self._ready.clear()
+            start = time.perf_counter()
+            delay, attempt = self.backoff, 0
+            while not self._stop.is_set():
+                attempt += 1
+                try:
+                    with self.lock:
+                        with self._internal():
+                            try:
+                                self.disconnect()
+                            except Exception as e:
+                                log.debug(f"disconnect failed | {e}")
+                            self.connect()
+                        report = self.rehydrate()
+                except Exception as e:
+                    self.last_error = str(e)
+                    log.warning(f"reconnect attempt {attempt} failed | {e}")
+                    METRICS.counter("reconnect_failures_total").inc()
+                    if max_attempts is not None and attempt >= max_attempts:
+                        break
+                    self._stop.wait(delay)
+                    delay = min(delay * 2, self.max_backoff)
+                    continue
+                self.state = CONNECTED
+                self._ready.set()
+                seconds = time.perf_counter() - start
+                METRICS.histogram("reconnect_seconds", help="session lost to calls served again").record(seconds)
+                log.info(f"connected after {attempt} attempt(s) in {seconds:.2f}s, rehydrated {report}")
+                return True
+            self.state = DISCONNECTED
+            return False
+
+    def lost(self, reason: str) -> None:
+        """Marks the session as lost and wakes the monitor to reconnect."""
+        if self.state == CONNECTED:
+            log.warning(f"connection lost | {reason}")
+            self.last_error = reason
+            self.state = RECONNECTING
+            self._ready.clear()
+            METRICS.counter("connection_lost_total").inc()
+        self._wake.set()
+
+    def check(self) -> bool:
+        """Sends a heartbeat and reconnects if it fails. Returns whether the session is up afterwards."""
+        if self.state == CONNECTED and self._alive():
+            return True
+        if self.state == CONNECTED:
+            self.lost("heartbeat failed")
+        return self.reconnect()
+
+    def call(self, name: str, fn: Callable, *args, **kwargs):
+        """
+        Runs a broker call if the session is up.
+
+        A call returning None (how MetaTrader5 reports errors) is followed by a heartbeat; if the
+        session turns out to be dead, it is marked lost and `ConnectionLost` is raised. Otherwise
+        the None is returned as usual.
+
+        Raises:
+            ConnectionLost: If the session is down and does not come back within `wait` seconds.
+        """
+        if getattr(self._local, "internal", 0):
+            return fn(*args, **kwargs)
+        if self.state != CONNECTED and not self._ready.wait(self.wait):
+            METRICS.counter("calls_failed_fast_total").inc()
+            raise ConnectionLost(f"{name} called while {self.state} | {self.last_error}")
+        result = fn(*args, **kwargs)
+        if result is None and not self._alive():
+            self.lost(f"{name} failed")
+            raise ConnectionLost(f"{name} failed, session lost | {self.last_error}")
+        return result
+
+    def wrap(self, name: str, fn: Callable) -> Callable:
+        """Returns `fn` as a supervised call. Usable as a `LazyModule` interceptor."""
+        @wraps(fn)
+        def supervised(*args, **kwargs):
+            return self.call(name, fn, *args, **kwargs)
+        return supervised
+
+    def start(self) -> None:
+        """Connects if needed and starts the monitor thread."""
+        self._stop.clear()
+        if self.state != CONNECTED:
+            self.reconnect()
+        self._thread = threading.Thread(target=self._monitor, name="connection", daemon=True)
+        self._thread.start()
+
+    def _monitor(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            self.check()
+
+    def stop(self) -> None:
+        """Stops the monitor thread and any reconnect in progress."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class _Internal:
+    # marks the current thread as the supervisor's, so its broker calls are not checked
+
+    def __init__(self, local: threading.local) -> None:
+        self._local = local
+
+    def __enter__(self):
+        self._local.internal = getattr(self._local, "internal", 0) + 1
+
+    def __exit__(self, *args) -> None:
+        self._local.internal -= 1
@@ -0,0 +1,242 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from typing import Optional, Type, Union
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from art_trader.abstract.common import Symbol
+from art_trader.abstract.utils import TIME, BrokerUtils, adjust_tz
+
+log = logging.getLogger(__name__)
+
+
+class RingBuffer:
+    """
+    Fixed-capacity buffer of the latest rows of a 2D array.
+
+    Every row is written twice, at `i` and `i + capacity`, so the latest `n` rows are always
+    one contiguous slice and `view` never copies.
+
+    Attributes:
+        capacity (int): The maximum number of rows kept.
+    """
+
+    def __init__(self, capacity: int, width: int, dtype=np.float64) -> None:
+        if capacity < 1:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self.capacity = capacity
+        self._data = np.zeros((2 * capacity, width), dtype=dtype)
+        self._head = 0
+        self._size = 0
+
+    def __repr__(self) -> str:
+        return str({"capacity": self.capacity, "size": self._size})
+
+    def __len__(self) -> int:
+        return self._size
+
+    def clear(self) -> None:
+        self._head = 0
+        self._size = 0
+
+    def extend(self, rows: np.ndarray) -> None:
+        """Appends rows, dropping the oldest ones beyond `capacity`."""
+        rows = rows[-self.capacity:]
+        n = len(rows)
+        if n == 0:
+            return
+        idx = (self._head + np.arange(n)) % self.capacity
+        self._data[idx] = rows
+        self._data[idx + self.capacity] = rows
+        self._head = (self._head + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+
+    def view(self, n: int = None) -> np.ndarray:
+        """Returns a read-only view of the latest `n` rows (all by default), oldest first."""
+        n = self._size if n is None else min(n, self._size)
+        end = self._head + self.capacity
+        out = self._data[end - n:end]
+        out.flags.writeable = False
+        return out
+
+
+class _Feed:
+    """The ring buffer of one (ticker, timeframe) with the bars queued for it."""
+
+    def __init__(self, capacity: int) -> None:
+        self.buffer = RingBuffer(capacity, 6)
+        self.source = None
+        self.close_times = None
+        self.cursor = 0
+        self.last_time = -np.inf
+
+    def load(self, rates: np.ndarray, close_times: np.ndarray) -> None:
+        self.source = rates
+        self.close_times = close_times
+        self.cursor = 0
+        self.buffer.clear()
+
+    def advance(self, cutoff: float) -> int:
+        """Pushes the queued bars that closed by `cutoff`. Returns the number of bars pushed."""
+        hi = int(np.searchsorted(self.close_times, cutoff, side="right"))
+        if hi < self.cursor:
+            # moved back in time, rebuild from the queue
+            self.buffer.clear()
+            self.cursor = max(hi - self.buffer.capacity, 0)
+        pushed = hi - self.cursor
+        self.buffer.extend(self.source[self.cursor:hi])
+        self.cursor = hi
+        if hi:
+            self.last_time = self.source[hi - 1, TIME]
+        return pushed
+
+
+class DataContext:
+    """
+    Per-symbol, per-timeframe history handed to `Strategy.strat`.
+
+    Each (ticker, timeframe) declared in the strategy's `lookback` gets a ring buffer holding its
+    latest closed bars. `advance` moves the context forward in time: only bars whose period has
+    ended by then are pushed, so a strategy cannot read a bar that was still forming, nor anything
+    after it. Reads are read-only views into the buffers and make no broker calls.
+
+    In a backtest, all bars of the run are fetched once up front and queued privately; in live
+    trading, each `advance` fetches only the bars that closed since the previous one.
+
+    Attributes:
+        broker_utils (Type[BrokerUtils]): Where the bars are fetched from.
+        lookback (dict[int, int]): The number of bars kept per timeframe.
+    """
+
+    def __init__(self, broker_utils: Type[BrokerUtils], lookback: dict[int, int], symbols: list[Symbol]) -> None:
+        self.broker_utils = broker_utils
+        self.lookback = dict(lookback)
+        self.symbols = {x.info.ticker: x for x in symbols}
+        self._feeds = {(t, tf): _Feed(n) for t in self.symbols for tf, n in self.lookback.items()}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return str({"lookback": self.lookback, "tickers": list(self.symbols)})
+
+    def track(self, symbols: list[Symbol]) -> None:
+        """
+        Adds the symbols that are not in the context yet, e.g. traded after the context was created.
+        Their feeds are filled by the next `advance`, or `preload`.
+        """
+        if all(x.info.ticker in self.symbols for x in symbols):
+            return
+        with self._lock:
+            for symbol in symbols:
+                ticker = symbol.info.ticker
+                if ticker not in self.symbols:
+                    self.symbols[ticker] = symbol
+                    for timeframe, n in self.lookback.items():
+                        self._feeds[(ticker, timeframe)] = _Feed(n)
+
+    def barSeconds(self, timeframe: int) -> Optional[int]:
+        """Returns the fixed length of a timeframe's bars in seconds, None for monthly bars."""
+        utils = self.broker_utils
+        lengths = {
+            utils.M10_TIMEFRAME: 600,
+            utils.HOURLY_TIMEFRAME: 3600,
+            utils.DAILY_TIMEFRAME: 86400,
+            utils.WEEKLY_TIMEFRAME: 7 * 86400,
+        }
+        if timeframe == utils.MONTHLY_TIMEFRAME:
+            return None
+        if timeframe not in lengths:
+            raise ValueError(f"Unsupported timeframe {timeframe}")
+        return lengths[timeframe]
+
+    def closeTimes(self, times: np.ndarray, timeframe: int) -> np.ndarray:
+        """Returns the time at which each bar's period ends."""
+        seconds = self.barSeconds(timeframe)
+        if seconds is not None:
+            return times + seconds
+        months = times.astype(np.int64).astype("datetime64[s]").astype("datetime64[M]") + 1
+        return months.astype("datetime64[s]").astype(np.float64)
+
+    def _span(self, timeframe: int) -> timedelta:
+        # calendar time holding `lookback` bars, with room for weekends and holidays
+        seconds = self.barSeconds(timeframe) or 31 * 86400
+        return timedelta(seconds=seconds * self.lookback[timeframe] * 1.5) + timedelta(days=7)
+
+    @staticmethod
+    def _cutoff(day: Union[date, datetime, float]) -> float:
+        if isinstance(day, (int, float)):
+            return float(day)
+        return adjust_tz(day).timestamp()
+
+    def _fetch(self, ticker: str, timeframe: int, start: datetime, end: datetime) -> np.ndarray:
+        try:
+            rates = self.broker_utils.getData(self.symbols[ticker], timeframe, start, end)
+        except Exception as e:
+            raise Exception(f"Failed to load {ticker} data for the context | {e}")
+        if len(rates) == 0:
+            return np.empty((0, 6))
+        return np.asarray(rates, dtype=np.float64)
+
+    def preload(self, start: date, end: date) -> None:
+        """
+        Fetches all bars needed to run from `start` to `end`: the declared lookback before `start`
+        and every bar up to `end`. Nothing is visible until `advance` is called.
+        """
+        end = adjust_tz(end) + timedelta(days=1)
+        with self._lock:
+            for (ticker, timeframe), feed in self._feeds.items():
+                first = adjust_tz(start) - self._span(timeframe)
+                rates = self._fetch(ticker, timeframe, first, end)
+                feed.load(rates, self.closeTimes(rates[:, TIME], timeframe))
+
+    def advance(self, day: Union[date, datetime, float] = None, tickers: list[str] = None) -> None:
+        """
+        Moves the context to `day`, making visible every bar that closed by then.
+
+        Args:
+            day (date, datetime or float, optional): The simulated day, or None for the broker's current time.
+            tickers (list[str], optional): Only advance these tickers.
+        """
+        cutoff = self._cutoff(day if day is not None else self.broker_utils.now())
+        tickers = self.symbols if tickers is None else tickers
+        with self._lock:
+            for (ticker, timeframe), feed in self._feeds.items():
+                if ticker not in tickers:
+                    continue
+                if feed.source is None:
+                    self._poll(ticker, timeframe, feed, cutoff)
+                else:
+                    feed.advance(cutoff)
+
+    def _poll(self, ticker: str, timeframe: int, feed: _Feed, cutoff: float) -> None:
+        # live: fetch what closed since the last visible bar, or the whole lookback the first time
+        utc = ZoneInfo("UTC")
+        end = datetime.fromtimestamp(cutoff, utc)
+        if np.isfinite(feed.last_time):
+            start = datetime.fromtimestamp(feed.last_time + 1, utc)
+        else:
+            start = end - self._span(timeframe)
+        rates = self._fetch(ticker, timeframe, start, end)
+        rates = rates[(rates[:, TIME] > feed.last_time) & (self.closeTimes(rates[:, TIME], timeframe) <= cutoff)]
+        if len(rates):
+            feed.buffer.extend(rates)
+            feed.last_time = rates[-1, TIME]
+
+    def rates(self, symbol: Union[Symbol, str], timeframe: int, n: int = None) -> np.ndarray:
+        """
+        Returns the latest `n` closed bars of a symbol (the whole lookback by default) as a read-only view.
+
+        Raises:
+            KeyError: If the timeframe was not declared in the lookback.
+        """
+        ticker = symbol if isinstance(symbol, str) else symbol.info.ticker
+        return self._feeds[(ticker, timeframe)].buffer.view(n)
+
+    def last(self, symbol: Union[Symbol, str], timeframe: int) -> np.ndarray:
+        """Returns the latest closed bar, or an empty array if there is none yet."""
+        rates = self.rates(symbol, timeframe, 1)
+        return rates[0] if len(rates) else rates
@@ -0,0 +1,404 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import heapq
+import logging
+import threading
+import time
+import weakref
+from abc import ABC, abstractmethod
+from collections import deque
+from itertools import count
+from typing import Optional
+
+from art_trader.abstract.metrics import METRICS
+
+log = logging.getLogger(__name__)
+
+# the live dispatchers, whose queues make up the `dispatch_queue_depth` gauge
+_DISPATCHERS: "weakref.WeakSet[OrderDispatcher]" = weakref.WeakSet()
+
+
+def _queue_depth() -> int:
+    return sum(x.depth for x in list(_DISPATCHERS))
+
+
+# SEND OUTCOMES
+DONE = 0
+RETRY = 1
+REQUOTE = 2
+REJECT = 3
+DUPLICATE = 4
+UNKNOWN = 5
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`, so short bursts of up to
+    `capacity` orders go out immediately while the sustained rate stays under the broker limit.
+
+    Attributes:
+        rate (float): Tokens added per second.
+        capacity (float): The maximum number of tokens held.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """
+        Takes `tokens` from the bucket if available.
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise the number of seconds to wait before retrying.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1) -> None:
+        """
+        Blocks until `tokens` could be taken from the bucket.
+        """
+        wait = self.try_acquire(tokens)
+        while wait > 0:
+            time.sleep(wait)
+            wait = self.try_acquire(tokens)
+
+
+class DispatchRecord:
+    """
+    The lifecycle of a single order going through an `OrderDispatcher`.
+
+    Attributes:
+        order (dict): The order as last sent (prices may have been refreshed on requotes).
+        key (tuple): The idempotency key of the order.
+        priority (int): Lower values are dispatched first.
+        attempts (int): The number of times the order was sent to the broker.
+        outcome (int): The final outcome (`DONE`, `REJECT` or `DUPLICATE`), None while queued.
+        retcode (int): The last broker return code.
+        comment (str): The last broker comment.
+        enqueued_at (float): Monotonic time at which the order was queued.
+        sent_at (float): Monotonic time of the first send.
+        done_at (float): Monotonic time at which the final outcome was known.
+    """
+
+    def __init__(self, order: dict, key: tuple, priority: int) -> None:
+        self.order = order
+        self.key = key
+        self.priority = priority
+        self.attempts = 0
+        self.outcome: Optional[int] = None
+        self.retcode: Optional[int] = None
+        self.comment: Optional[str] = None
+        self.enqueued_at = time.monotonic()
+        self.sent_at: Optional[float] = None
+        self.done_at: Optional[float] = None
+        self._done = threading.Event()
+
+    def __repr__(self) -> str:
+        return str({k: v for k, v in self.__dict__.items() if not k.startswith("_")})
+
+    @property
+    def queue_latency(self) -> Optional[float]:
+        """Seconds spent waiting in the queue and rate limiter before the first send."""
+        if self.sent_at is None:
+            return None
+        return self.sent_at - self.enqueued_at
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Seconds from queueing to the final outcome."""
+        if self.done_at is None:
+            return None
+        return self.done_at - self.enqueued_at
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Blocks until the order reaches a final outcome.
+
+        Returns:
+            bool: True if the order was filled or placed (`DONE`).
+        """
+        self._done.wait(timeout)
+        return self.outcome == DONE
+
+
+class OrderDispatcher(ABC):
+    """
+    Priority queue with rate limiting and classified retries in front of a broker's order API.
+
+    Orders are submitted with a priority and dispatched in priority order (FIFO within a
+    priority) under a `TokenBucket`. Each broker return code is classified as done, a transient
+    error to retry as is, a requote to retry with a refreshed price, or a hard rejection. An
+    order with the same idempotency key as one queued, or done less than `key_ttl` seconds ago,
+    is not sent twice.
+
+    A send that raises (e.g. the connection dropped mid-request) has an unknown outcome: the
+    broker may have accepted the order. It is only resent if `confirm` finds that the broker
+    does not have it; if `confirm` cannot tell, the order is rejected rather than risk a double fill.
+
+    Subclasses implement the broker-specific `_send`, `classify`, `refresh` and `confirm`.
+
+    Attributes:
+        limiter (TokenBucket): The rate limiter applied to every send, retries included.
+        max_retries (int): The number of resends allowed after a transient failure.
+        retry_backoff (float): Seconds to wait before a retry, multiplied by the attempt number.
+        key_ttl (float): Seconds for which the key of a done order blocks identical orders.
+        records (deque[DispatchRecord]): The most recent finished orders.
+    """
+
+    def __init__(self, rate: float = 10., burst: float = 10, max_retries: int = 3,
+                 retry_backoff: float = 0.05, history: int = 10_000, key_ttl: float = 60.) -> None:
+        self.limiter = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.key_ttl = key_ttl
+        self.records: deque[DispatchRecord] = deque(maxlen=history)
+        self._queue: list = []
+        self._seq = count()
+        self._keys: dict[tuple, DispatchRecord] = {}
+        self._expiry: deque[DispatchRecord] = deque()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        _DISPATCHERS.add(self)
+        METRICS.gauge("dispatch_queue_depth", help="orders waiting to be sent", fn=_queue_depth)
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    @abstractmethod
+    def _send(self, order: dict) -> tuple[int, str]:
+        """
+        Sends an order to the broker.
+
+        Returns:
+            tuple[int, str]: The broker return code and comment.
+        """
+        pass
+
+    @abstractmethod
+    def classify(self, retcode: int) -> int:
+        """
+        Maps a broker return code to `DONE`, `RETRY`, `REQUOTE` or `REJECT`.
+        """
+        pass
+
+    @abstractmethod
+    def refresh(self, order: dict) -> dict:
+        """
+        Returns a copy of the order priced at the current market, used after a requote.
+        """
+        pass
+
+    def confirm(self, order: dict) -> Optional[bool]:
+        """
+        Looks an order up at the broker after a send whose outcome is unknown.
+
+        Returns:
+            bool: True if the broker has the order, False if it does not, None if it cannot tell.
+        """
+        return None
+
+    def key(self, order: dict) -> tuple:
+        """
+        Returns the idempotency key of an order.
+
+        By default two orders are the same if they share symbol, action, type, price, volume,
+        magic number, comment and the position or order they refer to, so the legs of a
+        bracket are distinct orders.
+        """
+        return (order.get("symbol"), order.get("action"), order.get("type"), order.get("price"),
+                order.get("volume"), order.get("magic"), order.get("comment"), order.get("position"),
+                order.get("order"))
+
+    @property
+    def depth(self) -> int:
+        """The number of orders waiting to be sent."""
+        return len(self._queue)
+
+    def submit(self, order: dict, priority: int = 0) -> DispatchRecord:
+        """
+        Queues an order for dispatch.
+
+        Args:
+            order (dict): The order to send.
+            priority (int): Lower values are sent first.
+
+        Returns:
+            DispatchRecord: The record tracking the order. If an order with the same key is queued
+            or was done within `key_ttl`, a record with outcome `DUPLICATE` is returned and nothing is queued.
+        """
+        key = self.key(order)
+        record = DispatchRecord(order, key, priority)
+        with self._cond:
+            self._expire()
+            previous = self._keys.get(key)
+            if previous is not None and previous.outcome in (None, DONE):
+                log.warning(f"duplicate order ignored for {order.get('symbol')}: {key}")
+                self._finish(record, DUPLICATE)
+                return record
+            self._keys[key] = record
+            heapq.heappush(self._queue, (priority, next(self._seq), record))
+            self._cond.notify()
+        return record
+
+    def forget(self, order: dict) -> None:
+        """
+        Drops the idempotency key of an order so an identical order can be submitted again.
+        """
+        with self._cond:
+            self._keys.pop(self.key(order), None)
+
+    def _expire(self) -> None:
+        # drops the keys of orders done more than key_ttl ago, oldest first
+        cutoff = time.monotonic() - self.key_ttl
+        while self._expiry and self._expiry[0].done_at <= cutoff:
+            record = self._expiry.popleft()
+            if self._keys.get(record.key) is record:
+                del self._keys[record.key]
+
+    def _finish(self, record: DispatchRecord, outcome: int) -> None:
+        record.outcome = outcome
+        record.done_at = time.monotonic()
+        if outcome != DUPLICATE:
+            with self._cond:
+                if outcome == DONE:
+                    self._expiry.append(record)
+                elif self._keys.get(record.key) is record:
+                    del self._keys[record.key]
+        self.records.append(record)
+        METRICS.counter("dispatch_total", {"outcome": outcome}).inc()
+        if record.latency is not None and outcome != DUPLICATE:
+            METRICS.histogram("dispatch_latency_seconds", help="queue to final outcome").record(record.latency)
+        record._done.set()
+
+    def _dispatch(self, record: DispatchRecord) -> None:
+        while True:
+            self.limiter.acquire()
+            if record.sent_at is None:
+                record.sent_at = time.monotonic()
+                METRICS.histogram("dispatch_queue_seconds", help="queue to first send").record(record.queue_latency)
+            record.attempts += 1
+            try:
+                record.retcode, record.comment = self._send(record.order)
+                outcome = self.classify(record.retcode)
+            except Exception as e:
+                record.retcode, record.comment = None, str(e)
+                outcome = UNKNOWN
+
+            if outcome == UNKNOWN:
+                outcome = self._reconcile(record)
+
+            if outcome in (RETRY, REQUOTE) and record.attempts <= self.max_retries:
+                log.warning(f"retrying order for {record.order.get('symbol')} "
+                            f"(attempt {record.attempts}): {record.comment}")
+                time.sleep(self.retry_backoff * record.attempts)
+                if outcome == REQUOTE:
+                    try:
+                        record.order = self.refresh(record.order)
+                    except Exception as e:
+                        record.comment = f"refresh failed | {e}"
+                        log.error(f"order_send failed for {record.order.get('symbol')}: {record.comment}")
+                        self._finish(record, REJECT)
+                        return
+                continue
+
+            if outcome == DONE:
+                log.info(f"order_send successful for {record.order.get('symbol')}")
+                self._finish(record, DONE)
+            else:
+                log.error(f"order_send failed for {record.order.get('symbol')}: {record.comment}")
+                self._finish(record, REJECT)
+            return
+
+    def _reconcile(self, record: DispatchRecord) -> int:
+        # the outcome of the last send is unknown: only resend if the broker does not have the order
+        log.warning(f"order_send outcome unknown for {record.order.get('symbol')}: {record.comment}")
+        try:
+            found = self.confirm(record.order)
+        except Exception as e:
+            log.error(f"could not confirm order for {record.order.get('symbol')} | {e}")
+            found = None
+        if found:
+            return DONE
+        if found is None:
+            record.comment = f"outcome unknown, not resent | {record.comment}"
+            return REJECT
+        return RETRY
+
+    def _next(self, timeout: float = None) -> Optional[DispatchRecord]:
+        with self._cond:
+            if not self._queue:
+                self._cond.wait(timeout)
+            if not self._queue:
+                return None
+            return heapq.heappop(self._queue)[2]
+
+    def drain(self) -> list[DispatchRecord]:
+        """
+        Dispatches every queued order on the calling thread.
+
+        Returns:
+            list[DispatchRecord]: The records in the order they were dispatched.
+        """
+        out = []
+        record = self._next(timeout=0)
+        while record is not None:
+            self._dispatch(record)
+            out.append(record)
+            record = self._next(timeout=0)
+        return out
+
+    def start(self) -> None:
+        """
+        Starts dispatching queued orders on a background thread.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.is_set():
+                record = self._next(timeout=0.1)
+                if record is None:
+                    continue
+                try:
+                    self._dispatch(record)
+                except Exception as e:
+                    # never leave the thread dead and the waiters blocked
+                    log.error(f"dispatch failed for {record.order.get('symbol')} | {e}")
+                    if record.outcome is None:
+                        record.comment = str(e)
+                        self._finish(record, REJECT)
+
+        self._thread = threading.Thread(target=loop, name="dispatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops the background thread. Orders still queued stay queued.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        self._thread.join()
+        self._thread = None
@@ -0,0 +1,217 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import threading
+from datetime import timedelta
+from typing import Callable, Optional, Type, Union
+
+import numpy as np
+
+from art_trader.abstract.common import Symbol
+from art_trader.abstract.context import DataContext, RingBuffer
+from art_trader.abstract.utils import TIME, BrokerUtils
+
+log = logging.getLogger(__name__)
+
+
+class _Series:
+    """The closed bars of one (ticker, timeframe) and its forming bar."""
+
+    def __init__(self, capacity: int) -> None:
+        self.buffer = RingBuffer(capacity, 6)
+        self.forming: Optional[np.ndarray] = None
+        self.last_time = -np.inf
+
+    @property
+    def known_time(self) -> float:
+        # the newest bar seen, closed or forming
+        return self.forming[TIME] if self.forming is not None else self.last_time
+
+    def update(self, rows: np.ndarray, closed: np.ndarray) -> np.ndarray:
+        """
+        Applies the latest bars, newest last, where `closed` tells which bars have ended.
+        Returns the newly closed bars.
+        """
+        if len(rows) == 0:
+            return rows
+        new = rows[closed & (rows[:, TIME] > self.last_time)]
+        if len(new):
+            self.buffer.extend(new)
+            self.last_time = new[-1, TIME]
+        self.forming = None if closed[-1] else rows[-1].copy()
+        return new
+
+
+class BarFeed:
+    """
+    Live bars of many (ticker, timeframe), kept up to date incrementally.
+
+    Each (ticker, timeframe) in `lookback` gets a ring buffer of its latest closed bars. The first
+    `poll` fills it with the whole lookback, without reporting those bars as new; every later one
+    reads only the last `poll_bars` bars, appends the ones that closed since and replaces the
+    forming bar, so a poll costs the same whatever the lookback. If the polled bars do not reach
+    back to the bars already known (the feed was not polled for a while), the whole lookback is
+    read again.
+
+    A bar has closed once its period has ended by `broker_utils.now()`, so the last bar of a
+    market that has closed is not left forming until the next one opens.
+
+    Callbacks registered with `on_bar` are called with `(ticker, timeframe, bar)` for every newly
+    closed bar, from the thread that polls.
+
+    A feed reads like a `DataContext` (`rates`, `last`, `track`, `advance`), so it can be a trader's
+    `context`: the strategy then reads the bars the feed already polled, see `LiveScheduler.add_bar_job`.
+
+    Subclasses read the bars from their broker by position in `latest`; the default reads a time
+    range through `broker_utils.getData`.
+
+    Attributes:
+        broker_utils (Type[BrokerUtils]): Where the bars are read from.
+        lookback (dict[int, int]): The number of closed bars kept per timeframe.
+        poll_bars (int): The number of bars read per (ticker, timeframe) in each poll, the forming one included.
+    """
+
+    def __init__(self, broker_utils: Type[BrokerUtils], lookback: dict[int, int], symbols: list[Symbol],
+                 poll_bars: int = 3) -> None:
+        if poll_bars < 2:
+            raise ValueError(f"poll_bars must be at least 2, got {poll_bars}")
+        self.broker_utils = broker_utils
+        self.lookback = dict(lookback)
+        self.poll_bars = poll_bars
+        self.symbols = {x.info.ticker: x for x in symbols}
+        self._series = {(t, tf): _Series(n) for t in self.symbols for tf, n in self.lookback.items()}
+        self._callbacks: list[Callable] = []
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return str({"lookback": self.lookback, "tickers": list(self.symbols), "poll_bars": self.poll_bars})
+
+    # bar periods as in a DataContext
+    barSeconds = DataContext.barSeconds
+    closeTimes = DataContext.closeTimes
+
+    def on_bar(self, callback: Callable[[str, int, np.ndarray], None]) -> None:
+        """Registers a callback for every newly closed bar."""
+        self._callbacks.append(callback)
+
+    def track(self, symbols: list[Symbol]) -> None:
+        """Adds the symbols that are not fed yet. Their bars are read by the next `poll` or `advance`."""
+        if all(x.info.ticker in self.symbols for x in symbols):
+            return
+        with self._lock:
+            for symbol in symbols:
+                ticker = symbol.info.ticker
+                if ticker not in self.symbols:
+                    self.symbols[ticker] = symbol
+                    for timeframe, n in self.lookback.items():
+                        self._series[(ticker, timeframe)] = _Series(n)
+
+    def advance(self, day=None, tickers: list[str] = None) -> None:
+        """
+        Reads the bars of the (ticker, timeframe) never polled yet, e.g. at a trader's warmup. The others
+        are only moved by `poll`: the feed always holds the bars closed as of the last poll, whatever `day`.
+        """
+        tickers = self.symbols if tickers is None else tickers
+        with self._lock:
+            for (ticker, timeframe), series in self._series.items():
+                if ticker in tickers and not np.isfinite(series.known_time):
+                    try:
+                        self._poll(ticker, timeframe, series)
+                    except Exception as e:
+                        log.warning(str(e))
+
+    def latest(self, symbol: Symbol, timeframe: int, count: int) -> np.ndarray:
+        """
+        Returns the latest `count` formatted bars of a symbol, oldest first, the last one usually still forming.
+        """
+        utils = self.broker_utils
+        seconds = {
+            utils.M10_TIMEFRAME: 600,
+            utils.HOURLY_TIMEFRAME: 3600,
+            utils.DAILY_TIMEFRAME: 86400,
+            utils.WEEKLY_TIMEFRAME: 7 * 86400,
+        }.get(timeframe, 31 * 86400)
+        end = utils.now()
+        rates = utils.getData(symbol, timeframe, end - timedelta(seconds=seconds * count * 1.5) - timedelta(days=7),
+                              end)
+        return rates[-count:]
+
+    def _read(self, ticker: str, timeframe: int, count: int) -> np.ndarray:
+        try:
+            rates = self.latest(self.symbols[ticker], timeframe, count)
+        except Exception as e:
+            raise Exception(f"Failed to poll {ticker} {timeframe} bars | {e}")
+        if len(rates) == 0:
+            return np.empty((0, 6))
+        return np.asarray(rates, dtype=np.float64)
+
+    def poll(self, tickers: list[str] = None) -> dict[tuple, np.ndarray]:
+        """
+        Reads the latest bars of every (ticker, timeframe) and fires the callbacks for the newly closed ones.
+
+        A failing (ticker, timeframe) is logged and skipped, so one bad symbol does not stall the others.
+
+        Args:
+            tickers (list[str], optional): Only poll these tickers.
+
+        Returns:
+            dict[tuple, np.ndarray]: The newly closed bars per (ticker, timeframe) that has any.
+        """
+        tickers = self.symbols if tickers is None else tickers
+        out = {}
+        with self._lock:
+            for (ticker, timeframe), series in self._series.items():
+                if ticker not in tickers:
+                    continue
+                try:
+                    new = self._poll(ticker, timeframe, series)
+                except Exception as e:
+                    log.warning(str(e))
+                    continue
+                if len(new):
+                    out[(ticker, timeframe)] = new
+
+        for (ticker, timeframe), new in out.items():
+            for bar in new:
+                for callback in self._callbacks:
+                    try:
+                        callback(ticker, timeframe, bar)
+                    except Exception as e:
+                        log.error(f"bar callback failed for {ticker} {timeframe} | {e}")
+        return out
+
+    def _poll(self, ticker: str, timeframe: int, series: _Series) -> np.ndarray:
+        full = series.buffer.capacity + 1
+        now = DataContext._cutoff(self.broker_utils.now())
+        if not np.isfinite(series.known_time):
+            # the history is not news
+            rows = self._read(ticker, timeframe, full)
+            series.update(rows, self.closeTimes(rows[:, TIME], timeframe) <= now)
+            return np.empty((0, 6))
+        rows = self._read(ticker, timeframe, self.poll_bars)
+        if len(rows) and rows[0, TIME] > series.known_time:
+            # bars were missed since the last poll
+            rows = self._read(ticker, timeframe, full)
+        return series.update(rows, self.closeTimes(rows[:, TIME], timeframe) <= now)
+
+    def rates(self, symbol: Union[Symbol, str], timeframe: int, n: int = None) -> np.ndarray:
+        """
+        Returns the latest `n` closed bars (all kept by default) as a read-only view.
+
+        Raises:
+            KeyError: If the (ticker, timeframe) is not fed.
+        """
+        ticker = symbol if isinstance(symbol, str) else symbol.info.ticker
+        return self._series[(ticker, timeframe)].buffer.view(n)
+
+    def last(self, symbol: Union[Symbol, str], timeframe: int) -> np.ndarray:
+        """Returns the latest closed bar, or an empty array if there is none yet."""
+        rates = self.rates(symbol, timeframe, 1)
+        return rates[0] if len(rates) else rates
+
+    def forming(self, symbol: Union[Symbol, str], timeframe: int) -> Optional[np.ndarray]:
+        """Returns the bar still forming as of the last poll, or None before the first or if the last bar had closed."""
+        ticker = symbol if isinstance(symbol, str) else symbol.info.ticker
+        forming = self._series[(ticker, timeframe)].forming
+        return None if forming is None else forming.copy()
@@ -0,0 +1,117 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import json
+import logging
+import os
+from datetime import datetime
+
+import numpy as np
+
+from art_trader.abstract.common import StaticSymbol, StaticSymbolInfo, Symbol
+from art_trader.abstract.testing import Backtester
+from art_trader.abstract.utils import TIME, BrokerUtils, adjust_tz
+from art_trader.backends import Backend
+
+log = logging.getLogger(__name__)
+
+
+class FileStoreUtils(BrokerUtils):
+    """
+    Formatted rates stored on local disk, e.g. exported once from a terminal for offline backtests.
+
+    Layout: `<ROOT>/<ticker>/<timeframe>.npy` holds the formatted rates of a timeframe, sorted by time,
+    and the optional `<ROOT>/<ticker>/info.json` holds the `StaticSymbolInfo` fields of the ticker.
+    Timeframes use the MT5 values, so exported data keeps its timeframe ids.
+
+    The data directory is a class attribute set by `configure`, like any other broker setting, so the
+    classes stay module-level and pickle by reference. A process reading from the store (e.g. a pool
+    worker) configures it with the same root.
+
+    Attributes:
+        ROOT (str): The data directory, set with `configure`.
+    """
+
+    M10_TIMEFRAME = 10
+    HOURLY_TIMEFRAME = 16385
+    DAILY_TIMEFRAME = 16408
+    WEEKLY_TIMEFRAME = 32769
+    MONTHLY_TIMEFRAME = 49153
+
+    ROOT: str = None
+
+    @classmethod
+    def path(cls, ticker: str, name: str) -> str:
+        if cls.ROOT is None:
+            raise Exception("The file store has no data directory, use configure(root)")
+        return os.path.join(cls.ROOT, ticker, name)
+
+    @classmethod
+    def exists(cls, symbol: Symbol) -> bool:
+        return os.path.isdir(os.path.dirname(cls.path(symbol.info.ticker, "")))
+
+    @classmethod
+    def getRates(cls, symbol: Symbol, timeframe: int, start: datetime, end: datetime) -> np.ndarray:
+        path = cls.path(symbol.info.ticker, f"{timeframe}.npy")
+        try:
+            bars = np.load(path, mmap_mode="r")
+        except FileNotFoundError:
+            raise Exception(f"No {timeframe} data stored for {symbol.info.ticker} in {cls.ROOT}")
+        lo = np.searchsorted(bars[:, TIME], adjust_tz(start).timestamp(), side="left")
+        hi = np.searchsorted(bars[:, TIME], adjust_tz(end).timestamp(), side="right")
+        return np.array(bars[lo:hi])
+
+    def formatRates(array: np.ndarray) -> np.ndarray:
+        return array
+
+    @classmethod
+    def write(cls, ticker: str, timeframe: int, rates: np.ndarray, info: dict = None) -> None:
+        """
+        Stores formatted rates (replacing what was stored for the timeframe) and optionally the symbol info.
+        """
+        os.makedirs(os.path.dirname(cls.path(ticker, "")), exist_ok=True)
+        np.save(cls.path(ticker, f"{timeframe}.npy"), np.ascontiguousarray(rates, dtype=np.float64))
+        if info is not None:
+            with open(cls.path(ticker, "info.json"), "w") as f:
+                json.dump(info, f)
+
+    @classmethod
+    def symbolInfo(cls, ticker: str) -> StaticSymbolInfo:
+        try:
+            with open(cls.path(ticker, "info.json")) as f:
+                return StaticSymbolInfo(ticker, **json.load(f))
+        except FileNotFoundError:
+            return StaticSymbolInfo(ticker)
+
+
+class FileStoreSymbol(StaticSymbol):
+
+    utils = FileStoreUtils
+
+    def __init__(self, ticker: str) -> None:
+        self.info = self.utils.symbolInfo(ticker)
+
+
+class FileStoreBacktester(Backtester):
+
+    symbol_class = FileStoreSymbol
+    brokerUtil = FileStoreUtils
+
+
+def configure(root: str, resample_from: int = None) -> Backend:
+    """
+    Points the file store at `root` and returns its backend.
+
+    Args:
+        root (str): The data directory.
+        resample_from (int, optional): Build higher timeframes from this stored timeframe.
+    """
+    if (root, resample_from) != (FileStoreUtils.ROOT, FileStoreUtils.RESAMPLE_FROM):
+        FileStoreUtils.ROOT = root
+        FileStoreUtils.RESAMPLE_FROM = resample_from
+        if FileStoreUtils.rate_cache is not None:
+            FileStoreUtils.rate_cache.clear()
+    return backend
+
+
+backend = Backend("filestore", FileStoreUtils, FileStoreSymbol, FileStoreBacktester, configure=configure)
@@ -0,0 +1,225 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from art_trader.abstract.utils import adjust_tz
+
+log = logging.getLogger(__name__)
+
+ORDER_DTYPE = np.dtype([
+    ("ticket", np.int64),
+    ("time_setup_msc", np.int64),
+    ("time_done_msc", np.int64),
+    ("symbol", "U32"),
+    ("type", np.int32),
+    ("state", np.int32),
+    ("magic", np.int64),
+    ("position_id", np.int64),
+    ("volume_initial", np.float64),
+    ("volume_current", np.float64),
+    ("price_open", np.float64),
+    ("sl", np.float64),
+    ("tp", np.float64),
+    ("price_current", np.float64),
+    ("comment", "U32"),
+])
+
+DEAL_DTYPE = np.dtype([
+    ("ticket", np.int64),
+    ("order", np.int64),
+    ("time_msc", np.int64),
+    ("symbol", "U32"),
+    ("type", np.int32),
+    ("entry", np.int32),
+    ("magic", np.int64),
+    ("position_id", np.int64),
+    ("volume", np.float64),
+    ("price", np.float64),
+    ("commission", np.float64),
+    ("swap", np.float64),
+    ("profit", np.float64),
+    ("fee", np.float64),
+    ("comment", "U32"),
+])
+
+
+def toMsc(dt: datetime) -> int:
+    """Converts a datetime to broker epoch milliseconds, treating naive datetimes as UTC."""
+    if dt.tzinfo is None:
+        dt = adjust_tz(dt)
+    return int(dt.timestamp() * 1000)
+
+
+def fromMsc(msc: int) -> datetime:
+    """Converts broker epoch milliseconds to a UTC datetime."""
+    return datetime.fromtimestamp(msc / 1000, tz=ZoneInfo("UTC"))
+
+
+class HistoryTable:
+    """
+    An append-only file of fixed-size records with a (symbol, time) index.
+
+    Records are appended in raw binary form, so a sync writes only the new rows. The whole
+    file is read back lazily with a single `np.fromfile` and indexed on first query.
+
+    Attributes:
+        path (str): The file the records are stored in.
+        dtype (np.dtype): The record layout, must have `ticket` and `symbol` fields.
+        time_field (str): The field used as the high-water mark and for range queries.
+    """
+
+    def __init__(self, path: str, dtype: np.dtype, time_field: str) -> None:
+        self.path = path
+        self.dtype = dtype
+        self.time_field = time_field
+        self._rows: Optional[np.ndarray] = None
+        self._order: Optional[np.ndarray] = None
+
+    def __repr__(self) -> str:
+        return str({"path": self.path, "time_field": self.time_field})
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def rows(self) -> np.ndarray:
+        """All stored records in insertion order."""
+        if self._rows is None:
+            if os.path.exists(self.path):
+                # ignore a trailing partial record left by an interrupted append
+                count = os.path.getsize(self.path) // self.dtype.itemsize
+                self._rows = np.fromfile(self.path, dtype=self.dtype, count=count)
+            else:
+                self._rows = np.empty(0, dtype=self.dtype)
+        return self._rows
+
+    @property
+    def high_water_mark(self) -> Optional[int]:
+        """The latest stored time, None if the table is empty."""
+        if len(self.rows) == 0:
+            return None
+        return int(self.rows[self.time_field].max())
+
+    def append(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Appends the records whose ticket is not stored yet.
+
+        Returns:
+            np.ndarray: The records that were actually written.
+        """
+        new = rows[~np.isin(rows["ticket"], self.rows["ticket"])]
+        new = new[np.unique(new["ticket"], return_index=True)[1]]
+        if len(new) == 0:
+            return new
+        with open(self.path, "ab") as f:
+            # cut a trailing partial record left by an interrupted append, which would misalign every later one
+            f.truncate(len(self.rows) * self.dtype.itemsize)
+            new.tofile(f)
+        self._rows = np.concatenate([self.rows, new])
+        self._order = None
+        return new
+
+    def query(self, ticker: str = None, start: int = None, end: int = None) -> np.ndarray:
+        """
+        Returns the records of a symbol (or all symbols) with `start <= time <= end`, sorted by time.
+        """
+        rows = self.rows
+        if self._order is None:
+            self._order = np.lexsort((rows[self.time_field], rows["symbol"]))
+        if ticker is None:
+            order = np.argsort(rows[self.time_field], kind="stable")
+        else:
+            symbols = rows["symbol"][self._order]
+            lo = np.searchsorted(symbols, ticker, side="left")
+            hi = np.searchsorted(symbols, ticker, side="right")
+            order = self._order[lo:hi]
+        times = rows[self.time_field][order]
+        lo = 0 if start is None else np.searchsorted(times, start, side="left")
+        hi = len(times) if end is None else np.searchsorted(times, end, side="right")
+        return rows[order[lo:hi]]
+
+
+class HistorySync(ABC):
+    """
+    Incremental mirror of the broker's closed orders and deals in a local store.
+
+    Each `sync` call asks the broker only for the window since the latest stored time (less
+    an `overlap` safety margin) and appends the records not stored yet. Queries by symbol and
+    date range are answered from the local tables without any broker call.
+
+    Attributes:
+        orders (HistoryTable): Closed orders, keyed on `time_done_msc`.
+        deals (HistoryTable): Deals, keyed on `time_msc`.
+        since (datetime): Where the first sync starts when the store is empty.
+        overlap (timedelta): How far before the high-water mark each sync re-reads.
+    """
+
+    def __init__(self, directory: str, since: datetime, overlap: timedelta = timedelta(days=1)) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.orders = HistoryTable(os.path.join(directory, "orders.bin"), ORDER_DTYPE, "time_done_msc")
+        self.deals = HistoryTable(os.path.join(directory, "deals.bin"), DEAL_DTYPE, "time_msc")
+        self.since = since
+        self.overlap = overlap
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    @abstractmethod
+    def _fetch_orders(self, start: datetime, end: datetime) -> Iterable:
+        """
+        Returns the broker's closed orders between `start` and `end` as objects with the `ORDER_DTYPE` fields.
+        """
+        pass
+
+    @abstractmethod
+    def _fetch_deals(self, start: datetime, end: datetime) -> Iterable:
+        """
+        Returns the broker's deals between `start` and `end` as objects with the `DEAL_DTYPE` fields.
+        """
+        pass
+
+    def _start(self, table: HistoryTable) -> datetime:
+        hwm = table.high_water_mark
+        if hwm is None:
+            return self.since
+        return fromMsc(hwm) - self.overlap
+
+    @staticmethod
+    def _records(items: Iterable, dtype: np.dtype) -> np.ndarray:
+        return np.array([tuple(getattr(x, name) for name in dtype.names) for x in items], dtype=dtype)
+
+    def sync(self, end: datetime = None) -> tuple[int, int]:
+        """
+        Fetches and stores the orders and deals that are new since the last sync.
+
+        Args:
+            end (datetime, optional): The end of the window to fetch, defaults to now.
+
+        Returns:
+            tuple[int, int]: The number of new orders and new deals stored.
+        """
+        end = end or datetime.now(ZoneInfo("UTC"))
+        orders = self.orders.append(self._records(self._fetch_orders(self._start(self.orders), end), ORDER_DTYPE))
+        deals = self.deals.append(self._records(self._fetch_deals(self._start(self.deals), end), DEAL_DTYPE))
+        log.debug(f"history sync stored {len(orders)} orders and {len(deals)} deals")
+        return len(orders), len(deals)
+
+    def get_orders(self, ticker: str = None, start: datetime = None, end: datetime = None) -> np.ndarray:
+        """
+        Returns the stored closed orders of a symbol done between `start` and `end`.
+        """
+        return self.orders.query(ticker, None if start is None else toMsc(start), None if end is None else toMsc(end))
+
+    def get_deals(self, ticker: str = None, start: datetime = None, end: datetime = None) -> np.ndarray:
+        """
+        Returns the stored deals of a symbol between `start` and `end`.
+        """
+        return self.deals.query(ticker, None if start is None else toMsc(start), None if end is None else toMsc(end))
@@ -0,0 +1,427 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import math
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from art_trader.abstract.common import Symbol
+from art_trader.abstract.utils import CLOSE, HIGH, LOW, TIME
+
+log = logging.getLogger(__name__)
+
+NAN = float("nan")
+
+# Every indicator has a full-series function for backtests and an incremental state object with
+# an O(1) `update` for live use. Both perform the same floating point operations in the same order,
+# so they produce bit-identical values. Values are NaN until an indicator has seen enough bars.
+#
+# Rolling sums are kept as a running sum of values shifted by the first value seen, which is what
+# `np.cumsum` computes sequentially as well. Recursive indicators (EMA, and Wilder smoothing in ATR
+# and RSI) have no exact closed form, so their series functions run the state object over the
+# series; the element-wise parts (true range, gains and losses) are still vectorized.
+
+
+class Indicator(ABC):
+    """
+    Incremental indicator state.
+
+    Attributes:
+        period (int): The lookback in bars.
+        value (float): The latest value, NaN until ready.
+    """
+
+    def __init__(self, period: int) -> None:
+        if period < 1:
+            raise ValueError(f"period must be positive, got {period}")
+        self.period = period
+        self.value = NAN
+
+    def __repr__(self) -> str:
+        return str({"class": type(self).__name__, "period": self.period, "value": self.value})
+
+    @property
+    def ready(self) -> bool:
+        return not math.isnan(self.value)
+
+    @abstractmethod
+    def update(self, *values: float) -> float:
+        """Adds the next bar and returns the new value."""
+        pass
+
+
+class _RollingSums:
+    """Running sum and sum of squares over the last `period` values, shifted by the first value."""
+
+    def __init__(self, period: int) -> None:
+        self.period = period
+        self.shift = None
+        self.window = deque()
+        self.sum = 0.
+        self.sumsq = 0.
+
+    @property
+    def full(self) -> bool:
+        return len(self.window) == self.period
+
+    def update(self, x: float) -> float:
+        if self.shift is None:
+            self.shift = x
+        y = x - self.shift
+        if self.full:
+            old = self.window.popleft()
+            self.sum += y - old
+            self.sumsq += y * y - old * old
+        else:
+            self.sum += y - 0.
+            self.sumsq += y * y - 0.
+        self.window.append(y)
+        return y
+
+
+def _rollingSums(x: np.ndarray, period: int) -> tuple:
+    """The series equivalent of `_RollingSums`: returns (shifted values, running sums, running sums of squares)."""
+    y = x - x[0]
+    d = y.copy()
+    d[period:] = y[period:] - y[:-period]
+    sq = y * y
+    dsq = sq.copy()
+    dsq[period:] = sq[period:] - sq[:-period]
+    return y, np.cumsum(d), np.cumsum(dsq)
+
+
+def _recurse(state: Indicator, *columns: np.ndarray) -> np.ndarray:
+    update = state.update
+    return np.array([update(*x) for x in zip(*(c.tolist() for c in columns))], dtype=np.float64)
+
+
+def _asFloat(values) -> np.ndarray:
+    return np.asarray(values, dtype=np.float64)
+
+
+class SMA(Indicator):
+
+    def __init__(self, period: int) -> None:
+        super().__init__(period)
+        self._sums = _RollingSums(period)
+
+    def update(self, x: float) -> float:
+        self._sums.update(x)
+        if self._sums.full:
+            self.value = self._sums.shift + self._sums.sum / self.period
+        return self.value
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average."""
+    x = _asFloat(values)
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        _, s, _ = _rollingSums(x, period)
+        out[period - 1:] = x[0] + s[period - 1:] / period
+    return out
+
+
+class ZScore(Indicator):
+    """Distance of the last value from its rolling mean, in rolling (population) standard deviations."""
+
+    def __init__(self, period: int) -> None:
+        super().__init__(period)
+        self._sums = _RollingSums(period)
+
+    def update(self, x: float) -> float:
+        y = self._sums.update(x)
+        if self._sums.full:
+            mean = self._sums.sum / self.period
+            std = math.sqrt(max(self._sums.sumsq / self.period - mean * mean, 0.))
+            self.value = (y - mean) / std if std > 0 else 0.
+        return self.value
+
+
+def zscore(values: np.ndarray, period: int) -> np.ndarray:
+    """Rolling z-score, 0 where the window is flat."""
+    x = _asFloat(values)
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        y, s, q = _rollingSums(x, period)
+        mean = s[period - 1:] / period
+        std = np.sqrt(np.maximum(q[period - 1:] / period - mean * mean, 0.))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[period - 1:] = np.where(std > 0, (y[period - 1:] - mean) / std, 0.)
+    return out
+
+
+class _Extreme(Indicator):
+
+    def __init__(self, period: int) -> None:
+        super().__init__(period)
+        self._count = 0
+        self._candidates = deque()
+
+    @abstractmethod
+    def _dominates(self, a: float, b: float) -> bool:
+        pass
+
+    def update(self, x: float) -> float:
+        # monotonic deque of (index, value), amortized O(1)
+        while self._candidates and self._dominates(x, self._candidates[-1][1]):
+            self._candidates.pop()
+        self._candidates.append((self._count, x))
+        if self._candidates[0][0] <= self._count - self.period:
+            self._candidates.popleft()
+        self._count += 1
+        if self._count >= self.period:
+            self.value = self._candidates[0][1]
+        return self.value
+
+
+class RollingHigh(_Extreme):
+
+    def _dominates(self, a: float, b: float) -> bool:
+        return a >= b
+
+
+class RollingLow(_Extreme):
+
+    def _dominates(self, a: float, b: float) -> bool:
+        return a <= b
+
+
+def rollingHigh(values: np.ndarray, period: int) -> np.ndarray:
+    """Highest value of the last `period` values."""
+    x = _asFloat(values)
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        out[period - 1:] = sliding_window_view(x, period).max(axis=1)
+    return out
+
+
+def rollingLow(values: np.ndarray, period: int) -> np.ndarray:
+    """Lowest value of the last `period` values."""
+    x = _asFloat(values)
+    out = np.full(len(x), np.nan)
+    if len(x) >= period:
+        out[period - 1:] = sliding_window_view(x, period).min(axis=1)
+    return out
+
+
+class EMA(Indicator):
+    """Exponential moving average with `alpha = 2 / (period + 1)`, seeded with the SMA of the first `period` values."""
+
+    def __init__(self, period: int) -> None:
+        super().__init__(period)
+        self.alpha = 2. / (period + 1)
+        self._count = 0
+        self._sum = 0.
+
+    def update(self, x: float) -> float:
+        self._count += 1
+        if self._count < self.period:
+            self._sum += x
+        elif self._count == self.period:
+            self.value = (self._sum + x) / self.period
+        else:
+            self.value = self.value + self.alpha * (x - self.value)
+        return self.value
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """Exponential moving average, see `EMA`."""
+    return _recurse(EMA(period), _asFloat(values))
+
+
+class _Wilder(Indicator):
+    """Wilder smoothing, seeded with the mean of the first `period` values."""
+
+    def __init__(self, period: int) -> None:
+        super().__init__(period)
+        self._count = 0
+        self._sum = 0.
+
+    def update(self, x: float) -> float:
+        self._count += 1
+        if self._count < self.period:
+            self._sum += x
+        elif self._count == self.period:
+            self.value = (self._sum + x) / self.period
+        else:
+            self.value = (self.value * (self.period - 1) + x) / self.period
+        return self.value
+
+
+class ATR(Indicator):
+    """Average true range with Wilder smoothing."""
+
+    def __init__(self, period: int) -> None:
+        super().__init__(period)
+        self._smooth = _Wilder(period)
+        self._close = None
+
+    def update(self, high: float, low: float, close: float) -> float:
+        if self._close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self._close), abs(low - self._close))
+        self._close = close
+        self.value = self._smooth.update(tr)
+        return self.value
+
+
+def trueRange(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range, the first bar only has its own range."""
+    high, low, close = _asFloat(high), _asFloat(low), _asFloat(close)
+    out = high - low
+    prev = close[:-1]
+    out[1:] = np.maximum(out[1:], np.maximum(np.abs(high[1:] - prev), np.abs(low[1:] - prev)))
+    return out
+
+
+def atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int) -> np.ndarray:
+    """Average true range, see `ATR`."""
+    return _recurse(_Wilder(period), trueRange(high, low, close))
+
+
+def _rsi(gain: float, loss: float) -> float:
+    if loss == 0:
+        return 100.
+    return 100. - 100. / (1. + gain / loss)
+
+
+class RSI(Indicator):
+    """Relative strength index with Wilder smoothing of gains and losses."""
+
+    def __init__(self, period: int) -> None:
+        super().__init__(period)
+        self._gain = _Wilder(period)
+        self._loss = _Wilder(period)
+        self._close = None
+
+    def update(self, close: float) -> float:
+        if self._close is not None:
+            change = close - self._close
+            gain = self._gain.update(max(change, 0.))
+            loss = self._loss.update(max(-change, 0.))
+            if self._gain.ready:
+                self.value = _rsi(gain, loss)
+        self._close = close
+        return self.value
+
+
+def rsi(close: np.ndarray, period: int) -> np.ndarray:
+    """Relative strength index, see `RSI`."""
+    close = _asFloat(close)
+    out = np.full(len(close), np.nan)
+    if len(close) > period:
+        change = np.diff(close)
+        gain = _recurse(_Wilder(period), np.maximum(change, 0.))
+        loss = _recurse(_Wilder(period), np.maximum(-change, 0.))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out[period:] = np.where(loss[period - 1:] == 0, 100.,
+                                    100. - 100. / (1. + gain[period - 1:] / loss[period - 1:]))
+    return out
+
+
+# name: (series function, state class, formatted rate columns used as inputs)
+INDICATORS = {
+    "sma": (sma, SMA, (CLOSE,)),
+    "ema": (ema, EMA, (CLOSE,)),
+    "atr": (atr, ATR, (HIGH, LOW, CLOSE)),
+    "rsi": (rsi, RSI, (CLOSE,)),
+    "high": (rollingHigh, RollingHigh, (HIGH,)),
+    "low": (rollingLow, RollingLow, (LOW,)),
+    "zscore": (zscore, ZScore, (CLOSE,)),
+}
+
+
+class IndicatorCache:
+    """
+    Indicator values and states per (ticker, timeframe, indicator, params).
+
+    `series` serves backtests: values are computed once over the rates passed in, and calls with
+    a prefix of those rates (e.g. one call per simulated day) are slices. `state` serves the live
+    path: one incremental object per key, updated with each new bar.
+    """
+
+    def __init__(self) -> None:
+        self._series: dict[tuple, tuple] = {}
+        self._states: dict[tuple, Indicator] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return str({"series": list(self._series.keys()), "states": list(self._states.keys())})
+
+    @staticmethod
+    def key(symbol: Symbol, timeframe: int, name: str, period: int) -> tuple:
+        if name not in INDICATORS:
+            raise ValueError(f"Unknown indicator {name}, expected one of {list(INDICATORS)}")
+        return (symbol.info.ticker, timeframe, name, period)
+
+    def series(self, symbol: Symbol, timeframe: int, name: str, period: int, rates: np.ndarray) -> np.ndarray:
+        """
+        Returns the values of an indicator aligned with `rates` (formatted rates of `timeframe`).
+
+        Args:
+            symbol (Symbol): The symbol the rates belong to.
+            timeframe (int): The timeframe of the rates.
+            name (str): One of `INDICATORS`.
+            period (int): The lookback in bars.
+            rates (np.ndarray): Formatted rates.
+
+        Returns:
+            np.ndarray: One value per bar of `rates`.
+        """
+        key = self.key(symbol, timeframe, name, period)
+        n = len(rates)
+        with self._lock:
+            cached = self._series.get(key)
+        if cached is not None and n and len(cached[0]) >= n:
+            times, values = cached
+            if times[0] == rates[0, TIME] and times[n - 1] == rates[-1, TIME]:
+                return values[:n]
+
+        fn, _, columns = INDICATORS[name]
+        values = fn(*(rates[:, c] for c in columns), period)
+        with self._lock:
+            self._series[key] = (rates[:, TIME].copy(), values)
+        return values
+
+    def state(self, symbol: Symbol, timeframe: int, name: str, period: int, history: np.ndarray = None) -> Indicator:
+        """
+        Returns the incremental state of an indicator, creating it on first use.
+
+        Args:
+            history (np.ndarray, optional): Formatted rates to warm a new state up with.
+        """
+        key = self.key(symbol, timeframe, name, period)
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                _, cls, columns = INDICATORS[name]
+                state = self._states[key] = cls(period)
+                if history is not None and len(history):
+                    _recurse(state, *(history[:, c] for c in columns))
+        return state
+
+    def update(self, symbol: Symbol, timeframe: int, bar: np.ndarray) -> dict:
+        """
+        Feeds a new formatted bar to every state of a symbol and timeframe.
+
+        Returns:
+            dict: The new value per (indicator, period).
+        """
+        out = {}
+        with self._lock:
+            for key, state in self._states.items():
+                if key[0] == symbol.info.ticker and key[1] == timeframe:
+                    out[key[2:]] = state.update(*(float(bar[c]) for c in INDICATORS[key[2]][2]))
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+            self._states.clear()
@@ -0,0 +1,151 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+
+import numpy as np
+
+from art_trader.abstract.ticks import CLOSE_EXIT, NOT_FILLED, SL_EXIT, TP_EXIT
+
+log = logging.getLogger(__name__)
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+# The bar scan behind `Backtester.calcProfit`, for many trades at once. Trades are given as
+# stacked arrays: the bars of trade `i` are `low[starts[i]:ends[i]]` and `high[starts[i]:ends[i]]`.
+#
+# A trade enters on the first bar whose range strictly contains the entry price, then exits on
+# the first bar (the entry bar included) whose range strictly contains the TP or the SL, the TP
+# winning if both are. A positive `trail` turns the SL into a trailing stop that follows the best
+# high (long) or low (short) by that distance once the trade is open; it moves after a bar has
+# been checked, so a bar never triggers a stop raised by its own extreme.
+#
+# `_scanLoop` is compiled with numba when it is installed. Otherwise trades without a trailing
+# stop use the NumPy version and the others run `_scanLoop` as plain Python. All versions return
+# identical results, see test_kernels.
+
+
+def _scanLoop(low, high, starts, ends, entry, sl, tp, trail, is_long, entry_idx, exit_idx, kind, exit_price):
+    for i in range(len(starts)):
+        executed = False
+        stop = sl[i]
+        for j in range(starts[i], ends[i]):
+            if not executed:
+                if low[j] < entry[i] < high[j]:
+                    executed = True
+                    entry_idx[i] = j
+            if executed:
+                tp_hit = low[j] < tp[i] < high[j]
+                sl_hit = low[j] < stop < high[j]
+                if tp_hit or sl_hit:
+                    exit_idx[i] = j
+                    kind[i] = TP_EXIT if tp_hit else SL_EXIT
+                    exit_price[i] = tp[i] if tp_hit else stop
+                    break
+                if trail[i] > 0:
+                    if is_long[i]:
+                        stop = max(stop, high[j] - trail[i])
+                    else:
+                        stop = min(stop, low[j] + trail[i])
+        if executed and kind[i] == NOT_FILLED:
+            exit_idx[i] = ends[i] - 1
+            kind[i] = CLOSE_EXIT
+
+
+if HAS_NUMBA:
+    _scanCompiled = njit(cache=True, nogil=True)(_scanLoop)
+
+
+def _scanVectorized(low, high, start, end, entry, sl, tp) -> tuple:
+    """The scan of a single trade without trailing stop, with NumPy masks."""
+    low, high = low[start:end], high[start:end]
+    filled = (low < entry) & (entry < high)
+    if not filled.any():
+        return -1, -1, NOT_FILLED, np.nan
+    first = int(np.argmax(filled))
+    tp_hit = (low[first:] < tp) & (tp < high[first:])
+    sl_hit = (low[first:] < sl) & (sl < high[first:])
+    hit = tp_hit | sl_hit
+    if not hit.any():
+        return start + first, end - 1, CLOSE_EXIT, np.nan
+    j = int(np.argmax(hit))
+    if tp_hit[j]:
+        return start + first, start + first + j, TP_EXIT, tp
+    return start + first, start + first + j, SL_EXIT, sl
+
+
+def scan(low: np.ndarray, high: np.ndarray, starts: np.ndarray, ends: np.ndarray, entry: np.ndarray,
+         sl: np.ndarray, tp: np.ndarray, trail: np.ndarray = None, is_long: np.ndarray = None,
+         compiled: bool = None) -> tuple:
+    """
+    Finds the entry and exit bar of each trade.
+
+    Args:
+        low (np.ndarray): Stacked bar lows.
+        high (np.ndarray): Stacked bar highs.
+        starts (np.ndarray): The first bar of each trade.
+        ends (np.ndarray): One past the last bar of each trade.
+        entry (np.ndarray): Entry prices.
+        sl (np.ndarray): Stop loss prices.
+        tp (np.ndarray): Take profit prices.
+        trail (np.ndarray, optional): Trailing stop distances, 0 for a fixed SL.
+        is_long (np.ndarray, optional): Trade directions, only used by trailing stops.
+        compiled (bool, optional): Force (True) or avoid (False) the numba kernel. Defaults to using it if installed.
+
+    Returns:
+        tuple: Per trade, the entry bar and exit bar (-1 if not filled), the exit kind (`NOT_FILLED`,
+        `TP_EXIT`, `SL_EXIT` or `CLOSE_EXIT`) and the exit price (NaN for `NOT_FILLED` and `CLOSE_EXIT`).
+
+    Raises:
+        ImportError: If `compiled` is True but numba is not installed.
+    """
+    n = len(starts)
+    low, high = np.ascontiguousarray(low, dtype=np.float64), np.ascontiguousarray(high, dtype=np.float64)
+    starts, ends = np.asarray(starts, dtype=np.int64), np.asarray(ends, dtype=np.int64)
+    entry, sl, tp = (np.asarray(x, dtype=np.float64) for x in (entry, sl, tp))
+    trail = np.zeros(n) if trail is None else np.asarray(trail, dtype=np.float64)
+    is_long = np.ones(n, dtype=np.bool_) if is_long is None else np.asarray(is_long, dtype=np.bool_)
+
+    entry_idx = np.full(n, -1, dtype=np.int64)
+    exit_idx = np.full(n, -1, dtype=np.int64)
+    kind = np.full(n, NOT_FILLED, dtype=np.int64)
+    exit_price = np.full(n, np.nan)
+
+    if compiled is None:
+        compiled = HAS_NUMBA
+    if compiled:
+        if not HAS_NUMBA:
+            raise ImportError("numba is not installed")
+        _scanCompiled(low, high, starts, ends, entry, sl, tp, trail, is_long, entry_idx, exit_idx, kind, exit_price)
+        return entry_idx, exit_idx, kind, exit_price
+
+    trailing = np.flatnonzero(trail > 0)
+    for i in np.flatnonzero(trail <= 0):
+        entry_idx[i], exit_idx[i], kind[i], exit_price[i] = _scanVectorized(
+            low, high, starts[i], ends[i], entry[i], sl[i], tp[i])
+    if len(trailing):
+        out = (entry_idx[trailing], exit_idx[trailing], kind[trailing], exit_price[trailing])
+        _scanLoop(low.tolist(), high.tolist(), starts[trailing].tolist(), ends[trailing].tolist(),
+                  entry[trailing].tolist(), sl[trailing].tolist(), tp[trailing].tolist(), trail[trailing].tolist(),
+                  is_long[trailing].tolist(), *out)
+        entry_idx[trailing], exit_idx[trailing], kind[trailing], exit_price[trailing] = out
+    return entry_idx, exit_idx, kind, exit_price
+
+
+def stack(datas: list[np.ndarray]) -> tuple:
+    """
+    Stacks the price data of several trades for `scan`.
+
+    Returns:
+        tuple: The stacked array and the start and end row of each trade.
+    """
+    lengths = np.array([len(x) for x in datas], dtype=np.int64)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    nonempty = [x for x in datas if len(x)]
+    stacked = np.concatenate(nonempty) if nonempty else np.empty((0, 6))
+    return stacked, starts, ends
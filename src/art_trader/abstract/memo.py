@@ -0,0 +1,204 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import types
+from datetime import date
+from typing import TYPE_CHECKING, Iterable
+
+import numpy as np
+
+from art_trader.abstract.common import Strategy
+from art_trader.abstract.utils import dateRange, getPrevMarketDay
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cells (
+    fingerprint TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    day TEXT NOT NULL,
+    data_version TEXT NOT NULL,
+    profit REAL NOT NULL,
+    details TEXT,
+    PRIMARY KEY (fingerprint, ticker, day)
+)
+"""
+
+
+def fingerprint(strategy: Strategy, **extra) -> str:
+    """
+    Returns a stable hash of a strategy's class and public parameters, plus any `extra` settings
+    that change simulated results (e.g. the backtester class or account currency).
+
+    Parameters are hashed through `stableParams`, so the same configuration has the same hash in
+    every process.
+
+    Raises:
+        ValueError: If a parameter has no stable representation, see `stableParams`.
+    """
+    cls = type(strategy)
+    params = {k: v for k, v in vars(strategy).items() if not k.startswith("_")}
+    payload = {"strategy": f"{cls.__module__}.{cls.__qualname__}", "params": stableParams(params, "params"),
+               "extra": stableParams(extra, "extra")}
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def stableParams(value, name: str = "value"):
+    """
+    Converts a parameter to JSON values that do not change from one process to the next.
+
+    Containers, dates and numpy values are converted item by item, classes and functions are
+    named, and other objects are represented by their own `__repr__`.
+
+    Raises:
+        ValueError: If an object only has the default `repr`, which holds its memory address.
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {str(k): stableParams(v, f"{name}.{k}") for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [stableParams(v, f"{name}[{i}]") for i, v in enumerate(value)]
+    if isinstance(value, (set, frozenset)):
+        return sorted((stableParams(v, name) for v in value), key=lambda x: json.dumps(x, sort_keys=True))
+    if isinstance(value, (type, types.FunctionType, types.BuiltinFunctionType)):
+        return f"{value.__module__}.{value.__qualname__}"
+    text = repr(value)
+    if type(value).__repr__ is object.__repr__ or " at 0x" in text:
+        raise ValueError(f"{name} has no stable repr, define __repr__ on {type(value).__qualname__}: {text}")
+    return text
+
+
+class ResultCache:
+    """
+    Persistent cache of simulated (ticker, day) cells in a SQLite file.
+
+    A cell holds the simulated profit and the trade and fill details of one symbol on one day, keyed
+    by the fingerprint of the run's configuration. Cells are only served for the cache's current
+    `data_version`: bumping it (e.g. after re-downloading history) invalidates every cell lazily, and
+    `invalidate` drops cells explicitly (e.g. one ticker whose data was corrected).
+
+    Cells that failed (e.g. missing data) are not stored by the backtester, so they are retried on
+    the next run; skipped cells are, so a run with a screen can still be rebuilt by `balancePath`.
+
+    Attributes:
+        path (str): The SQLite file, or ":memory:".
+        data_version (str): The version of the underlying market data.
+    """
+
+    def __init__(self, path: str, data_version: str = "") -> None:
+        self.path = path
+        self.data_version = data_version
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            if path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+
+    def __repr__(self) -> str:
+        return str({"path": self.path, "data_version": self.data_version})
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _encode(cell: dict) -> str:
+        return json.dumps(cell, default=str)
+
+    def load(self, fingerprint: str, tickers: list[str], start: date, end: date) -> dict[tuple, dict]:
+        """
+        Reads all valid cells of a run in one query.
+
+        Returns:
+            dict[tuple, dict]: The cell details per (ticker, day), for days in `[start, end)`.
+        """
+        query = (f"SELECT ticker, day, profit, details FROM cells WHERE fingerprint = ? AND data_version = ? "
+                 f"AND day >= ? AND day < ? AND ticker IN ({','.join('?' * len(tickers))})")
+        with self._lock:
+            rows = self._conn.execute(query, (fingerprint, self.data_version, start.isoformat(), end.isoformat(),
+                                              *tickers)).fetchall()
+        out = {}
+        for ticker, day, profit, details in rows:
+            cell = json.loads(details) if details else {}
+            cell["profit"] = profit
+            cell["day"] = date.fromisoformat(day)
+            out[(ticker, cell["day"])] = cell
+        return out
+
+    def put(self, fingerprint: str, cells: Iterable[tuple]) -> None:
+        """
+        Stores `(ticker, day, cell)` tuples, where `cell` holds at least the `profit`.
+        """
+        rows = [(fingerprint, ticker, day.isoformat(), self.data_version, float(cell["profit"]), self._encode(cell))
+                for ticker, day, cell in cells]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?, ?, ?)", rows)
+
+    def invalidate(self, fingerprint: str = None, ticker: str = None, start: date = None, end: date = None) -> int:
+        """
+        Deletes the cells matching all given filters (all cells if none is given).
+
+        Returns:
+            int: The number of cells deleted.
+        """
+        clauses, args = [], []
+        for clause, value in (("fingerprint = ?", fingerprint), ("ticker = ?", ticker),
+                              ("day >= ?", start and start.isoformat()), ("day < ?", end and end.isoformat())):
+            if value is not None:
+                clauses.append(clause)
+                args.append(value)
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock, self._conn:
+            return self._conn.execute(f"DELETE FROM cells{where}", args).rowcount
+
+    def balancePath(self, fingerprint: str, tickers: list[str], start: date, end: date,
+                    initial_balance: float) -> "DataFrame":
+        """
+        Rebuilds the daily profit and balance of a run from cached cells only, as `run_all_single_thread` returns it.
+
+        Raises:
+            Exception: If some cells of the run are not cached.
+        """
+        query = (f"SELECT ticker, day, profit FROM cells WHERE fingerprint = ? AND data_version = ? "
+                 f"AND day >= ? AND day < ? AND ticker IN ({','.join('?' * len(tickers))})")
+        with self._lock:
+            rows = self._conn.execute(query, (fingerprint, self.data_version, start.isoformat(), end.isoformat(),
+                                              *tickers)).fetchall()
+        profits = {(ticker, day): profit for ticker, day, profit in rows}
+
+        days = list(dateRange(start, end))
+        missing = len(days) * len(tickers) - len(profits)
+        if missing:
+            raise Exception(f"{missing} cells of the run are not cached")
+
+        from pandas import DataFrame
+
+        # summed in the same order as the backtest so the balances are identical
+        results = [(getPrevMarketDay(start), 0., initial_balance)]
+        balance = initial_balance
+        for day in days:
+            key = day.isoformat()
+            day_profit = 0
+            for ticker in tickers:
+                day_profit += profits[(ticker, key)]
+            balance += day_profit
+            results.append((day, day_profit, balance))
+        return DataFrame(results, columns=["date", "profit", "balance"]).set_index("date")
@@ -0,0 +1,273 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import threading
+import tracemalloc
+import weakref
+from typing import Callable, Iterator
+
+log = logging.getLogger(__name__)
+
+# COMPONENTS, in spill order
+PRICE_CACHE = "price_cache"
+LEDGER = "ledger"
+
+# cells written to the spill file at once
+LEDGER_BATCH = 4096
+
+
+def cellSize(cell: dict) -> int:
+    """Estimates the bytes held by a ledger cell: the dict and its values, not counting shared objects."""
+    return sys.getsizeof(cell) + sum(sys.getsizeof(v) for v in cell.values())
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class Ledger:
+    """
+    Append-only list of ledger cells that can move its cells to a file.
+
+    Supports what is done with `Backtester.ledger`: `append`, `len`, iteration and indexing.
+    Spilled cells are pickled in batches; reading one loads its batch. The spill file is removed
+    by `clear`, or when the ledger is garbage collected.
+
+    Attributes:
+        nbytes (int): The estimated bytes of the cells held in memory.
+    """
+
+    def __init__(self) -> None:
+        self.nbytes = 0
+        self._cells: list[dict] = []
+        self._path = None
+        self._batches: list[tuple] = []  # (file offset, number of cells)
+        self._spilled = 0
+        self._cached = (None, None)
+        self._finalizer = None
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return str({"cells": len(self), "spilled": self._spilled, "nbytes": self.nbytes})
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._cells)
+
+    def append(self, cell: dict) -> None:
+        with self._lock:
+            self._cells.append(cell)
+            self.nbytes += cellSize(cell)
+
+    def _batch(self, b: int) -> list[dict]:
+        if self._cached[0] != b:
+            with open(self._path, "rb") as f:
+                f.seek(self._batches[b][0])
+                self._cached = (b, pickle.load(f))
+        return self._cached[1]
+
+    def __iter__(self) -> Iterator[dict]:
+        for batch in self.batches():
+            yield from batch
+
+    def batches(self) -> Iterator[list[dict]]:
+        """Yields the cells in order, in lists of at most `LEDGER_BATCH`, loading one spilled batch at a time."""
+        for b in range(len(self._batches)):
+            yield self._batch(b)
+        cells = list(self._cells)
+        for i in range(0, len(cells), LEDGER_BATCH):
+            yield cells[i:i + LEDGER_BATCH]
+
+    def __getitem__(self, i: int) -> dict:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("ledger index out of range")
+        if i >= self._spilled:
+            return self._cells[i - self._spilled]
+        for b, (_, count) in enumerate(self._batches):
+            if i < count:
+                return self._batch(b)[i]
+            i -= count
+
+    def spill(self, nbytes: int, directory: str) -> int:
+        """
+        Appends the cells held in memory to a file in `directory`.
+
+        Returns:
+            int: The bytes freed.
+        """
+        with self._lock:
+            if not self._cells:
+                return 0
+            if self._path is None:
+                fd, self._path = tempfile.mkstemp(prefix="ledger-", suffix=".pkl", dir=directory)
+                os.close(fd)
+                self._finalizer = weakref.finalize(self, _remove, self._path)
+            with open(self._path, "ab") as f:
+                for i in range(0, len(self._cells), LEDGER_BATCH):
+                    batch = self._cells[i:i + LEDGER_BATCH]
+                    self._batches.append((f.tell(), len(batch)))
+                    pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+            freed = self.nbytes
+            self._spilled += len(self._cells)
+            self._cells = []
+            self.nbytes = 0
+        log.info(f"spilled {freed / 2 ** 20:.1f} MiB of ledger to {self._path}")
+        return freed
+
+    def release(self, directory: str) -> None:
+        """
+        Moves the file of cells spilled to `directory` out of it, before the directory is removed.
+
+        The cells stay on disk and are still read one batch at a time, so releasing does not need
+        the memory the budget spilled them to save.
+        """
+        with self._lock:
+            if self._path is None or os.path.dirname(os.path.abspath(self._path)) != os.path.abspath(directory):
+                return
+            fd, path = tempfile.mkstemp(prefix="ledger-", suffix=".pkl")
+            os.close(fd)
+            shutil.move(self._path, path)
+            self._finalizer.detach()
+            self._path = path
+            self._finalizer = weakref.finalize(self, _remove, path)
+
+    def clear(self) -> None:
+        """Drops every cell, in memory and spilled."""
+        with self._lock:
+            self._cells = []
+            self.nbytes = 0
+            self._drop()
+
+    def _drop(self) -> None:
+        if self._finalizer is not None:
+            self._finalizer()
+        self._finalizer = None
+        self._path = None
+        self._batches = []
+        self._spilled = 0
+        self._cached = (None, None)
+
+
+class _Component:
+
+    def __init__(self, size: Callable[[], int], spill: Callable[[int, str], int],
+                 release: Callable[[str], None] = None) -> None:
+        self.size = size
+        self.spill = spill
+        self.release = release
+
+
+class MemoryBudget:
+    """
+    Keeps a backtest's memory under a limit by spilling components to disk.
+
+    Components register how to measure their bytes and how to spill them. `check`, called by the
+    backtester after each simulated day, spills components in registration order (cold price
+    arrays first, then the ledger) until usage is back under the limit. The run then gets slower
+    instead of being killed.
+
+    With `trace`, usage is the memory traced by `tracemalloc` (NumPy arrays included), which also
+    accounts for what no component owns; otherwise it is the sum of the components' own estimates.
+    Tracing slows allocations down noticeably.
+
+    Attributes:
+        limit (int): The budget in bytes.
+        directory (str): Where spilled data goes, a temporary directory removed by `close` by default.
+        trace (bool): Measure usage with `tracemalloc`.
+        spilled (dict[str, int]): The bytes spilled per component so far.
+    """
+
+    def __init__(self, limit: int, directory: str = None, trace: bool = True) -> None:
+        self.limit = limit
+        self._own_directory = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="art-spill-")
+        os.makedirs(self.directory, exist_ok=True)
+        self.trace = trace
+        self.spilled: dict[str, int] = {}
+        self._components: dict[str, _Component] = {}
+        self._started_tracing = False
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def __repr__(self) -> str:
+        return str({"limit": self.limit, "directory": self.directory, **self.usage()})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def register(self, name: str, size: Callable[[], int], spill: Callable[[int, str], int],
+                 release: Callable[[str], None] = None) -> None:
+        """
+        Registers a component, replacing one of the same name.
+
+        Args:
+            name (str): The component name, e.g. `PRICE_CACHE`.
+            size (Callable): Returns the component's bytes in memory.
+            spill (Callable): Given the bytes to free and the spill directory, spills and returns the bytes freed.
+            release (Callable, optional): Given the spill directory, stops using what was spilled there (by
+                                          moving it elsewhere or dropping it). Called by `close` before the
+                                          directory is removed.
+        """
+        self._components[name] = _Component(size, spill, release)
+
+    def usage(self) -> dict:
+        """Returns the bytes of each component, and the traced bytes and peak when tracing."""
+        out = {name: x.size() for name, x in self._components.items()}
+        if self.trace and tracemalloc.is_tracing():
+            out["traced"], out["traced_peak"] = tracemalloc.get_traced_memory()
+        return out
+
+    def used(self) -> int:
+        if self.trace and tracemalloc.is_tracing():
+            return tracemalloc.get_traced_memory()[0]
+        return sum(x.size() for x in self._components.values())
+
+    def check(self) -> int:
+        """
+        Spills components until usage is under the limit, or nothing is left to spill.
+
+        Returns:
+            int: The bytes freed.
+        """
+        excess = self.used() - self.limit
+        freed = 0
+        for name, component in self._components.items():
+            if excess - freed <= 0:
+                break
+            n = component.spill(excess - freed, self.directory)
+            self.spilled[name] = self.spilled.get(name, 0) + n
+            freed += n
+        if excess > freed:
+            log.warning(f"memory budget exceeded by {(excess - freed) / 2 ** 20:.1f} MiB with nothing left to spill")
+        return freed
+
+    def close(self) -> None:
+        """
+        Stops tracing if this budget started it, has the components release what they spilled and removes
+        its own spill directory.
+        """
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        for name, component in self._components.items():
+            if component.release is not None:
+                try:
+                    component.release(self.directory)
+                except Exception as e:
+                    log.warning(f"failed to release the spilled {name} | {e}")
+        if self._own_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
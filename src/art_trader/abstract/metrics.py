@@ -0,0 +1,360 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Histogram layout: values are recorded in microseconds into log-linear buckets with
+# 2**SUB_BUCKET_BITS linear sub-buckets per power of two (about 3% relative precision)
+SUB_BUCKET_BITS = 6
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+HALF_BUCKETS = SUB_BUCKETS >> 1
+MAX_EXPONENT = 40  # about 12 days in microseconds
+BUCKETS = (MAX_EXPONENT + 2) * HALF_BUCKETS
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def bucketIndex(value: int) -> int:
+    """Returns the histogram bucket of a non-negative integer value."""
+    exponent = max(value.bit_length() - SUB_BUCKET_BITS, 0)
+    return min(exponent * HALF_BUCKETS + (value >> exponent), BUCKETS - 1)
+
+
+def bucketValue(index: np.ndarray) -> np.ndarray:
+    """Returns the lowest value that falls in each of the given buckets."""
+    exponent = np.maximum(index // HALF_BUCKETS - 1, 0)
+    return (index - exponent * HALF_BUCKETS) << exponent
+
+
+class _PerThread:
+    """
+    Base class for metrics updated without locks.
+
+    Every thread writes to its own slot, created on the thread's first update; readers sum
+    all slots. Updates never contend, and a snapshot may lag a concurrent update by one value.
+    """
+
+    def __init__(self, name: str, labels: tuple, help: str) -> None:
+        self.name = name
+        self.labels = labels
+        self.help = help
+        self._local = threading.local()
+        self._slots: list = []
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return str({"name": self.name, "labels": self.labels})
+
+    def _new_slot(self):
+        pass
+
+    def _slot(self):
+        try:
+            return self._local.slot
+        except AttributeError:
+            slot = self._local.slot = self._new_slot()
+            with self._lock:
+                self._slots.append(slot)
+            return slot
+
+
+class Counter(_PerThread):
+    """
+    A monotonically increasing count, such as broker calls or rejected orders.
+    """
+
+    def _new_slot(self):
+        return [0]
+
+    def inc(self, amount: float = 1) -> None:
+        self._slot()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return sum(slot[0] for slot in list(self._slots))
+
+
+class Histogram(_PerThread):
+    """
+    HDR-style latency histogram with fixed log-linear buckets.
+
+    Values are recorded in seconds and stored in microseconds. Recording is a bit-length
+    computation and one list increment on the calling thread's own buckets.
+    """
+
+    def _new_slot(self):
+        # buckets, count, sum (us), max (us)
+        return [[0] * BUCKETS, [0, 0, 0]]
+
+    def record(self, seconds: float) -> None:
+        value = max(int(seconds * 1e6), 0)
+        buckets, totals = self._slot()
+        buckets[bucketIndex(value)] += 1
+        totals[0] += 1
+        totals[1] += value
+        if value > totals[2]:
+            totals[2] = value
+
+    @contextmanager
+    def time(self):
+        """Context manager recording the duration of its block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(time.perf_counter() - start)
+
+    def snapshot(self) -> dict:
+        """
+        Returns count, sum, max and quantiles in seconds, merged over all threads.
+        """
+        slots = list(self._slots)
+        counts = np.zeros(BUCKETS, dtype=np.int64)
+        count = total = peak = 0
+        for buckets, totals in slots:
+            counts += np.asarray(buckets, dtype=np.int64)
+            count += totals[0]
+            total += totals[1]
+            peak = max(peak, totals[2])
+
+        out = {"count": count, "sum": total / 1e6, "max": peak / 1e6}
+        cumulative = np.cumsum(counts)
+        values = bucketValue(np.arange(BUCKETS))
+        for q in QUANTILES:
+            if cumulative[-1] == 0:
+                out[str(q)] = 0.
+            else:
+                i = int(np.searchsorted(cumulative, q * cumulative[-1], side="left"))
+                out[str(q)] = min(int(values[i]), peak) / 1e6
+        return out
+
+
+class Gauge:
+    """
+    A value sampled at snapshot time, either set explicitly or read from a callable
+    (e.g. a queue's current depth).
+    """
+
+    def __init__(self, name: str, labels: tuple, help: str, fn: Callable[[], float] = None) -> None:
+        self.name = name
+        self.labels = labels
+        self.help = help
+        self.fn = fn
+        self._value = 0.
+
+    def __repr__(self) -> str:
+        return str({"name": self.name, "labels": self.labels})
+
+    def set(self, value: float) -> None:
+        self._value = value
+
+    @property
+    def value(self) -> float:
+        if self.fn is not None:
+            try:
+                return self.fn()
+            except Exception as e:
+                log.debug(f"gauge {self.name} failed | {e}")
+                return float("nan")
+        return self._value
+
+
+def _labels(labels: Optional[dict]) -> tuple:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels: tuple, extra: tuple = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+class MetricsRegistry:
+    """
+    A named collection of counters, gauges and histograms.
+
+    Metrics are created on first use and identified by name and labels, so instrumented
+    code can simply call e.g. `METRICS.histogram("order_send_seconds").record(dt)`.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self) -> str:
+        return str(list(self._metrics.keys()))
+
+    def _get(self, kind: type, name: str, labels: Optional[dict], help: str, **kwargs):
+        key = (name, _labels(labels))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = self._metrics[key] = kind(name, key[1], help, **kwargs)
+        if not isinstance(metric, kind):
+            raise TypeError(f"metric {name} is a {type(metric).__name__}, not a {kind.__name__}")
+        return metric
+
+    def counter(self, name: str, labels: dict = None, help: str = "") -> Counter:
+        return self._get(Counter, name, labels, help)
+
+    def histogram(self, name: str, labels: dict = None, help: str = "") -> Histogram:
+        return self._get(Histogram, name, labels, help)
+
+    def gauge(self, name: str, labels: dict = None, help: str = "", fn: Callable[[], float] = None) -> Gauge:
+        """
+        Returns a gauge, reading its value from `fn` if given.
+
+        Raises:
+            ValueError: If the gauge already reads from another callable, which would silently stop being reported.
+        """
+        gauge = self._get(Gauge, name, labels, help)
+        if fn is not None:
+            with self._lock:
+                if gauge.fn is not None and gauge.fn is not fn:
+                    raise ValueError(f"gauge {name}{_format_labels(gauge.labels)} already reads from {gauge.fn}")
+                gauge.fn = fn
+        return gauge
+
+    def snapshot(self) -> dict:
+        """
+        Returns the current value of every metric, keyed by name and labels.
+        """
+        out = {}
+        for (name, labels), metric in list(self._metrics.items()):
+            key = name + _format_labels(labels)
+            out[key] = metric.snapshot() if isinstance(metric, Histogram) else metric.value
+        return out
+
+    def render(self) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format. Histograms are exposed
+        as summaries with the `QUANTILES` quantiles.
+        """
+        lines = []
+        typed = set()
+        for (name, labels), metric in sorted(self._metrics.items(), key=lambda x: x[0]):
+            kind = {Counter: "counter", Gauge: "gauge", Histogram: "summary"}[type(metric)]
+            if name not in typed:
+                typed.add(name)
+                if metric.help:
+                    lines.append(f"# HELP {name} {metric.help}")
+                lines.append(f"# TYPE {name} {kind}")
+            if isinstance(metric, Histogram):
+                snap = metric.snapshot()
+                for q in QUANTILES:
+                    lines.append(f"{name}{_format_labels(labels, (('quantile', q),))} {snap[str(q)]}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {snap['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {snap['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+class MetricsServer:
+    """
+    Serves a registry on `http://host:port/metrics` (Prometheus text) and `/snapshot` (JSON)
+    from a daemon thread.
+    """
+
+    def __init__(self, registry: MetricsRegistry = METRICS, host: str = "127.0.0.1", port: int = 9108) -> None:
+        registry_ = registry
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = registry_.render().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/snapshot":
+                    body, content_type = json.dumps(registry_.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                log.debug(format % args)
+
+        self.registry = registry
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread: Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        return str({"address": self.address})
+
+    @property
+    def address(self) -> tuple:
+        return self._server.server_address
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+class SnapshotWriter:
+    """
+    Periodically writes `registry.snapshot()` as JSON to a file, replacing it atomically.
+    """
+
+    def __init__(self, path: str, registry: MetricsRegistry = METRICS, interval: float = 60.) -> None:
+        self.path = path
+        self.registry = registry
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __repr__(self) -> str:
+        return str({"path": self.path, "interval": self.interval})
+
+    def write(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"time": time.time(), "metrics": self.registry.snapshot()}, f)
+        os.replace(tmp, self.path)
+
+    def start(self) -> None:
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(self.interval):
+                try:
+                    self.write()
+                except Exception as e:
+                    log.error(f"failed to write metrics snapshot to {self.path} | {e}")
+
+        self._thread = threading.Thread(target=loop, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
@@ -0,0 +1,122 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Hashable, Iterable
+
+log = logging.getLogger(__name__)
+
+# how often a blocked producer checks for `close`, in seconds
+POLL = 0.1
+
+
+class Prefetcher:
+    """
+    Fetches planned items on a background thread into a bounded queue, ahead of their consumer.
+
+    The plan is an ordered list of `(key, args)`, given up front or extended with `add` as the
+    consumer learns what it will need: the producer calls `fetch(*args)` for each and queues the
+    result, blocking once `depth` results are waiting, so memory stays bounded whatever the plan's
+    length. The consumer `take`s keys in plan order; keys it skips are dropped as it moves past
+    them. Fetch errors are raised by `take`.
+
+    Broker calls are serialized by the broker's own `BrokerUtils.broker_lock`, held around every
+    rates fetch and, for MetaTrader5, every call into the terminal, so the producer and the
+    consumer may both call into the broker.
+
+    Attributes:
+        depth (int): The maximum number of fetched results waiting in the queue.
+        waited (float): The seconds `take` spent waiting for the producer, i.e. the I/O that was not hidden.
+        hits (int): The keys served from the queue.
+        misses (int): The keys not in the remaining plan, fetched directly.
+        planned (int): The keys added to the plan.
+    """
+
+    def __init__(self, fetch: Callable, plan: Iterable[tuple], depth: int = 16) -> None:
+        if depth < 1:
+            raise ValueError(f"depth must be positive, got {depth}")
+        self.depth = depth
+        self.waited = 0.
+        self.hits = 0
+        self.misses = 0
+        self.planned = 0
+        self._fetch = fetch
+        self._plan: queue.Queue = queue.Queue()
+        self._pending = set()
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        for key, args in plan:
+            self.add(key, *args)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name="prefetch", daemon=True)
+        self._thread.start()
+
+    def __repr__(self) -> str:
+        return str({"depth": self.depth, "planned": self.planned, "pending": len(self._pending),
+                    "hits": self.hits, "misses": self.misses, "waited": round(self.waited, 3)})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _produce(self) -> None:
+        while not self._stop.is_set():
+            try:
+                key, args = self._plan.get(timeout=POLL)
+            except queue.Empty:
+                continue
+            try:
+                item = (key, self._fetch(*args), None)
+            except Exception as e:
+                item = (key, None, e)
+            while not self._stop.is_set():
+                try:
+                    self._queue.put(item, timeout=POLL)
+                    break
+                except queue.Full:
+                    continue
+
+    def add(self, key: Hashable, *args) -> None:
+        """Appends `key` to the plan, to be fetched with `fetch(*args)` after the keys already planned."""
+        self.planned += 1
+        self._pending.add(key)
+        self._plan.put((key, args))
+
+    def take(self, key: Hashable, *args):
+        """
+        Returns the fetched result of `key`, waiting for the producer if needed.
+
+        Keys that are not (or no longer) in the plan are fetched directly with `args`.
+
+        Raises:
+            Exception: The error raised when fetching `key`.
+        """
+        if key not in self._pending:
+            self.misses += 1
+            return self._fetch(*args)
+        start = time.perf_counter()
+        while True:
+            k, value, error = self._queue.get()
+            self._pending.discard(k)
+            if k == key:
+                break
+        self.waited += time.perf_counter() - start
+        self.hits += 1
+        if error is not None:
+            raise error
+        return value
+
+    def close(self) -> None:
+        """Stops the producer and drops whatever it fetched that was not taken."""
+        self._stop.set()
+        self._thread.join()
+        self._pending.clear()
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
@@ -0,0 +1,274 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# EVENT KINDS
+PLACED = "placed"
+CANCELLED = "cancelled"
+FILLED = "filled"
+OPENED = "opened"
+MODIFIED = "modified"
+CLOSED = "closed"
+SL_HIT = "sl_hit"
+TP_HIT = "tp_hit"
+
+BOOK_DTYPE = np.dtype([
+    ("ticket", np.int64),
+    ("ref", np.int64),  # position identifier, or the position id of an order
+    ("symbol", np.int32),
+    ("type", np.int32),
+    ("volume", np.float64),
+    ("price_open", np.float64),
+    ("sl", np.float64),
+    ("tp", np.float64),
+    ("price_current", np.float64),
+])
+
+
+class SymbolIndex:
+    """
+    Stable mapping between tickers and the integer codes stored in book tables.
+    """
+
+    def __init__(self) -> None:
+        self._codes: dict[str, int] = {}
+        self.tickers: list[str] = []
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def code(self, ticker: str) -> int:
+        """Returns the code of a ticker, registering it if it is new."""
+        out = self._codes.get(ticker)
+        if out is None:
+            out = self._codes[ticker] = len(self.tickers)
+            self.tickers.append(ticker)
+        return out
+
+    def get(self, ticker: str) -> Optional[int]:
+        """Returns the code of a ticker, or None if it was never seen."""
+        return self._codes.get(ticker)
+
+
+class BookTable:
+    """
+    A numpy-backed table of positions or orders indexed by ticket and by symbol.
+
+    Rows are kept sorted by ticket so ticket lookups and diffs are binary searches. A second
+    permutation sorted by symbol gives every symbol's rows as one contiguous slice.
+
+    Attributes:
+        rows (np.ndarray): Structured array with dtype `BOOK_DTYPE`, sorted by ticket.
+    """
+
+    def __init__(self, rows: np.ndarray) -> None:
+        self.rows = rows[np.argsort(rows["ticket"], kind="stable")]
+        self._by_symbol = np.argsort(self.rows["symbol"], kind="stable")
+        self._symbol_codes = self.rows["symbol"][self._by_symbol]
+
+    def __repr__(self) -> str:
+        return str(self.rows)
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def tickets(self) -> np.ndarray:
+        return self.rows["ticket"]
+
+    def find(self, ticket: int) -> Optional[np.void]:
+        """Returns the row with the given ticket, or None."""
+        i = np.searchsorted(self.rows["ticket"], ticket)
+        if i < len(self.rows) and self.rows["ticket"][i] == ticket:
+            return self.rows[i]
+        return None
+
+    def for_symbol(self, code: Optional[int]) -> np.ndarray:
+        """Returns the rows of one symbol code."""
+        if code is None:
+            return self.rows[:0]
+        lo = np.searchsorted(self._symbol_codes, code, side="left")
+        hi = np.searchsorted(self._symbol_codes, code, side="right")
+        return self.rows[self._by_symbol[lo:hi]]
+
+
+class BookSnapshot:
+    """
+    All open positions and pending orders of an account at one point in time.
+
+    Attributes:
+        positions (BookTable): Open positions.
+        orders (BookTable): Pending orders.
+        symbols (SymbolIndex): The ticker codes used by both tables.
+    """
+
+    def __init__(self, positions: BookTable, orders: BookTable, symbols: SymbolIndex) -> None:
+        self.positions = positions
+        self.orders = orders
+        self.symbols = symbols
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    def get_positions(self, ticker: str) -> np.ndarray:
+        return self.positions.for_symbol(self.symbols.get(ticker))
+
+    def get_orders(self, ticker: str) -> np.ndarray:
+        return self.orders.for_symbol(self.symbols.get(ticker))
+
+
+class BookEvent:
+    """
+    A change between two snapshots.
+
+    Attributes:
+        kind (str): One of `PLACED`, `CANCELLED`, `FILLED`, `OPENED`, `MODIFIED`, `CLOSED`, `SL_HIT`, `TP_HIT`.
+        ticket (int): The ticket of the position or order that changed.
+        ticker (str): The ticker of the position or order.
+        before (np.void): The row in the previous snapshot, None if new.
+        after (np.void): The row in the current snapshot, None if gone.
+    """
+
+    def __init__(self, kind: str, ticket: int, ticker: str, before: np.void = None, after: np.void = None) -> None:
+        self.kind = kind
+        self.ticket = ticket
+        self.ticker = ticker
+        self.before = before
+        self.after = after
+
+    def __repr__(self) -> str:
+        return str({"kind": self.kind, "ticket": self.ticket, "ticker": self.ticker})
+
+
+def _diff(before: BookTable, after: BookTable) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Returns the new rows, the gone rows, and the matching before/after rows that changed.
+    """
+    new = after.rows[~np.isin(after.tickets, before.tickets, assume_unique=True)]
+    gone = before.rows[~np.isin(before.tickets, after.tickets, assume_unique=True)]
+
+    common, i_before, i_after = np.intersect1d(before.tickets, after.tickets, assume_unique=True, return_indices=True)
+    b, a = before.rows[i_before], after.rows[i_after]
+    changed = (b["sl"] != a["sl"]) | (b["tp"] != a["tp"]) | (b["volume"] != a["volume"]) | \
+        (b["price_open"] != a["price_open"])
+    return new, gone, b[changed], a[changed]
+
+
+class Reconciler(ABC):
+    """
+    Keeps a bulk snapshot of an account's book and reports only what changed.
+
+    Each `reconcile` call fetches all positions and all pending orders with one broker call each,
+    loads them into `BookTable`s and diffs them against the previous snapshot. Only the changed rows
+    are turned into `BookEvent`s, so a monitoring pass costs two broker calls plus work proportional
+    to the number of changes, whatever the size of the universe.
+
+    Attributes:
+        symbols (SymbolIndex): The ticker codes shared by all snapshots.
+        snapshot (BookSnapshot): The latest snapshot, None before the first call.
+    """
+
+    def __init__(self) -> None:
+        self.symbols = SymbolIndex()
+        self.snapshot: Optional[BookSnapshot] = None
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    @abstractmethod
+    def _fetch_positions(self) -> Iterable:
+        """
+        Returns every open position of the account as objects with `ticket`, `identifier`, `symbol`,
+        `type`, `volume`, `price_open`, `sl`, `tp` and `price_current` attributes.
+        """
+        pass
+
+    @abstractmethod
+    def _fetch_orders(self) -> Iterable:
+        """
+        Returns every pending order of the account as objects with `ticket`, `position_id`, `symbol`,
+        `type`, `volume_current`, `price_open`, `sl`, `tp` and `price_current` attributes.
+        """
+        pass
+
+    def _fetch_exit_kinds(self, refs: np.ndarray) -> dict[int, str]:
+        """
+        Returns why closed positions were closed, from the broker's deal history.
+
+        Args:
+            refs (np.ndarray): The position identifiers of the positions gone since the last snapshot.
+
+        Returns:
+            dict[int, str]: `SL_HIT`, `TP_HIT` or `CLOSED` per position identifier. Positions left out
+            are reported as `CLOSED`. By default none are looked up.
+        """
+        return {}
+
+    def _table(self, items: Iterable, ref: str, volume: str) -> BookTable:
+        code = self.symbols.code
+        rows = [(x.ticket, getattr(x, ref), code(x.symbol), x.type, getattr(x, volume),
+                 x.price_open, x.sl, x.tp, x.price_current) for x in items]
+        return BookTable(np.array(rows, dtype=BOOK_DTYPE))
+
+    def take_snapshot(self) -> BookSnapshot:
+        """
+        Fetches the whole book without touching the stored snapshot.
+        """
+        positions = self._table(self._fetch_positions(), "identifier", "volume")
+        orders = self._table(self._fetch_orders(), "position_id", "volume_current")
+        return BookSnapshot(positions, orders, self.symbols)
+
+    def reconcile(self) -> list[BookEvent]:
+        """
+        Takes a new snapshot and returns the events since the previous one.
+
+        The first call only records the book and returns no events.
+        """
+        current = self.take_snapshot()
+        previous, self.snapshot = self.snapshot, current
+        if previous is None:
+            return []
+        return self.diff(previous, current)
+
+    def diff(self, previous: BookSnapshot, current: BookSnapshot) -> list[BookEvent]:
+        """
+        Returns the events that turn `previous` into `current`.
+        """
+        tickers = self.symbols.tickers
+        events = []
+
+        new_orders, gone_orders, orders_before, orders_after = _diff(previous.orders, current.orders)
+        new_positions, gone_positions, positions_before, positions_after = _diff(previous.positions, current.positions)
+
+        filled = np.isin(gone_orders["ticket"], current.positions.rows["ref"])
+
+        for row in new_orders:
+            events.append(BookEvent(PLACED, int(row["ticket"]), tickers[row["symbol"]], after=row))
+        for row in gone_orders[~filled]:
+            events.append(BookEvent(CANCELLED, int(row["ticket"]), tickers[row["symbol"]], before=row))
+        for b, a in zip(orders_before, orders_after):
+            events.append(BookEvent(MODIFIED, int(a["ticket"]), tickers[a["symbol"]], before=b, after=a))
+
+        from_orders = np.isin(new_positions["ref"], gone_orders["ticket"][filled])
+        for row, is_fill in zip(new_positions, from_orders):
+            before = previous.orders.find(row["ref"]) if is_fill else None
+            events.append(BookEvent(FILLED if is_fill else OPENED, int(row["ticket"]), tickers[row["symbol"]],
+                                    before=before, after=row))
+        exits = self._fetch_exit_kinds(gone_positions["ref"]) if len(gone_positions) else {}
+        for row in gone_positions:
+            kind = exits.get(int(row["ref"]), CLOSED)
+            events.append(BookEvent(kind, int(row["ticket"]), tickers[row["symbol"]], before=row))
+        for b, a in zip(positions_before, positions_after):
+            events.append(BookEvent(MODIFIED, int(a["ticket"]), tickers[a["symbol"]], before=b, after=a))
+
+        return events
@@ -0,0 +1,126 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from art_trader.abstract.utils import CLOSE, HIGH, LOW, OPEN, SPREAD, TIME
+
+log = logging.getLogger(__name__)
+
+# RESAMPLING RULES
+H1 = "H1"
+D1 = "D1"
+W1 = "W1"
+MN1 = "MN1"
+
+# an upper bound on the length of one period, used to size fetches of the base timeframe
+PERIOD_SPAN = {
+    H1: timedelta(hours=1),
+    D1: timedelta(days=1),
+    W1: timedelta(days=7),
+    MN1: timedelta(days=31),
+}
+
+SUNDAY = 6
+MONDAY = 0
+
+# 1970-01-01 was a Thursday
+_EPOCH_WEEKDAY = 3
+
+
+def utcOffsets(times: np.ndarray, tz: Optional[ZoneInfo]) -> np.ndarray:
+    """
+    Returns the UTC offset in seconds of `tz` at each epoch time.
+
+    Offsets are looked up once per distinct hour, not once per bar.
+    """
+    if tz is None:
+        return np.zeros(len(times), dtype=np.int64)
+    hours, inverse = np.unique(np.asarray(times, dtype=np.int64) // 3600, return_inverse=True)
+    offsets = np.array([datetime.fromtimestamp(int(h) * 3600, tz).utcoffset().total_seconds() for h in hours],
+                       dtype=np.int64)
+    return offsets[inverse]
+
+
+def periodStarts(times: np.ndarray, rule: str, tz: Optional[ZoneInfo] = None, week_start: int = SUNDAY) -> np.ndarray:
+    """
+    Returns the start of the period containing each time, in the same epoch basis as `times`.
+
+    Args:
+        times (np.ndarray): Bar open times in epoch seconds.
+        rule (str): `H1`, `D1`, `W1` or `MN1`.
+        tz (ZoneInfo, optional): The session timezone. None if the times are already session-local,
+                                 which is the case for MT5 bars (they are stamped in server time).
+        week_start (int): The weekday weeks start on (`SUNDAY` as in MT5 W1 bars, or `MONDAY`).
+
+    Returns:
+        np.ndarray: The period start of each time.
+    """
+    times = np.asarray(times, dtype=np.int64)
+    offsets = utcOffsets(times, tz)
+    local = times + offsets
+
+    if rule == H1:
+        start = local - local % 3600
+    elif rule == D1:
+        start = local - local % 86400
+    elif rule == W1:
+        days = local // 86400
+        shift = (_EPOCH_WEEKDAY - week_start) % 7
+        start = ((days + shift) // 7 * 7 - shift) * 86400
+    elif rule == MN1:
+        start = local.astype("datetime64[s]").astype("datetime64[M]").astype("datetime64[s]").astype(np.int64)
+    else:
+        raise ValueError(f"Unsupported resampling rule {rule}")
+    if tz is None:
+        return start
+    # the offset can change within the period (DST), what counts is the offset at its start
+    return start - utcOffsets(start - offsets, tz)
+
+
+def periodEnds(starts: np.ndarray, rule: str, tz: Optional[ZoneInfo] = None, week_start: int = SUNDAY) -> np.ndarray:
+    """
+    Returns the end of each period (the start of the next one), given period starts as returned by `periodStarts`.
+    """
+    # one and a half periods ahead lands inside the next period whatever DST does to this one
+    ahead = np.asarray(starts, dtype=np.int64) + int(PERIOD_SPAN[rule].total_seconds() * 1.5)
+    return periodStarts(ahead, rule, tz, week_start)
+
+
+def resample(rates: np.ndarray, rule: str, tz: Optional[ZoneInfo] = None, week_start: int = SUNDAY) -> np.ndarray:
+    """
+    Aggregates formatted rate data into a higher timeframe.
+
+    Bars are grouped by the period containing their open time, and each group is reduced
+    with `reduceat`: first open, highest high, lowest low, last close and lowest spread.
+    The last period is returned even if it is still forming.
+
+    Args:
+        rates (np.ndarray): Formatted rates (TIME, OPEN, HIGH, LOW, CLOSE, SPREAD) sorted by time.
+        rule (str): `H1`, `D1`, `W1` or `MN1`.
+        tz (ZoneInfo, optional): The session timezone, see `periodStarts`.
+        week_start (int): The weekday weeks start on.
+
+    Returns:
+        np.ndarray: Formatted rates of the higher timeframe, stamped with each period's start.
+    """
+    if len(rates) == 0:
+        return rates
+    starts = periodStarts(rates[:, TIME], rule, tz, week_start)
+    first = np.flatnonzero(np.diff(starts, prepend=starts[0] - 1))
+    last = np.append(first[1:], len(rates)) - 1
+
+    out = np.empty((len(first), rates.shape[1]), dtype=rates.dtype)
+    out[:, TIME] = starts[first]
+    out[:, OPEN] = rates[first, OPEN]
+    out[:, HIGH] = np.maximum.reduceat(rates[:, HIGH], first)
+    out[:, LOW] = np.minimum.reduceat(rates[:, LOW], first)
+    out[:, CLOSE] = rates[last, CLOSE]
+    if rates.shape[1] > SPREAD:
+        out[:, SPREAD] = np.minimum.reduceat(rates[:, SPREAD], first)
+    return out
@@ -0,0 +1,271 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import itertools
+import logging
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from art_trader.abstract.ticks import CLOSE_EXIT, NOT_FILLED, SL_EXIT, TP_EXIT
+from art_trader.abstract.utils import CLOSE, HIGH, LOW, OPEN, SPREAD, TIME
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+    from art_trader.abstract.testing import Backtester
+
+log = logging.getLogger(__name__)
+
+# SCENARIO PARAMETERS
+SPREAD_MULT = "spread_mult"
+SHOCK = "shock"
+FX_SHIFT = "fx_shift"
+SLIPPAGE = "slippage"
+FEE_MULT = "fee_mult"
+
+# the values reproducing the backtest
+BASELINE = {SPREAD_MULT: 0., SHOCK: 0., FX_SHIFT: 0., SLIPPAGE: 0., FEE_MULT: 1.}
+
+# elements of one (scenarios, trades, bars) block evaluated at once
+BLOCK_SIZE = 1 << 22
+
+# the cell fields a trade needs to be replayed
+FIELDS = ("ticker", "day", "is_long", "entry_price", "TP", "SL", "volume", "exit_kind", "entry_time",
+          "exit_time", "exit_price")
+
+
+class ScenarioMatrix:
+    """
+    Scenarios to replay recorded trades under, one row per scenario.
+
+    Parameters not given take their `BASELINE` value:
+        spread_mult: The cost of crossing the spread, as a multiple of the spread of the entry bar.
+                     0 like the backtest, which fills at the bar prices.
+        shock: A relative price gap right after the entry bar, e.g. -0.02 moves every later bar 2% down.
+               A gap over the SL or TP exits at the gapped open.
+        fx_shift: A relative shift of the conversion rate of trades not in the account currency.
+        slippage: An adverse relative slippage on both the entry and the exit price.
+        fee_mult: A multiple of `Backtester.calc_tx_fee`.
+
+    Attributes:
+        params (dict[str, np.ndarray]): The value of each parameter in each scenario.
+    """
+
+    def __init__(self, **params) -> None:
+        unknown = set(params) - set(BASELINE)
+        if unknown:
+            raise ValueError(f"Unknown scenario parameters {sorted(unknown)}, expected some of {list(BASELINE)}")
+        n = max([np.size(x) for x in params.values()] or [1])
+        self.params = {k: np.broadcast_to(np.asarray(params.get(k, v), dtype=np.float64), (n,)).copy()
+                       for k, v in BASELINE.items()}
+
+    def __repr__(self) -> str:
+        return str({"scenarios": len(self)})
+
+    def __len__(self) -> int:
+        return len(self.params[SPREAD_MULT])
+
+    def __getitem__(self, param: str) -> np.ndarray:
+        return self.params[param]
+
+    @classmethod
+    def grid(cls, **axes) -> "ScenarioMatrix":
+        """Returns every combination of the given parameter values, e.g. `grid(spread_mult=[1, 2], shock=[0, -.05])`."""
+        keys = list(axes)
+        rows = list(itertools.product(*(np.atleast_1d(axes[k]) for k in keys)))
+        return cls(**{k: [row[i] for row in rows] for i, k in enumerate(keys)})
+
+    def frame(self) -> "DataFrame":
+        from pandas import DataFrame
+
+        return DataFrame(self.params)
+
+
+class TradeSet:
+    """
+    Filled trades with the price window each was simulated on, as padded arrays.
+
+    Attributes:
+        tickers (np.ndarray): The ticker of each trade.
+        days (np.ndarray): The day of each trade.
+        is_long, entry_price, tp, sl, volume (np.ndarray): The trade parameters.
+        notional (np.ndarray): The account currency value of one unit of price, `volume * contract size * xr`.
+        foreign (np.ndarray): Whether the trade's profit currency differs from the account currency.
+        fee (np.ndarray): The baseline transaction fee.
+        point (np.ndarray): The price of one spread point.
+        entry_idx, exit_idx, kind, exit_price (np.ndarray): The recorded fill, exit bars relative to the window.
+        fixed (np.ndarray): Trades whose exit is kept as recorded (trailing stops are path dependent).
+        bars (np.ndarray): The price windows, `(trades, bars, 6)` padded with NaN.
+        lengths (np.ndarray): The number of bars of each window.
+    """
+
+    def __init__(self, cells: list[dict], windows: list[np.ndarray], xr: np.ndarray, contract_size: np.ndarray,
+                 foreign: np.ndarray, fee: np.ndarray, point: np.ndarray) -> None:
+        n = len(cells)
+        self.tickers = np.array([x["ticker"] for x in cells], dtype=object)
+        self.days = np.array([x["day"] for x in cells], dtype=object)
+        self.is_long = np.array([bool(x["is_long"]) for x in cells])
+        self.entry_price = np.array([x["entry_price"] for x in cells], dtype=np.float64)
+        self.tp = np.array([x["TP"] for x in cells], dtype=np.float64)
+        self.sl = np.array([x["SL"] for x in cells], dtype=np.float64)
+        self.volume = np.array([x["volume"] for x in cells], dtype=np.float64)
+        self.notional = self.volume * np.asarray(contract_size, dtype=np.float64) * np.asarray(xr, dtype=np.float64)
+        self.foreign = np.asarray(foreign, dtype=bool)
+        self.fee = np.asarray(fee, dtype=np.float64)
+        self.point = np.asarray(point, dtype=np.float64)
+        self.kind = np.array([x["exit_kind"] for x in cells], dtype=np.int64)
+        self.exit_price = np.array([x["exit_price"] for x in cells], dtype=np.float64)
+        self.fixed = np.array([bool(x.get("trail")) for x in cells])
+
+        self.lengths = np.array([len(x) for x in windows], dtype=np.int64)
+        self.bars = np.full((n, max(self.lengths, default=0), 6), np.nan)
+        self.entry_idx = np.zeros(n, dtype=np.int64)
+        self.exit_idx = np.zeros(n, dtype=np.int64)
+        for i, (cell, window) in enumerate(zip(cells, windows)):
+            self.bars[i, :len(window)] = window[:, :6]
+            self.entry_idx[i] = np.searchsorted(window[:, TIME], cell["entry_time"])
+            self.exit_idx[i] = np.searchsorted(window[:, TIME], cell["exit_time"])
+
+    def __repr__(self) -> str:
+        return str({"trades": len(self), "bars": self.bars.shape[1]})
+
+    def __len__(self) -> int:
+        return len(self.is_long)
+
+    @classmethod
+    def fromBacktester(cls, backtester: "Backtester", point: float = None) -> "TradeSet":
+        """
+        Collects the filled trades of a backtest's `ledger` and refetches their price windows.
+
+        Cells without the trade and fill details, e.g. from a backtester overriding `simulate` or
+        `calcProfit`, cannot be replayed and are left out with a warning.
+
+        Args:
+            backtester (Backtester): A backtester that has run.
+            point (float, optional): The price of one spread point, defaults to each symbol's `info.point` (0 if
+                                     the symbol has none, which disables spread costs).
+        """
+        symbols = {x.info.ticker: x for x in backtester.symbols}
+        currency = backtester.account.currency
+        cells, missing = [], 0
+        for cell in backtester.ledger:
+            if not all(k in cell for k in FIELDS):
+                missing += "error" not in cell and "skipped" not in cell
+            elif cell["exit_kind"] != NOT_FILLED:
+                cells.append(cell)
+        if missing:
+            log.warning(f"{missing} cells without fill details left out of the trade set")
+
+        windows, xr, contract, foreign, fee, points = [], [], [], [], [], []
+        for cell in cells:
+            symbol = symbols[cell["ticker"]]
+            windows.append(np.asarray(backtester.getPriceAction(symbol, cell["day"]), dtype=np.float64))
+            profit_currency = symbol.info.currency_profit
+            xr.append((backtester.brokerUtil.xr(profit_currency, currency, cell["entry_time"]) +
+                       backtester.brokerUtil.xr(profit_currency, currency, cell["exit_time"])) / 2)
+            contract.append(symbol.info.trade_contract_size)
+            foreign.append(profit_currency != currency)
+            fee.append(backtester.calc_tx_fee(cell["volume"]))
+            points.append(point if point is not None else getattr(symbol.info, "point", 0.))
+        return cls(cells, windows, xr, contract, foreign, fee, points)
+
+
+def _evaluate(trades: TradeSet, shock: np.ndarray) -> tuple:
+    """Finds the exit bar, kind and price of every trade in every scenario of a block, shape `(scenarios, trades)`."""
+    n, length = trades.bars.shape[:2]
+    bars = np.arange(length)
+    e = trades.entry_idx[:, None]
+    # (scenarios, trades, bars): bars after the entry bar are moved by the shock
+    factor = 1 + shock[:, None, None] * (bars > e)[None]
+    low, high = trades.bars[None, :, :, LOW] * factor, trades.bars[None, :, :, HIGH] * factor
+    live = ((bars >= e) & (bars < trades.lengths[:, None]))[None]
+    tp, sl = trades.tp[None, :, None], trades.sl[None, :, None]
+    with np.errstate(invalid="ignore"):
+        tp_hit = (low < tp) & (tp < high) & live
+        sl_hit = (low < sl) & (sl < high) & live
+    hit = tp_hit | sl_hit
+    any_hit = hit.any(axis=2)
+    first = hit.argmax(axis=2)
+    take = np.take_along_axis(tp_hit, first[..., None], axis=2)[..., 0]
+
+    last = trades.lengths - 1
+    close = trades.bars[np.arange(n), last, CLOSE]
+    exit_idx = np.where(any_hit, first, last[None])
+    kind = np.where(any_hit, np.where(take, TP_EXIT, SL_EXIT), CLOSE_EXIT)
+    exit_price = np.where(any_hit, np.where(take, trades.tp[None], trades.sl[None]),
+                          close[None] * (1 + shock[:, None] * (last > trades.entry_idx)[None]))
+
+    # a shock moving the open of the first bar after the entry bar over the SL or TP exits at that open,
+    # an open that was already past the level is scanned like the backtest did
+    nxt = np.minimum(trades.entry_idx + 1, last)
+    open_ = trades.bars[np.arange(n), nxt, OPEN]
+    gap_open = open_[None] * (1 + shock[:, None])
+    direction = np.where(trades.is_long, 1., -1.)
+    gap_sl = ((gap_open - trades.sl[None]) * direction[None] <= 0) & ~((open_ - trades.sl) * direction <= 0)[None]
+    gap_tp = ((gap_open - trades.tp[None]) * direction[None] >= 0) & ~((open_ - trades.tp) * direction >= 0)[None]
+    gap = (nxt > trades.entry_idx)[None] & (gap_sl | gap_tp) & ~(any_hit & (first == trades.entry_idx[None]))
+    exit_idx = np.where(gap, nxt[None], exit_idx)
+    kind = np.where(gap, np.where(gap_sl, SL_EXIT, TP_EXIT), kind)
+    exit_price = np.where(gap, gap_open, exit_price)
+
+    # trailing stops keep their recorded exit
+    exit_idx = np.where(trades.fixed[None], trades.exit_idx[None], exit_idx)
+    kind = np.where(trades.fixed[None], trades.kind[None], kind)
+    exit_price = np.where(trades.fixed[None], trades.exit_price[None], exit_price)
+    return exit_idx, kind, exit_price
+
+
+def replay(trades: TradeSet, scenarios: ScenarioMatrix) -> tuple:
+    """
+    Recomputes the profit of every trade under every scenario, in blocks of scenarios broadcast
+    against all trades and bars at once.
+
+    Exits are found as in `Backtester.fillMany` on the shocked prices; the entry bar and price are kept
+    since the shock happens after it. The baseline scenario reproduces the backtest's profits.
+
+    Returns:
+        tuple: The profits and exit kinds, both of shape `(scenarios, trades)`.
+    """
+    s, n = len(scenarios), len(trades)
+    profits = np.zeros((s, n))
+    kinds = np.zeros((s, n), dtype=np.int64)
+    if n == 0:
+        return profits, kinds
+
+    direction = np.where(trades.is_long, 1., -1.)
+    entry_idx = trades.entry_idx
+    spread = trades.bars[np.arange(n), entry_idx, SPREAD] * trades.point
+    step = max(1, BLOCK_SIZE // (n * trades.bars.shape[1]))
+    for lo in range(0, s, step):
+        block = slice(lo, lo + step)
+        _, kind, exit_price = _evaluate(trades, scenarios[SHOCK][block])
+
+        slippage = scenarios[SLIPPAGE][block][:, None]
+        entry = trades.entry_price[None] * (1 + slippage * direction[None])
+        exit_ = exit_price * (1 - slippage * direction[None])
+        gross = (exit_ - entry) * direction[None] - scenarios[SPREAD_MULT][block][:, None] * spread[None]
+        xr = 1 + scenarios[FX_SHIFT][block][:, None] * trades.foreign[None]
+        profits[block] = gross * trades.notional[None] * xr - scenarios[FEE_MULT][block][:, None] * trades.fee[None]
+        kinds[block] = kind
+    return profits, kinds
+
+
+def summarize(trades: TradeSet, scenarios: ScenarioMatrix, profits: np.ndarray, kinds: np.ndarray) -> "DataFrame":
+    """
+    Returns one row per scenario: its parameters, the total profit, the worst daily profit, the
+    maximum drawdown of the cumulative daily profit and the number of SL exits.
+    """
+    days, inverse = np.unique(trades.days.astype(str), return_inverse=True) if len(trades) else ([], [])
+    daily = np.zeros((len(scenarios), len(days)))
+    if len(trades):
+        np.add.at(daily.T, inverse, profits.T)
+    equity = np.cumsum(daily, axis=1)
+    peak = np.maximum.accumulate(np.concatenate([np.zeros((len(scenarios), 1)), equity], axis=1), axis=1)[:, 1:]
+
+    df = scenarios.frame()
+    df["profit"] = profits.sum(axis=1)
+    df["worst_day"] = daily.min(axis=1) if len(days) else 0.
+    df["max_drawdown"] = (peak - equity).max(axis=1) if len(days) else 0.
+    df["sl_exits"] = (kinds == SL_EXIT).sum(axis=1)
+    return df
@@ -0,0 +1,387 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import asyncio
+import logging
+import threading
+import time as clock
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from functools import partial
+from typing import Callable, Optional
+from zoneinfo import ZoneInfo
+
+from art_trader.abstract.common import Symbol
+from art_trader.abstract.feed import BarFeed
+from art_trader.abstract.metrics import METRICS
+from art_trader.abstract.trading import Trader
+from art_trader.abstract.utils import isMarketDay
+
+log = logging.getLogger(__name__)
+
+# CYCLE OUTCOMES
+SENT = "sent"
+REJECTED = "rejected"
+NO_TRADE = "no_trade"
+LATE = "late"
+ERROR = "error"
+
+
+class BrokerExecutor:
+    """
+    Bounded executor for blocking broker calls.
+
+    Broker APIs such as MetaTrader5 keep a single process-global connection that is not
+    thread-safe, so by default every call is funnelled through one worker thread. The
+    asyncio side can still fan out over many symbols; only the broker calls are serialized.
+
+    Attributes:
+        max_workers (int): The number of threads allowed to call into the broker at once.
+    """
+
+    def __init__(self, max_workers: int = 1) -> None:
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="broker")
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    async def run(self, fn: Callable, *args, **kwargs):
+        """
+        Runs a blocking callable on the executor and awaits its result.
+
+        Cancelling the awaiting task also cancels the call if it has not started yet,
+        which is how late work is dropped at the end of a cycle.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+class ScheduledJob:
+    """
+    A trader and the universe it trades at a fixed time of day.
+
+    Attributes:
+        trader (Trader): The live trader whose strategy generates the orders.
+        symbols (list[Symbol]): The symbols to run the strategy for.
+        at (time): The time of day at which the cycle starts.
+        deadline (timedelta): How long after `at` the cycle may run before late work is cancelled.
+        name (str): A label used in logs.
+        warmup (timedelta, optional): How long before `at` to run `trader.warmup`.
+        currency (str, optional): The account currency, passed to `trader.warmup`.
+    """
+
+    def __init__(self, trader: Trader, symbols: list[Symbol], at: time, deadline: timedelta, name: str = None,
+                 warmup: timedelta = None, currency: str = None) -> None:
+        self.trader = trader
+        self.symbols = symbols
+        self.at = at
+        self.deadline = deadline
+        self.name = name or type(trader.strategy).__name__
+        self.warmup = warmup
+        self.currency = currency
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    def next_run(self, now: datetime) -> datetime:
+        """
+        Returns the next market-day datetime at or after `now` at which this job is due.
+        """
+        run = datetime.combine(now.date(), self.at, tzinfo=now.tzinfo)
+        if run < now:
+            run += timedelta(days=1)
+        while not isMarketDay(run.date()):
+            run += timedelta(days=1)
+        return run
+
+
+class BarJob:
+    """
+    A trader run for its symbols whenever a `BarFeed` closes a new bar of a timeframe.
+
+    Attributes:
+        trader (Trader): The live trader whose strategy generates the orders.
+        symbols (list[Symbol]): The symbols to run the strategy for.
+        feed (BarFeed): The feed reporting new bars.
+        timeframe (int): The timeframe whose new bars trigger a cycle.
+        deadline (timedelta): How long after the bar was seen the cycle may run.
+        name (str): A label used in logs.
+    """
+
+    def __init__(self, trader: Trader, symbols: list[Symbol], feed: BarFeed, timeframe: int, deadline: timedelta,
+                 name: str = None) -> None:
+        self.trader = trader
+        self.symbols = symbols
+        self.feed = feed
+        self.timeframe = timeframe
+        self.deadline = deadline
+        self.name = name or type(trader.strategy).__name__
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+
+class _Send:
+    # an order queued on the broker executor, which the cycle deadline may drop only until it starts
+
+    def __init__(self, send: Callable, order: dict) -> None:
+        self._send = send
+        self._order = order
+        self._guard = threading.Lock()
+        self.started = False
+        self.dropped = False
+
+    def __call__(self) -> Optional[bool]:
+        with self._guard:
+            if self.dropped:
+                return None
+            self.started = True
+        return self._send(self._order)
+
+    def drop(self) -> bool:
+        # returns whether the order was dropped, i.e. never reached the broker
+        with self._guard:
+            if not self.started:
+                self.dropped = True
+            return self.dropped
+
+
+class LiveScheduler:
+    """
+    Runs `Strategy.strat` for many symbols concurrently at configured times of day, or on new bars.
+
+    Each cycle creates one task per symbol that builds the order with `trader.trade` on a
+    strategy thread pool and submits it with `trader.send` on the `BrokerExecutor`, so the
+    strategies' CPU work is not serialized behind the broker. The broker calls `trader.trade`
+    makes itself (ticks, rates) are serialized by the broker's lock, see `BrokerUtils.broker_lock`.
+
+    Any task still running when the cycle deadline passes is cancelled and reported as `LATE`,
+    unless its order already started being sent: the send is then awaited and reported as usual,
+    since the broker may have accepted it.
+
+    Attributes:
+        executor (BrokerExecutor): The executor used for every blocking broker call.
+        strategy_workers (int): The number of threads running `trader.trade`, None for the `ThreadPoolExecutor` default.
+        tz (ZoneInfo): The timezone the job times are expressed in.
+        jobs (list[ScheduledJob]): The registered jobs.
+        feeds (dict[BarFeed, timedelta]): The registered feeds and their poll interval.
+        bar_jobs (list[BarJob]): The registered jobs run on new bars.
+    """
+
+    def __init__(self, executor: BrokerExecutor = None, tz: ZoneInfo = ZoneInfo("UTC"),
+                 strategy_workers: int = None) -> None:
+        self.executor = executor or BrokerExecutor()
+        self.strategy_workers = strategy_workers
+        self._strategies = ThreadPoolExecutor(max_workers=strategy_workers, thread_name_prefix="strategy")
+        self.tz = tz
+        self.jobs: list[ScheduledJob] = []
+        self.feeds: dict[BarFeed, timedelta] = {}
+        self.bar_jobs: list[BarJob] = []
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    def add_job(self, trader: Trader, symbols: list[Symbol], at: time, deadline: timedelta = timedelta(seconds=30),
+                name: str = None, warmup: timedelta = None, currency: str = None) -> ScheduledJob:
+        """
+        Registers a trader to run over `symbols` every market day at `at`, warming it up `warmup` before.
+
+        Returns:
+            ScheduledJob: The registered job.
+        """
+        job = ScheduledJob(trader, symbols, at, deadline, name, warmup, currency)
+        self.jobs.append(job)
+        return job
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shuts down the strategy pool and the executor."""
+        self._strategies.shutdown(wait=wait, cancel_futures=True)
+        self.executor.shutdown(wait=wait)
+
+    async def _run_symbol(self, trader: Trader, symbol: Symbol, sends: dict) -> str:
+        start = clock.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            # a live cycle trades at the broker's current time
+            order = await loop.run_in_executor(self._strategies, trader.trade, symbol, None)
+            METRICS.histogram("signal_seconds", help="trader.trade duration").record(clock.perf_counter() - start)
+            if order is None:
+                return NO_TRADE
+            send = _Send(trader.send, order)
+            task = asyncio.ensure_future(self.executor.run(send))
+            sends[symbol.info.ticker] = (send, task)
+            # shielded: a send that started must be awaited even when the cycle is cancelled
+            sent = await asyncio.shield(task)
+            METRICS.histogram("signal_to_ack_seconds", help="trader.trade start to trader.send result").record(
+                clock.perf_counter() - start)
+            return SENT if sent else REJECTED
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            log.error(f"live cycle failed for {symbol.info.ticker} | {e}")
+            return ERROR
+
+    def add_feed(self, feed: BarFeed, every: timedelta = timedelta(seconds=1)) -> BarFeed:
+        """
+        Registers a bar feed to be polled on the executor every `every`, firing its callbacks and bar jobs.
+        """
+        self.feeds[feed] = every
+        return feed
+
+    def add_bar_job(self, trader: Trader, symbols: list[Symbol], feed: BarFeed, timeframe: int,
+                    deadline: timedelta = timedelta(seconds=30), name: str = None) -> BarJob:
+        """
+        Registers a trader to run for each of `symbols` that closes a new `timeframe` bar in `feed`.
+        The feed is registered with the default interval if it is not already.
+
+        A strategy declaring a `lookback` reads its bars from the feed, which becomes the trader's
+        `context`, so they are not fetched a second time.
+
+        Returns:
+            BarJob: The registered job.
+
+        Raises:
+            ValueError: If the feed keeps fewer bars than the strategy's lookback.
+        """
+        lookback = trader.strategy.lookback
+        if lookback:
+            short = {tf: n for tf, n in lookback.items() if feed.lookback.get(tf, 0) < n}
+            if short:
+                raise ValueError(f"Feed {feed} keeps fewer bars than the lookback {short}")
+            feed.track(symbols)
+            trader.context = feed
+        job = BarJob(trader, symbols, feed, timeframe, deadline, name)
+        self.bar_jobs.append(job)
+        self.feeds.setdefault(feed, timedelta(seconds=1))
+        return job
+
+    async def poll_feed(self, feed: BarFeed) -> dict:
+        """
+        Polls a feed once and runs the bar jobs of the symbols that closed a bar.
+
+        Returns:
+            dict: The cycle results per job name.
+        """
+        new = await self.executor.run(feed.poll)
+        results = {}
+        for job in self.bar_jobs:
+            if job.feed is not feed:
+                continue
+            symbols = [x for x in job.symbols if (x.info.ticker, job.timeframe) in new]
+            if symbols:
+                results[job.name] = await self.run_cycle(job, symbols=symbols)
+                log.info(f"{job.name}: bar cycle finished with {results[job.name]}")
+        return results
+
+    async def _run_feed(self, feed: BarFeed, every: timedelta, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                await self.poll_feed(feed)
+            except Exception as e:
+                log.error(f"bar feed poll failed | {e}")
+            if not await self._sleep_until(datetime.now(self.tz) + every, stop):
+                return
+
+    async def run_cycle(self, job: ScheduledJob, deadline: Optional[datetime] = None,
+                        symbols: list[Symbol] = None) -> dict:
+        """
+        Runs one cycle of a job over all its symbols.
+
+        Args:
+            job (ScheduledJob or BarJob): The job to run.
+            deadline (datetime, optional): The wall-clock deadline, defaults to now + job.deadline.
+            symbols (list[Symbol], optional): Run only these symbols, defaults to the job's.
+
+        Returns:
+            dict: The outcome (`SENT`, `REJECTED`, `NO_TRADE`, `LATE` or `ERROR`) per ticker.
+        """
+        if deadline is None:
+            deadline = datetime.now(self.tz) + job.deadline
+        timeout = max((deadline - datetime.now(self.tz)).total_seconds(), 0)
+
+        symbols = job.symbols if symbols is None else symbols
+        sends = {}
+        tasks = {asyncio.create_task(self._run_symbol(job.trader, symbol, sends)): symbol for symbol in symbols}
+        if not tasks:
+            return {}
+        done, pending = await asyncio.wait(tasks.keys(), timeout=timeout)
+
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+        results = {tasks[task].info.ticker: task.result() for task in done}
+        started = []
+        for task in pending:
+            ticker = tasks[task].info.ticker
+            if ticker in sends and not sends[ticker][0].drop():
+                started.append(ticker)
+            else:
+                results[ticker] = LATE
+                if ticker in sends:
+                    sends[ticker][1].cancel()
+        for ticker in started:
+            # already at the broker: its outcome is known once the send returns
+            sending = sends[ticker][1]
+            try:
+                results[ticker] = SENT if await sending else REJECTED
+            except Exception as e:
+                log.error(f"live cycle failed for {ticker} | {e}")
+                results[ticker] = ERROR
+            log.warning(f"{job.name}: {ticker} was sent after the cycle deadline")
+
+        late = [ticker for ticker, result in results.items() if result == LATE]
+        METRICS.counter("cycle_late_total").inc(len(late))
+        if late:
+            log.warning(f"{job.name}: {len(late)} of {len(tasks)} symbols missed the cycle deadline")
+        return {symbol.info.ticker: results[symbol.info.ticker] for symbol in tasks.values()}
+
+    async def run_warmup(self, job: ScheduledJob) -> dict:
+        """
+        Runs `trader.warmup` for a job's symbols on the executor.
+
+        Returns:
+            dict: The warmup report, see `Trader.warmup`.
+        """
+        start = clock.perf_counter()
+        report = await self.executor.run(job.trader.warmup, job.symbols, job.currency)
+        METRICS.histogram("warmup_seconds", help="trader.warmup duration").record(clock.perf_counter() - start)
+        failed = [k for k, v in report.items() if isinstance(v, Exception)]
+        if failed:
+            log.warning(f"{job.name}: warmup steps {failed} failed")
+        return report
+
+    async def _sleep_until(self, at: datetime, stop: asyncio.Event) -> bool:
+        # returns False if stopped before `at`
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=max((at - datetime.now(self.tz)).total_seconds(), 0))
+            return False
+        except asyncio.TimeoutError:
+            return True
+
+    async def _run_job(self, job: ScheduledJob, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            start = job.next_run(datetime.now(self.tz))
+            if job.warmup is not None:
+                # started inside the warmup window: warm up right away
+                if not await self._sleep_until(start - job.warmup, stop):
+                    return
+                report = await self.run_warmup(job)
+                log.info(f"{job.name}: warmup for {start} finished with {report}")
+            if not await self._sleep_until(start, stop):
+                return
+            results = await self.run_cycle(job, deadline=start + job.deadline)
+            log.info(f"{job.name}: cycle at {start} finished with {results}")
+
+    async def run(self, stop: asyncio.Event = None) -> None:
+        """
+        Runs all registered jobs and polls all registered feeds until `stop` is set.
+        """
+        stop = stop or asyncio.Event()
+        await asyncio.gather(*[self._run_job(job, stop) for job in self.jobs],
+                             *[self._run_feed(feed, every, stop) for feed, every in self.feeds.items()])
@@ -0,0 +1,181 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+from datetime import date, timedelta
+from typing import Type
+
+import numpy as np
+
+from art_trader.abstract.cache import toEpoch
+from art_trader.abstract.common import Symbol
+from art_trader.abstract.utils import CLOSE, HIGH, LOW, SPREAD, TIME, BrokerUtils, dateRange
+
+log = logging.getLogger(__name__)
+
+DAY = 86400
+
+# SKIP REASONS, the `skipped` of a backtest ledger cell
+SCREENED = "screened"
+NO_TRADE = "no_trade"
+
+
+def rollingMean(x: np.ndarray, window: int) -> np.ndarray:
+    """Returns the mean of each `window` consecutive values ending at every row, NaN until there are enough."""
+    out = np.full(len(x), np.nan)
+    if window <= len(x):
+        c = np.cumsum(np.insert(x.astype(np.float64), 0, 0.))
+        out[window - 1:] = (c[window:] - c[:-window]) / window
+    return out
+
+
+class Filter:
+    """
+    A declared screening condition, evaluated on a symbol's whole daily history at once.
+
+    Subclasses implement `evaluate`, which returns for every daily bar whether the condition holds
+    using that bar and the ones before it. The screen applies the value of the last bar before a
+    day, so a filter never sees the day it decides on.
+
+    Attributes:
+        window (int): The daily bars needed before the first value.
+    """
+
+    window: int = 1
+
+    def evaluate(self, bars: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.__dict__})"
+
+
+class SpreadFilter(Filter):
+    """
+    Liquidity: the average spread of the last `window` days is at most `max_spread` points.
+    """
+
+    def __init__(self, max_spread: float, window: int = 5) -> None:
+        self.max_spread = max_spread
+        self.window = window
+
+    def evaluate(self, bars: np.ndarray) -> np.ndarray:
+        return rollingMean(bars[:, SPREAD], self.window) <= self.max_spread
+
+
+class VolatilityFilter(Filter):
+    """
+    The average daily range of the last `window` days, as a fraction of the close, is within [low, high].
+    """
+
+    def __init__(self, low: float = 0., high: float = np.inf, window: int = 14) -> None:
+        self.low = low
+        self.high = high
+        self.window = window
+
+    def evaluate(self, bars: np.ndarray) -> np.ndarray:
+        vol = rollingMean((bars[:, HIGH] - bars[:, LOW]) / bars[:, CLOSE], self.window)
+        return (vol >= self.low) & (vol <= self.high)
+
+
+class PriceFilter(Filter):
+    """
+    The last close is within [low, high].
+    """
+
+    def __init__(self, low: float = 0., high: float = np.inf) -> None:
+        self.low = low
+        self.high = high
+
+    def evaluate(self, bars: np.ndarray) -> np.ndarray:
+        return (bars[:, CLOSE] >= self.low) & (bars[:, CLOSE] <= self.high)
+
+
+class Screen:
+    """
+    Decides up front which (symbol, day) of a universe are worth simulating.
+
+    The daily bars of every symbol are fetched once and every filter is evaluated over them in one
+    vectorized pass, so the backtester skips the strategy and the hourly fetch of the rest.
+
+    Data availability is always checked: a day without a daily bar (halted or missing data) fails,
+    as its simulation would.
+
+    Attributes:
+        filters (list[Filter]): The conditions, all of which must hold.
+        tickers (list[str]): The screened symbols, the rows of `mask`.
+        days (list[date]): The screened days, the columns of `mask`.
+        mask (np.ndarray): Whether each (symbol, day) passes, shape `(symbols, days)`.
+    """
+
+    def __init__(self, filters: list[Filter]) -> None:
+        self.filters = list(filters)
+        self.tickers: list[str] = []
+        self.days: list[date] = []
+        self.mask = np.zeros((0, 0), dtype=bool)
+        self._rows: dict[str, int] = {}
+        self._cols: dict[date, int] = {}
+
+    def __repr__(self) -> str:
+        return str({"filters": self.filters, "symbols": len(self.tickers), "days": len(self.days),
+                    "passed": int(self.mask.sum())})
+
+    def screenSymbol(self, bars: np.ndarray, days: np.ndarray) -> np.ndarray:
+        """
+        Screens the days of one symbol.
+
+        Args:
+            bars (np.ndarray): The symbol's formatted daily rates, starting early enough for the filters' windows.
+            days (np.ndarray): The screened days as epoch days (epoch seconds // 86400).
+
+        Returns:
+            np.ndarray: Whether each day passes.
+        """
+        if len(bars) == 0:
+            return np.zeros(len(days), dtype=bool)
+        bar_days = (bars[:, TIME] // DAY).astype(np.int64)
+        at = np.searchsorted(bar_days, days)
+        out = at < len(bar_days)
+        out[out] = bar_days[at[out]] == days[out]
+
+        prev = at - 1
+        has_prev = prev >= 0
+        for f in self.filters:
+            ok = np.zeros(len(days), dtype=bool)
+            ok[has_prev] = f.evaluate(bars)[prev[has_prev]]
+            out &= ok
+        return out
+
+    def run(self, broker_utils: Type[BrokerUtils], symbols: list[Symbol], start: date, end: date) -> "Screen":
+        """
+        Screens the market days between `start` and `end` for every symbol.
+
+        Symbols whose daily data cannot be fetched fail on every day.
+        """
+        self.days = list(dateRange(start, end))
+        self.tickers = [x.info.ticker for x in symbols]
+        self._rows = {t: i for i, t in enumerate(self.tickers)}
+        self._cols = {d: i for i, d in enumerate(self.days)}
+        self.mask = np.zeros((len(symbols), len(self.days)), dtype=bool)
+        if not self.days:
+            return self
+
+        days = np.array([int(toEpoch(d) // DAY) for d in self.days], dtype=np.int64)
+        window = max([f.window for f in self.filters], default=1)
+        fetch_start = start - timedelta(days=window * 7 // 5 + 10)
+        for i, symbol in enumerate(symbols):
+            try:
+                bars = broker_utils.getDailyData(symbol, fetch_start, end)
+            except Exception as e:
+                log.warning(f"failed to screen {symbol.info.ticker} | {e}")
+                continue
+            self.mask[i] = self.screenSymbol(np.asarray(bars), days)
+        log.info(f"screen passed {int(self.mask.sum())} of {self.mask.size} (symbol, day)")
+        return self
+
+    def passes(self, ticker: str, day: date) -> bool:
+        """Returns whether a (symbol, day) passed; those that were not screened pass."""
+        row, col = self._rows.get(ticker), self._cols.get(day)
+        if row is None or col is None:
+            return True
+        return bool(self.mask[row, col])
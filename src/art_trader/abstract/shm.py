@@ -0,0 +1,247 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import threading
+from datetime import datetime
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Type
+
+import numpy as np
+
+from art_trader.abstract.cache import toEpoch
+from art_trader.abstract.common import Symbol
+from art_trader.abstract.utils import TIME, BrokerUtils
+
+log = logging.getLogger(__name__)
+
+# arrays start on cache line boundaries in the block
+ALIGN = 64
+
+
+class SharedManifest:
+    """
+    Describes a published block: small and picklable, so it is what gets sent to workers.
+
+    Attributes:
+        name (str): The name of the shared memory block.
+        entries (dict[tuple, tuple]): The `(offset, rows, columns)` of each (ticker, timeframe) in the block.
+        start (float): The start of the published time range (epoch seconds), if known.
+        end (float): The end of the published time range (epoch seconds), if known.
+    """
+
+    def __init__(self, name: str, entries: dict[tuple, tuple], start: float = None, end: float = None) -> None:
+        self.name = name
+        self.entries = entries
+        self.start = start
+        self.end = end
+
+    def __repr__(self) -> str:
+        return str({"name": self.name, "keys": len(self.entries), "nbytes": self.nbytes})
+
+    @property
+    def nbytes(self) -> int:
+        return sum(rows * cols * 8 for _, rows, cols in self.entries.values())
+
+
+def _views(shm: SharedMemory, manifest: SharedManifest) -> dict[tuple, np.ndarray]:
+    out = {}
+    for key, (offset, rows, cols) in manifest.entries.items():
+        view = np.ndarray((rows, cols), dtype=np.float64, buffer=shm.buf, offset=offset)
+        view.flags.writeable = False
+        out[key] = view
+    return out
+
+
+_untracked = threading.Lock()
+
+
+def _attach(manifest: SharedManifest) -> SharedMemory:
+    """
+    Opens a published block without taking ownership of it.
+
+    A block registered with a resource tracker is unlinked when the tracker's processes have all
+    exited, and unregistering it removes the registration for every process sharing the tracker.
+    Pool workers share the publisher's tracker, so a worker must neither register the block nor
+    unregister it: Python 3.13 attaches with `track=False`, older versions skip the registration.
+    """
+    try:
+        return SharedMemory(name=manifest.name, track=False)
+    except TypeError:
+        pass
+    with _untracked:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return SharedMemory(name=manifest.name)
+        finally:
+            resource_tracker.register = register
+
+
+class SharedRates:
+    """
+    Formatted rates of many (ticker, timeframe) published in one shared memory block.
+
+    The publisher copies every array into the block once; workers `attach` to the block by the
+    manifest and read the arrays as read-only NumPy views, so any number of processes share one
+    physical copy and nothing is pickled but the manifest.
+
+    The publisher owns the block: it must outlive the workers' use of it and `unlink` it at the end,
+    which `with SharedRates(...)` does.
+
+    Attributes:
+        manifest (SharedManifest): What workers need to attach.
+    """
+
+    def __init__(self, arrays: dict[tuple, np.ndarray], start: float = None, end: float = None) -> None:
+        entries, offset = {}, 0
+        arrays = {k: np.ascontiguousarray(v, dtype=np.float64).reshape(len(v), -1) for k, v in arrays.items()}
+        for key, array in arrays.items():
+            entries[key] = (offset, array.shape[0], array.shape[1])
+            offset += -(-array.nbytes // ALIGN) * ALIGN
+
+        self._shm = SharedMemory(create=True, size=max(offset, 1))
+        self.manifest = SharedManifest(self._shm.name, entries, start, end)
+        for key, (start, rows, cols) in entries.items():
+            np.ndarray((rows, cols), dtype=np.float64, buffer=self._shm.buf, offset=start)[:] = arrays[key]
+        self._views = _views(self._shm, self.manifest)
+        log.info(f"published {len(entries)} arrays ({offset / 2 ** 20:.1f} MiB) in {self.manifest.name}")
+
+    def __repr__(self) -> str:
+        return repr(self.manifest)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+        self.unlink()
+
+    def get(self, ticker: str, timeframe: int) -> Optional[np.ndarray]:
+        return self._views.get((ticker, timeframe))
+
+    def close(self) -> None:
+        self._views = {}
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Frees the block once every process has closed it. Attached views must not be used afterwards."""
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def fromBroker(cls, broker_utils: Type[BrokerUtils], symbols: list[Symbol], timeframes: list[int],
+                   start: datetime, end: datetime) -> "SharedRates":
+        """
+        Fetches the rates of every symbol and timeframe through `broker_utils.getData` and publishes them.
+
+        Raises:
+            Exception: If fetching any of them fails.
+        """
+        arrays = {}
+        for symbol in symbols:
+            for timeframe in timeframes:
+                try:
+                    rates = broker_utils.getData(symbol, timeframe, start, end)
+                except Exception as e:
+                    raise Exception(f"Failed to load {symbol.info.ticker} {timeframe} for sharing | {e}")
+                arrays[(symbol.info.ticker, timeframe)] = rates if len(rates) else np.empty((0, 6))
+        return cls(arrays, toEpoch(start), toEpoch(end))
+
+
+class SharedView:
+    """
+    A worker's read-only access to a published block.
+    """
+
+    def __init__(self, manifest: SharedManifest) -> None:
+        self.manifest = manifest
+        self._shm = _attach(manifest)
+        self._views = _views(self._shm, manifest)
+
+    def __repr__(self) -> str:
+        return repr(self.manifest)
+
+    def get(self, ticker: str, timeframe: int) -> Optional[np.ndarray]:
+        """Returns the whole published array, or None if it was not published."""
+        return self._views.get((ticker, timeframe))
+
+    def close(self) -> None:
+        self._views = {}
+        self._shm.close()
+
+
+_attached: Optional[SharedView] = None
+
+
+def attach(manifest: SharedManifest) -> SharedView:
+    """
+    Attaches this process to a published block, serving it to every `SharedRatesMixin` broker.
+
+    Use it as the initializer of a process pool: `ProcessPoolExecutor(initializer=attach, initargs=(manifest,))`.
+    """
+    global _attached
+    if _attached is not None and _attached.manifest.name != manifest.name:
+        _attached.close()
+        _attached = None
+    if _attached is None:
+        _attached = SharedView(manifest)
+    return _attached
+
+
+def serve(broker_utils: Type[BrokerUtils]) -> int:
+    """
+    Serves the attached block through the rate cache of `broker_utils` (enabled if needed), for brokers
+    used as they are rather than through a `SharedRatesMixin` class, e.g. by the command line.
+
+    The cache then slices the published arrays in place and fetches only what lies outside the
+    published time range. A manifest without a time range covers the published bars.
+
+    Returns:
+        int: The number of arrays served, 0 if this process is not attached.
+    """
+    if _attached is None:
+        return 0
+    if broker_utils.rate_cache is None:
+        broker_utils.enableCache()
+    for (ticker, timeframe), rates in _attached._views.items():
+        start, end = _attached.manifest.start, _attached.manifest.end
+        if start is None:
+            if not len(rates):
+                continue
+            start, end = rates[0, TIME], rates[-1, TIME]
+        broker_utils.rate_cache.put(ticker, timeframe, start, end, rates)
+    return len(_attached._views)
+
+
+def detach() -> None:
+    global _attached
+    if _attached is not None:
+        _attached.close()
+        _attached = None
+
+
+class SharedRatesMixin:
+    """
+    Serves `getData` from the block this process is attached to, falling back to the broker for
+    (ticker, timeframe) pairs that were not published.
+
+    Mix it into a module-level class so backtesters using it stay picklable, e.g.
+
+        class SharedMT5Utils(SharedRatesMixin, MT5Utils):
+            pass
+
+    The returned rates are read-only views into shared memory, limited to the published time range.
+    """
+
+    @classmethod
+    def getData(cls, symbol: Symbol, timeframe: int, start: datetime, end: datetime) -> np.ndarray:
+        rates = _attached.get(symbol.info.ticker, timeframe) if _attached is not None else None
+        if rates is None:
+            return super().getData(symbol, timeframe, start, end)
+        lo = np.searchsorted(rates[:, TIME], toEpoch(start), side="left")
+        hi = np.searchsorted(rates[:, TIME], toEpoch(end), side="right")
+        return rates[lo:hi]
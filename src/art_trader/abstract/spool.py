@@ -0,0 +1,365 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import os
+import pickle
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import date
+from typing import Optional, Type
+
+from pandas import DataFrame, concat
+
+from art_trader.abstract.common import Strategy
+from art_trader.abstract.testing import BacktestAccount, Backtester
+from art_trader.abstract.utils import dateRange
+
+log = logging.getLogger(__name__)
+
+PENDING = "pending"
+LOCKS = "locks"
+RESULTS = "results"
+FAILED = "failed"
+
+
+class BacktestJob:
+    """
+    One shard of a backtest: a strategy configuration over a block of symbols and a block of dates.
+
+    Jobs are pickled into the spool, so the strategy and the backtester class must be picklable
+    (module-level classes).
+
+    Attributes:
+        job_id (str): Unique and sortable id, also the file name in the spool.
+        config (str): The name of the strategy configuration; results are reduced per config.
+        backtester (Type[Backtester]): The backtester class to run, e.g. MT5Backtester.
+        strategy (Strategy): The configured strategy.
+        tickers (list[str]): The symbol block.
+        start (date): First day of the date block.
+        end (date): Day after the date block, as in `dateRange`.
+        initial_balance (float): The balance of the configuration's account.
+        currency (str): The account currency.
+    """
+
+    def __init__(self, job_id: str, config: str, backtester: Type[Backtester], strategy: Strategy,
+                 tickers: list[str], start: date, end: date, initial_balance: float, currency: str) -> None:
+        self.job_id = job_id
+        self.config = config
+        self.backtester = backtester
+        self.strategy = strategy
+        self.tickers = tickers
+        self.start = start
+        self.end = end
+        self.initial_balance = initial_balance
+        self.currency = currency
+
+    def __repr__(self) -> str:
+        return str({"job_id": self.job_id, "config": self.config, "tickers": self.tickers,
+                    "start": self.start, "end": self.end})
+
+    def run(self) -> DataFrame:
+        """Runs the shard and returns its daily profit."""
+        account = BacktestAccount(self.initial_balance, self.currency)
+        bt = self.backtester(self.strategy, self.tickers, self.start, self.end, account)
+        return bt.run_all_single_thread()[["profit"]]
+
+
+def shard(config: str, backtester: Type[Backtester], strategy: Strategy, tickers: list[str], start: date, end: date,
+          initial_balance: float, currency: str, symbols_per_job: int = None, days_per_job: int = None) -> list:
+    """
+    Splits a backtest into jobs of at most `symbols_per_job` symbols and `days_per_job` market days.
+
+    Shards are independent because `Backtester.run_all_single_thread` trades fixed volumes: the profit
+    of a day does not depend on the balance, so partial results add up exactly.
+
+    Returns:
+        list[BacktestJob]: The jobs, in a deterministic order.
+    """
+    symbols_per_job = symbols_per_job or len(tickers)
+    out = []
+    for d, (block_start, block_end) in enumerate(dateBlocks(start, end, days_per_job)):
+        for s in range(0, len(tickers), symbols_per_job):
+            job_id = f"{config}-d{d:05d}-s{s // symbols_per_job:05d}"
+            out.append(BacktestJob(job_id, config, backtester, strategy, tickers[s:s + symbols_per_job],
+                                   block_start, block_end, initial_balance, currency))
+    return out
+
+
+def dateBlocks(start: date, end: date, days_per_job: int = None) -> list[tuple]:
+    """
+    Splits `[start, end)` into consecutive blocks of at most `days_per_job` market days.
+
+    Returns:
+        list[tuple]: The `(start, end)` of each block, usable as the dates of a `Backtester`.
+    """
+    days = list(dateRange(start, end))
+    days_per_job = days_per_job or max(len(days), 1)
+    blocks = []
+    for i in range(0, len(days), days_per_job):
+        block_end = days[i + days_per_job] if i + days_per_job < len(days) else end
+        blocks.append((days[i], block_end))
+    return blocks
+
+
+def merge(profits: list[DataFrame], initial_balance: float) -> DataFrame:
+    """
+    Merges the daily profits of the shards of one configuration into its equity curve.
+
+    Daily profits of all symbol blocks are summed and date blocks are laid end to end, then
+    the balance is rebuilt from the initial balance.
+    """
+    # each date block starts with a zero-profit row for the previous market day, which is
+    # the last day of the block before it, so summing by day merges the blocks seamlessly
+    profit = concat([x.profit for x in profits]).groupby(level=0).sum().sort_index()
+    df = DataFrame({"profit": profit})
+    df["balance"] = initial_balance + df.profit.cumsum()
+    return df
+
+
+def _atomicWrite(path: str, data: bytes) -> None:
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class JobSpool:
+    """
+    Job queue in a directory on shared storage, needing nothing but a file system.
+
+    Layout:
+        pending/<job_id>.job     the pickled jobs
+        locks/<job_id>.lock      held by the worker running a job, created with O_EXCL
+        results/<job_id>.pkl     partial results, written to a temporary file and renamed
+        failed/<job_id>.txt      the traceback of a failed job
+
+    A worker refreshes the mtime of its lock while it runs. A lock not refreshed for `stale_after`
+    seconds is considered abandoned (the worker or its node died) and may be reclaimed.
+
+    Attributes:
+        root (str): The spool directory.
+        stale_after (float): Seconds after which a lock is considered abandoned.
+    """
+
+    def __init__(self, root: str, stale_after: float = 600.) -> None:
+        self.root = root
+        self.stale_after = stale_after
+        for d in (PENDING, LOCKS, RESULTS, FAILED):
+            os.makedirs(os.path.join(root, d), exist_ok=True)
+
+    def __repr__(self) -> str:
+        return str({"root": self.root, **self.status()})
+
+    def _path(self, kind: str, job_id: str) -> str:
+        ext = {PENDING: "job", LOCKS: "lock", RESULTS: "pkl", FAILED: "txt"}[kind]
+        return os.path.join(self.root, kind, f"{job_id}.{ext}")
+
+    def _ids(self, kind: str) -> list[str]:
+        return sorted(x.rsplit(".", 1)[0] for x in os.listdir(os.path.join(self.root, kind)) if not x.endswith(".tmp"))
+
+    def submit(self, jobs: list[BacktestJob]) -> int:
+        """
+        Adds jobs to the spool, skipping those already submitted.
+
+        Returns:
+            int: The number of jobs added.
+        """
+        added = 0
+        for job in jobs:
+            path = self._path(PENDING, job.job_id)
+            if os.path.exists(path):
+                continue
+            _atomicWrite(path, pickle.dumps(job))
+            added += 1
+        return added
+
+    def status(self) -> dict:
+        pending = set(self._ids(PENDING))
+        done = set(self._ids(RESULTS))
+        failed = set(self._ids(FAILED))
+        return {"total": len(pending), "done": len(done & pending), "failed": len(failed - done),
+                "running": len(set(self._ids(LOCKS)) - done)}
+
+    def _tryLock(self, job_id: str, owner: str) -> bool:
+        path = self._path(LOCKS, job_id)
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                age = time.time() - os.stat(path).st_mtime
+            except FileNotFoundError:
+                return False
+            if age < self.stale_after:
+                return False
+            # rename is atomic, so only one worker moves a stale lock out of the way
+            moved = f"{path}.{uuid.uuid4().hex}.tmp"
+            try:
+                os.rename(path, moved)
+            except FileNotFoundError:
+                return False
+            if time.time() - os.stat(moved).st_mtime < self.stale_after:
+                # another worker reclaimed it in between, put its lock back
+                try:
+                    os.link(moved, path)
+                except FileExistsError:
+                    pass
+                os.remove(moved)
+                return False
+            os.remove(moved)
+            log.warning(f"reclaiming stale lock of job {job_id} ({age:.0f}s old)")
+            return self._tryLock(job_id, owner)
+        with os.fdopen(fd, "w") as f:
+            f.write(owner)
+        return True
+
+    def claim(self, owner: str, skip_failed: bool = True) -> Optional[BacktestJob]:
+        """
+        Locks the next job that has neither a result nor a live lock.
+
+        Args:
+            owner (str): Written into the lock, for diagnostics.
+            skip_failed (bool): Do not claim jobs that failed before.
+
+        Returns:
+            BacktestJob: The claimed job, or None if there is nothing left to claim.
+        """
+        skip = set(self._ids(RESULTS))
+        if skip_failed:
+            skip |= set(self._ids(FAILED))
+        for job_id in self._ids(PENDING):
+            if job_id in skip or not self._tryLock(job_id, owner):
+                continue
+            if os.path.exists(self._path(RESULTS, job_id)):
+                self.release(job_id)
+                continue
+            with open(self._path(PENDING, job_id), "rb") as f:
+                return pickle.load(f)
+        return None
+
+    def heartbeat(self, job_id: str) -> None:
+        try:
+            os.utime(self._path(LOCKS, job_id))
+        except FileNotFoundError:
+            pass
+
+    def release(self, job_id: str) -> None:
+        try:
+            os.remove(self._path(LOCKS, job_id))
+        except FileNotFoundError:
+            pass
+
+    def complete(self, job_id: str, result: DataFrame) -> None:
+        _atomicWrite(self._path(RESULTS, job_id), pickle.dumps(result))
+        try:
+            os.remove(self._path(FAILED, job_id))
+        except FileNotFoundError:
+            pass
+        self.release(job_id)
+
+    def fail(self, job_id: str, error: str) -> None:
+        _atomicWrite(self._path(FAILED, job_id), error.encode())
+        self.release(job_id)
+
+    def results(self) -> dict[str, DataFrame]:
+        out = {}
+        for job_id in self._ids(RESULTS):
+            with open(self._path(RESULTS, job_id), "rb") as f:
+                out[job_id] = pickle.load(f)
+        return out
+
+    def jobs(self) -> dict[str, BacktestJob]:
+        out = {}
+        for job_id in self._ids(PENDING):
+            with open(self._path(PENDING, job_id), "rb") as f:
+                out[job_id] = pickle.load(f)
+        return out
+
+
+def _beat(spool: JobSpool, job_id: str, stop: threading.Event, interval: float) -> None:
+    while not stop.wait(interval):
+        spool.heartbeat(job_id)
+
+
+def run_worker(root: str, stale_after: float = 600., heartbeat: float = 30., max_jobs: int = None,
+               retry_failed: bool = False) -> int:
+    """
+    Claims and runs jobs from a spool until none is left.
+
+    Safe to start any number of times on any node sharing the spool directory.
+
+    Args:
+        root (str): The spool directory.
+        stale_after (float): See `JobSpool`.
+        heartbeat (float): Seconds between refreshes of the lock of the running job.
+        max_jobs (int, optional): Stop after this many jobs.
+        retry_failed (bool): Also run jobs that failed before.
+
+    Returns:
+        int: The number of jobs completed by this worker.
+    """
+    spool = JobSpool(root, stale_after)
+    owner = f"{socket.gethostname()}:{os.getpid()}"
+    completed = 0
+    attempted = set()
+
+    while max_jobs is None or completed < max_jobs:
+        job = spool.claim(owner, skip_failed=not retry_failed)
+        if job is None:
+            break
+        if job.job_id in attempted:
+            # failed in this worker already, leave it to the others
+            spool.release(job.job_id)
+            break
+        attempted.add(job.job_id)
+
+        stop = threading.Event()
+        beat = threading.Thread(target=_beat, args=(spool, job.job_id, stop, heartbeat), daemon=True)
+        beat.start()
+        try:
+            result = job.run()
+        except Exception as e:
+            log.error(f"job {job.job_id} failed | {e}")
+            spool.fail(job.job_id, f"{owner}\n{e!r}\n{traceback.format_exc()}")
+            continue
+        finally:
+            stop.set()
+            beat.join()
+        spool.complete(job.job_id, result)
+        completed += 1
+        log.info(f"job {job.job_id} done by {owner}")
+    return completed
+
+
+def reduce(root: str, allow_missing: bool = False) -> dict[str, DataFrame]:
+    """
+    Merges the partial results of a spool into one equity curve per configuration, see `merge`.
+
+    Args:
+        root (str): The spool directory.
+        allow_missing (bool): Reduce even if some jobs have no result yet.
+
+    Returns:
+        dict[str, DataFrame]: Daily profit and balance per configuration.
+
+    Raises:
+        Exception: If jobs are missing results and `allow_missing` is False.
+    """
+    spool = JobSpool(root)
+    jobs = spool.jobs()
+    results = spool.results()
+    missing = sorted(set(jobs) - set(results))
+    if missing and not allow_missing:
+        raise Exception(f"{len(missing)} of {len(jobs)} jobs have no result, e.g. {missing[:3]}")
+
+    by_config: dict[str, list] = {}
+    for job_id, result in results.items():
+        if job_id in jobs:
+            by_config.setdefault(jobs[job_id].config, []).append((jobs[job_id], result))
+
+    return {config: merge([x[1] for x in parts], parts[0][0].initial_balance) for config, parts in by_config.items()}
@@ -0,0 +1,113 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import math
+import zlib
+from datetime import datetime
+from functools import lru_cache
+
+import numpy as np
+
+from art_trader.abstract.common import StaticSymbol, Symbol
+from art_trader.abstract.testing import Backtester
+from art_trader.abstract.utils import BrokerUtils, adjust_tz
+from art_trader.backends import Backend
+
+log = logging.getLogger(__name__)
+
+# the generated history: hourly bars from ORIGIN, for DAYS days
+ORIGIN = datetime(2010, 1, 1)
+DAYS = 366 * 50
+# the standard deviation of the hourly log return
+SIGMA = 0.002
+
+
+def _seed(ticker: str) -> int:
+    return zlib.crc32(ticker.encode())
+
+
+@lru_cache(maxsize=64)
+def _levels(ticker: str) -> np.ndarray:
+    # the log price at the start of each day, a daily random walk (one float per day)
+    rng = np.random.default_rng([_seed(ticker)])
+    moves = rng.normal(0, SIGMA * math.sqrt(24), DAYS)
+    return np.log(100.) + np.concatenate([[0.], np.cumsum(moves)])
+
+
+def _dayBars(ticker: str, day: int) -> np.ndarray:
+    # the 24 hourly bars of a day: a random walk from the day's level to the next one
+    levels = _levels(ticker)
+    rng = np.random.default_rng([_seed(ticker), day])
+    steps = rng.normal(0, SIGMA, 24)
+    steps += (levels[day + 1] - levels[day] - steps.sum()) / 24
+    path = levels[day] + np.concatenate([[0.], np.cumsum(steps)])
+    open_, close = np.exp(path[:-1]), np.exp(path[1:])
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.0015, 24))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.0015, 24))
+    spread = rng.integers(1, 20, 24).astype(float)
+    times = adjust_tz(ORIGIN).timestamp() + 3600. * (24 * day + np.arange(24))
+    return np.column_stack([times, open_, high, low, close, spread])
+
+
+def hourlyBars(ticker: str, start: float, end: float) -> np.ndarray:
+    """
+    Returns deterministic random-walk hourly bars for a ticker (formatted), from `start` to `end` included.
+
+    Only the days of the range are generated. The walk is seeded with the ticker, and each day with
+    the ticker and the day, so every process and every range generates the same bars.
+
+    Args:
+        ticker (str): Any ticker.
+        start (float): The first bar time (timestamp).
+        end (float): The last bar time (timestamp).
+    """
+    origin = adjust_tz(ORIGIN).timestamp()
+    first = max(0, math.ceil((start - origin) / 3600))
+    last = min(24 * DAYS - 1, math.floor((end - origin) / 3600))
+    if last < first:
+        return np.empty((0, 6))
+    bars = np.concatenate([_dayBars(ticker, d) for d in range(first // 24, last // 24 + 1)])
+    offset = first // 24 * 24
+    return bars[first - offset:last - offset + 1]
+
+
+class SyntheticUtils(BrokerUtils):
+    """
+    Generated prices for demos and tests, no broker needed.
+
+    Hourly bars are a random walk; daily, weekly and monthly bars are resampled from them.
+    Any ticker exists and every currency converts at 1.
+    """
+
+    M10_TIMEFRAME = 10
+    HOURLY_TIMEFRAME = 16385
+    DAILY_TIMEFRAME = 16408
+    WEEKLY_TIMEFRAME = 32769
+    MONTHLY_TIMEFRAME = 49153
+
+    RESAMPLE_FROM = HOURLY_TIMEFRAME
+
+    def exists(symbol: Symbol) -> bool:
+        return True
+
+    def getRates(symbol: Symbol, timeframe: int, start: datetime, end: datetime) -> np.ndarray:
+        if timeframe != SyntheticUtils.HOURLY_TIMEFRAME:
+            raise Exception(f"Synthetic data is generated hourly, timeframe {timeframe} is not available")
+        return hourlyBars(symbol.info.ticker, adjust_tz(start).timestamp(), adjust_tz(end).timestamp())
+
+    def formatRates(array: np.ndarray) -> np.ndarray:
+        return array
+
+    @classmethod
+    def xr(cls, from_currency: str, to_currency: str, dt: datetime) -> float:
+        return 1.
+
+
+class SyntheticBacktester(Backtester):
+
+    symbol_class = StaticSymbol
+    brokerUtil = SyntheticUtils
+
+
+backend = Backend("synthetic", SyntheticUtils, StaticSymbol, SyntheticBacktester)
@@ -3,14 +3,23 @@ __version__ = "0.0-SNAPSHOT"
 
 from abc import abstractmethod
 import logging
-from datetime import date, datetime
-from typing import Tuple
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING, Optional, Tuple
 import numpy as np
-from pandas import DataFrame
 
 from art_trader.abstract.common import Account, BaseTrader, Strategy, Symbol
+from art_trader.abstract.context import DataContext
+from art_trader.abstract.kernels import scan, stack
+from art_trader.abstract.memo import ResultCache, fingerprint
+from art_trader.abstract.memory import LEDGER, PRICE_CACHE, Ledger, MemoryBudget
+from art_trader.abstract.prefetch import Prefetcher
+from art_trader.abstract.screening import NO_TRADE, SCREENED, Screen
+from art_trader.abstract.ticks import CLOSE_EXIT, NOT_FILLED, TickSource, fillTicks
 from art_trader.abstract.utils import OPEN, CLOSE, HIGH, LOW, SPREAD, TIME, BrokerUtils, dateRange, getPrevMarketDay, toDT
 
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
 log = logging.getLogger(__name__)
 
 
@@ -39,6 +48,62 @@ class BacktestAccount(Account):
         self._currency = currency
 
 
+class PortfolioLimits:
+    """
+    Capital constraints applied across all symbols traded on the same day.
+
+    Attributes:
+        max_leverage (float): Maximum total notional of the day's trades as a multiple of the balance.
+        symbol_cap (float): Maximum notional of any single trade as a fraction of the balance.
+        margin_rate (float): Margin required per unit of notional; total margin may not exceed the balance.
+                             0 disables the margin check.
+        scale (bool): If True, trades that breach a limit are scaled down to fit; otherwise they are rejected.
+    """
+
+    def __init__(self, max_leverage: float = 1., symbol_cap: float = 1., margin_rate: float = 0.,
+                 scale: bool = True) -> None:
+        self.max_leverage = max_leverage
+        self.symbol_cap = symbol_cap
+        self.margin_rate = margin_rate
+        self.scale = scale
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    def allocate(self, notional: np.ndarray, balance: float) -> np.ndarray:
+        """
+        Computes the fraction of each requested trade that fits within the limits.
+
+        Args:
+            notional (np.ndarray): The notional value of each requested trade in account currency.
+            balance (float): The account balance available for the day.
+
+        Returns:
+            np.ndarray: A factor in [0, 1] per trade; 0 means rejected.
+        """
+        notional = np.abs(notional)
+        capacity = balance * min(self.max_leverage, 1 / self.margin_rate if self.margin_rate > 0 else np.inf)
+        symbol_cap = balance * self.symbol_cap
+
+        if self.scale:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                factor = np.where(notional > 0, np.minimum(1., symbol_cap / notional), 0.)
+                capped = notional * factor
+                total = capped.sum()
+                if total > capacity:
+                    factor *= capacity / total
+            return factor
+
+        # first come, first served: a rejected trade does not use capacity, so a later smaller one may still fit
+        factor = np.zeros(len(notional))
+        used = 0.
+        for i, x in enumerate(notional):
+            if x <= symbol_cap and used + x <= capacity:
+                factor[i] = 1.
+                used += x
+        return factor
+
+
 class Backtester(BaseTrader):
 
     symbol_class = Symbol
@@ -47,16 +112,64 @@ class Backtester(BaseTrader):
     def __repr__(self) -> str:
         return str(self.__dict__)
 
-    def __init__(self, strategy: Strategy, tickers: list[str], start: date, end: date, account: BacktestAccount) -> None:
+    def __init__(self, strategy: Strategy, tickers: list[str], start: date, end: date, account: BacktestAccount,
+                 limits: PortfolioLimits = None, tick_source: TickSource = None,
+                 result_cache: ResultCache = None, memory_budget: MemoryBudget = None, prefetch: int = 0) -> None:
         self.strategy = strategy
         self.start = start
         self.end = end
         self.symbols = [self.symbol_class(x) for x in tickers]
         self.account = account
+        self.limits = limits
+        self.tick_source = tick_source
+        self.result_cache = result_cache
+        self.context = None
+        self.screening = None
+        self.prefetch = prefetch
+        self.prefetcher = None
+        self.memory_budget = memory_budget
+        self.ledger: list[dict] = [] if memory_budget is None else Ledger()
+        if memory_budget is not None:
+            self._registerBudget(memory_budget)
+
+    def _registerBudget(self, budget: MemoryBudget) -> None:
+        # cold price arrays are cheaper to read back than ledger cells, so they go first
+        cache = self.brokerUtil.rate_cache
+        if cache is not None:
+            budget.register(PRICE_CACHE, lambda: cache.nbytes, cache.spill, cache.release)
+        budget.register(LEDGER, lambda: self.ledger.nbytes, self.ledger.spill, self.ledger.release)
+
+    def fingerprint(self) -> str:
+        """
+        Identifies the configuration of this run for `result_cache`: the strategy and its parameters,
+        its screen and lookback, the backtester class, the account currency, the portfolio limits and
+        the tick source and its settings.
 
-    def run_all_single_thread(self) -> DataFrame:
+        Raises:
+            ValueError: If a setting has no stable representation, see `memo.stableParams`.
+        """
+        cls, ticks = type(self), self.tick_source
+        if ticks is not None:
+            ticks = {"class": type(ticks), **{k: v for k, v in vars(ticks).items() if not k.startswith("_")}}
+        limits = None if self.limits is None else vars(self.limits)
+        return fingerprint(self.strategy, backtester=f"{cls.__module__}.{cls.__qualname__}",
+                           currency=self.account.currency, limits=limits, ticks=ticks,
+                           screen=list(self.strategy.screen), lookback=self.strategy.lookback)
+
+    def run_all_single_thread(self) -> "DataFrame":
         """
         Runs the entire backtest and returns a DataFrame containing daily profit and balance.
+
+        The details of every simulated (symbol, day) are kept in `self.ledger`. With a `result_cache`,
+        cells cached for this configuration are read in bulk and only the others are simulated; cells
+        that failed are not cached, so they are retried next time. With a `memory_budget`, it is checked
+        after every day and the price cache and the ledger are spilled to disk as needed. Cells failing
+        the strategy's `screen` are skipped.
+
+        Subclasses overriding `simulate` or `calcProfit` have them called for every cell, see `simulate_day`.
+        With `prefetch`, the price action of a cell is fetched on a background thread as soon as the
+        strategy returns its trade, while the day's other cells are evaluated, holding up to `prefetch`
+        results. Cells without a trade are never fetched.
         """
         dates = [x for x in dateRange(self.start, self.end)]
         results = []
@@ -65,83 +178,405 @@ class Backtester(BaseTrader):
         initial_balance = self.account.balance
         results.append({"date": initial_date, "profit": 0, "balance": initial_balance})
 
+        cached, key = {}, None
+        if self.result_cache is not None:
+            key = self.fingerprint()
+            cached = self.result_cache.load(key, [x.info.ticker for x in self.symbols], self.start, self.end)
+
+        if self.prefetch and self.tick_source is None:
+            self.prefetcher = Prefetcher(self.getPriceAction, [], self.prefetch)
+        try:
+            self._runDays(dates, cached, key, results)
+        finally:
+            if self.prefetcher is not None:
+                log.info(f"prefetch {self.prefetcher}")
+                self.prefetcher.close()
+                self.prefetcher = None
+
+        from pandas import DataFrame
+
+        df = DataFrame(results, columns=["date", "profit", "balance"])
+        df["date"] = df.date.apply(lambda x: date.fromtimestamp(x))
+        return df.set_index("date")
+
+    def _runDays(self, dates: list[date], cached: dict, key: str, results: list[dict]) -> None:
         for date in dates:
             day_profit = 0
+            cells, todo = [], []
+            new = []
             for symbol in self.symbols:
-                symbol_profit = self.simulate(symbol, date)
-                day_profit += symbol_profit
-
+                if not self.screened(symbol, date):
+                    cell = self.skippedCell(symbol, date, SCREENED)
+                    if (symbol.info.ticker, date) not in cached:
+                        new.append((symbol.info.ticker, date, cell))
+                else:
+                    cell = cached.get((symbol.info.ticker, date))
+                    if cell is None:
+                        todo.append((len(cells), symbol))
+                cells.append(cell)
+
+            if todo:
+                for (i, symbol), cell in zip(todo, self.simulate_day([x for _, x in todo], date)):
+                    cells[i] = cell
+                    if "error" not in cell:
+                        new.append((symbol.info.ticker, date, cell))
+            for cell in cells:
+                self.ledger.append(cell)
+                day_profit += cell["profit"]
+
+            if key is not None:
+                self.result_cache.put(key, new)
+            if self.memory_budget is not None:
+                self.memory_budget.check()
             self.account.balance += day_profit
 
             results.append({"date": toDT(date).timestamp(), 
                             "profit": day_profit, 
                             "balance": self.account.balance})
 
-        df = DataFrame(results, columns=["date", "profit", "balance"])
+    def run_portfolio(self) -> "DataFrame":
+        """
+        Runs the backtest with the day's trades sharing the account's capital under `self.limits`.
+
+        Each day, every symbol's trade is generated first, then the notional of all trades is
+        checked at once against the per-symbol cap, the leverage limit and the margin requirement.
+        Trades are scaled down or rejected to fit before they are simulated.
+
+        Returns:
+            DataFrame: Daily profit, balance, and the notional exposure and margin that were allocated.
+        """
+        limits = self.limits or PortfolioLimits()
+        dates = [x for x in dateRange(self.start, self.end)]
+        results = [{"date": toDT(getPrevMarketDay(self.start)).timestamp(), "profit": 0,
+                    "balance": self.account.balance, "exposure": 0., "margin": 0.}]
+
+        for date in dates:
+            trades, symbols = [], []
+            for symbol in self.symbols:
+                if not self.screened(symbol, date):
+                    continue
+                try:
+                    trade = self.trade(symbol, date)
+                except Exception as e:
+                    log.warning(f"failed to generate trade for {symbol.info.ticker} on {date} | {e}")
+                    continue
+                if trade is None:
+                    continue
+                trades.append(trade)
+                symbols.append(symbol)
+
+            exposure, day_profit = 0., 0.
+            if trades:
+                factor, notional = self.allocate(trades, symbols, date, limits)
+                exposure = float((np.abs(notional) * factor).sum())
+                for trade, symbol, f in zip(trades, symbols, factor):
+                    trade["volume"] = self.roundVolume(trade["volume"] * f, symbol) if f > 0 else 0.
+                fill = [(x, y) for x, y in zip(trades, symbols) if x["volume"] > 0]
+                for (trade, symbol), result in zip(fill, self.replay([x for x, _ in fill], [y for _, y in fill], date)):
+                    if isinstance(result, Exception):
+                        log.warn(f"failed to simulate {symbol.info.ticker} for {date} | {result}")
+                    else:
+                        day_profit += result["profit"]
+
+            self.account.balance += day_profit
+            results.append({"date": toDT(date).timestamp(), "profit": day_profit, "balance": self.account.balance,
+                            "exposure": exposure, "margin": exposure * limits.margin_rate})
+
+        from pandas import DataFrame
+
+        df = DataFrame(results, columns=["date", "profit", "balance", "exposure", "margin"])
         df["date"] = df.date.apply(lambda x: date.fromtimestamp(x))
         return df.set_index("date")
 
+    def allocate(self, trades: list[dict], symbols: list[Symbol], day: date,
+                 limits: PortfolioLimits) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Computes the notional of a day's trades in account currency and the fraction of each allowed by `limits`.
+
+        Exchange rates are fetched once per profit currency rather than once per symbol.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The allocation factor and the requested notional of each trade.
+        """
+        currencies = [x.info.currency_profit for x in symbols]
+        rates = {c: self.brokerUtil.xr(c, self.account.currency, day) for c in set(currencies)}
+
+        entry = np.array([x["entry_price"] for x in trades], dtype=float)
+        volume = np.array([x["volume"] for x in trades], dtype=float)
+        contract = np.array([x.info.trade_contract_size for x in symbols], dtype=float)
+        xr = np.array([rates[c] for c in currencies], dtype=float)
+
+        notional = entry * volume * contract * xr
+        return limits.allocate(notional, self.account.balance), notional
+
+    def roundVolume(self, volume: float, symbol: Symbol) -> float:
+        """
+        Rounds a scaled volume down to the symbol's volume step, if the symbol defines one.
+        """
+        step = getattr(symbol.info, "volume_step", None)
+        if not step:
+            return volume
+        return np.floor(volume / step + 1e-9) * step
+
     def simulate(self, symbol: Symbol, day: date) -> Tuple[float, bool]:
         """
         Simulates a trade and returns the profit
         """
         try:
             trade = self.trade(symbol, day)
-            price_action = self.getPriceAction(symbol, day)
-            return self.calcProfit(trade, price_action, symbol)
         except Exception as e:
             log.warn(
                 f"failed to simulate {symbol.info.ticker} for {day} | {e}")
             return 0
+        if trade is None:
+            return 0
+        return self.simulate_trade(trade, symbol, day)
 
-    def trade(self, symbol: Symbol, day: datetime) -> dict:
-        trade = super().trade(symbol, day)
-        trade["day"] = day
+    def simulate_trade(self, trade: dict, symbol: Symbol, day: date) -> float:
+        """
+        Simulates an already generated trade and returns the profit
+        """
+        try:
+            if self.tick_source is not None:
+                return self.calcTickProfit(trade, symbol, day)
+            return self.calcProfit(trade, self.priceAction(symbol, day), symbol)
+        except Exception as e:
+            log.warn(
+                f"failed to simulate {symbol.info.ticker} for {day} | {e}")
+            return 0
+
+    def simulate_fill(self, trade: dict, symbol: Symbol, day: date) -> dict:
+        """
+        Simulates an already generated trade and returns its fill details, see `fillMany`.
+        """
+        if self.tick_source is not None:
+            return self.tickFill(trade, symbol, day)
+        return self.fill(trade, self.priceAction(symbol, day), symbol)
+
+    def simulate_cell(self, symbol: Symbol, day: date) -> dict:
+        """
+        Generates and simulates the trade of a symbol on a day.
+
+        Returns:
+            dict: The trade merged with its fill details, a zero `profit` and the `error` if either step failed,
+                  or a skipped cell if the strategy returned no trade.
+        """
+        return self.simulate_day([symbol], day)[0]
+
+    def simulate_day(self, symbols: list[Symbol], day: date) -> list[dict]:
+        """
+        Generates the trades of several symbols on a day and replays all of them against their
+        price action with a single `fillMany` call. If that call fails, the trades are replayed
+        one by one so only the failing ones become error cells.
+
+        A subclass overriding `simulate` has it called per symbol instead, and one overriding
+        `calcProfit` has it called per trade; their cells then only hold the trade and `profit`.
+
+        Returns:
+            list[dict]: One cell per symbol, see `simulate_cell`.
+        """
+        if self._overrides("simulate"):
+            return [{"ticker": x.info.ticker, "day": day, "profit": self.simulate(x, day)} for x in symbols]
+
+        cells: list[Optional[dict]] = [None] * len(symbols)
+        todo, trades = [], []
+        for i, symbol in enumerate(symbols):
+            try:
+                trade = self.trade(symbol, day)
+                if trade is None:
+                    cells[i] = self.skippedCell(symbol, day, NO_TRADE)
+                else:
+                    if self.prefetcher is not None:
+                        self.prefetcher.add((symbol.info.ticker, day), symbol, day)
+                    trades.append(trade)
+                    todo.append(i)
+            except Exception as e:
+                cells[i] = self.errorCell(symbols[i], day, e)
+        if not todo:
+            return cells
+
+        fills = self.replay(trades, [symbols[i] for i in todo], day)
+        for i, trade, fill in zip(todo, trades, fills):
+            cells[i] = self.errorCell(symbols[i], day, fill) if isinstance(fill, Exception) else {**trade, **fill}
+        return cells
+
+    def replay(self, trades: list[dict], symbols: list[Symbol], day: date) -> list:
+        """
+        Replays already generated trades of a day against their price action with a single
+        `fillMany` call. If that call fails, the trades are replayed one by one so only the
+        failing ones are lost.
+
+        Returns:
+            list: Per trade, its fill (see `fillMany`) or the exception that prevented it.
+            With `calcProfit` overridden, a fill only holds the `profit`.
+        """
+        fills: list = [None] * len(trades)
+        todo, datas = [], []
+        for i, (trade, symbol) in enumerate(zip(trades, symbols)):
+            try:
+                if self.tick_source is not None:
+                    fills[i] = self.tickFill(trade, symbol, day)
+                else:
+                    datas.append(self.priceAction(symbol, day))
+                    todo.append(i)
+            except Exception as e:
+                fills[i] = e
+        if not todo:
+            return fills
+
+        batch, batch_trades = [symbols[i] for i in todo], [trades[i] for i in todo]
+        if self._overrides("calcProfit"):
+            for i, trade, data, symbol in zip(todo, batch_trades, datas, batch):
+                try:
+                    fills[i] = {"profit": self.calcProfit(trade, data, symbol)}
+                except Exception as e:
+                    fills[i] = e
+            return fills
+        try:
+            results = self.fillMany(batch_trades, datas, batch)
+        except Exception:
+            results = []
+            for trade, data, symbol in zip(batch_trades, datas, batch):
+                try:
+                    results.append(self.fill(trade, data, symbol))
+                except Exception as e:
+                    results.append(e)
+        for i, fill in zip(todo, results):
+            fills[i] = fill
+        return fills
+
+    def _overrides(self, name: str) -> bool:
+        return getattr(type(self), name) is not getattr(Backtester, name)
+
+    def skippedCell(self, symbol: Symbol, day: date, reason: str) -> dict:
+        return {"ticker": symbol.info.ticker, "day": day, "profit": 0., "skipped": reason}
+
+    def errorCell(self, symbol: Symbol, day: date, e: Exception) -> dict:
+        log.warn(
+            f"failed to simulate {symbol.info.ticker} for {day} | {e}")
+        return {"ticker": symbol.info.ticker, "day": day, "profit": 0., "error": str(e)}
+
+    def trade(self, symbol: Symbol, day: datetime) -> Optional[dict]:
+        trade = super().trade(symbol, day, self.getContext(symbol, day))
+        if trade is not None:
+            trade["day"] = day
         return trade
 
+    def screened(self, symbol: Symbol, day: date) -> bool:
+        """
+        Returns whether a (symbol, day) passes the strategy's `screen`, which is run over the whole
+        universe on first use. Without a screen, everything passes.
+        """
+        if not self.strategy.screen:
+            return True
+        if self.screening is None:
+            self.screening = Screen(self.strategy.screen).run(self.brokerUtil, self.symbols, self.start, self.end)
+        return self.screening.passes(symbol.info.ticker, day)
+
+    def getContext(self, symbol: Symbol, day: date) -> DataContext:
+        """
+        Returns the strategy's data context advanced to `day`, or None if the strategy declares no lookback.
+
+        The bars of the whole run are fetched on first use, so days are served without broker calls.
+        """
+        if not self.strategy.lookback:
+            return None
+        if self.context is None:
+            self.context = DataContext(self.brokerUtil, self.strategy.lookback, self.symbols)
+            self.context.preload(self.start, self.end)
+        self.context.advance(day, [symbol.info.ticker])
+        return self.context
+
     def calcProfit(self, trade: dict, data: np.ndarray, symbol: Symbol) -> float:
         """
         Calculates the net profit for a trade given price data and other trade parameters.
 
         Always closes the trade if still open at end of parsing data.
         """
+        return self.fill(trade, data, symbol)["profit"]
 
-        def xr(hour):
-            return self.brokerUtil.xr(symbol.info.currency_profit, self.account.currency, hour)
+    def fill(self, trade: dict, data: np.ndarray, symbol: Symbol) -> dict:
+        """
+        Replays a trade against price data, see `fillMany`.
+        """
+        return self.fillMany([trade], [data], [symbol])[0]
 
-        executed = False
-        exit_price = None
+    def fillMany(self, trades: list[dict], datas: list[np.ndarray], symbols: list[Symbol]) -> list[dict]:
+        """
+        Replays many trades against their price data with a single call to the scan kernel.
 
-        multiplier = 1 if trade["is_long"] else -1
+        A trade enters on the first bar whose range contains its entry price and exits on the first
+        bar whose range contains its TP or SL, or at the last close. A trade with a positive `trail`
+        uses a trailing stop instead of a fixed SL. See `art_trader.abstract.kernels`.
+
+        Returns:
+            list[dict]: Per trade, `exit_kind`, `entry_time`, `entry_price`, `exit_time`, `exit_price`
+            and the net `profit` in account currency.
+        """
+        datas = [x if len(x) else np.empty((0, 6)) for x in datas]
+        stacked, starts, ends = stack(datas)
+        entry_idx, exit_idx, kinds, exit_prices = scan(
+            stacked[:, LOW], stacked[:, HIGH], starts, ends,
+            [x["entry_price"] for x in trades], [x["SL"] for x in trades], [x["TP"] for x in trades],
+            [x.get("trail") or 0. for x in trades], [x["is_long"] for x in trades])
+
+        out = []
+        for trade, symbol, i, j, kind, exit_price in zip(trades, symbols, entry_idx, exit_idx, kinds, exit_prices):
+            fill = {"exit_kind": int(kind), "entry_time": None, "entry_price": None, "exit_time": None,
+                    "exit_price": None, "profit": 0.}
+            out.append(fill)
+            if kind == NOT_FILLED:
+                continue
+
+            def xr(hour):
+                return self.brokerUtil.xr(symbol.info.currency_profit, self.account.currency, hour)
+
+            if kind == CLOSE_EXIT:
+                exit_price = stacked[j, CLOSE]
+            multiplier = 1 if trade["is_long"] else -1
+            avg_xr = (xr(stacked[i, TIME]) + xr(stacked[j, TIME])) / 2
+            net = (exit_price - trade["entry_price"]) * trade["volume"] * \
+                multiplier * symbol.info.trade_contract_size * avg_xr
+            fill.update({"entry_time": stacked[i, TIME], "entry_price": trade["entry_price"],
+                         "exit_time": stacked[j, TIME], "exit_price": float(exit_price),
+                         "profit": net - self.calc_tx_fee(trade["volume"])})
+        return out
+
+    def calcTickProfit(self, trade: dict, symbol: Symbol, day: date) -> float:
+        """
+        Calculates the net profit for a trade by replaying the day's ticks from `self.tick_source`.
+
+        Ticks are streamed in chunks and the replay stops at the exit, so memory stays bounded by
+        the source's chunk size. Always closes the trade if still open at the last tick of the day.
+        """
+        return self.tickFill(trade, symbol, day)["profit"]
 
-        for row in data:
-            if not executed:
-                if row[LOW] < trade["entry_price"] < row[HIGH]:
-                    executed = True
-                    entry_xr = xr(row[TIME])
-
-            if executed:
-                sl_hit = row[LOW] < trade["SL"] < row[HIGH]
-                tp_hit = row[LOW] < trade["TP"] < row[HIGH]
-                if tp_hit or sl_hit:
-                    exit_xr = xr(row[TIME])
-                    exit_price = trade["TP"] if tp_hit else trade["SL"]
-                    break
-
-        if not executed:
-            return 0.
-
-        if exit_price is None:
-            exit_price = data[-1][CLOSE]
-            exit_xr = xr(row[TIME])
-
-        avg_xr = (entry_xr + exit_xr) / 2
-        net = (exit_price - trade["entry_price"]) * trade["volume"] * \
+    def tickFill(self, trade: dict, symbol: Symbol, day: date) -> dict:
+        """
+        Replays a trade against the day's ticks, see `calcTickProfit`.
+
+        Returns:
+            dict: The same fields as `fillMany`, with times in epoch seconds.
+        """
+        start = datetime.combine(day, time())
+        end = start + timedelta(days=1) - timedelta(milliseconds=1)
+        fill = fillTicks(trade, self.tick_source.chunks(symbol.info.ticker, start, end))
+        fill["profit"] = 0.
+        if fill["exit_kind"] == NOT_FILLED:
+            return fill
+
+        def xr(msc):
+            return self.brokerUtil.xr(symbol.info.currency_profit, self.account.currency, msc / 1000)
+
+        multiplier = 1 if trade["is_long"] else -1
+        avg_xr = (xr(fill["entry_time"]) + xr(fill["exit_time"])) / 2
+        net = (fill["exit_price"] - fill["entry_price"]) * trade["volume"] * \
             multiplier * symbol.info.trade_contract_size * avg_xr
-        tx_fee = self.calc_tx_fee(trade["volume"])
+        fill["profit"] = net - self.calc_tx_fee(trade["volume"])
+        fill["entry_time"] /= 1000
+        fill["exit_time"] /= 1000
+        return fill
 
-        return net - tx_fee
-    
     def getPriceAction(self, symbol: Symbol, day: datetime) -> np.ndarray:
         """
         Get the price data for trade backtesting on a specific day.
@@ -162,6 +597,14 @@ class Backtester(BaseTrader):
         """
         return self.brokerUtil.getPriceAction(symbol, day)
 
+    def priceAction(self, symbol: Symbol, day: date) -> np.ndarray:
+        """
+        Returns `getPriceAction(symbol, day)`, from the prefetcher while one is running.
+        """
+        if self.prefetcher is not None:
+            return self.prefetcher.take((symbol.info.ticker, day), symbol, day)
+        return self.getPriceAction(symbol, day)
+
 
     def calc_tx_fee(self, volume: float) -> float:
         """
@@ -0,0 +1,288 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import bisect
+import logging
+import os
+from abc import ABC, abstractmethod
+from datetime import date, datetime, timedelta
+from typing import Callable, Iterable, Iterator, Optional
+
+import numpy as np
+
+from art_trader.abstract.history import toMsc
+
+log = logging.getLogger(__name__)
+
+TICK_DTYPE = np.dtype([
+    ("time_msc", np.int64),
+    ("bid", np.float64),
+    ("ask", np.float64),
+    ("last", np.float64),
+    ("volume", np.float64),
+])
+
+MERGED_TICK_DTYPE = np.dtype(TICK_DTYPE.descr + [("symbol", np.int32)])
+
+# FILL OUTCOMES
+NOT_FILLED = 0
+TP_EXIT = 1
+SL_EXIT = 2
+CLOSE_EXIT = 3
+
+
+class TickSource(ABC):
+    """
+    Reads tick history in chunks of at most `chunk_size` ticks.
+
+    Consumers iterate over `chunks`, so at most one chunk per symbol is held in memory however
+    long the requested range is.
+
+    Attributes:
+        chunk_size (int): The maximum number of ticks per chunk.
+    """
+
+    def __init__(self, chunk_size: int = 100_000) -> None:
+        self.chunk_size = chunk_size
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    @abstractmethod
+    def _read(self, ticker: str, start_msc: int, count: int) -> np.ndarray:
+        """
+        Returns up to `count` ticks of a ticker starting at or shortly before `start_msc`, sorted by time,
+        as an array with the `TICK_DTYPE` fields.
+        """
+        pass
+
+    def chunks(self, ticker: str, start: datetime, end: datetime) -> Iterator[np.ndarray]:
+        """
+        Yields the ticks of a ticker between `start` and `end` in time order, one chunk at a time.
+        """
+        cursor, end_msc = toMsc(start), toMsc(end)
+        seen_at_cursor = 0
+        while cursor <= end_msc:
+            count = self.chunk_size + seen_at_cursor
+            while True:
+                batch = self._read(ticker, cursor, count)
+                full = len(batch) >= count
+                batch = batch[batch["time_msc"] >= cursor][seen_at_cursor:]
+                if len(batch) or not full:
+                    break
+                # the whole batch was ticks before the cursor or already delivered: read further
+                count *= 2
+            if len(batch) > self.chunk_size:
+                batch, full = batch[:self.chunk_size], True
+            batch = batch[batch["time_msc"] <= end_msc]
+            if len(batch) == 0:
+                return
+            yield batch
+
+            if not full:
+                return
+            last = batch["time_msc"][-1]
+            # ticks sharing the last millisecond were (partly) delivered, skip them next time
+            same = int(np.count_nonzero(batch["time_msc"] == last))
+            seen_at_cursor = same + (seen_at_cursor if last == cursor else 0)
+            cursor = last
+
+
+class FileTickSource(TickSource):
+    """
+    Tick store on local disk with one `.npy` file of `TICK_DTYPE` records per ticker and day.
+
+    Files are memory-mapped and read one chunk at a time: a read finds the first tick at or after
+    its start with `searchsorted` and carries on into the following day files as needed.
+
+    Attributes:
+        root (str): The directory holding one sub-directory per ticker.
+    """
+
+    def __init__(self, root: str, chunk_size: int = 100_000) -> None:
+        super().__init__(chunk_size)
+        self.root = root
+        self._days: dict[str, list[date]] = {}
+
+    def _path(self, ticker: str, day: date) -> str:
+        return os.path.join(self.root, ticker, f"{day.isoformat()}.npy")
+
+    def days(self, ticker: str) -> list[date]:
+        """Returns the sorted days stored for a ticker."""
+        if ticker not in self._days:
+            directory = os.path.join(self.root, ticker)
+            names = os.listdir(directory) if os.path.isdir(directory) else []
+            self._days[ticker] = sorted(date.fromisoformat(x[:-4]) for x in names if x.endswith(".npy"))
+        return self._days[ticker]
+
+    def write(self, ticker: str, ticks: np.ndarray) -> None:
+        """
+        Stores ticks, split into one file per UTC day. Existing days are overwritten.
+        """
+        os.makedirs(os.path.join(self.root, ticker), exist_ok=True)
+        days = ticks["time_msc"] // 86_400_000
+        for d in np.unique(days):
+            day = date(1970, 1, 1) + timedelta(days=int(d))
+            np.save(self._path(ticker, day), np.ascontiguousarray(ticks[days == d], dtype=TICK_DTYPE))
+        self._days.pop(ticker, None)
+
+    def _read(self, ticker: str, start_msc: int, count: int) -> np.ndarray:
+        days = self.days(ticker)
+        first = date(1970, 1, 1) + timedelta(days=int(start_msc) // 86_400_000)
+        parts, n = [], 0
+        for day in days[bisect.bisect_left(days, first):]:
+            ticks = np.load(self._path(ticker, day), mmap_mode="r")
+            lo = np.searchsorted(ticks["time_msc"], start_msc, side="left")
+            parts.append(np.array(ticks[lo:lo + count - n]))
+            n += len(parts[-1])
+            if n >= count:
+                break
+        if not parts:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return np.concatenate(parts)
+
+
+def merge(streams: list[Iterable[np.ndarray]], chunk_size: int = 100_000) -> Iterator[np.ndarray]:
+    """
+    Merges several time-ordered chunk streams into one time-ordered stream.
+
+    The output has the `MERGED_TICK_DTYPE` fields, where `symbol` is the position of the source
+    stream. Ticks are released up to the earliest "last buffered time" among the streams that are
+    not exhausted, so at most about one chunk per stream is buffered at any time.
+
+    Args:
+        streams (list[Iterable[np.ndarray]]): One chunk stream per symbol.
+        chunk_size (int): The maximum number of ticks per output chunk.
+
+    Yields:
+        np.ndarray: Merged chunks.
+    """
+    iterators = [iter(x) for x in streams]
+    buffers: list[Optional[np.ndarray]] = [np.empty(0, dtype=TICK_DTYPE)] * len(iterators)
+    active = [True] * len(iterators)
+
+    while True:
+        for i, it in enumerate(iterators):
+            while active[i] and len(buffers[i]) == 0:
+                try:
+                    buffers[i] = next(it)
+                except StopIteration:
+                    active[i] = False
+
+        pending = [i for i in range(len(buffers)) if len(buffers[i])]
+        if not pending:
+            return
+        limits = [buffers[i]["time_msc"][-1] for i in pending if active[i]]
+        watermark = min(limits) if limits else np.iinfo(np.int64).max
+
+        parts = []
+        for i in pending:
+            n = np.searchsorted(buffers[i]["time_msc"], watermark, side="right")
+            if n == 0:
+                continue
+            part = np.empty(n, dtype=MERGED_TICK_DTYPE)
+            for name in TICK_DTYPE.names:
+                part[name] = buffers[i][name][:n]
+            part["symbol"] = i
+            parts.append(part)
+            buffers[i] = buffers[i][n:]
+
+        out = np.concatenate(parts)
+        out = out[np.argsort(out["time_msc"], kind="stable")]
+        for i in range(0, len(out), chunk_size):
+            yield out[i:i + chunk_size]
+
+
+class TickReplay:
+    """
+    Streams the merged tick history of a basket of tickers through a handler.
+
+    Attributes:
+        source (TickSource): Where the ticks are read from.
+        tickers (list[str]): The basket; merged ticks carry the index of their ticker in this list.
+    """
+
+    def __init__(self, source: TickSource, tickers: list[str]) -> None:
+        self.source = source
+        self.tickers = tickers
+
+    def __repr__(self) -> str:
+        return str(self.__dict__)
+
+    def stream(self, start: datetime, end: datetime) -> Iterator[np.ndarray]:
+        """Yields merged, time-ordered chunks of all tickers between `start` and `end`."""
+        return merge([self.source.chunks(x, start, end) for x in self.tickers], self.source.chunk_size)
+
+    def run(self, start: datetime, end: datetime, handler: Callable[[np.ndarray], None]) -> int:
+        """
+        Calls `handler` on every merged chunk.
+
+        Returns:
+            int: The number of ticks replayed.
+        """
+        total = 0
+        for chunk in self.stream(start, end):
+            handler(chunk)
+            total += len(chunk)
+        return total
+
+
+def fillTicks(trade: dict, chunks: Iterable[np.ndarray]) -> dict:
+    """
+    Replays a trade against tick data.
+
+    The entry is a limit or a stop depending on which side of the first quote it lies on, and
+    fills at the first quote reaching it (ask for longs, bid for shorts). The position then exits
+    at the first quote on the other side reaching the TP or SL, or at the last quote otherwise.
+    Fills happen at the triggering quote, so gaps through a level are priced realistically.
+
+    Args:
+        trade (dict): A trade as returned by `Backtester.trade`.
+        chunks (Iterable[np.ndarray]): Time-ordered tick chunks of the trade's symbol.
+
+    Returns:
+        dict: `exit_kind` (`NOT_FILLED`, `TP_EXIT`, `SL_EXIT` or `CLOSE_EXIT`), `entry_time`, `entry_price`,
+        `exit_time` and `exit_price` (times in epoch milliseconds).
+    """
+    is_long = trade["is_long"]
+    entry, tp, sl = trade["entry_price"], trade["TP"], trade["SL"]
+    open_side, close_side = ("ask", "bid") if is_long else ("bid", "ask")
+
+    out = {"exit_kind": NOT_FILLED, "entry_time": None, "entry_price": None, "exit_time": None, "exit_price": None}
+    is_stop = None
+    last = None
+
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        last = chunk[-1]
+        start = 0
+        if out["entry_time"] is None:
+            quotes = chunk[open_side]
+            if is_stop is None:
+                is_stop = quotes[0] < entry if is_long else quotes[0] > entry
+            hit = (quotes >= entry) if is_stop == is_long else (quotes <= entry)
+            if not hit.any():
+                continue
+            start = int(np.argmax(hit))
+            out["entry_time"] = int(chunk["time_msc"][start])
+            out["entry_price"] = float(quotes[start])
+
+        quotes = chunk[close_side][start:]
+        if is_long:
+            tp_hit, sl_hit = quotes >= tp, quotes <= sl
+        else:
+            tp_hit, sl_hit = quotes <= tp, quotes >= sl
+        hit = tp_hit | sl_hit
+        if hit.any():
+            i = int(np.argmax(hit))
+            out["exit_kind"] = TP_EXIT if tp_hit[i] else SL_EXIT
+            out["exit_time"] = int(chunk["time_msc"][start + i])
+            out["exit_price"] = float(quotes[i])
+            return out
+
+    if out["entry_time"] is not None:
+        out["exit_kind"] = CLOSE_EXIT
+        out["exit_time"] = int(last["time_msc"])
+        out["exit_price"] = float(last[close_side])
+    return out
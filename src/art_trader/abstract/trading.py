@@ -2,11 +2,11 @@ __copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
 __version__ = "0.0-SNAPSHOT"
 
 import logging
+import time
 from abc import ABC, abstractmethod
 from datetime import datetime
 
 from art_trader.abstract.common import BaseTrader, Symbol
-from art_trader.abstract.common import Symbol
 
 log = logging.getLogger(__name__)
 
@@ -23,6 +23,17 @@ class Order(ABC):
 
 
 class Trader(BaseTrader):
+    """
+    Attributes:
+        context (DataContext): If set, advanced to the current bar and passed to the strategy on each trade.
+                               A `BarFeed` can serve as the context, see `LiveScheduler.add_bar_job`.
+        brokerUtil (Type[BrokerUtils]): The data source of `warmup`.
+        order_templates (dict[str, dict]): The order fields that do not depend on the signal, per ticker.
+    """
+
+    context = None
+    brokerUtil = None
+    order_templates: dict = None
 
     def __repr__(self) -> str:
         return str(self.__dict__)
@@ -31,7 +42,95 @@ class Trader(BaseTrader):
     # Trade generation functions #
 
     def trade(self, symbol: Symbol, day: datetime) -> dict:
-        return super().trade(symbol, day)
+        if self.context is not None:
+            self.context.track([symbol])
+            self.context.advance(day, [symbol.info.ticker])
+        return super().trade(symbol, day, self.context)
+
+    ####################
+    # Warmup functions #
+
+    def warmup(self, symbols: list[Symbol], currency: str = None) -> dict:
+        """
+        Loads everything a trading cycle needs ahead of it, so that the cycle itself only evaluates
+        signals and sends orders: the strategy's lookback bars, symbol metadata, FX rates, tick
+        snapshots and order templates. A failing step is logged and the others still run.
+
+        Args:
+            symbols (list[Symbol]): The symbols of the coming cycle.
+            currency (str, optional): The account currency, to preload the FX rates of foreign symbols.
+
+        Returns:
+            dict: The seconds spent in each step, or the error of the steps that failed.
+        """
+        steps = [
+            ("lookback", self.warmLookback),
+            ("symbols", self.warmSymbols),
+            ("fx", lambda x: self.warmFx(x, currency)),
+            ("ticks", self.warmTicks),
+            ("orders", self.warmOrders),
+        ]
+        out = {}
+        for name, step in steps:
+            start = time.perf_counter()
+            try:
+                step(symbols)
+                out[name] = time.perf_counter() - start
+            except Exception as e:
+                log.warning(f"warmup step {name} failed | {e}")
+                out[name] = e
+        return out
+
+    def warmLookback(self, symbols: list[Symbol]) -> None:
+        """
+        Fills the data context with the bars declared in the strategy's `lookback`, creating it if needed.
+        The cycle then only fetches the bars that closed since.
+        """
+        if not self.strategy.lookback:
+            return
+        if self.context is None:
+            from art_trader.abstract.context import DataContext
+
+            self.context = DataContext(self.brokerUtil, self.strategy.lookback, symbols)
+        self.context.track(symbols)
+        self.context.advance(None, [x.info.ticker for x in symbols])
+
+    def warmSymbols(self, symbols: list[Symbol]) -> None:
+        """Refreshes symbol metadata. Nothing to do unless the broker caches it."""
+        pass
+
+    def warmFx(self, symbols: list[Symbol], currency: str = None) -> None:
+        """
+        Resolves the FX symbol of every foreign profit currency and loads its current rate, which
+        lands in `brokerUtil.rate_cache` when the cache is enabled.
+        """
+        if currency is None or self.brokerUtil is None:
+            return
+        now = self.brokerUtil.now()
+        for profit_currency in {x.info.currency_profit for x in symbols} - {currency}:
+            self.brokerUtil.xr(profit_currency, currency, now)
+
+    def warmTicks(self, symbols: list[Symbol]) -> None:
+        """Snapshots the symbols' ticks for the orders of the cycle. Nothing to do unless the broker supports it."""
+        pass
+
+    def warmOrders(self, symbols: list[Symbol]) -> None:
+        """Builds the order template of every symbol, see `orderTemplate`."""
+        self.order_templates = {**(self.order_templates or {}),
+                                **{x.info.ticker: self.buildOrderTemplate(x) for x in symbols}}
+
+    def buildOrderTemplate(self, symbol: Symbol) -> dict:
+        """Returns the order fields that do not depend on the signal. Empty by default."""
+        return {}
+
+    def orderTemplate(self, symbol: Symbol) -> dict:
+        """Returns the cached order template of a symbol, building it on first use."""
+        if self.order_templates is None:
+            self.order_templates = {}
+        template = self.order_templates.get(symbol.info.ticker)
+        if template is None:
+            template = self.order_templates[symbol.info.ticker] = self.buildOrderTemplate(symbol)
+        return template
 
     @abstractmethod
     def close(self, order: Order) -> dict:
@@ -1,21 +1,27 @@
 __copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
 __version__ = "0.0-SNAPSHOT"
 
+import importlib
 import logging
+import threading
 from abc import ABC, abstractmethod
 from datetime import date, datetime, time, timedelta
-from random import getrandbits
+from functools import wraps
+from types import ModuleType
+from typing import Callable, Optional
 from zoneinfo import ZoneInfo
 
 import numpy as np
-from pandas import DataFrame
 
-from art_trader.abstract.common import Symbol
+from art_trader.abstract.common import StaticSymbol, Symbol
 
 log = logging.getLogger(__name__)
 
 MIDNIGHT: time = time(0, 0, 0)
 
+# (broker utils class, from currency, to currency) -> (symbol, inverted), see BrokerUtils.fxSymbol
+_fx_symbols: dict[tuple, tuple] = {}
+
 # PRICE DATA INDICES
 TIME = 0
 OPEN = 1
@@ -25,6 +31,57 @@ CLOSE = 4
 SPREAD = 5
 
 
+class LazyModule(ModuleType):
+    """
+    Stands in for a heavy or optional module and imports it on first attribute access.
+
+    Example:
+        mt5 = LazyModule("MetaTrader5")  # nothing is imported until e.g. mt5.initialize()
+
+    Every function read from it can be routed through an interceptor, see `intercept`. With a
+    `lock`, every function call holds it, so a module that is not thread-safe can be called from
+    several threads (the interceptor runs outside the lock).
+    """
+
+    def __init__(self, name: str, lock: threading.RLock = None) -> None:
+        super().__init__(name)
+        self._module = None
+        self._interceptor = None
+        self._lock = lock
+
+    def __getattr__(self, attr: str):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        value = getattr(self.unwrapped(), attr)
+        if not callable(value) or isinstance(value, type):
+            return value
+        if self._lock is not None:
+            value = self._locked(value)
+        if self._interceptor is not None:
+            return self._interceptor(attr, value)
+        return value
+
+    def _locked(self, fn: Callable) -> Callable:
+        @wraps(fn)
+        def locked(*args, **kwargs):
+            with self._lock:
+                return fn(*args, **kwargs)
+        return locked
+
+    def unwrapped(self) -> ModuleType:
+        """Returns the real module, importing it if needed."""
+        if self._module is None:
+            self._module = importlib.import_module(self.__name__)
+        return self._module
+
+    def intercept(self, interceptor: Optional[Callable[[str, Callable], Callable]]) -> None:
+        """
+        Makes every function read from the module afterwards `interceptor(name, function)`, e.g. a
+        wrapper checking the connection first. None removes the interceptor.
+        """
+        self._interceptor = interceptor
+
+
 def toDT(day) -> datetime:
     """
     Converts various types to a datetime object.
@@ -129,6 +186,18 @@ def getPrevMarketDay(day: date) -> date:
 
 
 class BrokerUtils(ABC):
+    """
+    Broker-specific data access, used as a class (all methods are class-level).
+
+    Attributes:
+        RESAMPLE_FROM (int): If set, hourly and higher timeframes are built locally from this
+                             timeframe with `getResampledData` instead of being fetched.
+        RATES_TZ (ZoneInfo): The session timezone used to find period boundaries when resampling.
+                             None if bar times are already session-local.
+        rate_cache (RateCache): If set, formatted rates are served from this cache. See `enableCache`.
+        broker_lock (RLock): Held around every `getRates` call, see `fetchRates`, and by brokers whose
+                             module is a `LazyModule` around every call into it. Shared by all subclasses.
+    """
 
     M10_TIMEFRAME: int
     HOURLY_TIMEFRAME: int
@@ -136,6 +205,11 @@ class BrokerUtils(ABC):
     WEEKLY_TIMEFRAME: int
     MONTHLY_TIMEFRAME: int
 
+    RESAMPLE_FROM: int = None
+    RATES_TZ: ZoneInfo = None
+    rate_cache = None
+    broker_lock = threading.RLock()
+
     @abstractmethod
     def exists(symbol: Symbol) -> bool:
         """
@@ -193,20 +267,40 @@ class BrokerUtils(ABC):
         """
         if from_currency == to_currency:
             return 1.
-        
-        dt = adjust_tz(dt)
+
+        from art_trader.abstract.cache import toEpoch
+
+        dt = datetime.fromtimestamp(toEpoch(dt), ZoneInfo("UTC"))
 
         try:
-            ticker = from_currency+to_currency+"-Z"
-            if not c.exists(ticker):
-                ticker = to_currency+from_currency+"-Z"
-                if not c.exists(ticker):
-                    raise Exception()
-                return 1 / c.getHourlyData(ticker, dt, dt+timedelta(hours=1))[0][CLOSE]
-            return c.getHourlyData(ticker, dt, dt+timedelta(hours=1))[0][CLOSE]
+            symbol, inverted = cls.fxSymbol(from_currency, to_currency)
+            rate = cls.getHourlyData(symbol, dt, dt+timedelta(hours=1))[0][CLOSE]
+            return 1 / rate if inverted else rate
         except Exception as e:
             raise Exception(f"No exchange rate found for {from_currency}/{to_currency} | {e}")
 
+    @classmethod
+    def fxSymbol(cls, from_currency: str, to_currency: str) -> tuple:
+        """
+        Finds the symbol quoting a currency pair, either way round. Lookups are cached per class.
+
+        Returns:
+            tuple: The symbol, and whether it quotes `to_currency` in `from_currency` (the rate must be inverted).
+
+        Raises:
+            Exception: If the broker has no symbol for the pair.
+        """
+        key = (cls, from_currency, to_currency)
+        if key not in _fx_symbols:
+            for ticker, inverted in ((from_currency+to_currency+"-Z", False), (to_currency+from_currency+"-Z", True)):
+                symbol = StaticSymbol(ticker)
+                if cls.exists(symbol):
+                    _fx_symbols[key] = (symbol, inverted)
+                    break
+            else:
+                raise Exception(f"No symbol quotes {from_currency}/{to_currency}")
+        return _fx_symbols[key]
+
     @classmethod
     def getData(cls, symbol: Symbol, timeframe: int, start: datetime, end: datetime) -> np.ndarray:
         """
@@ -221,9 +315,87 @@ class BrokerUtils(ABC):
         Returns:
             np.ndarray: Formatted rate data for the specified parameters.
         """
-        out = cls.formatRates(cls.getRates(symbol, timeframe, start, end))
+        if cls.RESAMPLE_FROM is not None and timeframe != cls.RESAMPLE_FROM and timeframe in cls.resampleRules():
+            return cls.getResampledData(symbol, timeframe, start, end)
+        if cls.rate_cache is not None:
+            return cls.rate_cache.get(symbol, timeframe, start, end)
+        out = cls.fetchRates(symbol, timeframe, start, end)
         return out
 
+    @classmethod
+    def fetchRates(cls, symbol: Symbol, timeframe: int, start: datetime, end: datetime) -> np.ndarray:
+        """
+        Fetches and formats rates from the broker, holding `broker_lock` so calls from several
+        threads (e.g. a `Prefetcher` and the simulation) never reach a non-thread-safe API at once.
+        """
+        with cls.broker_lock:
+            rates = cls.getRates(symbol, timeframe, start, end)
+        return cls.formatRates(rates)
+
+    @classmethod
+    def now(cls) -> datetime:
+        """
+        Returns the current time in the time basis of the broker's bars.
+        """
+        return datetime.now(ZoneInfo("UTC"))
+
+    @classmethod
+    def enableCache(cls) -> None:
+        """
+        Serves all formatted rates of this class from an in-process `RateCache`.
+        """
+        from art_trader.abstract.cache import RateCache
+
+        cls.rate_cache = RateCache(cls.fetchRates)
+
+    @classmethod
+    def resampleRules(cls) -> dict:
+        """
+        Returns the resampling rule of each timeframe that can be built from a lower one.
+        """
+        from art_trader.abstract.resample import D1, H1, MN1, W1
+
+        return {cls.HOURLY_TIMEFRAME: H1, cls.DAILY_TIMEFRAME: D1, cls.WEEKLY_TIMEFRAME: W1, cls.MONTHLY_TIMEFRAME: MN1}
+
+    @classmethod
+    def getResampledData(cls, symbol: Symbol, timeframe: int, start: datetime, end: datetime,
+                         base_timeframe: int = None) -> np.ndarray:
+        """
+        Builds formatted data of a higher timeframe from a lower one instead of fetching it.
+
+        Returns the bars whose period starts between `start` and `end`, like `getData` would.
+        The base timeframe is read through `rate_cache` when it is enabled, so daily signals and
+        hourly fills share a single download.
+
+        Args:
+            symbol (Symbol): The symbol object for which to fetch data.
+            timeframe (int): The timeframe to build (HOURLY, DAILY, WEEKLY or MONTHLY).
+            start (datetime): The start date and time for data retrieval.
+            end (datetime): The end date and time for data retrieval.
+            base_timeframe (int, optional): The timeframe to build from, defaults to `RESAMPLE_FROM`.
+
+        Returns:
+            np.ndarray: Formatted rate data for the specified parameters.
+        """
+        from art_trader.abstract.cache import toEpoch
+        from art_trader.abstract.resample import PERIOD_SPAN, resample
+
+        base_timeframe = base_timeframe or cls.RESAMPLE_FROM
+        rule = cls.resampleRules()[timeframe]
+        _start, _end = toEpoch(start), toEpoch(end)
+        base_end = _end + PERIOD_SPAN[rule].total_seconds() - 1
+
+        if cls.rate_cache is not None:
+            base = cls.rate_cache.get(symbol, base_timeframe, _start, base_end)
+        else:
+            utc = ZoneInfo("UTC")
+            base = cls.fetchRates(symbol, base_timeframe, datetime.fromtimestamp(_start, utc),
+                                  datetime.fromtimestamp(base_end, utc))
+        if len(base) == 0:
+            return base
+        out = resample(base, rule, cls.RATES_TZ)
+        return out[(out[:, TIME] >= _start) & (out[:, TIME] <= _end)]
+
     @classmethod
     def getMonthlyData(cls, symbol: Symbol, start: date, end: date) -> np.ndarray:
         """
@@ -0,0 +1,192 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+import multiprocessing
+import threading
+import traceback
+from concurrent.futures import Future
+from multiprocessing.connection import Connection
+from typing import Any, Callable
+
+log = logging.getLogger(__name__)
+
+STOP = None
+
+
+class WorkerError(Exception):
+    """
+    Raised in the supervisor when a call failed inside a worker process.
+    """
+    pass
+
+
+def _worker_main(conn: Connection, factory: Callable[[], Any]) -> None:
+    """
+    Entry point of a worker process: builds the target object once, then executes
+    `(method, args, kwargs)` requests on it until it receives `STOP`.
+    """
+    try:
+        target = factory()
+        conn.send((True, None))
+    except Exception as e:
+        conn.send((False, f"{e!r}\n{traceback.format_exc()}"))
+        return
+
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is STOP:
+            return
+        method, args, kwargs = request
+        try:
+            conn.send((True, getattr(target, method)(*args, **kwargs)))
+        except Exception as e:
+            conn.send((False, f"{e!r}\n{traceback.format_exc()}"))
+
+
+class _Worker:
+
+    def __init__(self, name: str, factory: Callable[[], Any], context) -> None:
+        self.name = name
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, factory), name=f"worker-{name}", daemon=True)
+        self.lock = threading.Lock()
+        self.process.start()
+        child.close()
+
+    def request(self, method: str, args: tuple, kwargs: dict) -> None:
+        self.conn.send((method, args, kwargs))
+
+    def response(self) -> Any:
+        try:
+            ok, result = self.conn.recv()
+        except EOFError:
+            raise WorkerError(f"worker {self.name} exited (exitcode={self.process.exitcode})")
+        if not ok:
+            raise WorkerError(f"worker {self.name} failed | {result}")
+        return result
+
+
+class WorkerSupervisor:
+    """
+    Runs one worker process per account and routes calls to them over pipes.
+
+    Broker modules such as MetaTrader5 hold a single connection per process, so each account
+    gets its own process that builds its trader once through a factory and then serves method
+    calls. Calls to different accounts run in parallel; calls to the same account are serialized.
+
+    Factories must be picklable (module-level callables or instances of module-level classes)
+    since workers are started with the "spawn" method by default, the only one available on Windows.
+
+    Attributes:
+        factories (dict[str, Callable]): The factory building each account's worker object.
+    """
+
+    def __init__(self, factories: dict[str, Callable[[], Any]], start_method: str = "spawn") -> None:
+        self.factories = factories
+        self._context = multiprocessing.get_context(start_method)
+        self._workers: dict[str, _Worker] = {}
+
+    def __repr__(self) -> str:
+        return str({"accounts": list(self.factories.keys())})
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+    @property
+    def accounts(self) -> list[str]:
+        return list(self.factories.keys())
+
+    def start(self) -> None:
+        """
+        Starts every worker and waits until each one has built its target.
+
+        Raises:
+            WorkerError: If any worker failed to start; the others are stopped.
+        """
+        for name, factory in self.factories.items():
+            self._workers[name] = _Worker(name, factory, self._context)
+        try:
+            for worker in self._workers.values():
+                worker.response()
+        except WorkerError:
+            self.stop()
+            raise
+        log.info(f"started {len(self._workers)} workers")
+
+    def stop(self, timeout: float = 5.) -> None:
+        """
+        Asks every worker to exit, terminating those that do not within `timeout` seconds.
+        """
+        for worker in self._workers.values():
+            try:
+                with worker.lock:
+                    worker.conn.send(STOP)
+            except (OSError, ValueError):
+                pass
+        for worker in self._workers.values():
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+            worker.conn.close()
+        self._workers = {}
+
+    def call(self, account: str, method: str, *args, **kwargs) -> Any:
+        """
+        Calls `method` on an account's worker object and returns the result.
+
+        Raises:
+            KeyError: If the account is unknown.
+            WorkerError: If the call raised in the worker or the worker died.
+        """
+        worker = self._workers[account]
+        with worker.lock:
+            worker.request(method, args, kwargs)
+            return worker.response()
+
+    def submit(self, account: str, method: str, *args, **kwargs) -> Future:
+        """
+        Like `call`, but returns immediately with a Future of the result.
+        """
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(self.call(account, method, *args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def broadcast(self, method: str, *args, accounts: list[str] = None, **kwargs) -> dict[str, Any]:
+        """
+        Calls `method` on several workers at once (all by default) and gathers the results.
+
+        The requests are all written before any response is read, so the workers run in parallel.
+        Failed calls appear in the result as `WorkerError` instances rather than raising.
+        """
+        # locks are always taken in name order so concurrent broadcasts cannot deadlock
+        workers = [self._workers[name] for name in sorted(accounts or self.accounts)]
+        for worker in workers:
+            worker.lock.acquire()
+        try:
+            for worker in workers:
+                worker.request(method, args, kwargs)
+            out = {}
+            for worker in workers:
+                try:
+                    out[worker.name] = worker.response()
+                except WorkerError as e:
+                    out[worker.name] = e
+            return out
+        finally:
+            for worker in workers:
+                worker.lock.release()
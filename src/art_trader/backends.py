@@ -0,0 +1,128 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import importlib
+import logging
+import threading
+from importlib.metadata import entry_points
+from typing import Callable, Optional, Type, Union
+
+log = logging.getLogger(__name__)
+
+# backends are entry points in this group, the built-in ones are declared in setup.py; other packages add
+# theirs the same way, e.g. in setup.cfg:
+#   [options.entry_points]
+#   art_trader.backends =
+#       mybroker = mybroker.art:backend
+ENTRY_POINT_GROUP = "art_trader.backends"
+
+
+class Backend:
+    """
+    The classes that make up one broker integration.
+
+    Attributes:
+        name (str): The registry name.
+        utils (Type[BrokerUtils]): Data access.
+        symbol_class (Type[Symbol]): Built from a ticker.
+        backtester (Type[Backtester]): The backtester using `utils` and `symbol_class`.
+        trader (Type[Trader], optional): The live trader, if the backend can trade.
+    """
+
+    def __init__(self, name: str, utils: Type, symbol_class: Type, backtester: Type, trader: Type = None,
+                 configure: Callable[..., "Backend"] = None, connect: Callable[[], None] = None) -> None:
+        self.name = name
+        self.utils = utils
+        self.symbol_class = symbol_class
+        self.backtester = backtester
+        self.trader = trader
+        self._configure = configure
+        self._connect = connect
+
+    def __repr__(self) -> str:
+        return str({"name": self.name, "utils": self.utils.__name__, "backtester": self.backtester.__name__})
+
+    def configure(self, **options) -> "Backend":
+        """
+        Returns the backend bound to backend-specific options (e.g. the data directory of `filestore`).
+
+        Raises:
+            ValueError: If options are given to a backend that takes none.
+        """
+        if not options:
+            return self
+        if self._configure is None:
+            raise ValueError(f"Backend {self.name} takes no options, got {list(options)}")
+        return self._configure(**options)
+
+    def connect(self) -> None:
+        """
+        Opens the data source in this process (e.g. attaches to the broker terminal), before any data is read.
+        Nothing to do for backends reading local data.
+
+        Raises:
+            Exception: If the data source cannot be opened.
+        """
+        if self._connect is not None:
+            self._connect()
+
+
+_registry: dict[str, Union[str, Backend]] = {}
+_lock = threading.Lock()
+
+
+def _entryPoints() -> dict:
+    eps = entry_points()
+    group = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, "select") else eps.get(ENTRY_POINT_GROUP, [])
+    return {x.name: x for x in group}
+
+
+def register(name: str, target: Union[str, Backend]) -> None:
+    """
+    Registers a backend, either directly or as a lazily imported `"module:attribute"` path.
+    """
+    with _lock:
+        _registry[name] = target
+
+
+def available() -> list[str]:
+    """Returns the names of all registered and installed backends, without importing them."""
+    with _lock:
+        names = set(_registry)
+    return sorted(names | set(_entryPoints()))
+
+
+def get(name: str, **options) -> Backend:
+    """
+    Returns a backend, importing its module on first use.
+
+    Registered backends take precedence over installed entry points of the same name.
+
+    Args:
+        name (str): The backend name, see `available`.
+        **options: Passed to `Backend.configure`.
+
+    Raises:
+        KeyError: If no backend has this name.
+    """
+    with _lock:
+        target: Optional[Union[str, Backend]] = _registry.get(name)
+    if target is None:
+        ep = _entryPoints().get(name)
+        if ep is None:
+            raise KeyError(f"Unknown backend {name}, available: {available()}")
+        backend = ep.load()
+    elif isinstance(target, str):
+        module, _, attr = target.partition(":")
+        try:
+            backend = getattr(importlib.import_module(module), attr)
+        except ImportError as e:
+            raise ImportError(f"Backend {name} is not usable here | {e}")
+    else:
+        backend = target
+
+    if not isinstance(backend, Backend):
+        raise TypeError(f"Backend {name} resolved to {type(backend)}, expected Backend")
+    with _lock:
+        _registry[name] = backend
+    return backend.configure(**options)
@@ -0,0 +1,457 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import argparse
+import csv
+import importlib
+import itertools
+import json
+import logging
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+from typing import Any, Callable, Iterator, Optional
+
+log = logging.getLogger(__name__)
+
+SINGLE = "single"
+POOL = "pool"
+SWEEP = "sweep"
+MODES = (SINGLE, POOL, SWEEP)
+
+CSV = "csv"
+JSON = "json"
+PARQUET = "parquet"
+FORMATS = (CSV, JSON, PARQUET)
+
+LEDGER_COLUMNS = ["config", "ticker", "day", "is_long", "volume", "TP", "SL", "trail", "exit_kind", "entry_time",
+                  "entry_price", "exit_time", "exit_price", "profit", "error", "skipped"]
+
+EXAMPLE = """
+example config (TOML, or the same structure in JSON):
+
+    name = "trend"
+    tickers = ["EURUSD", "GBPUSD"]
+    start = 2022-01-03
+    end = 2022-07-01
+
+    [strategy]
+    class = "strategies.previous_day_trend_strategy:PreviousDayTrendStrategy"
+    params = {}
+
+    [backend]
+    name = "filestore"            # mt5, synthetic, filestore or an installed plugin
+    root = "/data/rates"          # backend options, for mt5: login, password, server, path
+
+    [account]
+    balance = 10000
+    currency = "USD"
+
+    [execution]
+    mode = "pool"                 # single, pool or sweep
+    workers = 8
+    symbols_per_job = 10
+    days_per_job = 60
+    cache = "cells.db"            # optional ResultCache file
+    memory_mb = 4096              # optional memory budget per backtest, see MemoryBudget
+    prefetch = 32                 # optional cells of price action fetched ahead of the simulation
+    share = true                  # optional, pool workers read one shared copy of the rates, see shareRates
+    share_days = 7                # days of rates shared before start, for the strategies' lookback
+
+    [sweep]                       # mode = "sweep": every combination of these strategy params
+    tp = [0.01, 0.02]
+
+    [output]
+    dir = "out/trend"
+    formats = ["csv", "json"]
+"""
+
+
+def loadConfig(path: str) -> dict:
+    """
+    Reads a run configuration from a `.toml` or `.json` file.
+
+    Raises:
+        Exception: If the file cannot be read or lacks a required key.
+    """
+    try:
+        if path.endswith(".toml"):
+            import tomllib
+            with open(path, "rb") as f:
+                config = tomllib.load(f)
+        else:
+            with open(path) as f:
+                config = json.load(f)
+    except Exception as e:
+        raise Exception(f"Failed to read config {path} | {e}")
+
+    for key in ("tickers", "start", "end", "strategy"):
+        if key not in config:
+            raise Exception(f"Config {path} is missing {key!r}")
+    for key in ("start", "end"):
+        if isinstance(config[key], str):
+            config[key] = date.fromisoformat(config[key])
+    if isinstance(config["strategy"], str):
+        config["strategy"] = {"class": config["strategy"]}
+    if isinstance(config.get("backend"), str):
+        config["backend"] = {"name": config["backend"]}
+    config.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    config.setdefault("backend", {"name": "mt5"})
+    config.setdefault("account", {})
+    config.setdefault("execution", {})
+    config.setdefault("output", {})
+    return config
+
+
+def importObject(path: str) -> Any:
+    """Imports `"package.module:Name"` (or `"package.module.Name"`)."""
+    module, _, attr = path.rpartition(":") if ":" in path else path.rpartition(".")
+    try:
+        return getattr(importlib.import_module(module), attr)
+    except (ImportError, AttributeError, ValueError) as e:
+        raise Exception(f"Cannot import {path} | {e}")
+
+
+def sweepGrid(config: dict) -> list[dict]:
+    """
+    Returns the strategy parameters of each run: the base params updated with every combination of the
+    `sweep` values in sweep mode, only the base params otherwise.
+    """
+    base = config["strategy"].get("params", {})
+    sweep = config.get("sweep", {})
+    if config["execution"].get("mode", SINGLE) != SWEEP or not sweep:
+        return [dict(base)]
+    keys = sorted(sweep)
+    return [{**base, **dict(zip(keys, values))} for values in itertools.product(*(sweep[k] for k in keys))]
+
+
+def _backend(spec: dict):
+    from art_trader import backends
+
+    options = {k: v for k, v in spec.items() if k != "name"}
+    return backends.get(spec["name"], **options)
+
+
+def runShard(config: dict, params: dict, tickers: list[str], start: date, end: date, ledger_path: str) -> tuple:
+    """
+    Runs one backtest of the config's strategy with `params` over a block of symbols and dates.
+
+    The ledger is streamed to `ledger_path` in pickled batches (see `readLedger`), one spilled batch at a
+    time with a memory budget, rather than returned: it never has to fit in memory, here or in the parent.
+
+    The strategy reads its data through the config's backend: its `broker_utils` is replaced by the backend's.
+    Module-level so it can run in pool workers, which rebuild (and connect) the backend and strategy from
+    the config.
+
+    Returns:
+        tuple: The daily profit frame and the ledger path of the shard.
+
+    Raises:
+        Exception: If the backend cannot be connected, or every cell of the shard failed (e.g. no data).
+    """
+    from art_trader.abstract import shm
+    from art_trader.abstract.memo import ResultCache
+    from art_trader.abstract.memory import LEDGER_BATCH, Ledger, MemoryBudget
+    from art_trader.abstract.testing import BacktestAccount
+
+    backend = _backend(config["backend"])
+    backend.connect()
+    shm.serve(backend.utils)
+    strategy = importObject(config["strategy"]["class"])(**params)
+    if hasattr(strategy, "broker_utils"):
+        strategy.broker_utils = backend.utils
+
+    account = config["account"]
+    cache = config["execution"].get("cache")
+    memory_mb = config["execution"].get("memory_mb")
+    bt = backend.backtester(strategy, tickers, start, end,
+                            BacktestAccount(account.get("balance", 10_000.), account.get("currency", "USD")),
+                            result_cache=ResultCache(cache) if cache else None,
+                            memory_budget=MemoryBudget(int(memory_mb * 2 ** 20)) if memory_mb else None,
+                            prefetch=config["execution"].get("prefetch", 0))
+    cells, failed, error = 0, 0, None
+    try:
+        result = bt.run_all_single_thread()
+        if isinstance(bt.ledger, Ledger):
+            batches = bt.ledger.batches()
+        else:
+            batches = (bt.ledger[i:i + LEDGER_BATCH] for i in range(0, len(bt.ledger), LEDGER_BATCH))
+        with open(ledger_path, "wb") as f:
+            for batch in batches:
+                pickle.dump(batch, f, protocol=pickle.HIGHEST_PROTOCOL)
+                cells += len(batch)
+                failed += sum("error" in x for x in batch)
+                error = error or next((x["error"] for x in batch if "error" in x), None)
+    finally:
+        if bt.result_cache is not None:
+            bt.result_cache.close()
+        if bt.memory_budget is not None:
+            bt.ledger.clear()  # written out, nothing to keep
+            bt.memory_budget.close()
+    if cells and failed == cells:
+        raise Exception(f"All {cells} cells failed, e.g. {error}")
+    return result[["profit"]], ledger_path
+
+
+def readLedger(path: str) -> Iterator[list[dict]]:
+    """Yields the batches of ledger cells written by `runShard`."""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def shareRates(config: dict):
+    """
+    Fetches the rates of every ticker of a config once and publishes them in shared memory, so pool workers
+    attached to it slice one copy instead of each fetching (and holding) its own, see `SharedRates`.
+
+    The run is covered from `share_days` before its start; workers fetch whatever lies outside. Only the
+    backend's `RESAMPLE_FROM` timeframe is published when it builds the others from it, hourly and daily
+    bars otherwise.
+
+    Returns:
+        SharedRates: The published block, to close and unlink once the workers are done.
+
+    Raises:
+        Exception: If any of the rates cannot be fetched.
+    """
+    from datetime import timedelta
+
+    from art_trader.abstract.shm import SharedRates
+
+    backend = _backend(config["backend"])
+    backend.connect()
+    utils = backend.utils
+    timeframes = [utils.RESAMPLE_FROM] if utils.RESAMPLE_FROM is not None else [utils.HOURLY_TIMEFRAME,
+                                                                                  utils.DAILY_TIMEFRAME]
+    start = config["start"] - timedelta(days=config["execution"].get("share_days", 7))
+    return SharedRates.fromBroker(utils, [backend.symbol_class(x) for x in config["tickers"]], timeframes, start,
+                                  config["end"] + timedelta(days=1))
+
+
+class _LedgerWriter:
+    """Appends ledger cells to `ledger.csv` and/or `ledger.jsonl` as shards complete."""
+
+    def __init__(self, directory: str, formats: list[str]) -> None:
+        self._files = []
+        self._csv = self._json = None
+        if CSV in formats:
+            f = open(os.path.join(directory, "ledger.csv"), "w", newline="")
+            self._csv = csv.DictWriter(f, LEDGER_COLUMNS, extrasaction="ignore")
+            self._csv.writeheader()
+            self._files.append(f)
+        if JSON in formats:
+            self._json = open(os.path.join(directory, "ledger.jsonl"), "w")
+            self._files.append(self._json)
+
+    def write(self, config: str, cells: list[dict]) -> None:
+        for cell in cells:
+            row = {**cell, "config": config}
+            if self._csv is not None:
+                self._csv.writerow(row)
+            if self._json is not None:
+                self._json.write(json.dumps(row, default=str) + "\n")
+        for f in self._files:
+            f.flush()
+
+    def close(self) -> None:
+        for f in self._files:
+            f.close()
+
+
+def writeTable(df, path: str, formats: list[str]) -> None:
+    """
+    Writes a DataFrame to `path` with the extension of each format.
+
+    Raises:
+        Exception: If parquet is requested without a parquet engine installed.
+    """
+    if CSV in formats:
+        df.to_csv(f"{path}.csv", index=False)
+    if JSON in formats:
+        df.to_json(f"{path}.json", orient="records", date_format="iso", indent=1)
+    if PARQUET in formats:
+        try:
+            df.to_parquet(f"{path}.parquet", index=False)
+        except ImportError as e:
+            raise Exception(f"Parquet output needs pyarrow or fastparquet | {e}")
+
+
+def _summary(name: str, params: dict, equity, initial_balance: float) -> dict:
+    drawdown = (equity.balance.cummax() - equity.balance).max()
+    return {"config": name, **params, "days": len(equity) - 1, "profit": equity.profit.sum(),
+            "final_balance": equity.balance.iloc[-1], "max_drawdown": drawdown,
+            "return": equity.balance.iloc[-1] / initial_balance - 1}
+
+
+def runBacktest(config: dict, workers: int = None, progress: Callable[[str], None] = None) -> dict:
+    """
+    Runs every backtest of a config and writes the results to its output directory.
+
+    In `single` mode the backtest runs in this process. In `pool` and `sweep` mode it is split into shards of
+    `symbols_per_job` symbols and `days_per_job` market days that run on a process pool; sweep mode runs
+    one configuration per combination of the `sweep` parameters; with `share`, the workers read the rates
+    from one copy in shared memory (see `shareRates`). Ledger cells are written as shards complete; the
+    equity curves and a summary per configuration are written at the end.
+
+    Returns:
+        dict: The summary row of each configuration, by name.
+    """
+    from pandas import DataFrame, concat
+
+    from art_trader.abstract.spool import dateBlocks, merge
+
+    execution, output = config["execution"], config["output"]
+    mode = execution.get("mode", SINGLE)
+    if mode not in MODES:
+        raise Exception(f"Unknown mode {mode}, expected one of {MODES}")
+    formats = output.get("formats", [CSV])
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise Exception(f"Unknown output formats {sorted(unknown)}, expected some of {FORMATS}")
+    directory = output.get("dir", os.path.join("out", config["name"]))
+    os.makedirs(directory, exist_ok=True)
+    progress = progress or log.info
+
+    grid = sweepGrid(config)
+    names = [config["name"]] if len(grid) == 1 else [f"{config['name']}-{i:04d}" for i in range(len(grid))]
+    tickers = list(config["tickers"])
+    symbols_per_job = execution.get("symbols_per_job") or len(tickers)
+    blocks = dateBlocks(config["start"], config["end"], execution.get("days_per_job"))
+    if mode == SINGLE:
+        symbols_per_job, blocks = len(tickers), [(config["start"], config["end"])]
+
+    shards = [(name, params, tickers[s:s + symbols_per_job], start, end)
+              for name, params in zip(names, grid) for start, end in blocks
+              for s in range(0, len(tickers), symbols_per_job)]
+    # each shard streams its ledger to a file of its own, appended to the output as it completes
+    shards = [(*shard, os.path.join(directory, f".ledger-{i:05d}.pkl")) for i, shard in enumerate(shards)]
+    initial_balance = config["account"].get("balance", 10_000.)
+    progress(f"{config['name']}: {len(grid)} configurations, {len(shards)} shards, mode {mode}")
+
+    parts: dict[str, list] = {name: [] for name in names}
+    ledger = _LedgerWriter(directory, formats)
+    started = time.time()
+    try:
+        def collect(shard: tuple, result: tuple) -> None:
+            parts[shard[0]].append(result[0])
+            for batch in readLedger(result[1]):
+                ledger.write(shard[0], batch)
+            os.remove(result[1])
+            done = sum(len(x) for x in parts.values())
+            progress(f"{done}/{len(shards)} shards done ({time.time() - started:.0f}s)")
+
+        workers = workers or execution.get("workers")
+        if mode == SINGLE or workers == 1:
+            for shard in shards:
+                collect(shard, runShard(config, *shard[1:]))
+        else:
+            from art_trader.abstract import shm
+
+            shared = shareRates(config) if execution.get("share") else None
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=shm.attach if shared else None,
+                                         initargs=(shared.manifest,) if shared else ()) as pool:
+                    futures = {pool.submit(runShard, config, *shard[1:]): shard for shard in shards}
+                    for future in as_completed(futures):
+                        shard = futures[future]
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            raise Exception(f"Shard {shard[0]} {shard[3]}..{shard[4]} {shard[2][:3]} failed | {e}")
+                        collect(shard, result)
+            finally:
+                if shared is not None:
+                    shared.close()
+                    shared.unlink()
+    finally:
+        ledger.close()
+        for shard in shards:
+            if os.path.exists(shard[-1]):
+                os.remove(shard[-1])
+
+    equities, summary = [], {}
+    for name, params in zip(names, grid):
+        equity = merge(parts[name], initial_balance)
+        summary[name] = _summary(name, params, equity, initial_balance)
+        equity = equity.reset_index()
+        equity.insert(0, "config", name)
+        equities.append(equity)
+    writeTable(concat(equities, ignore_index=True), os.path.join(directory, "equity"), formats)
+    writeTable(DataFrame(list(summary.values())), os.path.join(directory, "summary"), formats)
+    progress(f"{config['name']}: results written to {directory}")
+    return summary
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="art-trader", description="ART_Trader command line")
+    parser.add_argument("-v", "--verbose", action="store_true", help="log debug messages")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backtest = commands.add_parser("backtest", help="run backtests from a config file", epilog=EXAMPLE,
+                                   formatter_class=argparse.RawDescriptionHelpFormatter)
+    backtest.add_argument("config", nargs="+", help="TOML or JSON config files, run one after the other")
+    backtest.add_argument("--mode", choices=MODES, help="override the execution mode")
+    backtest.add_argument("--workers", type=int, help="override the number of pool processes")
+    backtest.add_argument("--output", help="override the output directory (one config only)")
+    backtest.add_argument("--format", action="append", choices=FORMATS, dest="formats",
+                          help="override the output formats, may be repeated")
+    backtest.add_argument("--backend", help="override the backend name, keeping the [backend] options")
+    backtest.add_argument("--path", action="append", default=[],
+                          help="add a directory to the import path, e.g. where strategies live")
+
+    commands.add_parser("backends", help="list the available data backends")
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    """
+    Entry point of the `art-trader` command, e.g. `python -m art_trader backtest config.toml`.
+
+    Returns:
+        int: The exit status, 0 on success.
+    """
+    args = _parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    if args.command == "backends":
+        from art_trader import backends
+
+        print("\n".join(backends.available()))
+        return 0
+
+    if args.output and len(args.config) > 1:
+        print("--output needs a single config", file=sys.stderr)
+        return 2
+    # pool workers inherit the import path
+    for path in args.path:
+        sys.path.insert(0, os.path.abspath(path))
+
+    status = 0
+    for path in args.config:
+        try:
+            config = loadConfig(path)
+            if args.mode:
+                config["execution"]["mode"] = args.mode
+            if args.output:
+                config["output"]["dir"] = args.output
+            if args.formats:
+                config["output"]["formats"] = args.formats
+            if args.backend:
+                config["backend"]["name"] = args.backend
+            runBacktest(config, workers=args.workers)
+        except Exception as e:
+            log.error(f"backtest {path} failed | {e}")
+            status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
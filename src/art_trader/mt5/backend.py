@@ -0,0 +1,35 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+from functools import partial
+
+from art_trader.backends import Backend
+from art_trader.mt5.common import MT5Symbol, MT5Utils, mt5
+from art_trader.mt5.testing import MT5Backtester
+from art_trader.mt5.trading import MT5Trader
+
+
+def initialize(login: int = None, password: str = None, server: str = None, path: str = None,
+               timeout: int = None) -> None:
+    """
+    Attaches this process to a terminal, by default the running one with its current account.
+
+    Raises:
+        Exception: If the terminal cannot be initialized.
+    """
+    kwargs = {"login": login, "password": password, "server": server, "path": path, "timeout": timeout}
+    kwargs = {k: v for k, v in kwargs.items() if v is not None}
+    if not mt5.initialize(**kwargs):
+        raise Exception(f"initialize() failed for {login}@{server} | {mt5.last_error()}")
+
+
+def configure(login: int = None, password: str = None, server: str = None, path: str = None,
+              timeout: int = None) -> Backend:
+    """
+    Returns the MetaTrader5 backend connecting to the given terminal and account, see `initialize`.
+    """
+    connect = partial(initialize, login, password, server, path, timeout)
+    return Backend("mt5", MT5Utils, MT5Symbol, MT5Backtester, MT5Trader, configure=configure, connect=connect)
+
+
+backend = Backend("mt5", MT5Utils, MT5Symbol, MT5Backtester, MT5Trader, configure=configure, connect=initialize)
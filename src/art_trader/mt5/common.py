@@ -2,26 +2,40 @@ __copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
 __version__ = "0.0-SNAPSHOT"
 
 import logging
+from datetime import datetime
 from zoneinfo import ZoneInfo
 
-import MetaTrader5 as mt5
 import numpy as np
 
 from art_trader.abstract.common import Strategy, Symbol, SymbolInfo
-from art_trader.abstract.utils import BrokerUtils, adjust_tz
+from art_trader.abstract.utils import BrokerUtils, LazyModule, adjust_tz
 
 log = logging.getLogger(__name__)
 
 MT5_TZ = ZoneInfo("EET")
 
+# imported on first use, so the MT5 classes can be imported (e.g. for backtests on cached data)
+# without paying for, or even having, the terminal package. The terminal connection is
+# process-global and not thread-safe: every call holds the broker lock, so metadata and FX
+# lookups cannot run while e.g. a Prefetcher thread is copying rates
+mt5 = LazyModule("MetaTrader5", lock=BrokerUtils.broker_lock)
+
 
 class MT5Utils(BrokerUtils):
 
-    M10_TIMEFRAME = mt5.TIMEFRAME_M10
-    HOURLY_TIMEFRAME = mt5.TIMEFRAME_H1
-    DAILY_TIMEFRAME = mt5.TIMEFRAME_D1
-    WEEKLY_TIMEFRAME = mt5.TIMEFRAME_W1
-    MONTHLY_TIMEFRAME = mt5.TIMEFRAME_MN1
+    # values of mt5.TIMEFRAME_M10, _H1, _D1, _W1 and _MN1
+    M10_TIMEFRAME = 10
+    HOURLY_TIMEFRAME = 16385
+    DAILY_TIMEFRAME = 16408
+    WEEKLY_TIMEFRAME = 32769
+    MONTHLY_TIMEFRAME = 49153
+
+    # bars are stamped in server time (MT5_TZ), so resampled periods already follow the server session
+    RATES_TZ = None
+
+    @classmethod
+    def now(cls) -> datetime:
+        return adjust_tz(datetime.now(MT5_TZ).replace(tzinfo=None))
 
     def exists(symbol: Symbol) -> bool:
         if mt5.symbol_info(symbol.info.ticker) == None:
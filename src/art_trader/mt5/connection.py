@@ -0,0 +1,89 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+from typing import Iterable
+
+from art_trader.abstract.connection import ConnectionSupervisor
+from art_trader.abstract.reconcile import BookEvent, Reconciler
+from art_trader.mt5.common import MT5Utils, mt5
+
+log = logging.getLogger(__name__)
+
+
+class MT5ConnectionSupervisor(ConnectionSupervisor):
+    """
+    Subclass of ConnectionSupervisor for a MetaTrader5 terminal.
+
+    The heartbeat is `mt5.terminal_info()`, answered by the local terminal, which also tells
+    whether it is connected to the trade server. After every reconnect, the symbol registry is
+    restored in Market Watch with one `mt5.symbols_get()`, and the reconciler, if any, reloads the
+    positions and pending orders with one bulk call each; the changes that happened while the
+    session was down are kept in `missed_events`.
+
+    `install` routes every `mt5.*` call of the package (traders, utils, reconcilers...) through
+    the supervisor. Heartbeats, reconnects and rehydration hold `MT5Utils.broker_lock`, like every
+    other call into the terminal.
+
+    Attributes:
+        symbols (set[str]): The symbol registry: tickers kept selected in Market Watch.
+        reconciler (Reconciler, optional): The account book to rehydrate.
+        missed_events (list[BookEvent]): The book changes found by the last rehydration.
+    """
+
+    def __init__(self, login: int, password: str, server: str, path: str = None, symbols: Iterable[str] = (),
+                 reconciler: Reconciler = None, **kwargs) -> None:
+        kwargs.setdefault("lock", MT5Utils.broker_lock)
+        super().__init__(**kwargs)
+        self.login = login
+        self._kwargs = {"login": login, "password": password, "server": server}
+        if path is not None:
+            self._kwargs["path"] = path
+        self.symbols = set(symbols)
+        self.reconciler = reconciler
+        self.missed_events: list[BookEvent] = []
+        self.on_reconnect("symbols", self.rehydrateSymbols)
+        if reconciler is not None:
+            self.on_reconnect("book", self.rehydrateBook)
+
+    def __repr__(self) -> str:
+        return str({"login": self.login, "state": self.state, "symbols": len(self.symbols)})
+
+    def connect(self) -> None:
+        if not mt5.initialize(**self._kwargs):
+            raise Exception(f"initialize() failed for {self.login} | {mt5.last_error()}")
+
+    def heartbeat(self) -> bool:
+        info = mt5.terminal_info()
+        return info is not None and bool(info.connected)
+
+    def disconnect(self) -> None:
+        mt5.shutdown()
+
+    def install(self) -> None:
+        """Routes every `mt5.*` function call through `call`."""
+        mt5.intercept(self.wrap)
+
+    def uninstall(self) -> None:
+        mt5.intercept(None)
+
+    def rehydrateSymbols(self) -> None:
+        """Selects the registered symbols that are no longer visible in Market Watch."""
+        if not self.symbols:
+            return
+        available = mt5.symbols_get()
+        if available is None:
+            raise Exception(f"symbols_get failed | {mt5.last_error()}")
+        visible = {x.name for x in available if x.visible}
+        known = {x.name for x in available}
+        for ticker in sorted(self.symbols - visible):
+            if ticker not in known:
+                log.warning(f"{ticker} is not offered by {self._kwargs['server']}")
+            elif not mt5.symbol_select(ticker, True):
+                log.warning(f"could not select {ticker} in Market Watch")
+
+    def rehydrateBook(self) -> None:
+        """Reloads the positions and pending orders, keeping what changed while disconnected."""
+        self.missed_events = self.reconciler.reconcile()
+        if self.missed_events:
+            log.info(f"{len(self.missed_events)} book changes while disconnected")
@@ -0,0 +1,117 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+from typing import Optional
+
+from art_trader.abstract.dispatch import DONE, REJECT, REQUOTE, RETRY, OrderDispatcher
+from art_trader.abstract.metrics import METRICS
+from art_trader.mt5.common import mt5
+
+log = logging.getLogger(__name__)
+
+# MT5 return codes, hardcoded so importing this module does not load MetaTrader5
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_PLACED = 10008
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_DONE_PARTIAL = 10010
+TRADE_RETCODE_TIMEOUT = 10012
+TRADE_RETCODE_PRICE_CHANGED = 10020
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_TOO_MANY_REQUESTS = 10024
+TRADE_RETCODE_LOCKED = 10028
+TRADE_RETCODE_CONNECTION = 10031
+
+# return codes that mean the order reached the broker
+DONE_RETCODES = {
+    TRADE_RETCODE_DONE,
+    TRADE_RETCODE_DONE_PARTIAL,
+    TRADE_RETCODE_PLACED,
+}
+
+# return codes that can succeed once the order is repriced
+REQUOTE_RETCODES = {
+    TRADE_RETCODE_REQUOTE,
+    TRADE_RETCODE_PRICE_CHANGED,
+    TRADE_RETCODE_PRICE_OFF,
+}
+
+# return codes that can succeed when sent again unchanged
+RETRY_RETCODES = {
+    TRADE_RETCODE_TIMEOUT,
+    TRADE_RETCODE_CONNECTION,
+    TRADE_RETCODE_TOO_MANY_REQUESTS,
+    TRADE_RETCODE_LOCKED,
+}
+
+
+class MT5OrderDispatcher(OrderDispatcher):
+    """
+    Subclass of OrderDispatcher that sends orders through `mt5.order_send`.
+
+    Requotes, price changes and off-quotes are retried with the price refreshed from the
+    latest tick; timeouts, connection errors and broker throttling are retried unchanged;
+    every other return code is a hard rejection. `order_send` returning None leaves the outcome
+    unknown, so the book is checked with `confirm` before anything is resent.
+    """
+
+    def _send(self, order: dict) -> tuple[int, str]:
+        with METRICS.histogram("order_send_seconds", help="mt5.order_send round trip").time():
+            result = mt5.order_send(order)
+        if result is None:
+            code, comment = mt5.last_error()
+            raise Exception(f"order_send returned None: {code} {comment}")
+        METRICS.counter("order_send_total", {"retcode": result.retcode}).inc()
+        log.debug(result._asdict())
+        return result.retcode, result.comment
+
+    def confirm(self, order: dict) -> Optional[bool]:
+        """
+        Looks the order up in the terminal's book: a close is confirmed by its position being gone,
+        a removal by its order being gone, and an opening order by an open position (market) or
+        pending order with the same symbol, type, volume, magic number and comment. An older
+        identical order is taken for it, which errs on the side of not sending twice.
+        """
+        action = order.get("action")
+        if order.get("position") is not None:
+            positions = mt5.positions_get(ticket=order["position"])
+            return None if positions is None else len(positions) == 0
+        if action == mt5.TRADE_ACTION_REMOVE:
+            orders = mt5.orders_get(ticket=order["order"])
+            return None if orders is None else len(orders) == 0
+        if action == mt5.TRADE_ACTION_PENDING:
+            book = mt5.orders_get(symbol=order["symbol"])
+            volume = "volume_initial"
+        elif action == mt5.TRADE_ACTION_DEAL:
+            book = mt5.positions_get(symbol=order["symbol"])
+            volume = "volume"
+        else:
+            return None
+        if book is None:
+            return None
+        return any(x.type == order.get("type") and x.magic == order.get("magic") and x.comment == order.get("comment")
+                   and getattr(x, volume) == order.get("volume") for x in book)
+
+    def classify(self, retcode: int) -> int:
+        if retcode in DONE_RETCODES:
+            return DONE
+        if retcode in REQUOTE_RETCODES:
+            return REQUOTE
+        if retcode in RETRY_RETCODES:
+            return RETRY
+        return REJECT
+
+    def refresh(self, order: dict) -> dict:
+        """
+        Reprices market orders at the current ask (buys) or bid (sells).
+
+        Pending orders keep their price since it is the strategy's entry level.
+        """
+        if order.get("action") != mt5.TRADE_ACTION_DEAL:
+            return order
+        tick = mt5.symbol_info_tick(order["symbol"])
+        if tick is None:
+            return order
+        out = dict(order)
+        out["price"] = tick.ask if order["type"] == mt5.ORDER_TYPE_BUY else tick.bid
+        return out
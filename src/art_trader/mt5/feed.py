@@ -0,0 +1,30 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+from typing import Type
+
+import numpy as np
+
+from art_trader.abstract.common import Symbol
+from art_trader.abstract.feed import BarFeed
+from art_trader.mt5.common import MT5Utils, mt5
+
+log = logging.getLogger(__name__)
+
+
+class MT5BarFeed(BarFeed):
+    """
+    Subclass of BarFeed that reads the latest bars by position with `mt5.copy_rates_from_pos`,
+    so a poll does not depend on the server clock.
+    """
+
+    def __init__(self, lookback: dict[int, int], symbols: list[Symbol], poll_bars: int = 3,
+                 broker_utils: Type[MT5Utils] = MT5Utils) -> None:
+        super().__init__(broker_utils, lookback, symbols, poll_bars)
+
+    def latest(self, symbol: Symbol, timeframe: int, count: int) -> np.ndarray:
+        rates = mt5.copy_rates_from_pos(symbol.info.ticker, timeframe, 0, count)
+        if rates is None:
+            raise Exception(f"copy_rates_from_pos failed | {mt5.last_error()}")
+        return self.broker_utils.formatRates(rates)
@@ -0,0 +1,29 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+from datetime import datetime
+
+from art_trader.abstract.history import HistorySync
+from art_trader.mt5.common import mt5
+
+log = logging.getLogger(__name__)
+
+
+class MT5HistorySync(HistorySync):
+    """
+    Subclass of HistorySync that reads the account history with `mt5.history_orders_get`
+    and `mt5.history_deals_get` over all symbols at once.
+    """
+
+    def _fetch_orders(self, start: datetime, end: datetime):
+        orders = mt5.history_orders_get(start, end)
+        if orders is None:
+            raise Exception(f"history_orders_get failed | {mt5.last_error()}")
+        return orders
+
+    def _fetch_deals(self, start: datetime, end: datetime):
+        deals = mt5.history_deals_get(start, end)
+        if deals is None:
+            raise Exception(f"history_deals_get failed | {mt5.last_error()}")
+        return deals
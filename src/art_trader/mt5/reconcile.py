@@ -0,0 +1,53 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+
+import numpy as np
+
+from art_trader.abstract.reconcile import CLOSED, SL_HIT, TP_HIT, Reconciler
+from art_trader.mt5.common import mt5
+
+log = logging.getLogger(__name__)
+
+# values of mt5.DEAL_ENTRY_OUT, _OUT_BY, mt5.DEAL_REASON_SL and _TP
+DEAL_ENTRY_OUT = 1
+DEAL_ENTRY_OUT_BY = 3
+DEAL_REASON_SL = 4
+DEAL_REASON_TP = 5
+
+
+class MT5Reconciler(Reconciler):
+    """
+    Subclass of Reconciler that reads the book with one `mt5.positions_get()` and one
+    `mt5.orders_get()` call for the whole account.
+
+    Why a position closed is read from the `reason` of its closing deal, with one
+    `mt5.history_deals_get(position=...)` call per closed position.
+    """
+
+    def _fetch_positions(self):
+        positions = mt5.positions_get()
+        if positions is None:
+            raise Exception(f"positions_get failed | {mt5.last_error()}")
+        return positions
+
+    def _fetch_orders(self):
+        orders = mt5.orders_get()
+        if orders is None:
+            raise Exception(f"orders_get failed | {mt5.last_error()}")
+        return orders
+
+    def _fetch_exit_kinds(self, refs: np.ndarray) -> dict[int, str]:
+        out = {}
+        for ref in refs.tolist():
+            deals = mt5.history_deals_get(position=ref)
+            if deals is None:
+                log.warning(f"history_deals_get failed for position {ref} | {mt5.last_error()}")
+                continue
+            exits = [x for x in deals if x.entry in (DEAL_ENTRY_OUT, DEAL_ENTRY_OUT_BY)]
+            if not exits:
+                continue
+            reason = max(exits, key=lambda x: x.time_msc).reason
+            out[ref] = SL_HIT if reason == DEAL_REASON_SL else TP_HIT if reason == DEAL_REASON_TP else CLOSED
+        return out
@@ -0,0 +1,33 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from art_trader.abstract.ticks import TICK_DTYPE, TickSource
+from art_trader.mt5.common import mt5
+
+log = logging.getLogger(__name__)
+
+
+class MT5TickSource(TickSource):
+    """
+    Subclass of TickSource reading fixed-size batches with `mt5.copy_ticks_from`.
+
+    `copy_ticks_from` takes a start time in whole seconds, so each batch may begin up to one
+    second before the cursor; `TickSource.chunks` drops the ticks it has already delivered, and
+    reads a larger batch when a whole one falls before the cursor.
+    """
+
+    def _read(self, ticker: str, start_msc: int, count: int) -> np.ndarray:
+        start = datetime.fromtimestamp(start_msc // 1000, tz=ZoneInfo("UTC"))
+        ticks = mt5.copy_ticks_from(ticker, start, count, mt5.COPY_TICKS_ALL)
+        if ticks is None:
+            raise Exception(f"copy_ticks_from failed for {ticker} | {mt5.last_error()}")
+        out = np.empty(len(ticks), dtype=TICK_DTYPE)
+        for name in TICK_DTYPE.names:
+            out[name] = ticks[name]
+        return out
@@ -2,12 +2,19 @@ __copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
 __version__ = "0.0-SNAPSHOT"
 
 import logging
+import time
 from datetime import datetime
+from typing import Optional
 
-from abstract.common import Account
-from abstract.trading import Order, Trader
+import numpy as np
 
-from .common import MT5Symbol, MT5Utils, mt5
+from art_trader.abstract.common import Account
+from art_trader.abstract.metrics import METRICS
+from art_trader.abstract.trading import Order, Trader
+
+from .common import MT5Symbol, MT5SymbolInfo, MT5Utils, mt5
+from .dispatch import MT5OrderDispatcher
+from .history import MT5HistorySync
 
 log = logging.getLogger(__name__)
 
@@ -66,40 +73,60 @@ class MT5Order(Order):
 class MT5Trader(Trader):
     """
     Subclass of Trader designed for interfacing with the MT5 trading platform.
+
+    Set `history` to an MT5HistorySync to answer closed-order queries from a local store
+    that is synced incrementally instead of re-downloading the whole window.
+
+    Orders are sent through `dispatcher`, an MT5OrderDispatcher created on the first send unless
+    one is set, so every order (including those of a LiveScheduler or a TerminalWorker) is rate
+    limited, deduplicated and retried only when it is safe to. A send waits at most `send_timeout`
+    seconds for the outcome of its order.
+
+    `warmup` selects every symbol in the terminal's Market Watch, so ticks are served from the
+    terminal's local tick stream, and snapshots the last tick of each symbol in `ticks`. Orders are
+    priced from the snapshot while it is at most `tick_ttl` seconds old, and from a new tick, which
+    replaces it, otherwise.
     """
 
     symbol_class = MT5Symbol
     brokerUtil = MT5Utils
+    history: MT5HistorySync = None
+    ticks: dict = None  # ticker -> (time.monotonic() of the snapshot, tick)
+    tick_ttl: float = 1.
+    dispatcher: MT5OrderDispatcher = None
+    send_timeout: float = 30.
 
     #############################
     # Trade execution functions #
 
-    def send(self, order: dict) -> bool:
+    def send(self, order: dict, priority: int = 0) -> bool:
         """
-        Sends an order to the MT5 trading platform.
+        Sends an order to the MT5 trading platform through `dispatcher` and waits for its outcome.
 
         Args:
             order (dict): The order parameters in dictionary form.
+            priority (int, optional): Lower values are sent first.
 
         Returns:
-            bool: True if the order was successfully sent, False otherwise.
-        """
-        result = mt5.order_send(order)
-        if result.retcode == mt5.TRADE_RETCODE_DONE:
-            log.info(
-                f"order_send successful for {result.request.symbol}")
-            log.debug(result._asdict())
-            return True
-        else:
-            log.error(
-                f"order_send failed for {result.request.symbol}: {result.comment}")
-            log.debug(result._asdict())
-            return False
+            bool: True if the order was successfully sent, False otherwise (including duplicates).
+
+        Raises:
+            Exception: If the order has no outcome within `send_timeout` seconds. It may still be sent.
+        """
+        if self.dispatcher is None:
+            self.dispatcher = MT5OrderDispatcher()
+        self.dispatcher.start()
+        record = self.dispatcher.submit(order, priority)
+        sent = record.wait(self.send_timeout)
+        if record.outcome is None:
+            raise Exception(f"no outcome for {order.get('symbol')} order after {self.send_timeout}s, "
+                            f"it is still queued: {record.key}")
+        return sent
 
     ##############################
     # Trade generation functions #
 
-    def trade(self, symbol: MT5Symbol, day: None = None) -> dict:
+    def trade(self, symbol: MT5Symbol, day: None = None) -> Optional[dict]:
         """
         Generates a trade for the given symbol.
 
@@ -108,33 +135,47 @@ class MT5Trader(Trader):
             day (None, optional): Should always be None for live trading.
 
         Returns:
-            dict: The trade order in dictionary form.
+            dict: The trade order in dictionary form, or None if the strategy returned no trade.
         """
         if day is not None:
             raise ValueError(
                 "Parameter 'day' should not be initialised for live trading.")
 
-        trade = super().trade(symbol, day=None)
+        with METRICS.histogram("strategy_eval_seconds", help="Strategy.strat duration").time():
+            trade = super().trade(symbol, day=None)
+        if trade is None:
+            return None
 
-        if trade["is_long"]:
-            if trade["entry_price"] > mt5.symbol_info_tick(symbol.info.ticker).ask:
-                order_type = mt5.ORDER_TYPE_BUY_STOP
-            else:
-                order_type = mt5.ORDER_TYPE_BUY_LIMIT
-        else:
-            if trade["entry_price"] > mt5.symbol_info_tick(symbol.info.ticker).bid:
-                order_type = mt5.ORDER_TYPE_SELL_LIMIT
-            else:
-                order_type = mt5.ORDER_TYPE_SELL_STOP
+        tick = self.lastTick(symbol)
 
+        with METRICS.histogram("order_build_seconds", help="trade to order request").time():
+            if trade["is_long"]:
+                if trade["entry_price"] > tick.ask:
+                    order_type = mt5.ORDER_TYPE_BUY_STOP
+                else:
+                    order_type = mt5.ORDER_TYPE_BUY_LIMIT
+            else:
+                if trade["entry_price"] > tick.bid:
+                    order_type = mt5.ORDER_TYPE_SELL_LIMIT
+                else:
+                    order_type = mt5.ORDER_TYPE_SELL_STOP
+
+            return {
+                **self.orderTemplate(symbol),
+                "volume": trade["volume"],
+                "type": order_type,
+                "price": trade["entry_price"],
+                "sl": trade["SL"],
+                "tp": trade["TP"],
+            }
+
+    def buildOrderTemplate(self, symbol: MT5Symbol) -> dict:
+        """
+        Returns the fields of an opening order that do not depend on the signal.
+        """
         return {
             "action": mt5.TRADE_ACTION_PENDING,
-            "symbol": trade["ticker"],
-            "volume": trade["volume"],
-            "type": order_type,
-            "price": trade["entry_price"],
-            "sl": trade["SL"],
-            "tp": trade["TP"],
+            "symbol": symbol.info.ticker,
             "deviation": 20,
             "magic": 234000,
             "comment": "ART script OPEN",
@@ -142,6 +183,53 @@ class MT5Trader(Trader):
             "type_filling": mt5.ORDER_FILLING_RETURN
         }
 
+    ####################
+    # Warmup functions #
+
+    def warmSymbols(self, symbols: list[MT5Symbol]) -> None:
+        """
+        Selects the symbols in Market Watch and refreshes their metadata.
+        """
+        for symbol in symbols:
+            if not mt5.symbol_select(symbol.info.ticker, True):
+                log.warning(f"could not select {symbol.info.ticker} in Market Watch")
+            symbol.info = MT5SymbolInfo(symbol.info.ticker)
+
+    def warmTicks(self, symbols: list[MT5Symbol]) -> None:
+        """
+        Snapshots the last tick of every symbol into `ticks`.
+        """
+        ticks = dict(self.ticks or {})
+        for symbol in symbols:
+            tick = mt5.symbol_info_tick(symbol.info.ticker)
+            if tick is None:
+                log.warning(f"no tick for {symbol.info.ticker}")
+                continue
+            ticks[symbol.info.ticker] = (time.monotonic(), tick)
+        self.ticks = ticks
+
+    def lastTick(self, symbol: MT5Symbol):
+        """
+        Returns the tick snapshot of a symbol if it is at most `tick_ttl` seconds old, otherwise fetches
+        a new tick and keeps it as the snapshot.
+
+        Raises:
+            Exception: If the terminal has no tick for the symbol.
+        """
+        ticker = symbol.info.ticker
+        snapshot = (self.ticks or {}).get(ticker)
+        if snapshot is not None and time.monotonic() - snapshot[0] <= self.tick_ttl:
+            METRICS.counter("tick_snapshot_hits_total").inc()
+            return snapshot[1]
+        with METRICS.histogram("tick_fetch_seconds", help="mt5.symbol_info_tick round trip").time():
+            tick = mt5.symbol_info_tick(ticker)
+        if tick is None:
+            raise Exception(f"No tick for {ticker} | {mt5.last_error()}")
+        if self.ticks is None:
+            self.ticks = {}
+        self.ticks[ticker] = (time.monotonic(), tick)
+        return tick
+
     def close(self, order: MT5Order) -> dict:
         """
         Generates a closing order for an existing open position.
@@ -234,6 +322,11 @@ class MT5Trader(Trader):
         Returns:
             list[Order]: A list of closed orders.
         """
+        if self.history is not None:
+            self.history.sync()
+            closed_orders = self.history.get_orders(symbol.info.ticker, start, end).view(np.recarray)
+            return [MT5Order(x) for x in closed_orders]
+
         closed_orders = mt5.history_orders_get(
             start, end, group=symbol.info.ticker)
         if closed_orders:
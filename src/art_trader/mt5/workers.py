@@ -0,0 +1,164 @@
+__copyright__ = "Copyright (C) 2022 Alpha Rho Techologies LLC"
+__version__ = "0.0-SNAPSHOT"
+
+import logging
+
+from art_trader.abstract.common import Strategy
+from art_trader.abstract.workers import WorkerSupervisor
+from art_trader.mt5.common import MT5Symbol, MT5Utils, mt5
+
+log = logging.getLogger(__name__)
+
+
+class TerminalConfig:
+    """
+    Everything a worker process needs to drive one MT5 terminal/account.
+
+    Instances are picklable and are called inside the worker to build its TerminalWorker.
+
+    Attributes:
+        login (int): The account number.
+        password (str): The account password.
+        server (str): The trade server name.
+        path (str): Path to the terminal64.exe of this account's terminal installation.
+        strategy (Strategy): The strategy the account trades.
+        supervise (bool): Keep the connection alive with an `MT5ConnectionSupervisor`.
+    """
+
+    def __init__(self, login: int, password: str, server: str, path: str = None, strategy: Strategy = None,
+                 supervise: bool = False) -> None:
+        self.login = login
+        self.password = password
+        self.server = server
+        self.path = path
+        self.strategy = strategy
+        self.supervise = supervise
+
+    def __repr__(self) -> str:
+        return str({"login": self.login, "server": self.server, "path": self.path})
+
+    def __call__(self) -> "TerminalWorker":
+        return TerminalWorker(self)
+
+
+class TerminalWorker:
+    """
+    The object living in an account's worker process. Initializes the terminal connection
+    and serves trading and monitoring calls by ticker, so only plain data crosses the pipe.
+    """
+
+    def __init__(self, config: TerminalConfig) -> None:
+        from art_trader.mt5.trading import MT5Trader
+
+        self.supervisor = None
+        if config.supervise:
+            from art_trader.mt5.connection import MT5ConnectionSupervisor
+
+            self.supervisor = MT5ConnectionSupervisor(config.login, config.password, config.server, config.path)
+            if not self.supervisor.reconnect(max_attempts=3):
+                raise Exception(f"initialize() failed for {config.login}@{config.server} | "
+                                f"{self.supervisor.last_error}")
+            self.supervisor.install()
+            self.supervisor.start()
+        else:
+            kwargs = {"login": config.login, "password": config.password, "server": config.server}
+            if config.path is not None:
+                kwargs["path"] = config.path
+            if not mt5.initialize(**kwargs):
+                raise Exception(f"initialize() failed for {config.login}@{config.server} | {mt5.last_error()}")
+
+        self.login = config.login
+        self.trader = MT5Trader()
+        self.trader.strategy = config.strategy
+        self._symbols: dict[str, MT5Symbol] = {}
+
+    def _symbol(self, ticker: str) -> MT5Symbol:
+        symbol = self._symbols.get(ticker)
+        if symbol is None:
+            symbol = self._symbols[ticker] = MT5Symbol(ticker)
+            if self.supervisor is not None:
+                self.supervisor.symbols.add(ticker)
+        return symbol
+
+    def trade(self, ticker: str) -> dict:
+        """Returns the order generated by the strategy for a ticker."""
+        return self.trader.trade(self._symbol(ticker))
+
+    def trade_and_send(self, tickers: list[str]) -> dict[str, bool]:
+        """Generates and sends the strategy's orders for many tickers in one round trip."""
+        out = {}
+        for ticker in tickers:
+            try:
+                order = self.trader.trade(self._symbol(ticker))
+                out[ticker] = order is not None and self.trader.send(order)
+            except Exception as e:
+                log.error(f"{self.login}: failed to trade {ticker} | {e}")
+                out[ticker] = False
+        return out
+
+    def send(self, order: dict) -> bool:
+        return self.trader.send(order)
+
+    def account_state(self) -> dict:
+        """Returns the account info together with its open positions and pending orders."""
+        info = mt5.account_info()
+        positions = mt5.positions_get() or ()
+        orders = mt5.orders_get() or ()
+        return {
+            "account": info._asdict() if info is not None else None,
+            "positions": [x._asdict() for x in positions],
+            "orders": [x._asdict() for x in orders],
+        }
+
+    def equity(self, currency: str = None) -> tuple[float, str]:
+        """
+        Returns the account's equity and its currency, converted to `currency` at the current rate if given.
+        """
+        info = mt5.account_info()
+        if info is None:
+            raise Exception(f"account_info failed for {self.login} | {mt5.last_error()}")
+        if currency is None or currency == info.currency:
+            return info.equity, info.currency
+        return info.equity * MT5Utils.xr(info.currency, currency, MT5Utils.now()), currency
+
+    def shutdown(self) -> None:
+        mt5.shutdown()
+
+
+class MT5Supervisor(WorkerSupervisor):
+    """
+    Subclass of WorkerSupervisor with one MT5 terminal per account.
+    """
+
+    def __init__(self, configs: dict[str, TerminalConfig]) -> None:
+        super().__init__(configs)
+
+    def account_states(self) -> dict[str, dict]:
+        """Returns every account's state, gathered in parallel."""
+        return self.broadcast("account_state")
+
+    def total_equity(self, currency: str = None) -> float:
+        """
+        Returns the summed equity of the accounts that answered.
+
+        Args:
+            currency (str, optional): Convert every account's equity to this currency, in its own
+                                      worker. By default all accounts must share one currency.
+
+        Raises:
+            Exception: If `currency` is not given and the accounts are in different currencies.
+        """
+        results = self.broadcast("equity", currency)
+        failed = [name for name, x in results.items() if not isinstance(x, tuple)]
+        if failed:
+            log.warning(f"total equity leaves out {failed} | {[str(results[x]) for x in failed]}")
+        equities = [x for x in results.values() if isinstance(x, tuple)]
+        currencies = {c for _, c in equities}
+        if len(currencies) > 1:
+            raise Exception(f"cannot add equities in {sorted(currencies)}, pass a currency to convert to")
+        return sum(e for e, _ in equities)
+
+    def stop(self, timeout: float = 5.) -> None:
+        if self._workers:
+            self.broadcast("shutdown")
+        super().stop(timeout)
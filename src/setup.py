@@ -7,4 +7,15 @@ setup(
     install_requires=[
         # List your dependencies here
     ],
+    entry_points={
+        "console_scripts": [
+            "art-trader = art_trader.cli:main",
+        ],
+        # the data backends, see art_trader.backends; other packages add theirs to the same group
+        "art_trader.backends": [
+            "mt5 = art_trader.mt5.backend:backend",
+            "synthetic = art_trader.abstract.synthetic:backend",
+            "filestore = art_trader.abstract.filestore:backend",
+        ],
+    },
 )
@@ -0,0 +1,120 @@
+"""
+Broker-free fixtures shared by the backtest tests: deterministic random-walk hourly bars,
+daily bars aggregated from them, and a strategy in the spirit of PreviousDayTrendStrategy.
+"""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from art_trader.abstract.common import Strategy, Symbol, SymbolInfo, Trade
+from art_trader.abstract.testing import Backtester
+from art_trader.abstract.utils import CLOSE, OPEN, TIME, BrokerUtils, adjust_tz, getPrevMarketDay
+
+START = datetime(2022, 1, 1)
+HOURS = 24 * 800
+
+
+def hourly_bars(ticker: str) -> np.ndarray:
+    rng = np.random.default_rng(sum(ticker.encode()))
+    times = adjust_tz(START).timestamp() + 3600 * np.arange(HOURS)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.004, HOURS)))
+    open_ = np.concatenate([[100.], close[:-1]])
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.003, HOURS))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.003, HOURS))
+    spread = rng.integers(1, 20, HOURS).astype(float)
+    return np.column_stack([times, open_, high, low, close, spread])
+
+
+def daily_bars(hourly: np.ndarray) -> np.ndarray:
+    days = (hourly[:, TIME] // 86400).astype(np.int64)
+    starts = np.flatnonzero(np.diff(days, prepend=-1))
+    return np.column_stack([
+        hourly[starts, TIME],
+        hourly[starts, OPEN],
+        np.maximum.reduceat(hourly[:, 2], starts),
+        np.minimum.reduceat(hourly[:, 3], starts),
+        hourly[np.append(starts[1:], len(hourly)) - 1, CLOSE],
+        hourly[starts, 5],
+    ])
+
+
+class MockSymbolInfo(SymbolInfo):
+
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+        self.currency_profit = "USD"
+        self.trade_contract_size = 1
+
+
+class MockSymbol(Symbol):
+
+    def __init__(self, ticker: str) -> None:
+        self.info = MockSymbolInfo(ticker)
+
+
+class MockUtils(BrokerUtils):
+
+    M10_TIMEFRAME = 10
+    HOURLY_TIMEFRAME = 16385
+    DAILY_TIMEFRAME = 16408
+    WEEKLY_TIMEFRAME = 32769
+    MONTHLY_TIMEFRAME = 49153
+
+    calls = []
+    _bars = {}
+
+    def exists(symbol: Symbol) -> bool:
+        return True
+
+    def bars(ticker: str, timeframe: int) -> np.ndarray:
+        key = (ticker, timeframe)
+        if key not in MockUtils._bars:
+            hourly = hourly_bars(ticker)
+            MockUtils._bars[(ticker, MockUtils.HOURLY_TIMEFRAME)] = hourly
+            MockUtils._bars[(ticker, MockUtils.DAILY_TIMEFRAME)] = daily_bars(hourly)
+        return MockUtils._bars[key]
+
+    def getRates(symbol: Symbol, timeframe: int, start, end) -> np.ndarray:
+        MockUtils.calls.append((symbol.info.ticker, timeframe, start, end))
+        bars = MockUtils.bars(symbol.info.ticker, timeframe)
+        lo = np.searchsorted(bars[:, TIME], adjust_tz(start).timestamp(), side="left")
+        hi = np.searchsorted(bars[:, TIME], adjust_tz(end).timestamp(), side="right")
+        return bars[lo:hi]
+
+    def formatRates(array: np.ndarray) -> np.ndarray:
+        return array
+
+    @classmethod
+    def xr(cls, from_currency: str, to_currency: str, dt) -> float:
+        return 1. if from_currency == to_currency else 1.1
+
+
+class MockStrategy(Strategy):
+
+    broker_utils = MockUtils
+
+    def __init__(self, volume: float = 1.):
+        self.volume = volume
+
+    def strat(self, symbol: Symbol, day: date) -> Trade:
+        prev_day = getPrevMarketDay(day)
+        data = self.broker_utils.getDailyData(symbol, prev_day, prev_day)
+        open_price, close_price = data[0, OPEN], data[0, CLOSE]
+        is_long = close_price > open_price
+        return Trade(
+            ticker=symbol.info.ticker,
+            is_long=is_long,
+            entry_price=close_price,
+            TP=close_price * 1.01 if is_long else close_price * 0.99,
+            SL=close_price * 0.99 if is_long else close_price * 1.01,
+            volume=self.volume,
+        )
+
+
+class MockBacktester(Backtester):
+
+    symbol_class = MockSymbol
+    brokerUtil = MockUtils
+
+
+TICKERS = ["AAA", "BBB", "CCC", "DDD"]
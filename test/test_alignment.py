@@ -0,0 +1,80 @@
+import unittest
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from art_trader.abstract.alignment import NONE, AlignmentIndex
+from art_trader.abstract.resample import D1, H1, MN1, W1, periodEnds, periodStarts, resample
+from art_trader.abstract.utils import TIME
+from mock_broker import MockSymbol, MockUtils, hourly_bars
+
+M10, HOURLY, DAILY, WEEKLY, MONTHLY = 10, 16385, 16408, 32769, 49153
+RULES = {HOURLY: H1, DAILY: D1, WEEKLY: W1, MONTHLY: MN1}
+
+
+class AlignmentIndexTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        hourly = hourly_bars("AAA")[:24 * 120]
+        # drop a day and a few hours to have gaps
+        hourly = np.delete(hourly, np.r_[24 * 30:24 * 31, 24 * 50 + 3:24 * 50 + 6], axis=0)
+        m10 = np.repeat(hourly, 6, axis=0)
+        m10[:, TIME] += np.tile(np.arange(6) * 600, len(hourly))
+        cls.rates = {M10: m10, HOURLY: hourly, DAILY: resample(hourly, D1), WEEKLY: resample(hourly, W1),
+                     MONTHLY: resample(hourly, MN1)}
+        cls.index = AlignmentIndex(cls.rates, RULES)
+
+    def test_matches_brute_force(self):
+        for lower in (M10, HOURLY, DAILY):
+            for higher in (DAILY, WEEKLY, MONTHLY):
+                if lower == higher:
+                    continue
+                times = self.rates[lower][:, TIME]
+                starts = self.rates[higher][:, TIME]
+                ends = periodEnds(starts, RULES[higher])
+                expected_enclosing = [next((k for k in range(len(starts)) if starts[k] <= t < ends[k]), NONE)
+                                      for t in times]
+                expected_completed = [max((k for k in range(len(starts)) if ends[k] <= t), default=NONE)
+                                      for t in times]
+                np.testing.assert_array_equal(self.index.enclosing(lower, higher), expected_enclosing)
+                np.testing.assert_array_equal(self.index.lastCompleted(lower, higher), expected_completed)
+
+    def test_previous_day_lookup(self):
+        hourly = self.rates[HOURLY]
+        i = self.index.row(HOURLY, datetime(2022, 1, 10, 0))
+        self.assertNotEqual(i, NONE)
+        day = self.index.lastCompleted(HOURLY, DAILY)[i]
+        self.assertEqual(self.rates[DAILY][day, TIME], MockUtils.getDailyData(MockSymbol("AAA"), date(2022, 1, 9),
+                                                                             date(2022, 1, 9))[0, TIME])
+        self.assertEqual(self.index.enclosing(HOURLY, DAILY)[i], day + 1)
+
+        # the hourly bars of a day, with the dropped hours missing
+        gap = self.index.row(DAILY, date(2022, 2, 20))
+        rows = self.index.members(DAILY, gap, HOURLY)
+        self.assertEqual(rows.stop - rows.start, 21)
+        np.testing.assert_array_equal(self.index.enclosing(HOURLY, DAILY)[rows], gap)
+        self.assertEqual(self.index.row(DAILY, date(2022, 1, 31)), NONE)
+
+    def test_not_a_pair(self):
+        with self.assertRaises(KeyError):
+            self.index.enclosing(DAILY, HOURLY)
+
+    def test_from_broker(self):
+        index = AlignmentIndex.fromBroker(MockUtils, MockSymbol("BBB"), [HOURLY, DAILY], datetime(2022, 3, 1),
+                                          datetime(2022, 3, 10))
+        self.assertEqual(len(index.rates(DAILY)), 10)
+        self.assertEqual(index.enclosing(HOURLY, DAILY)[-1], 9)
+
+    def test_period_ends_across_dst(self):
+        tz = ZoneInfo("America/New_York")
+        times = np.arange(datetime(2022, 3, 12, tzinfo=tz).timestamp(), datetime(2022, 3, 15, tzinfo=tz).timestamp(),
+                          3600)
+        starts = np.unique(periodStarts(times, D1, tz))
+        np.testing.assert_array_equal(periodEnds(starts, D1, tz)[:-1], starts[1:])
+        self.assertEqual(starts[2] - starts[1], 23 * 3600)
+
+
+if __name__ == '__main__':
+    unittest.main()
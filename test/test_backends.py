@@ -0,0 +1,111 @@
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from art_trader import backends
+from art_trader.abstract.synthetic import SyntheticUtils, hourlyBars
+from art_trader.abstract.testing import BacktestAccount
+from art_trader.abstract.utils import TIME, adjust_tz
+from mock_broker import MockBacktester, MockStrategy, MockUtils
+
+START = date(2022, 3, 1)
+END = date(2022, 3, 15)
+
+
+class BackendRegistryTest(unittest.TestCase):
+
+    def test_builtin_backends_are_listed_without_importing(self):
+        # declared as entry points in setup.py
+        self.assertTrue({"mt5", "synthetic", "filestore"} <= set(backends._entryPoints()))
+        self.assertTrue({"mt5", "synthetic", "filestore"} <= set(backends.available()))
+
+    def test_register_and_get(self):
+        backend = backends.Backend("mock", MockUtils, MockBacktester.symbol_class, MockBacktester)
+        backends.register("mock", backend)
+        self.assertIs(backends.get("mock"), backend)
+        with self.assertRaises(ValueError):
+            backends.get("mock", root="/tmp")
+        with self.assertRaises(KeyError):
+            backends.get("no-such-backend")
+
+    def test_lazy_path(self):
+        backends.register("synthetic-alias", "art_trader.abstract.synthetic:backend")
+        self.assertEqual(backends.get("synthetic-alias").utils, SyntheticUtils)
+
+    def test_synthetic_backtest(self):
+        backend = backends.get("synthetic")
+        bt = backend.backtester(MockStrategy(1.), ["AAA", "BBB"], START, END, BacktestAccount(1_000, "USD"))
+        results = bt.run_all_single_thread()
+        self.assertEqual(len(results), 11)
+        self.assertTrue(np.isfinite(results.balance.values).all())
+
+        # deterministic, whatever the range, and resampled from the hourly walk
+        start, end = adjust_tz(datetime(2022, 3, 1)).timestamp(), adjust_tz(datetime(2022, 3, 8)).timestamp()
+        week = hourlyBars("AAA", start, end)
+        self.assertEqual((len(week), week[0, TIME], week[-1, TIME]), (7 * 24 + 1, start, end))
+        np.testing.assert_array_equal(hourlyBars("AAA", start + 5 * 3600, start + 30 * 3600), week[5:31])
+        np.testing.assert_array_equal(week[1:, 1], week[:-1, 4])  # each bar opens at the previous close
+        self.assertFalse(np.array_equal(week[:, 4], hourlyBars("BBB", start, end)[:, 4]))
+        daily = backend.utils.getDailyData(backend.symbol_class("AAA"), START, END)
+        hourly = backend.utils.getHourlyData(backend.symbol_class("AAA"), datetime(2022, 3, 1), datetime(2022, 3, 1, 23))
+        self.assertEqual(daily[0, TIME], hourly[0, TIME])
+        self.assertEqual(daily[0, 2], hourly[:, 2].max())
+
+    def test_filestore_round_trip(self):
+        with tempfile.TemporaryDirectory() as root:
+            backend = backends.get("filestore", root=root)
+            self.assertIs(pickle.loads(pickle.dumps(backend.backtester)), backend.backtester)
+            rates = MockUtils.bars("AAA", MockUtils.HOURLY_TIMEFRAME)
+            backend.utils.write("AAA", MockUtils.HOURLY_TIMEFRAME, rates, info={"currency_profit": "EUR"})
+            backend.utils.write("AAA", MockUtils.DAILY_TIMEFRAME, MockUtils.bars("AAA", MockUtils.DAILY_TIMEFRAME))
+
+            symbol = backend.symbol_class("AAA")
+            self.assertEqual(symbol.info.currency_profit, "EUR")
+            self.assertTrue(backend.utils.exists(symbol))
+            self.assertFalse(backend.utils.exists(backend.symbol_class("ZZZ")))
+
+            start, end = datetime(2022, 3, 1), datetime(2022, 3, 2)
+            np.testing.assert_array_equal(backend.utils.getHourlyData(symbol, start, end),
+                                          MockUtils.getHourlyData(symbol, start, end))
+            with self.assertRaises(Exception):
+                backend.utils.getM10Data(symbol, start, end)
+
+    def test_mt5_connects(self):
+        from art_trader.mt5.common import mt5
+
+        calls = []
+        module, mt5._module = mt5._module, SimpleNamespace(initialize=lambda **kw: calls.append(kw) or len(calls) < 3,
+                                                           last_error=lambda: (-6, "Authorization failed"))
+        try:
+            backends.get("mt5").connect()
+            backends.get("mt5", login=1, password="pw", server="Demo").connect()
+            with self.assertRaises(Exception):
+                backends.get("mt5", login=2).connect()
+        finally:
+            mt5._module = module
+        self.assertEqual(calls, [{}, {"login": 1, "password": "pw", "server": "Demo"}, {"login": 2}])
+
+
+class ImportTimeTest(unittest.TestCase):
+
+    def test_core_imports_stay_light(self):
+        code = ("import sys, time; t = time.perf_counter(); "
+                "import art_trader.backends, art_trader.abstract.utils, art_trader.mt5.common; "
+                "print(time.perf_counter() - t); "
+                "print(int('pandas' in sys.modules), int('MetaTrader5' in sys.modules))")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+        out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+        elapsed, flags = out.stdout.split("\n")[:2]
+        self.assertEqual(flags, "0 0")
+        self.assertLess(float(elapsed), 2.)
+
+
+if __name__ == '__main__':
+    unittest.main()
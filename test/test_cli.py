@@ -0,0 +1,140 @@
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from art_trader.abstract import filestore
+from art_trader.abstract.synthetic import SyntheticUtils, hourlyBars
+from art_trader.abstract.utils import adjust_tz
+from art_trader.cli import loadConfig, main, runBacktest, sweepGrid
+
+TOML = """
+name = "trend"
+tickers = ["AAA", "BBB", "CCC"]
+start = 2022-03-01
+end = 2022-04-01
+
+[strategy]
+class = "mock_broker:MockStrategy"
+params = {volume = 1.0}
+
+[backend]
+name = "synthetic"
+
+[account]
+balance = 1000
+currency = "USD"
+
+[execution]
+mode = "single"
+workers = 2
+symbols_per_job = 2
+days_per_job = 10
+
+[sweep]
+volume = [1.0, 2.0]
+"""
+
+
+class CliTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "trend.toml")
+        with open(self.path, "w") as f:
+            f.write(TOML)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def config(self, mode, out):
+        config = loadConfig(self.path)
+        config["execution"]["mode"] = mode
+        config["output"] = {"dir": os.path.join(self.dir.name, out), "formats": ["csv", "json"]}
+        return config
+
+    def test_load_config(self):
+        config = loadConfig(self.path)
+        self.assertEqual(config["start"], date(2022, 3, 1))
+        self.assertEqual(config["backend"], {"name": "synthetic"})
+        self.assertEqual(sweepGrid(config), [{"volume": 1.0}])
+        config["execution"]["mode"] = "sweep"
+        self.assertEqual(sweepGrid(config), [{"volume": 1.0}, {"volume": 2.0}])
+
+    def test_pool_matches_single(self):
+        single = runBacktest(self.config("single", "single"))["trend"]
+        pool = runBacktest(self.config("pool", "pool"))["trend"]
+        self.assertAlmostEqual(single["final_balance"], pool["final_balance"], places=6)
+
+        a = pd.read_csv(os.path.join(self.dir.name, "single", "equity.csv"))
+        b = pd.read_csv(os.path.join(self.dir.name, "pool", "equity.csv"))
+        np.testing.assert_allclose(a.balance.values, b.balance.values)
+        self.assertEqual(len(a), 24)
+
+        ledger = pd.read_csv(os.path.join(self.dir.name, "pool", "ledger.csv"))
+        self.assertEqual(len(ledger), 23 * 3)
+        self.assertAlmostEqual(ledger.profit.sum(), pool["profit"], places=6)
+        with open(os.path.join(self.dir.name, "pool", "ledger.jsonl")) as f:
+            self.assertEqual(len(f.readlines()), 23 * 3)
+
+    def test_memory_budget(self):
+        single = runBacktest(self.config("single", "single"))["trend"]
+        config = self.config("pool", "budget")
+        config["execution"]["memory_mb"] = 1e-6  # spills everything
+        budget = runBacktest(config)["trend"]
+        self.assertAlmostEqual(single["final_balance"], budget["final_balance"], places=6)
+        ledger = pd.read_csv(os.path.join(self.dir.name, "budget", "ledger.csv"))
+        self.assertEqual(len(ledger), 23 * 3)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.dir.name, "budget"))),
+                         ["equity.csv", "equity.json", "ledger.csv", "ledger.jsonl", "summary.csv", "summary.json"])
+
+    def test_shared_rates(self):
+        single = runBacktest(self.config("single", "single"))["trend"]
+        config = self.config("pool", "shared")
+        config["execution"]["share"] = True
+        shared = runBacktest(config)["trend"]
+        self.assertAlmostEqual(single["final_balance"], shared["final_balance"], places=6)
+
+    def test_sweep(self):
+        summary = runBacktest(self.config("sweep", "sweep"), workers=1)
+        self.assertEqual(list(summary), ["trend-0000", "trend-0001"])
+        self.assertAlmostEqual(summary["trend-0001"]["profit"], 2 * summary["trend-0000"]["profit"], places=6)
+        with open(os.path.join(self.dir.name, "sweep", "summary.json")) as f:
+            self.assertEqual([x["volume"] for x in json.load(f)], [1.0, 2.0])
+
+    def test_main(self):
+        out = os.path.join(self.dir.name, "main")
+        self.assertEqual(main(["backtest", self.path, "--output", out, "--format", "json"]), 0)
+        self.assertTrue(os.path.exists(os.path.join(out, "equity.json")))
+        self.assertFalse(os.path.exists(os.path.join(out, "equity.csv")))
+        self.assertEqual(main(["backtest", os.path.join(self.dir.name, "missing.toml")]), 1)
+
+    def test_backend_override_keeps_options(self):
+        root = os.path.join(self.dir.name, "rates")
+        with open(self.path) as f:
+            toml = f.read().replace('name = "synthetic"', f'name = "mt5"\nroot = "{root}"\nresample_from = 16385')
+        with open(self.path, "w") as f:
+            f.write(toml)
+
+        # nothing stored yet: every cell fails, and so does the run
+        out = os.path.join(self.dir.name, "main")
+        self.assertEqual(main(["backtest", self.path, "--backend", "filestore", "--output", out]), 1)
+        with self.assertRaises(Exception):
+            runBacktest({**self.config("single", "empty"), "backend": {"name": "filestore", "root": root}})
+
+        store = filestore.configure(root, SyntheticUtils.HOURLY_TIMEFRAME)
+        start, end = adjust_tz(date(2022, 2, 1)).timestamp(), adjust_tz(date(2022, 4, 2)).timestamp()
+        for ticker in ["AAA", "BBB", "CCC"]:
+            store.utils.write(ticker, SyntheticUtils.HOURLY_TIMEFRAME, hourlyBars(ticker, start, end))
+        self.assertEqual(main(["backtest", self.path, "--backend", "filestore", "--output", out]), 0)
+        expected = runBacktest({**self.config("single", "synthetic"), "backend": {"name": "synthetic"}})["trend"]
+        equity = pd.read_csv(os.path.join(out, "equity.csv"))
+        self.assertAlmostEqual(equity.balance.iloc[-1], expected["final_balance"], places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
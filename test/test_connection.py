@@ -0,0 +1,208 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+from art_trader.abstract.connection import (CONNECTED, DISCONNECTED, RECONNECTING, ConnectionLost,
+                                            ConnectionSupervisor)
+from art_trader.abstract.reconcile import OPENED, Reconciler
+from art_trader.mt5.common import MT5Utils, mt5
+from art_trader.mt5.connection import MT5ConnectionSupervisor
+
+
+class FakeSession(ConnectionSupervisor):
+    """A session that is alive while `up`, and connects after failing `failures` attempts."""
+
+    def __init__(self, failures=0, **kwargs):
+        super().__init__(**kwargs)
+        self.up = False
+        self.failures = failures
+        self.attempts = 0
+        self.rehydrated = 0
+        self.unlocked_calls = 0
+        self.on_reconnect("state", self.count)
+
+    def count(self):
+        self.rehydrated += 1
+        self.unlocked_calls += not self.lock._is_owned()
+
+    def connect(self):
+        self.attempts += 1
+        self.unlocked_calls += not self.lock._is_owned()
+        if self.failures:
+            self.failures -= 1
+            raise Exception("terminal not running")
+        self.up = True
+
+    def heartbeat(self):
+        self.unlocked_calls += not self.lock._is_owned()
+        return self.up
+
+    def broker_call(self, value):
+        return value if self.up else None
+
+
+class ConnectionSupervisorTest(unittest.TestCase):
+
+    def test_reconnect_backoff(self):
+        s = FakeSession(failures=3, backoff=0.01, max_backoff=0.02)
+        start = time.perf_counter()
+        self.assertTrue(s.reconnect())
+        self.assertGreaterEqual(time.perf_counter() - start, 0.01 + 0.02 + 0.02)
+        self.assertEqual((s.attempts, s.rehydrated, s.state), (4, 1, CONNECTED))
+
+        s = FakeSession(failures=5, backoff=0.001)
+        self.assertFalse(s.reconnect(max_attempts=2))
+        self.assertEqual((s.attempts, s.rehydrated, s.state), (2, 0, DISCONNECTED))
+        self.assertIn("terminal not running", s.last_error)
+
+    def test_rehydration_failure_retries(self):
+        s = FakeSession(backoff=0.001)
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) == 1:
+                raise Exception("positions_get failed")
+
+        s.on_reconnect("book", flaky)
+        self.assertTrue(s.reconnect())
+        self.assertEqual((s.attempts, len(calls)), (2, 2))
+
+    def test_calls(self):
+        s = FakeSession()
+        s.reconnect()
+        call = s.wrap("broker_call", s.broker_call)
+        self.assertEqual(call(1), 1)
+        self.assertIsNone(s.call("broker_call", lambda: None))  # None on a live session is an answer
+
+        s.up = False
+        with self.assertRaises(ConnectionLost):
+            call(2)
+        self.assertEqual(s.state, RECONNECTING)
+        start = time.perf_counter()
+        with self.assertRaises(ConnectionLost):
+            call(3)  # fails fast
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+        self.assertTrue(s.check())
+        self.assertEqual(call(4), 4)
+        self.assertEqual(s.rehydrated, 2)
+
+    def test_monitor(self):
+        s = FakeSession(interval=0.01, backoff=0.01, wait=2.)
+        s.start()
+        try:
+            self.assertEqual(s.state, CONNECTED)
+            s.failures = 2
+            s.up = False
+            deadline = time.perf_counter() + 2
+            while s.state == CONNECTED and time.perf_counter() < deadline:
+                time.sleep(0.001)
+            self.assertNotEqual(s.state, CONNECTED)
+            # made during the reconnect: waits for it instead of failing
+            self.assertEqual(s.call("broker_call", s.broker_call, 5), 5)
+            self.assertEqual(s.state, CONNECTED)
+            self.assertEqual(s.rehydrated, 2)
+        finally:
+            s.stop()
+        self.assertIsNone(s._thread)
+        self.assertEqual(s.unlocked_calls, 0)
+
+
+class FakeTerminal:
+    """Enough of the MetaTrader5 module for the supervisor."""
+
+    def __init__(self):
+        self.alive = True
+        self.calls = []
+        self.selected = {"AAA"}
+        self.positions = []
+
+    def initialize(self, **kwargs):
+        self.calls.append("initialize")
+        return self.alive
+
+    def shutdown(self):
+        self.calls.append("shutdown")
+
+    def last_error(self):
+        return (-10004, "No IPC connection")
+
+    def terminal_info(self):
+        self.calls.append("terminal_info")
+        return SimpleNamespace(connected=True) if self.alive else None
+
+    def symbols_get(self):
+        self.calls.append("symbols_get")
+        return [SimpleNamespace(name=x, visible=x in self.selected) for x in ["AAA", "BBB", "CCC"]]
+
+    def symbol_select(self, ticker, enable):
+        self.calls.append(f"symbol_select {ticker}")
+        self.selected.add(ticker)
+        return True
+
+    def symbol_info_tick(self, ticker):
+        return SimpleNamespace(bid=1., ask=1.1) if self.alive else None
+
+    def positions_get(self):
+        return self.positions if self.alive else None
+
+    def orders_get(self):
+        return [] if self.alive else None
+
+
+class FakeReconciler(Reconciler):
+
+    def _fetch_positions(self):
+        return mt5.positions_get()
+
+    def _fetch_orders(self):
+        return mt5.orders_get()
+
+
+class MT5ConnectionSupervisorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.terminal = FakeTerminal()
+        self._module = mt5._module
+        mt5._module = self.terminal
+
+    def tearDown(self):
+        mt5.intercept(None)
+        mt5._module = self._module
+
+    def test_rehydrate(self):
+        s = MT5ConnectionSupervisor(1, "pw", "Demo", symbols=["AAA", "BBB", "ZZZ"], reconciler=FakeReconciler(),
+                                    backoff=0.001)
+        self.assertIs(s.lock, MT5Utils.broker_lock)
+        self.assertTrue(s.reconnect())
+        self.assertEqual(self.terminal.calls, ["shutdown", "initialize", "symbols_get", "symbol_select BBB"])
+
+        s.install()
+        self.assertEqual(mt5.symbol_info_tick("AAA").ask, 1.1)
+
+        self.terminal.alive = False
+        with self.assertRaises(ConnectionLost):
+            mt5.symbol_info_tick("AAA")
+        with self.assertRaises(ConnectionLost):
+            mt5.symbol_info_tick("AAA")
+        self.assertFalse(s.reconnect(max_attempts=2))
+
+        # the book changed while the terminal was away
+        self.terminal.alive = True
+        self.terminal.selected = set()
+        self.terminal.positions = [SimpleNamespace(ticket=7, identifier=7, symbol="AAA", type=0, volume=1.,
+                                                   price_open=1., sl=0.9, tp=1.2, price_current=1.)]
+        self.terminal.calls.clear()
+        self.assertTrue(s.check())
+        self.assertEqual(self.terminal.calls[-3:], ["symbols_get", "symbol_select AAA", "symbol_select BBB"])
+        self.assertEqual([(x.kind, x.ticket) for x in s.missed_events], [(OPENED, 7)])
+        self.assertEqual(mt5.symbol_info_tick("AAA").bid, 1.)
+
+        # constants are not wrapped
+        self.terminal.TRADE_ACTION_DEAL = 1
+        self.assertEqual(mt5.TRADE_ACTION_DEAL, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from art_trader.abstract.common import Trade
+from art_trader.abstract.context import DataContext, RingBuffer
+from art_trader.abstract.testing import BacktestAccount
+from art_trader.abstract.utils import CLOSE, OPEN, TIME, adjust_tz
+from mock_broker import MockBacktester, MockStrategy, MockSymbol, MockUtils
+
+DAILY, HOURLY, MONTHLY = MockUtils.DAILY_TIMEFRAME, MockUtils.HOURLY_TIMEFRAME, MockUtils.MONTHLY_TIMEFRAME
+
+
+class ResampledUtils(MockUtils):
+
+    RESAMPLE_FROM = HOURLY
+
+
+class RingBufferTest(unittest.TestCase):
+
+    def test_latest_rows_are_contiguous(self):
+        buffer = RingBuffer(4, 2)
+        rows = np.arange(20, dtype=float).reshape(10, 2)
+        for i in range(10):
+            buffer.extend(rows[i:i + 1])
+            view = buffer.view()
+            np.testing.assert_array_equal(view, rows[max(i - 3, 0):i + 1])
+            self.assertTrue(view.flags.c_contiguous)
+        buffer.extend(rows[:7])
+        np.testing.assert_array_equal(buffer.view(2), rows[5:7])
+        with self.assertRaises(ValueError):
+            buffer.view()[0, 0] = 1
+
+
+class ContextStrategy(MockStrategy):
+
+    lookback = {DAILY: 5, HOURLY: 48}
+
+    def strat(self, symbol, day, context=None):
+        bar = context.last(symbol, DAILY)
+        is_long = bar[CLOSE] > bar[OPEN]
+        close = bar[CLOSE]
+        return Trade(ticker=symbol.info.ticker, is_long=is_long, entry_price=close,
+                     TP=close * 1.01 if is_long else close * 0.99, SL=close * 0.99 if is_long else close * 1.01,
+                     volume=self.volume)
+
+
+class ReferenceStrategy(MockStrategy):
+
+    def strat(self, symbol, day):
+        previous = day - timedelta(days=1)
+        data = self.broker_utils.getDailyData(symbol, previous, previous)
+        return ContextStrategy.strat(self, symbol, day, _Context(data[0]))
+
+
+class _Context:
+
+    def __init__(self, bar):
+        self.bar = bar
+
+    def last(self, symbol, timeframe):
+        return self.bar
+
+
+class DataContextTest(unittest.TestCase):
+
+    def test_only_closed_bars_are_visible(self):
+        symbol = MockSymbol("AAA")
+        context = DataContext(ResampledUtils, {DAILY: 5, HOURLY: 48, MONTHLY: 2}, [symbol])
+        context.preload(date(2022, 3, 1), date(2022, 3, 31))
+        for day in (date(2022, 3, 1), date(2022, 3, 15), date(2022, 3, 3), date(2022, 3, 31)):
+            context.advance(day)
+            cutoff = adjust_tz(day).timestamp()
+            hourly = context.rates(symbol, HOURLY)
+            self.assertEqual(len(hourly), 48)
+            self.assertEqual(hourly[-1, TIME], cutoff - 3600)
+            self.assertEqual(context.rates(symbol, DAILY)[-1, TIME], cutoff - 86400)
+            self.assertLess(context.rates(symbol, MONTHLY)[-1, TIME], adjust_tz(date(2022, 3, 1)).timestamp())
+            expected = MockUtils.getHourlyData(symbol, adjust_tz(day) - timedelta(hours=48), adjust_tz(day))
+            np.testing.assert_array_equal(hourly, expected[:-1])
+
+    def test_live_polling(self):
+        symbol = MockSymbol("BBB")
+        context = DataContext(MockUtils, {HOURLY: 10}, [symbol])
+        now = adjust_tz(datetime(2022, 5, 2, 12, 30))
+        context.advance(now.timestamp())
+        self.assertEqual(context.last(symbol, HOURLY)[TIME], now.timestamp() - 5400)
+        MockUtils.calls.clear()
+        context.advance((now + timedelta(hours=3)).timestamp())
+        self.assertEqual(len(MockUtils.calls), 1)
+        rates = context.rates(symbol, HOURLY)
+        self.assertEqual(len(rates), 10)
+        self.assertTrue((np.diff(rates[:, TIME]) == 3600).all())
+        self.assertEqual(rates[-1, TIME], now.timestamp() + 5400)
+
+    def test_backtest_with_context(self):
+        start, end = date(2022, 3, 1), date(2022, 4, 1)
+        account = lambda: BacktestAccount(1_000, "USD")
+        expected = MockBacktester(ReferenceStrategy(), ["AAA", "BBB"], start, end, account()).run_all_single_thread()
+        bt = MockBacktester(ContextStrategy(), ["AAA", "BBB"], start, end, account())
+        result = bt.run_all_single_thread()
+        np.testing.assert_array_equal(result.profit.values, expected.profit.values)
+        self.assertIsNotNone(bt.context)
+
+
+if __name__ == '__main__':
+    unittest.main()
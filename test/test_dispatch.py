@@ -0,0 +1,195 @@
+import time
+import unittest
+
+from art_trader.abstract.dispatch import (DONE, DUPLICATE, REJECT, REQUOTE, RETRY, OrderDispatcher, TokenBucket)
+from art_trader.abstract.metrics import METRICS
+
+DONE_CODE = 10009
+REQUOTE_CODE = 10004
+TIMEOUT_CODE = 10012
+INVALID_CODE = 10013
+
+
+class MockDispatcher(OrderDispatcher):
+
+    def __init__(self, retcodes, found=None, **kwargs):
+        super().__init__(retry_backoff=0, **kwargs)
+        self.retcodes = retcodes
+        self.found = found
+        self.sent = []
+
+    def _send(self, order):
+        self.sent.append(dict(order))
+        codes = self.retcodes.get(order["symbol"], [DONE_CODE])
+        code = codes.pop(0) if len(codes) > 1 else codes[0]
+        if isinstance(code, Exception):
+            raise code
+        return code, ""
+
+    def confirm(self, order):
+        return self.found
+
+    def classify(self, retcode):
+        return {DONE_CODE: DONE, REQUOTE_CODE: REQUOTE, TIMEOUT_CODE: RETRY}.get(retcode, REJECT)
+
+    def refresh(self, order):
+        if order["symbol"] == "STALE":
+            raise Exception("no tick")
+        out = dict(order)
+        out["price"] += 1
+        return out
+
+
+def order(symbol, comment="ART script OPEN"):
+    return {"symbol": symbol, "action": 1, "magic": 234000, "comment": comment, "price": 1.}
+
+
+class TokenBucketTest(unittest.TestCase):
+
+    def test_burst_then_rate(self):
+        now = [0.]
+        bucket = TokenBucket(rate=2, capacity=3, clock=lambda: now[0])
+        for _ in range(3):
+            self.assertEqual(bucket.try_acquire(), 0)
+        self.assertAlmostEqual(bucket.try_acquire(), 0.5)
+        now[0] += 0.5
+        self.assertEqual(bucket.try_acquire(), 0)
+
+
+class OrderDispatcherTest(unittest.TestCase):
+
+    def test_priority(self):
+        d = MockDispatcher({})
+        d.submit(order("LOW"), priority=5)
+        d.submit(order("HIGH"), priority=0)
+        d.submit(order("LOW2"), priority=5)
+        d.drain()
+        self.assertEqual([x["symbol"] for x in d.sent], ["HIGH", "LOW", "LOW2"])
+
+    def test_requote_refreshes_price(self):
+        d = MockDispatcher({"A": [REQUOTE_CODE, DONE_CODE]})
+        record = d.submit(order("A"))
+        d.drain()
+        self.assertEqual(record.outcome, DONE)
+        self.assertEqual(record.attempts, 2)
+        self.assertEqual([x["price"] for x in d.sent], [1., 2.])
+
+    def test_retry_limit(self):
+        d = MockDispatcher({"A": [TIMEOUT_CODE]}, max_retries=2)
+        record = d.submit(order("A"))
+        d.drain()
+        self.assertEqual(record.outcome, REJECT)
+        self.assertEqual(record.attempts, 3)
+        self.assertEqual([x["price"] for x in d.sent], [1., 1., 1.])
+
+    def test_hard_reject_not_retried(self):
+        d = MockDispatcher({"A": [INVALID_CODE]})
+        record = d.submit(order("A"))
+        d.drain()
+        self.assertEqual(record.outcome, REJECT)
+        self.assertEqual(record.attempts, 1)
+
+    def test_idempotency(self):
+        d = MockDispatcher({"B": [INVALID_CODE, DONE_CODE]})
+        d.submit(order("A"))
+        self.assertEqual(d.submit(order("A")).outcome, DUPLICATE)
+        self.assertIsNone(d.submit(order("A", comment="other")).outcome)
+        d.drain()
+        self.assertEqual(d.submit(order("A")).outcome, DUPLICATE)
+
+        # a rejected order may be resubmitted
+        d.submit(order("B"))
+        d.drain()
+        record = d.submit(order("B"))
+        d.drain()
+        self.assertEqual(record.outcome, DONE)
+
+    def test_bracket_legs_are_distinct(self):
+        d = MockDispatcher({})
+        stop = {**order("A"), "type": 5, "price": 1.1, "volume": 1.}
+        limit = {**order("A"), "type": 3, "price": 1.2, "volume": 1.}
+        self.assertIsNone(d.submit(stop).outcome)
+        self.assertIsNone(d.submit(limit).outcome)
+        self.assertIsNone(d.submit({**limit, "volume": 2.}).outcome)
+        self.assertEqual(d.submit(dict(stop)).outcome, DUPLICATE)
+
+    def test_send_timeout(self):
+        from art_trader.mt5.trading import MT5Trader
+
+        class Stalled(MockDispatcher):
+            def start(self):
+                pass
+
+        trader = MT5Trader()
+        trader.dispatcher = Stalled({})
+        trader.send_timeout = 0.01
+        with self.assertRaises(Exception):
+            trader.send(order("A"))
+        self.assertEqual(trader.dispatcher.depth, 1)
+
+    def test_keys_expire(self):
+        d = MockDispatcher({"B": [INVALID_CODE]}, key_ttl=0.05)
+        d.submit(order("A"))
+        d.submit(order("B"))
+        d.drain()
+        self.assertEqual(d.submit(order("A")).outcome, DUPLICATE)
+        self.assertEqual(list(d._keys), [d.key(order("A"))])  # the rejected key is dropped at once
+        time.sleep(0.06)
+        self.assertIsNone(d.submit(order("A")).outcome)
+        d.drain()
+        self.assertEqual(len(d.sent), 3)
+
+    def test_unknown_outcome(self):
+        lost = Exception("connection reset")
+        # the broker has it: done without resending
+        d = MockDispatcher({"A": [lost, DONE_CODE]}, found=True)
+        record = d.submit(order("A"))
+        d.drain()
+        self.assertEqual((record.outcome, len(d.sent)), (DONE, 1))
+
+        # the broker does not have it: resent
+        d = MockDispatcher({"A": [lost, DONE_CODE]}, found=False)
+        record = d.submit(order("A"))
+        d.drain()
+        self.assertEqual((record.outcome, len(d.sent)), (DONE, 2))
+
+        # cannot tell: not resent
+        d = MockDispatcher({"A": [lost, DONE_CODE]})
+        record = d.submit(order("A"))
+        d.drain()
+        self.assertEqual((record.outcome, len(d.sent)), (REJECT, 1))
+        self.assertIn("connection reset", record.comment)
+
+    def test_background_thread_survives_errors(self):
+        d = MockDispatcher({"STALE": [REQUOTE_CODE]})
+        d.start()
+        stale = d.submit(order("STALE"))
+        self.assertFalse(stale.wait(timeout=1))
+        self.assertEqual(stale.outcome, REJECT)
+        self.assertIn("refresh failed", stale.comment)
+        self.assertTrue(d.submit(order("A")).wait(timeout=1))
+        d.stop()
+
+    def test_queue_depth_gauge(self):
+        gauge = METRICS.gauge("dispatch_queue_depth")
+        a, b = MockDispatcher({}), MockDispatcher({})
+        base = gauge.value
+        a.submit(order("A"))
+        b.submit(order("A"))
+        b.submit(order("B"))
+        self.assertEqual(gauge.value, base + 3)
+        b.drain()
+        self.assertEqual(gauge.value, base + 1)
+
+    def test_background_thread(self):
+        d = MockDispatcher({})
+        d.start()
+        record = d.submit(order("A"))
+        self.assertTrue(record.wait(timeout=1))
+        d.stop()
+        self.assertIsNotNone(record.latency)
+        self.assertEqual(len(d.records), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,201 @@
+import asyncio
+import unittest
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from art_trader.abstract.common import Strategy, Trade
+from art_trader.abstract.feed import BarFeed
+from art_trader.abstract.scheduling import SENT, BrokerExecutor, LiveScheduler
+from art_trader.abstract.trading import Trader
+from art_trader.abstract.utils import CLOSE, TIME
+from mock_broker import MockSymbol, MockUtils, hourly_bars
+
+H1 = MockUtils.HOURLY_TIMEFRAME
+
+
+class ReplayUtils(MockUtils):
+    """The mock broker's clock, `elapsed` seconds into the hourly bar at `position`."""
+
+    position = 100
+    elapsed = 1800
+
+    @classmethod
+    def now(cls):
+        return datetime.fromtimestamp(hourly_bars("AAA")[cls.position, TIME] + cls.elapsed, ZoneInfo("UTC"))
+
+
+class ReplayFeed(BarFeed):
+    """Serves the mock hourly bars as if the bar at `position` were forming."""
+
+    def __init__(self, lookback, symbols, poll_bars=3):
+        super().__init__(ReplayUtils, lookback, symbols, poll_bars)
+        ReplayUtils.position, ReplayUtils.elapsed = 100, 1800
+        self.reads = []
+
+    @property
+    def position(self):
+        return ReplayUtils.position
+
+    @position.setter
+    def position(self, position):
+        ReplayUtils.position = position
+
+    def latest(self, symbol, timeframe, count):
+        self.reads.append(count)
+        bars = hourly_bars(symbol.info.ticker)[max(self.position + 1 - count, 0):self.position + 1].copy()
+        bars[-1, CLOSE] += self.position  # the forming bar is still changing
+        return bars
+
+
+class LastCloseStrategy(Strategy):
+
+    def __init__(self, feed):
+        self.feed = feed
+
+    def strat(self, symbol, day):
+        close = self.feed.last(symbol, H1)[CLOSE]
+        return Trade(symbol.info.ticker, True, close, close * 1.01, close * 0.99, 1)
+
+
+class ContextStrategy(Strategy):
+
+    lookback = {H1: 12}
+
+    def strat(self, symbol, day, context=None):
+        close = context.last(symbol, H1)[CLOSE]
+        return Trade(symbol.info.ticker, True, close, close * 1.01, close * 0.99, 1)
+
+
+class OrderTrader(Trader):
+
+    def __init__(self, strategy):
+        self.strategy = strategy
+        self.sent = []
+
+    def trade(self, symbol, day=None):
+        return super().trade(symbol, day)
+
+    def send(self, order):
+        self.sent.append((order["ticker"], order["entry_price"]))
+        return True
+
+    def close(self, order):
+        pass
+
+    def cancel(self, order):
+        pass
+
+    def get_open_orders(self, symbol):
+        return []
+
+    def get_pending_orders(self, symbol):
+        return []
+
+    def get_closed_orders(self, symbol, start, end):
+        return []
+
+
+class BarFeedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.symbols = [MockSymbol("AAA"), MockSymbol("BBB")]
+        self.feed = ReplayFeed({H1: 24}, self.symbols)
+        self.bars = hourly_bars("AAA")
+
+    def test_incremental(self):
+        seen = []
+        self.feed.on_bar(lambda ticker, tf, bar: seen.append((ticker, bar[0])))
+
+        self.assertEqual(self.feed.poll(), {})
+        np.testing.assert_array_equal(self.feed.rates("AAA", H1), self.bars[76:100])
+        self.assertEqual(self.feed.reads, [25, 25])
+        self.assertEqual(self.feed.forming("AAA", H1)[CLOSE], self.bars[100, CLOSE] + 100)
+
+        self.feed.reads.clear()
+        for position in range(101, 110):
+            self.feed.position = position
+            new = self.feed.poll(["AAA"])
+            np.testing.assert_array_equal(new[("AAA", H1)], self.bars[position - 1:position])
+        self.assertEqual(self.feed.reads, [3] * 9)
+        np.testing.assert_array_equal(self.feed.rates("AAA", H1), self.bars[85:109])
+        np.testing.assert_array_equal(self.feed.last("AAA", H1), self.bars[108])
+        self.assertEqual(seen, [("AAA", t) for t in self.bars[100:109, 0]])
+
+        # the closed bar has its final values, not the ones seen while forming
+        self.assertEqual(self.feed.rates("AAA", H1)[-1, CLOSE], self.bars[108, CLOSE])
+
+        # polled more than one bar apart: still contiguous
+        self.feed.position = 111
+        np.testing.assert_array_equal(self.feed.poll(["AAA"])[("AAA", H1)], self.bars[109:111])
+
+    def test_last_bar_closes_with_its_period(self):
+        self.feed.poll()
+        # the market closed: no new bar opened, but the period of the forming one has ended
+        ReplayUtils.elapsed = 3600
+        new = self.feed.poll(["AAA"])
+        np.testing.assert_array_equal(new[("AAA", H1)][:, TIME], self.bars[100:101, TIME])
+        self.assertIsNone(self.feed.forming("AAA", H1))
+        self.assertEqual(self.feed.poll(["AAA"]), {})
+
+        # the next bar opens, the closed one is not reported again
+        self.feed.position, ReplayUtils.elapsed = 101, 1800
+        self.assertEqual(self.feed.poll(["AAA"]), {})
+        self.assertEqual(self.feed.forming("AAA", H1)[TIME], self.bars[101, TIME])
+
+    def test_gap(self):
+        self.feed.poll()
+        self.feed.reads.clear()
+        self.feed.position = 130
+        new = self.feed.poll(["AAA"])
+        self.assertEqual(self.feed.reads, [3, 25])
+        np.testing.assert_array_equal(new[("AAA", H1)], self.bars[106:130])
+        np.testing.assert_array_equal(self.feed.rates("AAA", H1), self.bars[106:130])
+
+    def test_failures(self):
+        def fail(ticker, tf, bar):
+            raise ValueError("boom")
+
+        self.feed.on_bar(fail)
+        self.feed.poll()
+        self.feed.position = 101
+        self.assertIn(("AAA", H1), self.feed.poll())
+
+        with self.assertRaises(ValueError):
+            ReplayFeed({H1: 24}, self.symbols, poll_bars=1)
+
+    def test_bar_job(self):
+        scheduler = LiveScheduler(BrokerExecutor())
+        trader = OrderTrader(LastCloseStrategy(self.feed))
+        scheduler.add_bar_job(trader, self.symbols[:1], self.feed, H1, name="bars")
+        self.assertIn(self.feed, scheduler.feeds)
+
+        self.assertEqual(asyncio.run(scheduler.poll_feed(self.feed)), {})
+        self.feed.position = 101
+        self.assertEqual(asyncio.run(scheduler.poll_feed(self.feed)), {"bars": {"AAA": SENT}})
+        self.assertEqual(asyncio.run(scheduler.poll_feed(self.feed)), {})
+        self.assertEqual(trader.sent, [("AAA", self.bars[100, CLOSE])])
+        scheduler.executor.shutdown()
+
+    def test_feed_is_the_context(self):
+        scheduler = LiveScheduler(BrokerExecutor())
+        trader = OrderTrader(ContextStrategy())
+        scheduler.add_bar_job(trader, [MockSymbol("CCC")], self.feed, H1, name="bars")
+        self.assertIs(trader.context, self.feed)
+
+        MockUtils.calls.clear()
+        trader.warmup([MockSymbol("CCC")])
+        self.assertEqual(len(self.feed.rates("CCC", H1)), 24)
+        self.feed.position = 101
+        self.assertEqual(asyncio.run(scheduler.poll_feed(self.feed))["bars"], {"CCC": SENT})
+        self.assertEqual(trader.sent, [("CCC", hourly_bars("CCC")[100, CLOSE])])
+        self.assertEqual(MockUtils.calls, [])  # every bar came from the feed
+        scheduler.executor.shutdown()
+
+        with self.assertRaises(ValueError):
+            scheduler.add_bar_job(trader, self.symbols, ReplayFeed({H1: 6}, self.symbols), H1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+from art_trader.abstract.history import DEAL_DTYPE, ORDER_DTYPE, HistorySync, fromMsc, toMsc
+
+UTC = ZoneInfo("UTC")
+T0 = datetime(2023, 1, 2, tzinfo=UTC)
+
+
+def record(dtype, ticket, symbol, when):
+    values = {name: 0 for name in dtype.names}
+    values.update(ticket=ticket, symbol=symbol, comment="", time_done_msc=toMsc(when), time_msc=toMsc(when))
+    return SimpleNamespace(**values)
+
+
+class MockHistorySync(HistorySync):
+
+    def __init__(self, directory, broker_orders):
+        super().__init__(directory, since=T0, overlap=timedelta(hours=1))
+        self.broker_orders = broker_orders
+        self.windows = []
+
+    def _window(self, start, end):
+        return [x for x in self.broker_orders if toMsc(start) <= x.time_done_msc <= toMsc(end)]
+
+    def _fetch_orders(self, start, end):
+        self.windows.append((start, end))
+        return self._window(start, end)
+
+    def _fetch_deals(self, start, end):
+        return [record(DEAL_DTYPE, x.ticket, x.symbol, fromMsc(x.time_done_msc)) for x in self._window(start, end)]
+
+
+class HistorySyncTest(unittest.TestCase):
+
+    def test_incremental_sync(self):
+        broker = [record(ORDER_DTYPE, i, "A" if i % 2 else "B", T0 + timedelta(hours=i)) for i in range(1, 11)]
+        with tempfile.TemporaryDirectory() as d:
+            h = MockHistorySync(d, broker[:5])
+            self.assertEqual(h.sync(end=T0 + timedelta(days=1)), (5, 5))
+
+            # the second window starts at the high-water mark less the overlap
+            h.broker_orders = broker
+            self.assertEqual(h.sync(end=T0 + timedelta(days=1)), (5, 5))
+            self.assertEqual(h.windows[1][0], T0 + timedelta(hours=4))
+            self.assertEqual(h.sync(end=T0 + timedelta(days=1)), (0, 0))
+
+            # queries are answered from the local store
+            a = h.get_orders("A", T0 + timedelta(hours=2), T0 + timedelta(hours=7))
+            self.assertEqual(list(a["ticket"]), [3, 5, 7])
+            self.assertEqual(list(h.get_orders()["ticket"]), list(range(1, 11)))
+            self.assertEqual(len(h.get_orders("C")), 0)
+
+            # a new instance reloads the store and resumes from its high-water mark
+            h2 = MockHistorySync(d, broker)
+            self.assertEqual(h2.sync(end=T0 + timedelta(days=1)), (0, 0))
+            self.assertEqual(h2.windows[0][0], T0 + timedelta(hours=9))
+            self.assertEqual(list(h2.get_orders("B")["ticket"]), [2, 4, 6, 8, 10])
+            self.assertEqual(list(h2.get_deals("A", end=T0 + timedelta(hours=3))["ticket"]), [1, 3])
+
+    def test_partial_record_is_ignored(self):
+        with tempfile.TemporaryDirectory() as d:
+            h = MockHistorySync(d, [record(ORDER_DTYPE, 1, "A", T0)])
+            h.sync(end=T0 + timedelta(days=1))
+            with open(h.orders.path, "ab") as f:
+                f.write(b"partial")
+            self.assertEqual(len(MockHistorySync(d, []).orders), 1)
+
+            # appending after the torn record overwrites it instead of following it
+            broker = [record(ORDER_DTYPE, i, "A", T0 + timedelta(hours=i)) for i in range(1, 4)]
+            h = MockHistorySync(d, broker)
+            self.assertEqual(h.sync(end=T0 + timedelta(days=1)), (2, 2))
+            reloaded = MockHistorySync(d, []).orders
+            self.assertEqual(list(reloaded.rows["ticket"]), [1, 2, 3])
+            self.assertEqual(list(reloaded.rows["time_done_msc"]), [toMsc(T0)] + [x.time_done_msc for x in broker[1:]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+import numpy as np
+
+from art_trader.abstract.indicators import (ATR, EMA, INDICATORS, RSI, SMA, IndicatorCache, RollingHigh, RollingLow,
+                                            ZScore, atr, ema, rollingHigh, rollingLow, rsi, sma, zscore)
+from art_trader.abstract.utils import CLOSE, HIGH, LOW
+from mock_broker import MockSymbol, hourly_bars
+
+
+def run(state, *columns):
+    return np.array([state.update(*x) for x in zip(*(c.tolist() for c in columns))])
+
+
+class IndicatorTest(unittest.TestCase):
+
+    rates = hourly_bars("AAA")[:2000]
+
+    def assertIdentical(self, a, b):
+        # bit-identical, NaN where the other is NaN
+        np.testing.assert_array_equal(a, b, strict=True)
+
+    def test_series_matches_incremental(self):
+        close, high, low = self.rates[:, CLOSE], self.rates[:, HIGH], self.rates[:, LOW]
+        for period in (1, 2, 14, 200):
+            with self.subTest(period=period):
+                self.assertIdentical(sma(close, period), run(SMA(period), close))
+                self.assertIdentical(ema(close, period), run(EMA(period), close))
+                self.assertIdentical(zscore(close, period), run(ZScore(period), close))
+                self.assertIdentical(rollingHigh(high, period), run(RollingHigh(period), high))
+                self.assertIdentical(rollingLow(low, period), run(RollingLow(period), low))
+                self.assertIdentical(atr(high, low, close, period), run(ATR(period), high, low, close))
+                self.assertIdentical(rsi(close, period), run(RSI(period), close))
+
+    def test_reference_values(self):
+        close = self.rates[:, CLOSE]
+        np.testing.assert_allclose(sma(close, 20)[19:], np.convolve(close, np.ones(20) / 20, "valid"), rtol=1e-12)
+        windows = np.lib.stride_tricks.sliding_window_view(close, 20)
+        expected = (close[19:] - windows.mean(axis=1)) / windows.std(axis=1)
+        np.testing.assert_allclose(zscore(close, 20)[19:], expected, rtol=1e-7)
+        self.assertTrue(np.isnan(sma(close, 20)[:19]).all())
+
+        flat = np.full(10, 5.)
+        self.assertEqual(rsi(flat + np.arange(10), 3)[-1], 100.)
+        self.assertEqual(zscore(flat, 3)[-1], 0.)
+
+    def test_short_series(self):
+        for name, (fn, cls, columns) in INDICATORS.items():
+            with self.subTest(name=name):
+                out = fn(*(self.rates[:3, c] for c in columns), 5)
+                self.assertEqual(len(out), 3)
+                self.assertTrue(np.isnan(out).all())
+
+
+class IndicatorCacheTest(unittest.TestCase):
+
+    def test_series_and_state(self):
+        rates = hourly_bars("BBB")[:500]
+        symbol = MockSymbol("BBB")
+        cache = IndicatorCache()
+        full = cache.series(symbol, 1, "atr", 14, rates)
+        self.assertIs(cache.series(symbol, 1, "atr", 14, rates[:100]).base, full)
+
+        state = cache.state(symbol, 1, "atr", 14, history=rates[:400])
+        cache.state(symbol, 1, "ema", 20, history=rates[:400])
+        for bar in rates[400:]:
+            values = cache.update(symbol, 1, bar)
+        self.assertEqual(values[("atr", 14)], full[-1])
+        self.assertEqual(state.value, full[-1])
+        self.assertEqual(values[("ema", 20)], ema(rates[:, CLOSE], 20)[-1])
+
+        with self.assertRaises(ValueError):
+            cache.series(symbol, 1, "macd", 14, rates)
+
+
+if __name__ == '__main__':
+    unittest.main()
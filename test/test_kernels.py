@@ -0,0 +1,139 @@
+import unittest
+from datetime import date
+
+import numpy as np
+
+from art_trader.abstract.kernels import HAS_NUMBA, _scanLoop, scan, stack
+from art_trader.abstract.testing import BacktestAccount
+from art_trader.abstract.ticks import CLOSE_EXIT, NOT_FILLED, SL_EXIT, TP_EXIT
+from art_trader.abstract.utils import CLOSE, HIGH, LOW, TIME
+from mock_broker import MockBacktester, MockStrategy, MockSymbol, hourly_bars
+
+
+def legacy_profit(bt, trade, data, symbol):
+    """The row loop calcProfit used before the scan kernel."""
+    def xr(hour):
+        return bt.brokerUtil.xr(symbol.info.currency_profit, bt.account.currency, hour)
+
+    executed, exit_price = False, None
+    multiplier = 1 if trade["is_long"] else -1
+    for row in data:
+        if not executed and row[LOW] < trade["entry_price"] < row[HIGH]:
+            executed = True
+            entry_xr = xr(row[TIME])
+        if executed:
+            sl_hit = row[LOW] < trade["SL"] < row[HIGH]
+            tp_hit = row[LOW] < trade["TP"] < row[HIGH]
+            if tp_hit or sl_hit:
+                exit_xr = xr(row[TIME])
+                exit_price = trade["TP"] if tp_hit else trade["SL"]
+                break
+    if not executed:
+        return 0.
+    if exit_price is None:
+        exit_price = data[-1][CLOSE]
+        exit_xr = xr(row[TIME])
+    avg_xr = (entry_xr + exit_xr) / 2
+    net = (exit_price - trade["entry_price"]) * trade["volume"] * \
+        multiplier * symbol.info.trade_contract_size * avg_xr
+    return net - bt.calc_tx_fee(trade["volume"])
+
+
+def random_trades(n, seed=0):
+    rng = np.random.default_rng(seed)
+    bars = hourly_bars("AAA")
+    datas, trades = [], []
+    for _ in range(n):
+        start = rng.integers(0, len(bars) - 48)
+        data = bars[start:start + rng.integers(0, 48)]
+        ref = bars[start, CLOSE]
+        is_long = bool(rng.integers(0, 2))
+        width = rng.uniform(0.002, 0.02) * ref
+        entry = ref * (1 + rng.normal(0, 0.003))
+        trades.append({"is_long": is_long, "entry_price": entry, "volume": 1.,
+                       "TP": entry + width if is_long else entry - width,
+                       "SL": entry - width if is_long else entry + width,
+                       "trail": width / 2 if rng.random() < 0.3 else 0.})
+        datas.append(data)
+    return trades, datas
+
+
+def scan_args(trades, datas):
+    stacked, starts, ends = stack([x if len(x) else np.empty((0, 6)) for x in datas])
+    return (stacked[:, LOW], stacked[:, HIGH], starts, ends, [x["entry_price"] for x in trades],
+            [x["SL"] for x in trades], [x["TP"] for x in trades], [x["trail"] for x in trades],
+            [x["is_long"] for x in trades])
+
+
+def loop_scan(low, high, starts, ends, entry, sl, tp, trail, is_long):
+    n = len(starts)
+    out = (np.full(n, -1), np.full(n, -1), np.full(n, NOT_FILLED), np.full(n, np.nan))
+    _scanLoop(low.tolist(), high.tolist(), list(starts), list(ends), entry, sl, tp, trail, is_long, *out)
+    return out
+
+
+class ScanTest(unittest.TestCase):
+
+    def assertSameScan(self, a, b):
+        for x, y in zip(a, b):
+            np.testing.assert_array_equal(x, y)
+
+    def test_vectorized_matches_loop(self):
+        trades, datas = random_trades(500)
+        for x in trades:
+            x["trail"] = 0.
+        args = scan_args(trades, datas)
+        out = scan(*args, compiled=False)
+        self.assertSameScan(out, loop_scan(*args))
+        self.assertEqual(set(out[2].tolist()), {NOT_FILLED, TP_EXIT, SL_EXIT, CLOSE_EXIT})
+
+    @unittest.skipUnless(HAS_NUMBA, "numba is not installed")
+    def test_compiled_matches_fallback(self):
+        args = scan_args(*random_trades(2000, seed=1))
+        self.assertSameScan(scan(*args, compiled=True), scan(*args, compiled=False))
+
+    def test_trailing_stop(self):
+        # long entered on bar 0, rallies, then gives back more than the trail distance
+        low = np.array([99.5, 101., 103., 104.5, 101.])
+        high = np.array([100.5, 103., 105., 106., 105.5])
+        out = scan(low, high, [0], [5], [100.], [95.], [110.], [1.], [True], compiled=False)
+        self.assertEqual([x[0] for x in out[:3]], [0, 4, SL_EXIT])
+        # stop trails the previous bar's high of 106
+        self.assertEqual(out[3][0], 105.)
+        out = scan(low, high, [0], [5], [100.], [95.], [110.], [0.], [True], compiled=False)
+        self.assertEqual(out[2][0], CLOSE_EXIT)
+
+
+class CalcProfitTest(unittest.TestCase):
+
+    def test_matches_legacy_loop(self):
+        bt = MockBacktester(MockStrategy(), ["AAA"], date(2022, 3, 1), date(2022, 3, 2), BacktestAccount(1_000, "USD"))
+        symbol = MockSymbol("AAA")
+        trades, datas = random_trades(300, seed=2)
+        for trade, data in zip(trades, datas):
+            trade["trail"] = 0.
+            self.assertEqual(bt.calcProfit(trade, data, symbol), legacy_profit(bt, trade, data, symbol))
+
+        fills = bt.fillMany(trades, datas, [symbol] * len(trades))
+        self.assertEqual([x["profit"] for x in fills], [legacy_profit(bt, *x, symbol) for x in zip(trades, datas)])
+
+    def test_one_scan_per_day(self):
+        calls = []
+
+        class CountingBacktester(MockBacktester):
+            def fillMany(self, trades, datas, symbols):
+                calls.append(len(trades))
+                return super().fillMany(trades, datas, symbols)
+
+        start, end = date(2022, 3, 1), date(2022, 3, 8)
+        tickers = ["AAA", "BBB", "CCC"]
+        expected = MockBacktester(MockStrategy(), tickers, start, end, BacktestAccount(1_000, "USD"))
+        expected_result = expected.run_all_single_thread()
+        bt = CountingBacktester(MockStrategy(), tickers, start, end, BacktestAccount(1_000, "USD"))
+        result = bt.run_all_single_thread()
+        np.testing.assert_array_equal(result.balance.values, expected_result.balance.values)
+        self.assertEqual(calls, [len(tickers)] * (len(result) - 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+import os
+import tempfile
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+import numpy as np
+
+from art_trader.abstract.memo import ResultCache, fingerprint
+from art_trader.abstract.screening import SCREENED, VolatilityFilter
+from art_trader.abstract.testing import BacktestAccount, PortfolioLimits
+from art_trader.abstract.ticks import FileTickSource
+from mock_broker import TICKERS, MockBacktester, MockStrategy, MockUtils
+
+START = date(2022, 3, 1)
+END = date(2022, 4, 1)
+
+
+class CountingBacktester(MockBacktester):
+
+    def simulate_day(self, symbols, day):
+        self.simulated.extend((x.info.ticker, day) for x in symbols)
+        return super().simulate_day(symbols, day)
+
+
+# tickers whose data is missing, outside the strategy so fixing them does not change its fingerprint
+MISSING = set()
+
+
+class FlakyStrategy(MockStrategy):
+
+    def strat(self, symbol, day):
+        if symbol.info.ticker in MISSING:
+            raise Exception("no data")
+        return super().strat(symbol, day)
+
+
+class ScreenedStrategy(MockStrategy):
+
+    screen = [VolatilityFilter(high=0.025, window=5)]
+
+
+class FeeBacktester(CountingBacktester):
+    """Overrides the legacy profit hook."""
+
+    def calcProfit(self, trade, data, symbol):
+        return super().calcProfit(trade, data, symbol) - 1
+
+
+class ResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "cells.db")
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def run_bt(self, cache, tickers=TICKERS, end=END, volume=1., strategy=None, backtester=CountingBacktester):
+        bt = backtester(strategy or MockStrategy(volume), tickers, START, end, BacktestAccount(1_000, "USD"),
+                        result_cache=cache)
+        bt.simulated = []
+        return bt, bt.run_all_single_thread()
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint(MockStrategy(1.)), fingerprint(MockStrategy(1.)))
+        self.assertNotEqual(fingerprint(MockStrategy(1.)), fingerprint(MockStrategy(2.)))
+        self.assertNotEqual(fingerprint(MockStrategy(1.), currency="USD"), fingerprint(MockStrategy(1.), currency="EUR"))
+
+    def test_fingerprint_is_stable(self):
+        strategy = MockStrategy(1.)
+        strategy.screen = [VolatilityFilter(high=0.05)]
+        strategy.days = {date(2022, 3, 2), date(2022, 3, 1)}
+        self.assertEqual(fingerprint(strategy), fingerprint(strategy))
+        strategy.helper = object()
+        with self.assertRaises(ValueError):
+            fingerprint(strategy)
+
+    def test_fingerprint_covers_run_settings(self):
+        account = BacktestAccount(1_000, "USD")
+        base = MockBacktester(MockStrategy(1.), TICKERS, START, END, account).fingerprint()
+        limited = MockBacktester(MockStrategy(1.), TICKERS, START, END, account,
+                                 limits=PortfolioLimits(max_leverage=2)).fingerprint()
+        ticks = [MockBacktester(MockStrategy(1.), TICKERS, START, END, account,
+                                tick_source=FileTickSource(x)).fingerprint() for x in ("a", "b", "a")]
+        self.assertEqual(len({base, limited, ticks[0], ticks[1]}), 4)
+        self.assertEqual(ticks[0], ticks[2])
+
+    def test_reruns_only_compute_new_cells(self):
+        _, expected = self.run_bt(None, end=date(2022, 5, 2))
+
+        cache = ResultCache(self.path)
+        bt, first = self.run_bt(cache)
+        self.assertEqual(len(bt.simulated), 23 * len(TICKERS))
+
+        # extended by a month: only the new days are simulated
+        bt, extended = self.run_bt(ResultCache(self.path), end=date(2022, 5, 2))
+        self.assertEqual({x[1] for x in bt.simulated}, {x for x in expected.index if x >= END})
+        np.testing.assert_array_equal(extended.balance.values, expected.balance.values)
+        self.assertEqual(bt.ledger[0]["ticker"], TICKERS[0])
+        self.assertIn("exit_kind", bt.ledger[0])
+
+        # one more ticker: only its cells are simulated
+        bt, _ = self.run_bt(cache, tickers=TICKERS + ["EEE"])
+        self.assertEqual({x[0] for x in bt.simulated}, {"EEE"})
+
+        # different parameters do not share cells
+        bt, _ = self.run_bt(cache, volume=2.)
+        self.assertEqual(len(bt.simulated), 23 * len(TICKERS))
+
+    def test_invalidation_and_balance_path(self):
+        cache = ResultCache(self.path, data_version="v1")
+        bt, expected = self.run_bt(cache)
+        key = bt.fingerprint()
+        path = cache.balancePath(key, TICKERS, START, END, 1_000)
+        np.testing.assert_array_equal(path.balance.values, expected.balance.values)
+        self.assertEqual(list(path.index), list(expected.index))
+
+        self.assertEqual(cache.invalidate(ticker="AAA", start=date(2022, 3, 15)), 13)
+        with self.assertRaises(Exception):
+            cache.balancePath(key, TICKERS, START, END, 1_000)
+        bt, _ = self.run_bt(cache)
+        self.assertEqual(len(bt.simulated), 13)
+
+        bt, _ = self.run_bt(ResultCache(self.path, data_version="v2"))
+        self.assertEqual(len(bt.simulated), 23 * len(TICKERS))
+
+    def test_errors_are_retried(self):
+        cache = ResultCache(self.path)
+        MISSING.add("AAA")
+        try:
+            bt, _ = self.run_bt(cache, strategy=FlakyStrategy())
+        finally:
+            MISSING.clear()
+        self.assertEqual(sum("error" in x for x in bt.ledger), 23)
+        bt, result = self.run_bt(cache, strategy=FlakyStrategy())
+        self.assertEqual({x[0] for x in bt.simulated}, {"AAA"})
+        self.assertEqual(len(bt.simulated), 23)
+        _, expected = self.run_bt(None)
+        np.testing.assert_array_equal(result.balance.values, expected.balance.values)
+
+    def test_balance_path_with_screen(self):
+        cache = ResultCache(self.path)
+        bt, expected = self.run_bt(cache, strategy=ScreenedStrategy())
+        self.assertLess(len(bt.simulated), 23 * len(TICKERS))
+        path = cache.balancePath(bt.fingerprint(), TICKERS, START, END, 1_000)
+        np.testing.assert_array_equal(path.balance.values, expected.balance.values)
+
+    def test_screen_comes_first(self):
+        bt, _ = self.run_bt(None, strategy=ScreenedStrategy())
+        key = bt.fingerprint()
+        with patch.object(ScreenedStrategy, "screen", [VolatilityFilter(high=0.05, window=5)]):
+            self.assertNotEqual(bt.fingerprint(), key)
+
+        # cells cached as traded are skipped once the screen rejects them
+        cache = ResultCache(self.path)
+        self.run_bt(cache)
+        bt = CountingBacktester(MockStrategy(1.), TICKERS, START, END, BacktestAccount(1_000, "USD"), result_cache=cache)
+        bt.simulated = []
+        bt.screened = lambda symbol, day: symbol.info.ticker != "AAA"
+        bt.run_all_single_thread()
+        self.assertEqual({x.get("skipped") for x in bt.ledger if x["ticker"] == "AAA"}, {SCREENED})
+        self.assertEqual(bt.simulated, [])
+
+    def test_calc_profit_override(self):
+        _, expected = self.run_bt(None)
+        _, result = self.run_bt(None, backtester=FeeBacktester)
+        np.testing.assert_allclose(result.profit.values[1:], expected.profit.values[1:] - len(TICKERS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import tempfile
+import unittest
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from art_trader.abstract.memory import LEDGER, PRICE_CACHE, Ledger, MemoryBudget, cellSize
+from art_trader.abstract.testing import BacktestAccount
+from mock_broker import TICKERS, MockBacktester, MockStrategy, MockUtils
+
+START = date(2022, 3, 1)
+END = date(2022, 4, 1)
+
+
+class CachedUtils(MockUtils):
+    pass
+
+
+class CachedStrategy(MockStrategy):
+
+    broker_utils = CachedUtils
+
+
+class CachedBacktester(MockBacktester):
+
+    brokerUtil = CachedUtils
+
+
+class LedgerTest(unittest.TestCase):
+
+    def test_spill(self):
+        with tempfile.TemporaryDirectory() as d:
+            ledger = Ledger()
+            for i in range(10):
+                ledger.append({"profit": float(i), "day": i})
+            self.assertGreater(ledger.nbytes, 0)
+            freed = ledger.spill(1, d)
+            self.assertGreater(freed, 0)
+            self.assertEqual(ledger.nbytes, 0)
+            for i in range(10, 15):
+                ledger.append({"profit": float(i), "day": i})
+            ledger.spill(1, d)
+            ledger.append({"profit": 15., "day": 15})
+
+            self.assertEqual(len(ledger), 16)
+            self.assertEqual([x["day"] for x in ledger], list(range(16)))
+            self.assertEqual(ledger[3]["day"], 3)
+            self.assertEqual(ledger[12]["day"], 12)
+            self.assertEqual(ledger[-1]["day"], 15)
+            with self.assertRaises(IndexError):
+                ledger[16]
+            self.assertEqual([len(x) for x in ledger.batches()], [10, 5, 1])
+
+            # released cells stay on disk, outside the spill directory
+            ledger.release(d)
+            self.assertEqual(os.listdir(d), [])
+            self.assertEqual([x["day"] for x in ledger], list(range(16)))
+            self.assertEqual(ledger.nbytes, cellSize({"profit": 15., "day": 15}))
+            path = ledger._path
+            self.assertTrue(os.path.exists(path))
+            ledger.spill(1, d)
+            self.assertEqual([x["day"] for x in ledger], list(range(16)))
+            ledger.clear()
+            self.assertEqual((len(ledger), os.path.exists(path)), (0, False))
+
+            ledger.append({"profit": 0., "day": 0})
+            ledger.spill(1, d)
+            ledger.release(d)
+            path = ledger._path
+            del ledger
+            self.assertFalse(os.path.exists(path))
+
+
+class MemoryBudgetTest(unittest.TestCase):
+
+    def setUp(self):
+        CachedUtils.enableCache()
+
+    def tearDown(self):
+        CachedUtils.rate_cache = None
+
+    def test_order(self):
+        spilled = []
+        budget = MemoryBudget(100, trace=False)
+        budget.register("a", lambda: 80, lambda n, d: spilled.append(("a", n)) or 80)
+        budget.register("b", lambda: 80, lambda n, d: spilled.append(("b", n)) or 80)
+        self.assertEqual(budget.check(), 80)
+        self.assertEqual(spilled, [("a", 60)])
+        self.assertEqual(budget.spilled, {"a": 80})
+        budget.close()
+        self.assertFalse(os.path.exists(budget.directory))
+
+    def test_backtest(self):
+        expected = MockBacktester(MockStrategy(), TICKERS, START, END, BacktestAccount(1_000, "USD"))
+        expected_result = expected.run_all_single_thread()
+
+        with MemoryBudget(1, trace=False) as budget:
+            bt = CachedBacktester(CachedStrategy(), TICKERS, START, END, BacktestAccount(1_000, "USD"),
+                                  memory_budget=budget)
+            result = bt.run_all_single_thread()
+
+            pd.testing.assert_frame_equal(result, expected_result)
+            self.assertEqual(list(bt.ledger), expected.ledger)
+            self.assertGreater(budget.spilled[PRICE_CACHE], 0)
+            self.assertGreater(budget.spilled[LEDGER], 0)
+            self.assertEqual(budget.usage()[PRICE_CACHE], 0)
+            rates = CachedUtils.getHourlyData(bt.symbols[0], datetime(2022, 3, 10), datetime(2022, 3, 11))
+            self.assertIsInstance(rates, np.memmap)
+            self.assertTrue(os.listdir(budget.directory))
+        self.assertFalse(os.path.exists(budget.directory))
+
+        # what was spilled is no longer read from the removed directory
+        self.assertEqual(list(bt.ledger), expected.ledger)
+        self.assertFalse([k for k, x in CachedUtils.rate_cache._entries.items() if isinstance(x.rates, np.memmap)])
+        rates = CachedUtils.getHourlyData(bt.symbols[0], datetime(2022, 3, 10), datetime(2022, 3, 11))
+        self.assertNotIsInstance(rates, np.memmap)
+
+    def test_trace(self):
+        with MemoryBudget(2 ** 40) as budget:
+            usage = budget.usage()
+            self.assertIn("traced", usage)
+            self.assertEqual(budget.check(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from urllib.request import urlopen
+
+from art_trader.abstract.metrics import (MetricsRegistry, MetricsServer, SnapshotWriter, bucketIndex, bucketValue)
+
+
+class HistogramTest(unittest.TestCase):
+
+    def test_buckets_round_trip(self):
+        for value in [0, 1, 63, 64, 65, 1000, 123456, 10**9]:
+            low = int(bucketValue(bucketIndex(value)))
+            self.assertLessEqual(low, value)
+            self.assertLessEqual(value - low, max(value / 32, 1))
+
+    def test_quantiles(self):
+        h = MetricsRegistry().histogram("latency_seconds")
+        for i in range(1, 1001):
+            h.record(i / 1e3)
+        snap = h.snapshot()
+        self.assertEqual(snap["count"], 1000)
+        self.assertAlmostEqual(snap["max"], 1.)
+        self.assertAlmostEqual(snap["0.5"], 0.5, delta=0.5 / 32)
+        self.assertAlmostEqual(snap["0.99"], 0.99, delta=0.99 / 32)
+
+    def test_threads(self):
+        registry = MetricsRegistry()
+        h = registry.histogram("latency_seconds")
+        c = registry.counter("calls_total", {"call": "order_send"})
+
+        def work():
+            for _ in range(1000):
+                h.record(0.001)
+                c.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(h.snapshot()["count"], 8000)
+        self.assertEqual(c.value, 8000)
+
+
+class MetricsRegistryTest(unittest.TestCase):
+
+    def test_render(self):
+        registry = MetricsRegistry()
+        registry.counter("calls_total", {"call": "order_send"}, help="broker calls").inc(2)
+        registry.gauge("queue_depth", fn=lambda: 3)
+        with registry.histogram("send_seconds").time():
+            pass
+        text = registry.render()
+        self.assertIn('# HELP calls_total broker calls', text)
+        self.assertIn('calls_total{call="order_send"} 2', text)
+        self.assertIn('queue_depth 3', text)
+        self.assertIn('send_seconds_count 1', text)
+        self.assertIn('send_seconds{quantile="0.99"}', text)
+        with self.assertRaises(TypeError):
+            registry.counter("queue_depth")
+
+    def test_gauge_reregistration(self):
+        registry = MetricsRegistry()
+
+        def depth():
+            return 3
+
+        registry.gauge("queue_depth", fn=depth)
+        registry.gauge("queue_depth", fn=depth)
+        registry.gauge("queue_depth", {"queue": "other"}, fn=lambda: 4)
+        with self.assertRaises(ValueError):
+            registry.gauge("queue_depth", fn=lambda: 5)
+        self.assertEqual(registry.snapshot(), {"queue_depth": 3, 'queue_depth{queue="other"}': 4})
+
+    def test_server_and_snapshot_file(self):
+        registry = MetricsRegistry()
+        registry.counter("calls_total").inc()
+
+        server = MetricsServer(registry, port=0)
+        server.start()
+        try:
+            host, port = server.address
+            body = urlopen(f"http://{host}:{port}/metrics").read().decode()
+            self.assertIn("calls_total 1", body)
+            snap = json.loads(urlopen(f"http://{host}:{port}/snapshot").read())
+            self.assertEqual(snap["calls_total"], 1)
+        finally:
+            server.stop()
+
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, "metrics.json")
+            writer = SnapshotWriter(path, registry, interval=0.01)
+            writer.start()
+            writer.stop()
+            with open(path) as f:
+                self.assertEqual(json.load(f)["metrics"]["calls_total"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
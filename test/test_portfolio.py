@@ -0,0 +1,75 @@
+import unittest
+from datetime import date
+
+import numpy as np
+
+from art_trader.abstract.testing import BacktestAccount, PortfolioLimits
+from mock_broker import TICKERS, MockBacktester, MockStrategy
+
+START = date(2022, 3, 1)
+END = date(2022, 4, 1)
+
+
+class PortfolioLimitsTest(unittest.TestCase):
+
+    def test_scale(self):
+        limits = PortfolioLimits(max_leverage=2, symbol_cap=0.5)
+        factor = limits.allocate(np.array([100., 40., 20.]), balance=100)
+        # 100 is capped to 50, then 50 + 40 + 20 = 110 fits under 200
+        np.testing.assert_allclose(factor, [0.5, 1, 1])
+
+        factor = limits.allocate(np.array([50., 50., 100.]), balance=50)
+        # capped to 25 each, which fits under the 100 allowed
+        np.testing.assert_allclose(factor * [50, 50, 100], [25, 25, 25])
+
+        limits = PortfolioLimits(max_leverage=1, symbol_cap=1)
+        factor = limits.allocate(np.array([50., 50., 100.]), balance=100)
+        # 200 requested, everything is scaled by half to the 100 allowed
+        np.testing.assert_allclose(factor * [50, 50, 100], [25, 25, 50])
+
+    def test_margin(self):
+        limits = PortfolioLimits(max_leverage=100, symbol_cap=100, margin_rate=0.1)
+        factor = limits.allocate(np.array([600., 600.]), balance=100)
+        np.testing.assert_allclose(factor * 600 * 0.1, [50, 50])
+
+    def test_reject(self):
+        limits = PortfolioLimits(max_leverage=1, symbol_cap=0.6, scale=False)
+        factor = limits.allocate(np.array([70., 30., 40., 20.]), balance=100)
+        np.testing.assert_array_equal(factor, [0, 1, 1, 1])
+        factor = limits.allocate(np.array([50., 30., 40., 20.]), balance=100)
+        np.testing.assert_array_equal(factor, [1, 1, 0, 1])
+
+    def test_reject_keeps_capacity(self):
+        # a rejected trade does not use capacity, a later one that still fits is accepted
+        limits = PortfolioLimits(max_leverage=1, symbol_cap=1, scale=False)
+        factor = limits.allocate(np.array([60., 50., 30.]), balance=100)
+        np.testing.assert_array_equal(factor, [1, 0, 1])
+
+
+class PortfolioBacktestTest(unittest.TestCase):
+
+    def backtester(self, limits=None):
+        account = BacktestAccount(initial_balance=1_000, currency="USD")
+        return MockBacktester(MockStrategy(volume=1), TICKERS, START, END, account, limits=limits)
+
+    def test_unconstrained_matches_independent_run(self):
+        expected = self.backtester().run_all_single_thread()
+        result = self.backtester(PortfolioLimits(max_leverage=100)).run_portfolio()
+        np.testing.assert_allclose(result.profit.values, expected.profit.values)
+        np.testing.assert_allclose(result.balance.values, expected.balance.values)
+        self.assertTrue((result.exposure.iloc[1:] > 0).all())
+
+    def test_exposure_is_capped(self):
+        limits = PortfolioLimits(max_leverage=0.2, symbol_cap=0.1)
+        result = self.backtester(limits).run_portfolio()
+        previous_balance = result.balance.shift(1).iloc[1:]
+        exposure = result.exposure.iloc[1:]
+        self.assertTrue((exposure <= previous_balance * 0.2 + 1e-9).all())
+        self.assertTrue((exposure > 0).all())
+
+        unconstrained = self.backtester().run_all_single_thread()
+        self.assertLess(result.profit.abs().sum(), unconstrained.profit.abs().sum())
+
+
+if __name__ == '__main__':
+    unittest.main()
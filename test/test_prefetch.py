@@ -0,0 +1,133 @@
+import threading
+import time
+import unittest
+from datetime import date
+from types import SimpleNamespace
+
+import pandas as pd
+
+from art_trader.abstract.prefetch import Prefetcher
+from art_trader.abstract.testing import BacktestAccount
+from art_trader.abstract.utils import LazyModule
+from mock_broker import TICKERS, MockBacktester, MockStrategy, MockUtils
+
+START = date(2022, 3, 1)
+END = date(2022, 4, 1)
+
+
+class SlowUtils(MockUtils):
+    """Sleeps in getRates and records whether two calls ever overlapped."""
+
+    active = 0
+    overlapped = False
+    threads = set()
+
+    def getRates(symbol, timeframe, start, end):
+        SlowUtils.active += 1
+        SlowUtils.overlapped |= SlowUtils.active > 1
+        SlowUtils.threads.add(threading.current_thread().name)
+        time.sleep(0.001)
+        SlowUtils.active -= 1
+        return MockUtils.getRates(symbol, timeframe, start, end)
+
+
+class SlowStrategy(MockStrategy):
+
+    broker_utils = SlowUtils
+
+
+class SlowBacktester(MockBacktester):
+
+    brokerUtil = SlowUtils
+
+
+class PrefetcherTest(unittest.TestCase):
+
+    def test_order_and_skips(self):
+        fetched = []
+
+        def fetch(x):
+            fetched.append(x)
+            if x == 3:
+                raise ValueError("no data")
+            return x * 10
+
+        with Prefetcher(fetch, [(x, (x,)) for x in range(10)], depth=2) as p:
+            self.assertEqual(p.take(0, 0), 0)
+            self.assertEqual(p.take(2, 2), 20)  # 1 was never taken
+            with self.assertRaises(ValueError):
+                p.take(3, 3)
+            self.assertEqual(p.take(1, 1), 10)  # behind the plan: fetched directly
+            self.assertEqual(p.take(42, 42), 420)
+            self.assertEqual(p.take(9, 9), 90)
+            self.assertEqual((p.hits, p.misses), (4, 2))
+        self.assertEqual(fetched.count(1), 2)
+
+    def test_bounded(self):
+        fetched = []
+        p = Prefetcher(fetched.append, [(x, (x,)) for x in range(100)], depth=4)
+        time.sleep(0.1)
+        # `depth` results queued and one more waiting to be put
+        self.assertLessEqual(len(fetched), 5)
+        p.close()
+        self.assertFalse(p._thread.is_alive())
+
+        with self.assertRaises(ValueError):
+            Prefetcher(fetched.append, [], depth=0)
+
+    def test_backtest(self):
+        expected = MockBacktester(MockStrategy(), TICKERS, START, END, BacktestAccount(1_000, "USD"))
+        expected_result = expected.run_all_single_thread()
+
+        SlowUtils.threads.clear()
+        bt = SlowBacktester(SlowStrategy(), TICKERS, START, END, BacktestAccount(1_000, "USD"), prefetch=8)
+        result = bt.run_all_single_thread()
+        pd.testing.assert_frame_equal(result, expected_result)
+        self.assertEqual(bt.ledger, expected.ledger)
+        self.assertIsNone(bt.prefetcher)
+        self.assertIn("prefetch", SlowUtils.threads)
+        self.assertFalse(SlowUtils.overlapped)
+
+    def test_only_trades_are_fetched(self):
+        fetched = []
+
+        class OneTicker(MockStrategy):
+            def strat(self, symbol, day):
+                return super().strat(symbol, day) if symbol.info.ticker == "AAA" else None
+
+        class Recording(MockBacktester):
+            def getPriceAction(self, symbol, day):
+                fetched.append(symbol.info.ticker)
+                return super().getPriceAction(symbol, day)
+
+        bt = Recording(OneTicker(), TICKERS, START, END, BacktestAccount(1_000, "USD"), prefetch=8)
+        bt.run_all_single_thread()
+        self.assertEqual(set(fetched), {"AAA"})
+        self.assertEqual(len(fetched), len(bt.ledger) // len(TICKERS))
+
+    def test_locked_module(self):
+        lock = threading.RLock()
+
+        def free_elsewhere():
+            # whether another thread could take the lock during the call
+            out = []
+
+            def probe():
+                out.append(lock.acquire(blocking=False))
+                if out[0]:
+                    lock.release()
+
+            t = threading.Thread(target=probe)
+            t.start()
+            t.join()
+            return out[0]
+
+        module = LazyModule("broker", lock=lock)
+        module._module = SimpleNamespace(symbol_info=free_elsewhere, VERSION=5)
+        self.assertFalse(module.symbol_info())
+        self.assertTrue(free_elsewhere())
+        self.assertEqual(module.VERSION, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
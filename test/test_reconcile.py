@@ -0,0 +1,123 @@
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from art_trader.abstract.reconcile import (CANCELLED, CLOSED, FILLED, MODIFIED, OPENED, PLACED, SL_HIT, TP_HIT,
+                                           Reconciler)
+from art_trader.mt5.common import mt5
+from art_trader.mt5.reconcile import DEAL_REASON_SL, DEAL_REASON_TP, MT5Reconciler
+
+
+def position(ticket, symbol, identifier=None, sl=0., tp=0., price_open=1., price_current=1., volume=1.):
+    return SimpleNamespace(ticket=ticket, identifier=identifier or ticket, symbol=symbol, type=0, volume=volume,
+                           price_open=price_open, sl=sl, tp=tp, price_current=price_current)
+
+
+def pending(ticket, symbol, sl=0., tp=0.):
+    return SimpleNamespace(ticket=ticket, position_id=0, symbol=symbol, type=2, volume_current=1.,
+                           price_open=1., sl=sl, tp=tp, price_current=1.)
+
+
+class MockReconciler(Reconciler):
+
+    def __init__(self):
+        super().__init__()
+        self.positions = []
+        self.orders = []
+        self.exits = {}
+        self.calls = 0
+
+    def _fetch_positions(self):
+        self.calls += 1
+        return self.positions
+
+    def _fetch_orders(self):
+        self.calls += 1
+        return self.orders
+
+    def _fetch_exit_kinds(self, refs):
+        return {ref: self.exits[ref] for ref in refs.tolist() if ref in self.exits}
+
+
+def deal(entry, reason, time_msc):
+    return SimpleNamespace(entry=entry, reason=reason, time_msc=time_msc)
+
+
+class FakeTerminal:
+
+    def __init__(self, deals):
+        self.deals = deals
+
+    def positions_get(self):
+        return []
+
+    def orders_get(self):
+        return []
+
+    def history_deals_get(self, position):
+        return self.deals.get(position)
+
+    def last_error(self):
+        return (1, "")
+
+
+class ReconcilerTest(unittest.TestCase):
+
+    def kinds(self, events):
+        return sorted((e.kind, e.ticket) for e in events)
+
+    def test_first_snapshot_has_no_events(self):
+        r = MockReconciler()
+        r.positions = [position(1, "EURUSD-Z")]
+        self.assertEqual(r.reconcile(), [])
+        self.assertEqual(r.calls, 2)
+        self.assertEqual(len(r.snapshot.get_positions("EURUSD-Z")), 1)
+        self.assertEqual(len(r.snapshot.get_positions("GBPUSD-Z")), 0)
+
+    def test_events(self):
+        r = MockReconciler()
+        r.positions = [position(1, "A", sl=0.9, tp=1.2), position(2, "B", sl=0.9, tp=1.2),
+                       position(3, "C", sl=0.9), position(4, "D")]
+        r.orders = [pending(10, "A"), pending(11, "B"), pending(12, "C", sl=0.5)]
+        r.reconcile()
+
+        # 1 hits TP, 2 hits SL, 3 closes manually and 4 gets a new SL
+        r.exits = {1: TP_HIT, 2: SL_HIT}
+        # 10 fills into 20, 11 is cancelled, 12 is modified, 13 is new, 21 is a market order
+        r.positions = [position(4, "D", sl=0.8), position(20, "A", identifier=10), position(21, "E")]
+        r.orders = [pending(12, "C", sl=0.6), pending(13, "E")]
+        events = r.reconcile()
+
+        self.assertEqual(self.kinds(events), sorted([
+            (TP_HIT, 1), (SL_HIT, 2), (CLOSED, 3), (MODIFIED, 4), (FILLED, 20), (OPENED, 21),
+            (CANCELLED, 11), (MODIFIED, 12), (PLACED, 13),
+        ]))
+        fill = [e for e in events if e.kind == FILLED][0]
+        self.assertEqual(fill.ticker, "A")
+        self.assertEqual(fill.before["ticket"], 10)
+
+    def test_mt5_exit_reasons(self):
+        module = mt5._module
+        mt5._module = FakeTerminal({
+            1: [deal(0, 0, 1), deal(1, DEAL_REASON_TP, 2)],
+            # partially closed by hand, then stopped out
+            2: [deal(0, 0, 1), deal(1, 3, 2), deal(1, DEAL_REASON_SL, 3)],
+            3: [deal(0, 0, 1), deal(1, 3, 2)],
+        })
+        try:
+            kinds = MT5Reconciler()._fetch_exit_kinds(np.array([1, 2, 3, 4]))
+        finally:
+            mt5._module = module
+        self.assertEqual(kinds, {1: TP_HIT, 2: SL_HIT, 3: CLOSED})
+
+    def test_no_change(self):
+        r = MockReconciler()
+        r.positions = [position(1, "A")]
+        r.orders = [pending(2, "A")]
+        r.reconcile()
+        self.assertEqual(r.reconcile(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import numpy as np
+
+from art_trader.abstract.cache import RateCache, toEpoch
+from art_trader.abstract.resample import D1, MN1, MONDAY, SUNDAY, W1, periodStarts, resample
+from art_trader.abstract.utils import CLOSE, SPREAD, TIME, adjust_tz
+from mock_broker import MockSymbol, MockUtils, daily_bars, hourly_bars
+
+
+class ResampledUtils(MockUtils):
+
+    RESAMPLE_FROM = MockUtils.HOURLY_TIMEFRAME
+
+
+class ResampleTest(unittest.TestCase):
+
+    def test_daily_matches_reference(self):
+        hourly = hourly_bars("AAA")
+        out = resample(hourly, D1)
+        np.testing.assert_array_equal(out[:, :SPREAD], daily_bars(hourly)[:, :SPREAD])
+        # the spread of a period is the lowest spread of its bars, as on MT5 bars
+        np.testing.assert_array_equal(out[:3, SPREAD], [hourly[i:i + 24, SPREAD].min() for i in (0, 24, 48)])
+
+    def test_week_and_month_starts(self):
+        times = np.array([adjust_tz(datetime(2023, 1, d, 12)).timestamp() for d in (1, 2, 7, 8, 31)])
+        sunday = [adjust_tz(date(2023, 1, d)).timestamp() for d in (1, 1, 1, 8, 29)]
+        monday = [adjust_tz(x).timestamp() for x in (date(2022, 12, 26), date(2023, 1, 2), date(2023, 1, 2),
+                                                     date(2023, 1, 2), date(2023, 1, 30))]
+        np.testing.assert_array_equal(periodStarts(times, W1, week_start=SUNDAY), sunday)
+        np.testing.assert_array_equal(periodStarts(times, W1, week_start=MONDAY), monday)
+        months = periodStarts(times + 20 * 86400, MN1)
+        self.assertEqual([datetime.fromtimestamp(x, ZoneInfo("UTC")).date() for x in months],
+                         [date(2023, 1, 1)] * 4 + [date(2023, 2, 1)])
+
+    def test_session_timezone(self):
+        tz = ZoneInfo("America/New_York")
+        # 03:00 UTC is still the previous day in New York
+        times = np.array([adjust_tz(datetime(2023, 1, 3, 3)).timestamp()])
+        start = periodStarts(times, D1, tz)[0]
+        self.assertEqual(datetime.fromtimestamp(start, tz), datetime(2023, 1, 2, tzinfo=tz))
+
+    def test_getData_builds_from_base_timeframe(self):
+        symbol = MockSymbol("BBB")
+        MockUtils.calls.clear()
+        out = ResampledUtils.getDailyData(symbol, date(2022, 3, 1), date(2022, 3, 10))
+        expected = MockUtils.getDailyData(symbol, date(2022, 3, 1), date(2022, 3, 10))
+        np.testing.assert_array_equal(out[:, :SPREAD], expected[:, :SPREAD])
+        self.assertEqual(MockUtils.calls[0][1], MockUtils.HOURLY_TIMEFRAME)
+
+
+class RateCacheTest(unittest.TestCase):
+
+    def test_fetches_only_missing_ranges(self):
+        calls = []
+
+        def fetch(symbol, timeframe, start, end):
+            calls.append((toEpoch(start), toEpoch(end)))
+            return MockUtils.getRates(symbol, timeframe, start, end)
+
+        cache = RateCache(fetch)
+        symbol, tf = MockSymbol("CCC"), MockUtils.HOURLY_TIMEFRAME
+        day = lambda d: adjust_tz(date(2022, 2, d))
+        full = MockUtils.bars("CCC", tf)
+
+        def expected(start, end):
+            return full[(full[:, TIME] >= start.timestamp()) & (full[:, TIME] <= end.timestamp())]
+
+        np.testing.assert_array_equal(cache.get(symbol, tf, day(10), day(12)), expected(day(10), day(12)))
+        np.testing.assert_array_equal(cache.get(symbol, tf, day(10), day(11)), expected(day(10), day(11)))
+        self.assertEqual(len(calls), 1)
+
+        out = cache.get(symbol, tf, day(8), day(14))
+        np.testing.assert_array_equal(out, expected(day(8), day(14)))
+        self.assertEqual(calls[1:], [(day(8).timestamp(), day(10).timestamp()),
+                                     (day(12).timestamp(), day(14).timestamp())])
+        self.assertTrue((np.diff(out[:, TIME]) > 0).all())
+
+        cache.evict("CCC")
+        cache.get(symbol, tf, day(10), day(11))
+        self.assertEqual(len(calls), 4)
+
+    def test_forming_bar_is_refetched(self):
+        symbol, tf = MockSymbol("CCC"), MockUtils.HOURLY_TIMEFRAME
+        full = MockUtils.bars("CCC", tf)
+        start, now = full[10, TIME], full[20, TIME] + 1800
+        forming = full.copy()
+        forming[20, CLOSE] += 1
+        calls = []
+
+        def fetch(symbol, timeframe, start, end):
+            calls.append(toEpoch(start))
+            bars = forming if len(calls) == 1 else full
+            return bars[(bars[:, TIME] >= toEpoch(start)) & (bars[:, TIME] <= toEpoch(end))]
+
+        cache = RateCache(fetch)
+        self.assertEqual(cache.get(symbol, tf, start, now)[-1, CLOSE], forming[20, CLOSE])
+        out = cache.get(symbol, tf, start, full[25, TIME])
+        self.assertEqual(calls[1], full[20, TIME])
+        np.testing.assert_array_equal(out, full[10:26])
+
+    def test_enable_cache(self):
+        class CachedUtils(MockUtils):
+            pass
+
+        CachedUtils.enableCache()
+        symbol = MockSymbol("DDD")
+        MockUtils.calls.clear()
+        a = CachedUtils.getHourlyData(symbol, datetime(2022, 3, 1), datetime(2022, 3, 3))
+        b = CachedUtils.getHourlyData(symbol, datetime(2022, 3, 1, 5), datetime(2022, 3, 2))
+        self.assertEqual(len(MockUtils.calls), 1)
+        np.testing.assert_array_equal(b, a[5:25])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from datetime import date
+
+import numpy as np
+
+from art_trader.abstract.scenarios import ScenarioMatrix, TradeSet, replay, summarize
+from art_trader.abstract.testing import BacktestAccount
+from art_trader.abstract.ticks import SL_EXIT, TP_EXIT
+from art_trader.abstract.utils import OPEN, CLOSE
+from mock_broker import TICKERS, MockBacktester, MockStrategy
+
+START = date(2022, 3, 1)
+END = date(2022, 5, 2)
+
+
+class FeeBacktester(MockBacktester):
+
+    def calc_tx_fee(self, volume: float) -> float:
+        return 0.5 * volume
+
+
+class ScenarioTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.bt = FeeBacktester(MockStrategy(2.), TICKERS, START, END, BacktestAccount(1_000, "EUR"))
+        cls.bt.run_all_single_thread()
+        cls.trades = TradeSet.fromBacktester(cls.bt, point=0.01)
+        cls.filled = [x for x in cls.bt.ledger if x.get("exit_kind")]
+
+    def test_baseline_reproduces_backtest(self):
+        self.assertEqual(len(self.trades), len(self.filled))
+        profits, kinds = replay(self.trades, ScenarioMatrix())
+        np.testing.assert_allclose(profits[0], [x["profit"] for x in self.filled], rtol=1e-12)
+        np.testing.assert_array_equal(kinds[0], [x["exit_kind"] for x in self.filled])
+
+    def test_costs(self):
+        scenarios = ScenarioMatrix(spread_mult=[0, 1], fx_shift=[0, 0.1], fee_mult=[1, 3])
+        profits, _ = replay(self.trades, scenarios)
+        spread = np.array([self.trades.bars[i, self.trades.entry_idx[i], 5] for i in range(len(self.trades))])
+        # account in EUR: every trade is foreign, converted at 1.1 in the mock
+        gross = profits[0] + 1.
+        expected = (gross - spread * 0.01 * 2. * 1.1) * 1.1 - 3.
+        np.testing.assert_allclose(profits[1], expected, rtol=1e-9)
+
+    def test_shock_matches_rescan(self):
+        shock = 0.001
+        profits, kinds = replay(self.trades, ScenarioMatrix(shock=[shock]))
+        symbols = {x.info.ticker: x for x in self.bt.symbols}
+        for i, cell in enumerate(self.filled):
+            window = self.trades.bars[i, :self.trades.lengths[i]].copy()
+            window[self.trades.entry_idx[i] + 1:, OPEN:CLOSE + 1] *= 1 + shock
+            fill = self.bt.fill(cell, window, symbols[cell["ticker"]])
+            self.assertEqual(kinds[0, i], fill["exit_kind"])
+            self.assertAlmostEqual(profits[0, i], fill["profit"], places=9)
+
+    def test_gap_exits_at_open(self):
+        profits, kinds = replay(self.trades, ScenarioMatrix(shock=[-0.05]))
+        has_next = self.trades.entry_idx + 1 < self.trades.lengths
+        no_early_exit = (self.trades.exit_idx > self.trades.entry_idx) | (self.trades.kind == 3)
+        gapped = has_next & no_early_exit
+        expected = np.where(self.trades.is_long, SL_EXIT, TP_EXIT)
+        np.testing.assert_array_equal(kinds[0, gapped], expected[gapped])
+        self.assertLess(profits[0, gapped & self.trades.is_long].max(), 0)
+
+    def test_open_already_past_sl_is_not_a_gap(self):
+        # long at 100, SL 99: the bar after the entry already opens below the SL, the SL fills on the next one
+        window = np.array([[0., 100., 100.5, 99.5, 100., 0.],
+                           [1., 98., 98.5, 97.5, 98., 0.],
+                           [2., 98., 99.5, 97., 99.2, 0.]])
+        cell = {"ticker": "AAA", "day": START, "is_long": True, "entry_price": 100., "TP": 101., "SL": 99.,
+                "volume": 1., "exit_kind": SL_EXIT, "entry_time": 0., "exit_time": 2., "exit_price": 99.}
+        trades = TradeSet([cell], [window], [1.], [1.], [False], [0.], [0.])
+        profits, kinds = replay(trades, ScenarioMatrix(shock=[0., 0.001]))
+        np.testing.assert_array_equal(kinds[:, 0], [SL_EXIT, SL_EXIT])
+        np.testing.assert_allclose(profits[:, 0], [-1., -1.])
+
+    def test_cells_without_fills_are_left_out(self):
+        class Custom(MockBacktester):
+            def simulate(self, symbol, day):
+                return 1.
+
+        bt = Custom(MockStrategy(), TICKERS, START, date(2022, 3, 4), BacktestAccount(1_000, "USD"))
+        bt.run_all_single_thread()
+        with self.assertLogs("art_trader.abstract.scenarios", "WARNING"):
+            self.assertEqual(len(TradeSet.fromBacktester(bt)), 0)
+
+    def test_grid_and_summary(self):
+        scenarios = ScenarioMatrix.grid(spread_mult=[0, 1, 2], shock=[0, -0.01, 0.01], slippage=[0, 1e-4])
+        self.assertEqual(len(scenarios), 18)
+        profits, kinds = replay(self.trades, scenarios)
+        summary = summarize(self.trades, scenarios, profits, kinds)
+        self.assertEqual(len(summary), 18)
+        baseline = summary[(summary.spread_mult == 0) & (summary.shock == 0) & (summary.slippage == 0)]
+        self.assertAlmostEqual(baseline.profit.iloc[0], self.bt.account.balance - 1_000, places=6)
+        self.assertTrue((summary.max_drawdown >= 0).all())
+        with self.assertRaises(ValueError):
+            ScenarioMatrix(spread=[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
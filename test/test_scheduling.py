@@ -0,0 +1,209 @@
+import asyncio
+import time as clock
+import unittest
+from datetime import datetime, time, timedelta
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
+
+import mock_broker
+from art_trader.abstract.common import Strategy, Trade
+from art_trader.abstract.scheduling import (ERROR, LATE, NO_TRADE, SENT, BrokerExecutor, LiveScheduler,
+                                            ScheduledJob)
+from art_trader.abstract.trading import Trader
+from art_trader.abstract.utils import CLOSE, BrokerUtils
+from mock_broker import MockSymbol
+
+
+class MockStrategy(Strategy):
+    def strat(self, symbol, day):
+        return Trade(symbol.info.ticker, True, 1., 2., 0.5, 1)
+
+
+class MockTrader(Trader):
+
+    def __init__(self, delays=None, send_delay=0):
+        self.strategy = MockStrategy()
+        self.delays = delays or {}
+        self.send_delay = send_delay
+        self.sent = []
+
+    def trade(self, symbol, day):
+        ticker = symbol.info.ticker
+        if ticker == "NONE":
+            return None
+        if ticker == "BAD":
+            raise Exception("boom")
+        clock.sleep(self.delays.get(ticker, 0))
+        return super().trade(symbol, day)
+
+    def send(self, order):
+        clock.sleep(self.send_delay)
+        self.sent.append(order["ticker"])
+        return True
+
+    def close(self, order):
+        pass
+
+    def cancel(self, order):
+        pass
+
+    def get_open_orders(self, symbol):
+        return []
+
+    def get_pending_orders(self, symbol):
+        return []
+
+    def get_closed_orders(self, symbol, start, end):
+        return []
+
+
+class WarmUtils(mock_broker.MockUtils):
+
+    xr = classmethod(BrokerUtils.xr.__func__)
+
+    def exists(symbol):
+        return symbol.info.ticker == "USDEUR-Z"
+
+    @classmethod
+    def now(cls):
+        return datetime(2022, 6, 1, 10, tzinfo=ZoneInfo("UTC"))
+
+
+class LookbackStrategy(MockStrategy):
+
+    lookback = {WarmUtils.HOURLY_TIMEFRAME: 5}
+
+    def strat(self, symbol, day, context=None):
+        return super().strat(symbol, day)
+
+
+class WarmTrader(MockTrader):
+
+    brokerUtil = WarmUtils
+
+    def __init__(self):
+        super().__init__()
+        self.strategy = LookbackStrategy()
+
+    def buildOrderTemplate(self, symbol):
+        return {"symbol": symbol.info.ticker, "magic": 1}
+
+
+class WarmupTest(unittest.TestCase):
+
+    def test_xr_finds_inverted_pair(self):
+        rate = WarmUtils.xr("EUR", "USD", datetime(2022, 3, 1, 10))
+        bars = mock_broker.hourly_bars("USDEUR-Z")
+        hour = int((datetime(2022, 3, 1, 10) - mock_broker.START).total_seconds() // 3600)
+        self.assertAlmostEqual(rate, 1 / bars[hour, CLOSE])
+        with self.assertRaises(Exception):
+            WarmUtils.xr("GBP", "USD", datetime(2022, 3, 1, 10))
+
+    def test_warmup(self):
+        trader = WarmTrader()
+        symbols = [MockSymbol("A"), MockSymbol("B")]
+        symbols[1].info.currency_profit = "EUR"
+        report = trader.warmup(symbols, currency="USD")
+        self.assertEqual(set(report), {"lookback", "symbols", "fx", "ticks", "orders"})
+        self.assertFalse([k for k, v in report.items() if isinstance(v, Exception)])
+
+        # the lookback is loaded up to the warmup time
+        rates = trader.context.rates("A", WarmUtils.HOURLY_TIMEFRAME)
+        self.assertEqual(len(rates), 5)
+        self.assertEqual(rates[-1, 0], datetime(2022, 6, 1, 9, tzinfo=ZoneInfo("UTC")).timestamp())
+
+        self.assertEqual(trader.order_templates["B"], {"symbol": "B", "magic": 1})
+        self.assertIs(trader.orderTemplate(symbols[1]), trader.order_templates["B"])
+
+        # a failing step does not stop the others
+        report = trader.warmup(symbols, currency="GBP")
+        self.assertIsInstance(report["fx"], Exception)
+        self.assertIsInstance(report["orders"], float)
+
+    def test_symbols_added_after_warmup(self):
+        trader = WarmTrader()
+        trader.warmup([MockSymbol("A")])
+        self.assertEqual(trader.trade(MockSymbol("C"), None)["ticker"], "C")
+        self.assertEqual(len(trader.context.rates("C", WarmUtils.HOURLY_TIMEFRAME)), 5)
+
+    def test_mt5_tick_snapshot(self):
+        from art_trader.mt5.common import mt5
+        from art_trader.mt5.trading import MT5Trader
+
+        calls = []
+        terminal = SimpleNamespace(symbol_info_tick=lambda x: calls.append(x) or SimpleNamespace(bid=1., ask=1.1),
+                                   last_error=lambda: (1, "unknown symbol"))
+        module, mt5._module = mt5._module, terminal
+        try:
+            trader = MT5Trader()
+            trader.tick_ttl = 60.
+            symbol = MockSymbol("A")
+            trader.warmTicks([symbol])
+            self.assertEqual(trader.lastTick(symbol).ask, 1.1)
+            self.assertEqual(calls, ["A"])
+
+            # stale: refreshed
+            trader.ticks["A"] = (clock.monotonic() - 61, trader.ticks["A"][1])
+            trader.lastTick(symbol)
+            self.assertEqual(calls, ["A", "A"])
+            self.assertLess(clock.monotonic() - trader.ticks["A"][0], 60)
+
+            terminal.symbol_info_tick = lambda x: None
+            with self.assertRaises(Exception):
+                trader.lastTick(MockSymbol("B"))
+        finally:
+            mt5._module = module
+
+    def test_scheduler_runs_warmup(self):
+        scheduler = LiveScheduler()
+        job = scheduler.add_job(WarmTrader(), [MockSymbol("A")], time(8, 0), warmup=timedelta(minutes=5))
+        report = asyncio.run(scheduler.run_warmup(job))
+        self.assertIn("A", job.trader.order_templates)
+        self.assertIsInstance(report["lookback"], float)
+
+
+class LiveSchedulerTest(unittest.TestCase):
+
+    def test_run_cycle(self):
+        trader = MockTrader()
+        scheduler = LiveScheduler()
+        symbols = [MockSymbol(x) for x in ["A", "B", "NONE", "BAD"]]
+        job = scheduler.add_job(trader, symbols, time(8, 0))
+        results = asyncio.run(scheduler.run_cycle(job))
+        self.assertEqual(results, {"A": SENT, "B": SENT, "NONE": NO_TRADE, "BAD": ERROR})
+        self.assertEqual(sorted(trader.sent), ["A", "B"])
+
+    def test_late_work_is_cancelled(self):
+        # a slow strategy does not hold up the others, which no longer share the broker thread
+        trader = MockTrader(delays={"SLOW": 0.3})
+        scheduler = LiveScheduler()
+        symbols = [MockSymbol(x) for x in ["SLOW", "A", "B"]]
+        job = scheduler.add_job(trader, symbols, time(8, 0), deadline=timedelta(seconds=0.1))
+        results = asyncio.run(scheduler.run_cycle(job))
+        self.assertEqual(results, {"SLOW": LATE, "A": SENT, "B": SENT})
+        scheduler.shutdown()
+        self.assertEqual(sorted(trader.sent), ["A", "B"])
+
+    def test_started_send_is_not_late(self):
+        trader = MockTrader(send_delay=0.15)
+        scheduler = LiveScheduler(executor=BrokerExecutor(max_workers=1))
+        symbols = [MockSymbol(x) for x in ["A", "B"]]
+        job = scheduler.add_job(trader, symbols, time(8, 0), deadline=timedelta(seconds=0.1))
+        results = asyncio.run(scheduler.run_cycle(job))
+        scheduler.shutdown()
+        # the first send was at the broker when the deadline passed, the second was still queued
+        self.assertEqual(sorted(results.values()), [LATE, SENT])
+        self.assertEqual(len(trader.sent), 1)
+        self.assertEqual(results[trader.sent[0]], SENT)
+
+    def test_next_run(self):
+        tz = ZoneInfo("UTC")
+        job = ScheduledJob(MockTrader(), [], time(8, 0), timedelta(seconds=1))
+        friday_evening = datetime(2022, 12, 9, 9, 0, tzinfo=tz)
+        self.assertEqual(job.next_run(friday_evening), datetime(2022, 12, 12, 8, 0, tzinfo=tz))
+        monday_morning = datetime(2022, 12, 12, 7, 0, tzinfo=tz)
+        self.assertEqual(job.next_run(monday_morning), datetime(2022, 12, 12, 8, 0, tzinfo=tz))
+
+
+if __name__ == '__main__':
+    unittest.main()
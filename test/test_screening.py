@@ -0,0 +1,99 @@
+import unittest
+from datetime import date
+
+import numpy as np
+
+from art_trader.abstract.screening import (NO_TRADE, SCREENED, PriceFilter, Screen, SpreadFilter, VolatilityFilter,
+                                           rollingMean)
+from art_trader.abstract.testing import BacktestAccount
+from art_trader.abstract.utils import CLOSE, HIGH, LOW, OPEN, SPREAD
+from mock_broker import TICKERS, MockBacktester, MockStrategy, MockSymbol, MockUtils, daily_bars, hourly_bars
+
+START = date(2022, 3, 1)
+END = date(2022, 4, 1)
+
+
+class ScreenedStrategy(MockStrategy):
+
+    screen = [VolatilityFilter(high=0.025, window=5)]
+
+
+class SparseStrategy(MockStrategy):
+    """Trades only on Mondays."""
+
+    def strat(self, symbol, day):
+        return super().strat(symbol, day) if day.weekday() == 0 else None
+
+
+class CountingBacktester(MockBacktester):
+
+    def getPriceAction(self, symbol, day):
+        self.fetched.append((symbol.info.ticker, day))
+        return super().getPriceAction(symbol, day)
+
+
+class ScreeningTest(unittest.TestCase):
+
+    def run_bt(self, strategy):
+        bt = CountingBacktester(strategy, TICKERS, START, END, BacktestAccount(1_000, "USD"))
+        bt.fetched = []
+        return bt, bt.run_all_single_thread()
+
+    def test_rolling_mean(self):
+        np.testing.assert_allclose(rollingMean(np.arange(5.), 2), [np.nan, .5, 1.5, 2.5, 3.5])
+        self.assertTrue(np.isnan(rollingMean(np.arange(2.), 3)).all())
+
+    def test_screen_symbol(self):
+        bars = daily_bars(hourly_bars("AAA"))
+        days = (bars[:, 0] // 86400).astype(np.int64)
+        f = VolatilityFilter(high=0.025, window=5)
+        out = Screen([f]).screenSymbol(bars, days[10:40])
+
+        vol = (bars[:, HIGH] - bars[:, LOW]) / bars[:, CLOSE]
+        expected = [vol[i - 5:i].mean() <= 0.025 for i in range(10, 40)]
+        self.assertEqual(out.tolist(), expected)
+        self.assertTrue(0 < out.sum() < len(out))
+
+        # a day without a bar never passes, nor one with no bar before it
+        self.assertFalse(Screen([]).screenSymbol(bars, np.array([days[5] - 100, days[-1] + 1])).any())
+        self.assertFalse(Screen([]).screenSymbol(bars[:0], days[:3]).any())
+
+    def test_filters(self):
+        bars = np.zeros((4, 6))
+        bars[:, OPEN] = bars[:, CLOSE] = [10., 20., 30., 40.]
+        bars[:, SPREAD] = [1., 3., 5., 1.]
+        self.assertEqual(PriceFilter(15., 35.).evaluate(bars).tolist(), [False, True, True, False])
+        self.assertEqual(SpreadFilter(3., window=2).evaluate(bars).tolist(), [False, True, False, True])
+
+    def test_run(self):
+        symbols = [MockSymbol(x) for x in TICKERS]
+        screen = Screen([VolatilityFilter(high=0.025, window=5)]).run(MockUtils, symbols, START, END)
+        self.assertEqual(screen.mask.shape, (len(TICKERS), len(screen.days)))
+        bars = daily_bars(hourly_bars("BBB"))
+        days = np.array([(np.datetime64(d) - np.datetime64("1970-01-01")).astype(int) for d in screen.days])
+        self.assertEqual(screen.mask[1].tolist(), Screen(screen.filters).screenSymbol(bars, days).tolist())
+        self.assertTrue(screen.passes("ZZZ", START))
+
+    def test_backtest_skips_screened(self):
+        full, full_result = self.run_bt(MockStrategy())
+        bt, result = self.run_bt(ScreenedStrategy())
+
+        self.assertEqual(len(bt.ledger), len(full.ledger))
+        self.assertLess(len(bt.fetched), len(full.fetched))
+        for cell, expected in zip(bt.ledger, full.ledger):
+            passed = bt.screening.passes(cell["ticker"], cell["day"])
+            self.assertEqual(cell.get("skipped"), None if passed else SCREENED)
+            self.assertEqual(cell["profit"], expected["profit"] if passed else 0.)
+
+    def test_no_trade(self):
+        bt, result = self.run_bt(SparseStrategy())
+        mondays = [x for x in bt.ledger if x["day"].weekday() == 0]
+        self.assertEqual(len(bt.fetched), len(mondays))
+        self.assertTrue(all(x["skipped"] == NO_TRADE and x["profit"] == 0. for x in bt.ledger
+                            if x["day"].weekday() != 0))
+        self.assertAlmostEqual(result.profit.sum(), sum(x["profit"] for x in mondays))
+        self.assertEqual(bt.simulate(bt.symbols[0], date(2022, 3, 2)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import multiprocessing
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+
+import numpy as np
+
+from art_trader.abstract import shm
+from art_trader.abstract.shm import SharedRates, SharedRatesMixin, SharedView, attach, detach, serve
+from art_trader.abstract.testing import BacktestAccount
+from mock_broker import TICKERS, MockBacktester, MockStrategy, MockSymbol, MockUtils
+
+START = date(2022, 3, 1)
+END = date(2022, 4, 1)
+
+
+class SharedMockUtils(SharedRatesMixin, MockUtils):
+    pass
+
+
+class CachedMockUtils(MockUtils):
+    pass
+
+
+class SharedMockBacktester(MockBacktester):
+
+    brokerUtil = SharedMockUtils
+
+
+class SharedMockStrategy(MockStrategy):
+
+    broker_utils = SharedMockUtils
+
+
+def runShared(ticker: str) -> tuple:
+    MockUtils.calls.clear()
+    bt = SharedMockBacktester(SharedMockStrategy(), [ticker], START, END, BacktestAccount(1_000, "USD"))
+    balance = bt.run_all_single_thread().balance.values
+    return balance, len(MockUtils.calls)
+
+
+class SharedRatesTest(unittest.TestCase):
+
+    def setUp(self):
+        symbols = [MockSymbol(x) for x in TICKERS]
+        self.shared = SharedRates.fromBroker(MockUtils, symbols, [MockUtils.HOURLY_TIMEFRAME, MockUtils.DAILY_TIMEFRAME],
+                                             datetime(2022, 1, 1), datetime(2022, 6, 1))
+
+    def tearDown(self):
+        detach()
+        self.shared.close()
+        self.shared.unlink()
+
+    def test_views(self):
+        view = SharedView(self.shared.manifest)
+        try:
+            rates = view.get("AAA", MockUtils.HOURLY_TIMEFRAME)
+            start, end = datetime(2022, 1, 1), datetime(2022, 6, 1)
+            np.testing.assert_array_equal(rates, MockUtils.getHourlyData(MockSymbol("AAA"), start, end))
+            self.assertFalse(rates.flags.writeable)
+            self.assertIsNone(view.get("AAA", MockUtils.M10_TIMEFRAME))
+            self.assertEqual(self.shared.manifest.nbytes, sum(
+                self.shared.get(t, tf).nbytes for t, tf in self.shared.manifest.entries))
+        finally:
+            view.close()
+
+    def test_mixin_serves_published_rates(self):
+        attach(self.shared.manifest)
+        symbol = MockSymbol("BBB")
+        start, end = datetime(2022, 3, 1), datetime(2022, 3, 2, 5)
+        MockUtils.calls.clear()
+        np.testing.assert_array_equal(SharedMockUtils.getHourlyData(symbol, start, end),
+                                      MockUtils.getHourlyData(symbol, start, end))
+        self.assertEqual(len(MockUtils.calls), 1)
+
+        # not published: falls back to the broker
+        with self.assertRaises(Exception):
+            SharedMockUtils.getM10Data(symbol, start, end)
+
+    def test_serve_through_rate_cache(self):
+        self.assertEqual(serve(CachedMockUtils), 0)
+        attach(self.shared.manifest)
+        try:
+            self.assertEqual(serve(CachedMockUtils), 8)
+            symbol = MockSymbol("CCC")
+            MockUtils.calls.clear()
+            start, end = datetime(2022, 3, 1), datetime(2022, 3, 2, 5)
+            np.testing.assert_array_equal(CachedMockUtils.getHourlyData(symbol, start, end),
+                                          MockUtils.getHourlyData(symbol, start, end))
+            self.assertEqual(len(MockUtils.calls), 1)
+            self.assertEqual(CachedMockUtils.rate_cache.nbytes, 0)  # not this process's memory
+
+            # outside the published range: only the missing part is fetched
+            CachedMockUtils.getHourlyData(symbol, datetime(2021, 12, 30), end)
+            self.assertEqual(MockUtils.calls[-1][2].date(), date(2021, 12, 30))
+            self.assertEqual(len(MockUtils.calls), 2)
+        finally:
+            CachedMockUtils.rate_cache = None
+
+    def test_workers_share_one_copy(self):
+        expected = MockBacktester(MockStrategy(), ["AAA"], START, END, BacktestAccount(1_000, "USD"))
+        expected = expected.run_all_single_thread().balance.values
+
+        for method in ("spawn", "fork"):
+            with ProcessPoolExecutor(2, multiprocessing.get_context(method), initializer=attach,
+                                     initargs=(self.shared.manifest,)) as pool:
+                results = list(pool.map(runShared, TICKERS))
+            np.testing.assert_array_equal(results[0][0], expected)
+            self.assertEqual([x[1] for x in results], [0] * len(TICKERS))
+
+        # the block outlives the workers
+        view = SharedView(self.shared.manifest)
+        self.assertEqual(view.get("DDD", MockUtils.DAILY_TIMEFRAME).shape[1], 6)
+        view.close()
+        self.assertIsNone(shm._attached)
+
+
+if __name__ == '__main__':
+    unittest.main()
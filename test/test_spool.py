@@ -0,0 +1,119 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+from datetime import date
+
+import numpy as np
+
+from art_trader.abstract.spool import BacktestJob, JobSpool, reduce, run_worker, shard
+from art_trader.abstract.testing import BacktestAccount
+from mock_broker import TICKERS, MockBacktester, MockStrategy
+
+START = date(2022, 3, 1)
+END = date(2022, 4, 15)
+
+
+class FailingStrategy(MockStrategy):
+
+    def strat(self, symbol, day):
+        raise RuntimeError("boom")
+
+
+class FailingBacktester(MockBacktester):
+
+    def run_all_single_thread(self):
+        raise RuntimeError("boom")
+
+
+def jobs(config="base", volume=1.):
+    return shard(config, MockBacktester, MockStrategy(volume), TICKERS, START, END, 1_000, "USD",
+                 symbols_per_job=3, days_per_job=7)
+
+
+class ShardTest(unittest.TestCase):
+
+    def test_shards_cover_the_run(self):
+        out = jobs()
+        self.assertEqual(len(out), 5 * 2)  # 33 market days in blocks of 7, 4 symbols in blocks of 3
+        self.assertEqual(out[0].start, START)
+        self.assertEqual(out[-1].end, END)
+        self.assertEqual(sorted({x.job_id for x in out}), [x.job_id for x in out])
+        self.assertEqual(sum(len(x.tickers) for x in out if x.start == START), len(TICKERS))
+
+
+class SpoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.root = self.dir.name
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_local_processes_match_single_run(self):
+        spool = JobSpool(self.root)
+        self.assertEqual(spool.submit(jobs("base") + jobs("double", volume=2.)), 20)
+        self.assertEqual(spool.submit(jobs("base")), 0)
+
+        ctx = multiprocessing.get_context("spawn")
+        workers = [ctx.Process(target=run_worker, args=(self.root,)) for _ in range(3)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join(60)
+            self.assertEqual(w.exitcode, 0)
+        self.assertEqual(spool.status(), {"total": 20, "done": 20, "failed": 0, "running": 0})
+
+        curves = reduce(self.root)
+        for config, volume in (("base", 1.), ("double", 2.)):
+            account = BacktestAccount(1_000, "USD")
+            expected = MockBacktester(MockStrategy(volume), TICKERS, START, END, account).run_all_single_thread()
+            np.testing.assert_allclose(curves[config].profit.values, expected.profit.values, rtol=1e-12)
+            np.testing.assert_allclose(curves[config].balance.values, expected.balance.values, rtol=1e-12)
+            self.assertEqual(list(curves[config].index), list(expected.index))
+
+    def test_locks(self):
+        spool = JobSpool(self.root, stale_after=60)
+        spool.submit(jobs()[:2])
+        a, b = spool.claim("a"), spool.claim("b")
+        self.assertNotEqual(a.job_id, b.job_id)
+        self.assertIsNone(spool.claim("c"))
+
+        # a died: once its lock is stale, the job is reclaimed
+        lock = spool._path("locks", a.job_id)
+        os.utime(lock, (time.time() - 120, time.time() - 120))
+        self.assertEqual(spool.claim("c").job_id, a.job_id)
+        with open(lock) as f:
+            self.assertEqual(f.read(), "c")
+
+        spool.complete(a.job_id, a.run())
+        spool.release(b.job_id)
+        self.assertEqual(spool.claim("d").job_id, b.job_id)
+
+    def test_failures(self):
+        spool = JobSpool(self.root)
+        job = BacktestJob("bad", "bad", FailingBacktester, MockStrategy(), ["AAA"], START, END, 1_000, "USD")
+        spool.submit([job] + jobs()[:1])
+        self.assertEqual(run_worker(self.root), 1)
+        self.assertEqual(spool.status()["failed"], 1)
+        self.assertEqual(run_worker(self.root), 0)
+        with self.assertRaises(Exception):
+            reduce(self.root)
+        self.assertEqual(list(reduce(self.root, allow_missing=True)), ["base"])
+
+    def test_strategy_errors_do_not_fail_the_job(self):
+        # unlike a crashing backtester, a strategy failing on every cell only yields zero profits
+        spool = JobSpool(self.root)
+        spool.submit([BacktestJob("zero", "zero", MockBacktester, FailingStrategy(), ["AAA"], START, END, 1_000,
+                                  "USD")])
+        self.assertEqual(run_worker(self.root), 1)
+        self.assertEqual(spool.status()["failed"], 0)
+        curve = reduce(self.root)["zero"]
+        self.assertEqual(curve.profit.abs().sum(), 0)
+        self.assertTrue((curve.balance == 1_000).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from art_trader.abstract.history import toMsc
+from art_trader.abstract.testing import BacktestAccount
+from art_trader.abstract.ticks import (CLOSE_EXIT, NOT_FILLED, SL_EXIT, TICK_DTYPE, TP_EXIT, FileTickSource,
+                                       TickReplay, TickSource, fillTicks, merge)
+from mock_broker import MockBacktester, MockStrategy
+
+T0 = datetime(2023, 1, 2)
+
+
+def make_ticks(times, mid, spread=0.):
+    out = np.zeros(len(times), dtype=TICK_DTYPE)
+    out["time_msc"] = times
+    out["bid"] = np.asarray(mid) - spread / 2
+    out["ask"] = np.asarray(mid) + spread / 2
+    return out
+
+
+class MemoryTickSource(TickSource):
+
+    def __init__(self, ticks, chunk_size):
+        super().__init__(chunk_size)
+        self.ticks = ticks
+
+    def _read(self, ticker, start_msc, count):
+        i = np.searchsorted(self.ticks["time_msc"], start_msc)
+        return self.ticks[i:i + count]
+
+
+class SecondsTickSource(MemoryTickSource):
+    """Reads from the start of the cursor's second, like `copy_ticks_from`."""
+
+    def _read(self, ticker, start_msc, count):
+        return super()._read(ticker, start_msc - start_msc % 1000, count)
+
+
+class TickSourceTest(unittest.TestCase):
+
+    def test_chunks_with_shared_milliseconds(self):
+        base = toMsc(T0)
+        times = base + np.array([0, 1, 1, 1, 1, 2, 3, 3, 4, 5, 5, 5, 5, 5, 6])
+        ticks = make_ticks(times, np.arange(len(times), dtype=float))
+        source = MemoryTickSource(ticks, chunk_size=3)
+        chunks = list(source.chunks("A", T0, T0 + timedelta(seconds=1)))
+        np.testing.assert_array_equal(np.concatenate(chunks)["bid"], ticks["bid"])
+        self.assertTrue(all(len(x) <= 3 for x in chunks))
+
+    def test_batch_before_cursor(self):
+        # more ticks in the cursor's second before the cursor than a whole batch
+        times = toMsc(T0) + np.concatenate([np.arange(10), [500, 501, 502, 1500]])
+        ticks = make_ticks(times, np.arange(len(times), dtype=float))
+        source = SecondsTickSource(ticks, chunk_size=4)
+        chunks = list(source.chunks("A", T0 + timedelta(milliseconds=500), T0 + timedelta(seconds=2)))
+        np.testing.assert_array_equal(np.concatenate(chunks)["bid"], [10, 11, 12, 13])
+        self.assertTrue(all(len(x) <= 4 for x in chunks))
+
+    def test_file_store(self):
+        times = toMsc(T0) + np.arange(0, 3 * 86_400_000, 3_600_000)
+        ticks = make_ticks(times, np.arange(len(times), dtype=float))
+        with tempfile.TemporaryDirectory() as d:
+            source = FileTickSource(d, chunk_size=10)
+            source.write("A", ticks)
+            chunks = list(source.chunks("A", T0 + timedelta(hours=5), T0 + timedelta(days=2, hours=3)))
+        self.assertTrue(all(len(x) <= 10 for x in chunks))
+        out = np.concatenate(chunks)
+        np.testing.assert_array_equal(out["bid"], np.arange(5, 52))
+
+    def test_file_store_read(self):
+        times = toMsc(T0) + np.arange(0, 3 * 86_400_000, 3_600_000)
+        ticks = make_ticks(times, np.arange(len(times), dtype=float))
+        with tempfile.TemporaryDirectory() as d:
+            source = FileTickSource(d)
+            source.write("A", ticks[:24])
+            source.write("A", ticks[48:])  # a day missing
+            self.assertEqual(source.days("A"), [date(2023, 1, 2), date(2023, 1, 4)])
+            # crosses the missing day
+            batch = source._read("A", int(times[20]) + 1, 6)
+            np.testing.assert_array_equal(batch["bid"], [21, 22, 23, 48, 49, 50])
+            self.assertEqual(len(source._read("A", int(times[-1]) + 1, 6)), 0)
+            self.assertEqual(len(source._read("B", int(times[0]), 6)), 0)
+
+
+class MergeTest(unittest.TestCase):
+
+    def test_merge_is_time_ordered(self):
+        rng = np.random.default_rng(1)
+        streams, all_times = [], []
+        for _ in range(3):
+            times = np.sort(rng.integers(0, 10_000, 500))
+            all_times.append(times)
+            ticks = make_ticks(times, np.zeros(len(times)))
+            streams.append([ticks[i:i + 50] for i in range(0, len(ticks), 50)])
+        chunks = list(merge(streams, chunk_size=64))
+        out = np.concatenate(chunks)
+        self.assertTrue(all(len(x) <= 64 for x in chunks))
+        np.testing.assert_array_equal(out["time_msc"], np.sort(np.concatenate(all_times)))
+        self.assertTrue((np.diff(out["time_msc"]) >= 0).all())
+        self.assertEqual(np.bincount(out["symbol"]).tolist(), [500, 500, 500])
+
+    def test_replay_counts_every_tick(self):
+        times = toMsc(T0) + np.arange(0, 86_400_000, 60_000)
+        with tempfile.TemporaryDirectory() as d:
+            source = FileTickSource(d, chunk_size=100)
+            source.write("A", make_ticks(times, np.ones(len(times))))
+            source.write("B", make_ticks(times + 1, np.ones(len(times))))
+            seen = []
+            total = TickReplay(source, ["A", "B"]).run(T0, T0 + timedelta(days=1), lambda x: seen.append(len(x)))
+        self.assertEqual(total, 2 * len(times))
+        self.assertLessEqual(max(seen), 100)
+
+
+class FillTicksTest(unittest.TestCase):
+
+    def chunks(self, mid, spread=0.):
+        ticks = make_ticks(np.arange(len(mid)), mid, spread)
+        return [ticks[i:i + 2] for i in range(0, len(ticks), 2)]
+
+    def test_long_stop_to_tp(self):
+        trade = {"is_long": True, "entry_price": 101, "TP": 103, "SL": 99}
+        fill = fillTicks(trade, self.chunks([100, 100.5, 101.2, 102, 103.5, 99]))
+        self.assertEqual(fill["exit_kind"], TP_EXIT)
+        self.assertEqual((fill["entry_time"], fill["entry_price"]), (2, 101.2))
+        self.assertEqual((fill["exit_time"], fill["exit_price"]), (4, 103.5))
+
+    def test_short_limit_to_sl_with_spread(self):
+        trade = {"is_long": False, "entry_price": 101, "TP": 99, "SL": 102}
+        fill = fillTicks(trade, self.chunks([100, 101.5, 101.8, 102.5], spread=0.2))
+        self.assertEqual(fill["exit_kind"], SL_EXIT)
+        self.assertAlmostEqual(fill["entry_price"], 101.4)
+        self.assertAlmostEqual(fill["exit_price"], 102.6)
+
+    def test_close_and_no_fill(self):
+        trade = {"is_long": True, "entry_price": 101, "TP": 110, "SL": 90}
+        fill = fillTicks(trade, self.chunks([100, 101, 102, 103]))
+        self.assertEqual((fill["exit_kind"], fill["exit_price"]), (CLOSE_EXIT, 103))
+        fill = fillTicks(trade, self.chunks([100, 100.5]))
+        self.assertEqual(fill["exit_kind"], NOT_FILLED)
+
+
+class TickBacktestTest(unittest.TestCase):
+
+    def test_backtest_with_ticks(self):
+        day = date(2022, 3, 2)
+        bt = MockBacktester(MockStrategy(), ["AAA"], day, day + timedelta(days=1), BacktestAccount(1_000, "USD"))
+        symbol = bt.symbols[0]
+        trade = bt.trade(symbol, day)
+        entry = trade["entry_price"]
+        path = [0.995, 0.998, 1.0005, 1.004, 1.02] if trade["is_long"] else [1.005, 1.002, 0.9995, 0.996, 0.98]
+        times = toMsc(datetime(2022, 3, 2, 9)) + np.arange(len(path)) * 1000
+        with tempfile.TemporaryDirectory() as d:
+            bt.tick_source = FileTickSource(d)
+            bt.tick_source.write("AAA", make_ticks(times, entry * np.array(path)))
+            profit = bt.simulate(symbol, day)
+        self.assertAlmostEqual(profit, abs(path[-1] - path[2]) * entry)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import time
+import unittest
+
+from art_trader.abstract.workers import WorkerError, WorkerSupervisor
+from art_trader.mt5.workers import MT5Supervisor
+
+
+class MockAccount:
+    """Stands in for a terminal connection, one per worker process."""
+
+    def __init__(self, balance):
+        self.balance = balance
+        self.orders = []
+
+    def send(self, order):
+        self.orders.append(order)
+        return True
+
+    def state(self):
+        return {"pid": os.getpid(), "balance": self.balance, "orders": len(self.orders)}
+
+    def slow(self, seconds):
+        time.sleep(seconds)
+        return seconds
+
+    def fail(self):
+        raise ValueError("rejected")
+
+
+class MockAccountFactory:
+
+    def __init__(self, balance):
+        self.balance = balance
+
+    def __call__(self):
+        if self.balance < 0:
+            raise ValueError("cannot log in")
+        return MockAccount(self.balance)
+
+
+class MockTerminal(MockAccount):
+    """Enough of a TerminalWorker for MT5Supervisor, with EUR worth 1.1 USD."""
+
+    def __init__(self, balance, currency):
+        super().__init__(balance)
+        self.currency = currency
+
+    def equity(self, currency=None):
+        if currency is None or currency == self.currency:
+            return self.balance, self.currency
+        return self.balance * (1.1 if self.currency == "EUR" else 1 / 1.1), currency
+
+    def shutdown(self):
+        pass
+
+
+class MockTerminalFactory:
+
+    def __init__(self, balance, currency):
+        self.balance = balance
+        self.currency = currency
+
+    def __call__(self):
+        return MockTerminal(self.balance, self.currency)
+
+
+class WorkerSupervisorTest(unittest.TestCase):
+
+    def test_routing_and_aggregation(self):
+        factories = {"a": MockAccountFactory(100), "b": MockAccountFactory(200)}
+        with WorkerSupervisor(factories) as supervisor:
+            self.assertTrue(supervisor.call("a", "send", {"symbol": "EURUSD-Z"}))
+            self.assertTrue(supervisor.submit("a", "send", {"symbol": "GBPUSD-Z"}).result(timeout=5))
+
+            states = supervisor.broadcast("state")
+            self.assertEqual(states["a"]["orders"], 2)
+            self.assertEqual(states["b"]["orders"], 0)
+            self.assertEqual(sum(x["balance"] for x in states.values()), 300)
+            self.assertNotEqual(states["a"]["pid"], states["b"]["pid"])
+            self.assertNotEqual(states["a"]["pid"], os.getpid())
+
+            with self.assertRaises(WorkerError):
+                supervisor.call("b", "fail")
+            # the worker survives a failed call
+            self.assertEqual(supervisor.call("b", "state")["balance"], 200)
+
+    def test_parallel_broadcast(self):
+        factories = {str(i): MockAccountFactory(i) for i in range(4)}
+        with WorkerSupervisor(factories) as supervisor:
+            start = time.perf_counter()
+            results = supervisor.broadcast("slow", 0.5)
+            elapsed = time.perf_counter() - start
+        self.assertEqual(list(results.values()), [0.5] * 4)
+        self.assertLess(elapsed, 1.5)
+
+    def test_total_equity(self):
+        with MT5Supervisor({"a": MockTerminalFactory(100, "USD"), "b": MockTerminalFactory(200, "USD")}) as s:
+            self.assertEqual(s.total_equity(), 300)
+        with MT5Supervisor({"a": MockTerminalFactory(100, "USD"), "b": MockTerminalFactory(200, "EUR")}) as s:
+            with self.assertRaises(Exception):
+                s.total_equity()
+            self.assertAlmostEqual(s.total_equity("USD"), 320)
+
+    def test_failed_start(self):
+        supervisor = WorkerSupervisor({"ok": MockAccountFactory(1), "bad": MockAccountFactory(-1)})
+        with self.assertRaises(WorkerError):
+            supervisor.start()
+
+
+if __name__ == '__main__':
+    unittest.main()